@@ -0,0 +1,91 @@
+"""
+Compares the speed (and peak memory on CUDA) of full and sparse attention in a CogVideoX attention layer for an
+increasing number of video tokens. Example:
+
+    python benchmarks/cogvideox_sparse_attention.py --frames 4 7 13 --height 30 --width 45 --window_size 4 8 8
+
+The sizes are given in tokens, i.e. after the VAE and patchifying: a 49 frames 480x720 video is `13 x 30 x 45`.
+"""
+
+import argparse
+import time
+
+import torch
+
+from diffusers.models.attention_processor import (
+    Attention,
+    CogVideoXAttnProcessor2_0,
+    CogVideoXSparseAttnProcessor2_0,
+)
+
+
+def run(attn, hidden_states, encoder_hidden_states, video_shape, num_runs):
+    def forward():
+        with torch.no_grad():
+            attn(hidden_states, encoder_hidden_states, video_shape=video_shape)
+
+    forward()  # warmup
+    if hidden_states.device.type == "cuda":
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+
+    start = time.perf_counter()
+    for _ in range(num_runs):
+        forward()
+    if hidden_states.device.type == "cuda":
+        torch.cuda.synchronize()
+    seconds = (time.perf_counter() - start) / num_runs
+
+    memory = torch.cuda.max_memory_allocated() / 1024**3 if hidden_states.device.type == "cuda" else float("nan")
+    return seconds, memory
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, nargs="+", default=[2, 4, 7, 13])
+    parser.add_argument("--height", type=int, default=30)
+    parser.add_argument("--width", type=int, default=45)
+    parser.add_argument("--text_seq_length", type=int, default=226)
+    parser.add_argument("--window_size", type=int, nargs=3, default=[4, 8, 8])
+    parser.add_argument("--temporal_stride", type=int, default=None)
+    parser.add_argument("--num_attention_heads", type=int, default=48)
+    parser.add_argument("--attention_head_dim", type=int, default=64)
+    parser.add_argument("--num_runs", type=int, default=3)
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--dtype", type=str, default="bfloat16", choices=["float32", "float16", "bfloat16"])
+    args = parser.parse_args()
+
+    dtype = getattr(torch, args.dtype)
+    dim = args.num_attention_heads * args.attention_head_dim
+    attn = Attention(
+        query_dim=dim,
+        dim_head=args.attention_head_dim,
+        heads=args.num_attention_heads,
+        qk_norm="layer_norm",
+        eps=1e-6,
+        bias=True,
+        out_bias=True,
+        processor=CogVideoXAttnProcessor2_0(),
+    ).to(args.device, dtype)
+    dense_processor = CogVideoXAttnProcessor2_0()
+    sparse_processor = CogVideoXSparseAttnProcessor2_0(args.window_size, temporal_stride=args.temporal_stride)
+
+    print(
+        f"{'tokens':>8} {'grid':>14} {'full (s)':>10} {'sparse (s)':>11} {'speedup':>8} {'full (GB)':>10} {'sparse (GB)':>12}"
+    )
+    for frames in args.frames:
+        video_shape = (frames, args.height, args.width)
+        num_tokens = frames * args.height * args.width
+        hidden_states = torch.randn(1, num_tokens, dim, device=args.device, dtype=dtype)
+        encoder_hidden_states = torch.randn(1, args.text_seq_length, dim, device=args.device, dtype=dtype)
+
+        attn.set_processor(dense_processor)
+        dense_seconds, dense_memory = run(attn, hidden_states, encoder_hidden_states, video_shape, args.num_runs)
+        attn.set_processor(sparse_processor)
+        sparse_seconds, sparse_memory = run(attn, hidden_states, encoder_hidden_states, video_shape, args.num_runs)
+
+        grid = "x".join(str(size) for size in video_shape)
+        print(
+            f"{num_tokens:>8} {grid:>14} {dense_seconds:>10.4f} {sparse_seconds:>11.4f} "
+            f"{dense_seconds / sparse_seconds:>7.2f}x {dense_memory:>10.2f} {sparse_memory:>12.2f}"
+        )
@@ -0,0 +1,113 @@
+"""
+Measures how long it takes to import diffusers and breaks the time down per module.
+
+Each statement is run in a fresh interpreter with `python -X importtime`, so the numbers are cold-import numbers for
+the current environment (OS file cache aside). Example:
+
+    python benchmarks/import_time.py \
+        --stmt "import diffusers" --stmt "from diffusers import StableDiffusionXLPipeline" --budget 1.0
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List
+
+
+DEFAULT_STATEMENTS = ["import diffusers", "from diffusers import StableDiffusionXLPipeline"]
+IMPORTTIME_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+@dataclass
+class ModuleImportTime:
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def run_importtime(stmt: str) -> List[ModuleImportTime]:
+    """Runs `stmt` in a fresh interpreter and parses the `-X importtime` report."""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", stmt], capture_output=True, text=True, check=True
+    ).stderr
+
+    timings = []
+    for line in output.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            timings.append(
+                ModuleImportTime(
+                    name=match[4],
+                    self_us=int(match[1]),
+                    cumulative_us=int(match[2]),
+                    depth=len(match[3]) // 2,
+                )
+            )
+    return timings
+
+
+def total_time(timings: List[ModuleImportTime]) -> float:
+    """Total import time in seconds, i.e. the sum of the cumulative times of all top-level imports."""
+    return sum(timing.cumulative_us for timing in timings if timing.depth == 0) / 1e6
+
+
+def self_time_per_package(timings: List[ModuleImportTime]) -> Dict[str, float]:
+    """Self time in seconds grouped by top-level package (`torch`, `transformers`, `diffusers`, ...)."""
+    per_package = defaultdict(float)
+    for timing in timings:
+        per_package[timing.name.split(".")[0]] += timing.self_us / 1e6
+    return dict(per_package)
+
+
+def report(stmt: str, runs: List[List[ModuleImportTime]], top_k: int):
+    totals = [total_time(timings) for timings in runs]
+    print(f"\n`{stmt}`: {statistics.median(totals):.3f}s (median of {len(totals)}, min {min(totals):.3f}s)")
+
+    # The median run is the most representative one for the per-module breakdown.
+    timings = runs[totals.index(sorted(totals)[len(totals) // 2])]
+
+    print("\n  Self time per top-level package:")
+    per_package = sorted(self_time_per_package(timings).items(), key=lambda item: item[1], reverse=True)
+    for package, seconds in per_package[:top_k]:
+        print(f"    {seconds:8.3f}s  {package}")
+
+    print("\n  Slowest diffusers modules (cumulative, including what they import):")
+    diffusers_timings = [timing for timing in timings if timing.name.startswith("diffusers")]
+    for timing in sorted(diffusers_timings, key=lambda t: t.cumulative_us, reverse=True)[:top_k]:
+        print(f"    {timing.cumulative_us / 1e6:8.3f}s  {timing.name}  (self {timing.self_us / 1e6:.3f}s)")
+
+    return statistics.median(totals)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--stmt",
+        type=str,
+        action="append",
+        help="Import statement to time. Can be passed several times. Defaults to `import diffusers` and an SDXL pipeline import.",
+    )
+    parser.add_argument("--num_runs", type=int, default=3)
+    parser.add_argument("--top_k", type=int, default=15)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=None,
+        help="Exit with a non-zero status if the median import time of any statement exceeds this many seconds.",
+    )
+    args = parser.parse_args()
+
+    over_budget = []
+    for stmt in args.stmt or DEFAULT_STATEMENTS:
+        median = report(stmt, [run_importtime(stmt) for _ in range(args.num_runs)], args.top_k)
+        if args.budget is not None and median > args.budget:
+            over_budget.append(f"`{stmt}` took {median:.3f}s (budget {args.budget:.3f}s)")
+
+    if over_budget:
+        print("\nImport time budget exceeded:\n  " + "\n  ".join(over_budget))
+        sys.exit(1)
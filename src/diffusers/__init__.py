@@ -140,6 +140,7 @@ else:
             "AutoPipelineForImage2Image",
             "AutoPipelineForInpainting",
             "AutoPipelineForText2Image",
+            "CFGParallelMixin",
             "ConsistencyModelPipeline",
             "DanceDiffusionPipeline",
             "DDIMPipeline",
@@ -618,6 +619,7 @@ if TYPE_CHECKING or DIFFUSERS_SLOW_IMPORT:
             AutoPipelineForText2Image,
             BlipDiffusionControlNetPipeline,
             BlipDiffusionPipeline,
+            CFGParallelMixin,
             CLIPImageProjection,
             ConsistencyModelPipeline,
             DanceDiffusionPipeline,
@@ -1,7 +1,14 @@
-from typing import Any, Dict, List
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+import PIL.Image
+import torch
 
 from .configuration_utils import ConfigMixin, register_to_config
-from .utils import CONFIG_NAME
+from .image_processor import VaeImageProcessor
+from .utils import CONFIG_NAME, BaseOutput
 
 
 class PipelineCallback(ConfigMixin):
@@ -154,3 +161,150 @@ class IPAdapterScaleCutoffCallback(PipelineCallback):
         if step_index == cutoff_step:
             pipeline.set_ip_adapter_scale(0.0)
         return callback_kwargs
+
+
+@dataclass
+class LatentPreviewOutput(BaseOutput):
+    """
+    Preview of the intermediate latents pushed by [`LatentPreviewCallback`].
+
+    Args:
+        step_index (`int`):
+            The index of the denoising step.
+        timestep (`int` or `torch.Tensor`):
+            The timestep of the denoising step.
+        images (`List[PIL.Image.Image]`, `List[List[PIL.Image.Image]]`, `np.ndarray` or `torch.Tensor`):
+            The preview images. For video latents, there is a list of frames (or an extra frames dimension) per video.
+    """
+
+    step_index: int
+    timestep: Union[int, torch.Tensor]
+    images: Union[List[PIL.Image.Image], List[List[PIL.Image.Image]], np.ndarray, torch.Tensor]
+
+
+class LatentPreviewCallback(PipelineCallback):
+    """
+    Callback function to preview the intermediate latents of any pipeline. Every `preview_steps` steps (and at the last
+    step), the latents are decoded into low-cost previews that are pushed to `sink` as a [`LatentPreviewOutput`].
+
+    The latents are decoded either with a tiny autoencoder (`vae`, e.g. [`AutoencoderTiny`] with the TAESD, TAESDXL,
+    TAESD3 or TAEF1 weights) or with a linear projection of the latent channels to RGB (`latent_rgb_factors`), which
+    is almost free but only gives a preview at the latent resolution. Packed latents (like the ones of Flux) are
+    unpacked with the `_unpack_latents` method of the pipeline, and video latents are previewed frame by frame.
+
+    Note: This callback doesn't modify the latents.
+
+    Args:
+        sink (`Callable` or `queue.Queue`):
+            Where to push the previews: a function that is called with every preview, or an object with a `put`
+            method like a `queue.Queue`. To feed an `asyncio.Queue` from the thread running the pipeline, pass
+            `lambda preview: loop.call_soon_threadsafe(queue.put_nowait, preview)`.
+        vae (`AutoencoderTiny`, *optional*):
+            The tiny autoencoder to decode the latents with. It has to be on the device of the pipeline.
+        latent_rgb_factors (`List[List[float]]` or `torch.Tensor`, *optional*):
+            The `(num_channels, 3)` weights of the projection from the latent channels to RGB values in `[-1, 1]`.
+        latent_rgb_bias (`List[float]` or `torch.Tensor`, *optional*):
+            The bias of the projection from the latent channels to RGB values.
+        preview_steps (`int`, defaults to 1):
+            The number of denoising steps between two previews.
+        output_type (`str`, defaults to `"pil"`):
+            The output format of the previews. Choose between `"pil"`, `"np"` and `"pt"`.
+        height (`int`, *optional*):
+            The height in pixels of the generated images, to unpack packed latents. Defaults to square images.
+        width (`int`, *optional*):
+            The width in pixels of the generated images, to unpack packed latents. Defaults to square images.
+    """
+
+    tensor_inputs = ["latents"]
+
+    def __init__(
+        self,
+        sink: Callable[[LatentPreviewOutput], Any],
+        vae: Optional[torch.nn.Module] = None,
+        latent_rgb_factors: Optional[Union[List[List[float]], torch.Tensor]] = None,
+        latent_rgb_bias: Optional[Union[List[float], torch.Tensor]] = None,
+        preview_steps: int = 1,
+        output_type: str = "pil",
+        height: Optional[int] = None,
+        width: Optional[int] = None,
+    ):
+        if (vae is None) == (latent_rgb_factors is None):
+            raise ValueError("Either vae or latent_rgb_factors should be provided, not both or none.")
+        if not isinstance(preview_steps, int) or preview_steps < 1:
+            raise ValueError("preview_steps must be a positive integer.")
+        if output_type not in ["pil", "np", "pt"]:
+            raise ValueError(f"{output_type} does not exist. Please choose one of ['pil', 'np', 'pt']")
+
+        self.register_to_config(preview_steps=preview_steps, output_type=output_type, height=height, width=width)
+        self.sink = sink.put if hasattr(sink, "put") else sink
+        self.vae = vae
+        self.latent_rgb_factors = None
+        self.latent_rgb_bias = None
+        if latent_rgb_factors is not None:
+            self.latent_rgb_factors = torch.as_tensor(latent_rgb_factors, dtype=torch.float32)
+            bias = latent_rgb_bias if latent_rgb_bias is not None else [0.0, 0.0, 0.0]
+            self.latent_rgb_bias = torch.as_tensor(bias, dtype=torch.float32)
+        self.image_processor = VaeImageProcessor()
+
+    @property
+    def latent_channels(self) -> int:
+        if self.vae is not None:
+            return self.vae.config.latent_channels
+        return self.latent_rgb_factors.shape[0]
+
+    def _unpack_latents(self, pipeline, latents: torch.Tensor) -> torch.Tensor:
+        vae_scale_factor = pipeline.vae_scale_factor
+        height, width = self.config.height, self.config.width
+        if height is None or width is None:
+            size = math.isqrt(latents.shape[1]) * vae_scale_factor
+            height, width = height or size, width or size
+        return pipeline._unpack_latents(latents, height, width, vae_scale_factor)
+
+    def decode_latents(self, pipeline, latents: torch.Tensor) -> torch.Tensor:
+        r"""
+        Decodes the latents of `pipeline` into preview images in `[-1, 1]`. Video latents are decoded into a batch of
+        frames of shape `(batch_size, num_frames, 3, height, width)`.
+        """
+        if latents.ndim == 3 and hasattr(pipeline, "_unpack_latents"):
+            latents = self._unpack_latents(pipeline, latents)
+
+        num_frames = None
+        if latents.ndim == 5:
+            # the video latents are either (batch, channels, frames, height, width) or (batch, frames, channels, ...)
+            if latents.shape[1] == self.latent_channels:
+                latents = latents.transpose(1, 2)
+            num_frames = latents.shape[1]
+            latents = latents.flatten(0, 1)
+
+        if self.vae is not None:
+            latents = latents / self.vae.config.scaling_factor + getattr(self.vae.config, "shift_factor", 0.0)
+            images = self.vae.decode(latents.to(self.vae.dtype), return_dict=False)[0]
+        else:
+            factors = self.latent_rgb_factors.to(latents.device)
+            bias = self.latent_rgb_bias.to(latents.device)
+            images = torch.einsum("bchw,cr->brhw", latents.float(), factors) + bias[:, None, None]
+
+        if num_frames is not None:
+            images = images.unflatten(0, (-1, num_frames))
+        return images.clamp(-1, 1)
+
+    def callback_fn(self, pipeline, step_index, timestep, callback_kwargs) -> Dict[str, Any]:
+        num_timesteps = getattr(pipeline, "num_timesteps", None)
+        if step_index % self.config.preview_steps != 0 and step_index != (num_timesteps or 0) - 1:
+            return callback_kwargs
+
+        with torch.no_grad():
+            images = self.decode_latents(pipeline, callback_kwargs[self.tensor_inputs[0]])
+
+        output_type = self.config.output_type
+        if images.ndim == 5:
+            previews = [self.image_processor.postprocess(frames, output_type=output_type) for frames in images]
+            if output_type == "np":
+                previews = np.stack(previews)
+            elif output_type == "pt":
+                previews = torch.stack(previews)
+        else:
+            previews = self.image_processor.postprocess(images, output_type=output_type)
+
+        self.sink(LatentPreviewOutput(step_index=step_index, timestep=timestep, images=previews))
+        return callback_kwargs
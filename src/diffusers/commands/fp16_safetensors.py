@@ -13,32 +13,187 @@
 # limitations under the License.
 
 """
-Usage example:
+Usage examples:
     diffusers-cli fp16_safetensors --ckpt_id=openai/shap-e --fp16 --use_safetensors
+    diffusers-cli fp16_safetensors --ckpt_id=/path/to/local/pipeline --dtype=bf16 --output_dir=/path/to/output
+
+The conversion streams the checkpoint tensor by tensor: every output shard is written directly to disk from the
+memory-mapped input shards, so memory usage is bounded by the largest single tensor (times `--num_workers`) rather
+than by the size of the model.
 """
 
-import glob
 import json
+import os
+import re
+import shutil
+import struct
 import warnings
 from argparse import ArgumentParser, Namespace
-from importlib import import_module
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
 
 import huggingface_hub
 import torch
-from huggingface_hub import hf_hub_download
+from huggingface_hub import snapshot_download, split_torch_state_dict_into_shards
 from packaging import version
 
-from ..utils import logging
+from ..utils import _add_variant, logging
 from . import BaseDiffusersCLICommand
 
 
+SUPPORTED_DTYPES = {"fp16": torch.float16, "bf16": torch.bfloat16}
+
+# Base (non-variant) weight files, optionally sharded, e.g. `diffusion_pytorch_model.safetensors`,
+# `model-00001-of-00002.safetensors` or `pytorch_model.bin`. Variant files such as `model.fp16.safetensors` have an
+# extra dot-separated segment and are not matched.
+_WEIGHT_FILE_REGEX = re.compile(r"^(?P<stem>[^.]+?)(?:-\d{5}-of-\d{5})?\.(?P<ext>safetensors|bin)$")
+_INDEX_FILE_REGEX = re.compile(r"^[^.]+\.(safetensors|bin)\.index\.json$")
+
+_SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+_TORCH_TO_SAFETENSORS_DTYPES = {dtype: name for name, dtype in _SAFETENSORS_DTYPES.items()}
+for _name, _dtype_name in [("F8_E4M3", "float8_e4m3fn"), ("F8_E5M2", "float8_e5m2")]:
+    if hasattr(torch, _dtype_name):
+        _SAFETENSORS_DTYPES[_name] = getattr(torch, _dtype_name)
+        _TORCH_TO_SAFETENSORS_DTYPES[getattr(torch, _dtype_name)] = _name
+
+
 def conversion_command_factory(args: Namespace):
     if args.use_auth_token:
         warnings.warn(
             "The `--use_auth_token` flag is deprecated and will be removed in a future version. Authentication is now"
             " handled automatically if user is logged in."
         )
-    return FP16SafetensorsCommand(args.ckpt_id, args.fp16, args.use_safetensors)
+    dtype = args.dtype or ("fp16" if args.fp16 else None)
+    return FP16SafetensorsCommand(
+        args.ckpt_id,
+        dtype,
+        args.use_safetensors,
+        output_dir=args.output_dir,
+        max_shard_size=args.max_shard_size,
+        num_workers=args.num_workers,
+        create_pr=not args.no_pr,
+    )
+
+
+@dataclass
+class _SourceTensor:
+    """Where to read a tensor from and what it becomes once converted."""
+
+    name: str
+    shape: List[int]
+    source_dtype: torch.dtype
+    target_dtype: torch.dtype
+    load: Callable[[], torch.Tensor]
+
+
+@dataclass
+class _ComponentPlan:
+    """All the output shards of one weight file group (e.g. the `unet`'s `diffusion_pytorch_model*.safetensors`)."""
+
+    output_dir: str
+    index_name: str
+    tensors: Dict[str, _SourceTensor] = field(default_factory=dict)
+    shards: Dict[str, List[str]] = field(default_factory=dict)
+    metadata: Dict[str, int] = field(default_factory=dict)
+
+
+def _safetensors_loader(path: str, name: str) -> Callable[[], torch.Tensor]:
+    def load():
+        from safetensors import safe_open
+
+        # `safe_open` memory-maps the file, so opening it once per tensor is cheap and keeps workers independent.
+        with safe_open(path, framework="pt", device="cpu") as f:
+            return f.get_tensor(name)
+
+    return load
+
+
+def _collect_safetensors(path: str, target_dtype: Optional[torch.dtype]) -> Dict[str, _SourceTensor]:
+    from safetensors import safe_open
+
+    tensors = {}
+    with safe_open(path, framework="pt", device="cpu") as f:
+        for name in f.keys():
+            tensor_slice = f.get_slice(name)
+            dtype_name = tensor_slice.get_dtype()
+            if dtype_name not in _SAFETENSORS_DTYPES:
+                raise ValueError(f"Unsupported dtype {dtype_name} for tensor {name} in {path}.")
+            source_dtype = _SAFETENSORS_DTYPES[dtype_name]
+            tensors[name] = _SourceTensor(
+                name=name,
+                shape=list(tensor_slice.get_shape()),
+                source_dtype=source_dtype,
+                target_dtype=_target_dtype(source_dtype, target_dtype),
+                load=_safetensors_loader(path, name),
+            )
+    return tensors
+
+
+def _collect_pickle(path: str, target_dtype: Optional[torch.dtype]) -> Dict[str, _SourceTensor]:
+    # `mmap=True` keeps the pickled tensors on disk until they are accessed.
+    state_dict = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    return {
+        name: _SourceTensor(
+            name=name,
+            shape=list(tensor.shape),
+            source_dtype=tensor.dtype,
+            target_dtype=_target_dtype(tensor.dtype, target_dtype),
+            load=lambda tensor=tensor: tensor,
+        )
+        for name, tensor in state_dict.items()
+    }
+
+
+def _target_dtype(source_dtype: torch.dtype, target_dtype: Optional[torch.dtype]) -> torch.dtype:
+    # Only floating point weights are cast, integer buffers (e.g. `position_ids`) keep their dtype.
+    if target_dtype is None or not source_dtype.is_floating_point:
+        return source_dtype
+    return target_dtype
+
+
+def _write_safetensors_streaming(path: str, tensors: List[_SourceTensor], metadata: Optional[Dict[str, str]] = None):
+    """
+    Writes `tensors` to a safetensors file one tensor at a time. The header is computed upfront from the shapes and
+    target dtypes, so no more than one (converted) tensor has to be held in memory.
+    """
+    header = {}
+    offset = 0
+    for tensor in tensors:
+        num_bytes = torch.Size(tensor.shape).numel() * torch.empty((), dtype=tensor.target_dtype).element_size()
+        header[tensor.name] = {
+            "dtype": _TORCH_TO_SAFETENSORS_DTYPES[tensor.target_dtype],
+            "shape": tensor.shape,
+            "data_offsets": [offset, offset + num_bytes],
+        }
+        offset += num_bytes
+    if metadata is not None:
+        header["__metadata__"] = metadata
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    # The data section has to start at an 8-byte aligned offset, the format pads the header with spaces.
+    header_bytes += b" " * (-len(header_bytes) % 8)
+
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for tensor in tensors:
+            data = tensor.load().to(tensor.target_dtype).contiguous()
+            if data.numel() > 0:
+                f.write(memoryview(data.reshape(-1).view(torch.uint8).numpy()))
+            del data
 
 
 class FP16SafetensorsCommand(BaseDiffusersCLICommand):
@@ -48,14 +203,43 @@ class FP16SafetensorsCommand(BaseDiffusersCLICommand):
         conversion_parser.add_argument(
             "--ckpt_id",
             type=str,
-            help="Repo id of the checkpoints on which to run the conversion. Example: 'openai/shap-e'.",
+            help="Repo id of the checkpoints, or path to a local folder, on which to run the conversion. Example: 'openai/shap-e'.",
+        )
+        conversion_parser.add_argument(
+            "--fp16",
+            action="store_true",
+            help="If serializing the variables in FP16 precision. Same as `--dtype fp16`.",
         )
         conversion_parser.add_argument(
-            "--fp16", action="store_true", help="If serializing the variables in FP16 precision."
+            "--dtype",
+            type=str,
+            choices=list(SUPPORTED_DTYPES.keys()),
+            default=None,
+            help="Floating point precision to serialize the variables in. Also used as the variant name of the files.",
         )
         conversion_parser.add_argument(
             "--use_safetensors", action="store_true", help="If serializing in the safetensors format."
         )
+        conversion_parser.add_argument(
+            "--output_dir",
+            type=str,
+            default=None,
+            help="Where to write the converted checkpoint. Defaults to the folder itself for local checkpoints and to `/tmp/<ckpt_id>` for Hub checkpoints.",
+        )
+        conversion_parser.add_argument(
+            "--max_shard_size",
+            type=str,
+            default="10GB",
+            help="Maximum size of each output shard, e.g. '5GB'. Follows the sharding of `save_pretrained`.",
+        )
+        conversion_parser.add_argument(
+            "--num_workers", type=int, default=4, help="Number of shards converted in parallel."
+        )
+        conversion_parser.add_argument(
+            "--no_pr",
+            action="store_true",
+            help="Don't open a PR with the converted files when converting a checkpoint from the Hub.",
+        )
         conversion_parser.add_argument(
             "--use_auth_token",
             action="store_true",
@@ -63,19 +247,163 @@ class FP16SafetensorsCommand(BaseDiffusersCLICommand):
         )
         conversion_parser.set_defaults(func=conversion_command_factory)
 
-    def __init__(self, ckpt_id: str, fp16: bool, use_safetensors: bool):
+    def __init__(
+        self,
+        ckpt_id: str,
+        dtype: Optional[str],
+        use_safetensors: bool,
+        output_dir: Optional[str] = None,
+        max_shard_size: str = "10GB",
+        num_workers: int = 4,
+        create_pr: bool = True,
+    ):
         self.logger = logging.get_logger("diffusers-cli/fp16_safetensors")
-        self.ckpt_id = ckpt_id
-        self.local_ckpt_dir = f"/tmp/{ckpt_id}"
-        self.fp16 = fp16
+        # For backwards compatibility, a boolean `dtype` is the former `fp16` flag.
+        if isinstance(dtype, bool):
+            dtype = "fp16" if dtype else None
+        if dtype is not None and dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"`dtype` must be one of {list(SUPPORTED_DTYPES.keys())}, got {dtype}.")
 
+        self.ckpt_id = ckpt_id
+        self.is_local = os.path.isdir(ckpt_id)
+        self.local_ckpt_dir = output_dir or (ckpt_id if self.is_local else f"/tmp/{ckpt_id}")
+        self.dtype = dtype
+        self.fp16 = dtype == "fp16"
         self.use_safetensors = use_safetensors
+        self.max_shard_size = max_shard_size
+        self.num_workers = max(1, num_workers)
+        self.create_pr = create_pr and not self.is_local
 
-        if not self.use_safetensors and not self.fp16:
+        if not self.use_safetensors and self.dtype is None:
             raise NotImplementedError(
                 "When `use_safetensors` and `fp16` both are False, then this command is of no use."
             )
 
+    def _plan_component(self, source_dir: str, stem: str, files: List[str]) -> _ComponentPlan:
+        """Plans the output shards for one group of weight files sharing the same `stem`."""
+        target_dtype = SUPPORTED_DTYPES[self.dtype] if self.dtype is not None else None
+
+        tensors = {}
+        for file in sorted(files):
+            path = os.path.join(source_dir, file)
+            if file.endswith(".safetensors"):
+                tensors.update(_collect_safetensors(path, target_dtype))
+            else:
+                tensors.update(_collect_pickle(path, target_dtype))
+
+        # `transformers` checkpoints are named `pytorch_model.bin` but `model.safetensors`.
+        output_stem = "model" if stem == "pytorch_model" else stem
+        weights_name = _add_variant(f"{output_stem}.safetensors", self.dtype)
+        weights_name_pattern = weights_name.replace(".safetensors", "{suffix}.safetensors")
+
+        # Meta tensors let us reuse the sharding logic of `save_pretrained` without materializing anything.
+        meta_state_dict = {
+            name: torch.empty(tensor.shape, dtype=tensor.target_dtype, device="meta")
+            for name, tensor in tensors.items()
+        }
+        split = split_torch_state_dict_into_shards(
+            meta_state_dict, max_shard_size=self.max_shard_size, filename_pattern=weights_name_pattern
+        )
+
+        return _ComponentPlan(
+            output_dir=self._output_dir_for(source_dir),
+            index_name=_add_variant(f"{output_stem}.safetensors.index.json", self.dtype) if split.is_sharded else None,
+            tensors=tensors,
+            shards=split.filename_to_tensors,
+            metadata=split.metadata,
+        )
+
+    def _output_dir_for(self, source_dir: str) -> str:
+        return os.path.normpath(os.path.join(self.local_ckpt_dir, os.path.relpath(source_dir, self.source_ckpt_dir)))
+
+    def _plan(self) -> List[_ComponentPlan]:
+        plans = []
+        for source_dir, dirnames, filenames in os.walk(self.source_ckpt_dir):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+
+            groups = defaultdict(lambda: defaultdict(list))
+            for filename in filenames:
+                match = _WEIGHT_FILE_REGEX.match(filename)
+                if match is not None:
+                    output_stem = "model" if match["stem"] == "pytorch_model" else match["stem"]
+                    groups[output_stem][match["ext"]].append(filename)
+
+            for output_stem, files_per_ext in sorted(groups.items()):
+                # Prefer safetensors over pickle files when a checkpoint ships both.
+                ext = "safetensors" if "safetensors" in files_per_ext else "bin"
+                if self.dtype is None and ext == "safetensors":
+                    # Nothing to convert: the weights are already in the requested format and precision.
+                    self._copy_as_is(source_dir, files_per_ext[ext])
+                    continue
+                files = files_per_ext[ext]
+                stem = _WEIGHT_FILE_REGEX.match(files[0])["stem"]
+                plans.append(self._plan_component(source_dir, stem, files))
+        return plans
+
+    def _download(self) -> str:
+        # Only the base weights are needed, other variants already present in the repo are skipped.
+        ignore_patterns = [f"*.{variant}{sep}*" for variant in ["fp16", "bf16", "non_ema", "ema"] for sep in ".-"]
+        return snapshot_download(repo_id=self.ckpt_id, ignore_patterns=ignore_patterns)
+
+    def _copy_as_is(self, source_dir: str, filenames: List[str]):
+        output_dir = self._output_dir_for(source_dir)
+        if output_dir == os.path.normpath(source_dir):
+            return
+        os.makedirs(output_dir, exist_ok=True)
+        for filename in filenames:
+            shutil.copy(os.path.join(source_dir, filename), os.path.join(output_dir, filename))
+
+    def _copy_non_weight_files(self):
+        for source_dir, dirnames, filenames in os.walk(self.source_ckpt_dir):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            output_dir = self._output_dir_for(source_dir)
+            for filename in filenames:
+                if _WEIGHT_FILE_REGEX.match(filename) or _INDEX_FILE_REGEX.match(filename):
+                    continue
+                if re.search(r"\.(safetensors|bin)$", filename) or ".index." in filename:
+                    # Weights and indices of other variants.
+                    continue
+                os.makedirs(output_dir, exist_ok=True)
+                shutil.copy(os.path.join(source_dir, filename), os.path.join(output_dir, filename))
+
+    def convert(self) -> List[str]:
+        """Converts the checkpoint and returns the paths of the written weight and index files."""
+        self.source_ckpt_dir = self.ckpt_id if self.is_local else self._download()
+        if os.path.abspath(self.source_ckpt_dir) != os.path.abspath(self.local_ckpt_dir):
+            self._copy_non_weight_files()
+
+        plans = self._plan()
+        jobs = []
+        for plan in plans:
+            os.makedirs(plan.output_dir, exist_ok=True)
+            for filename, names in plan.shards.items():
+                jobs.append((os.path.join(plan.output_dir, filename), [plan.tensors[name] for name in names]))
+
+        self.logger.info(
+            f"Converting {len(plans)} weight files into {len(jobs)} shards with {self.num_workers} workers."
+        )
+
+        def write(job):
+            path, tensors = job
+            _write_safetensors_streaming(path, tensors, metadata={"format": "pt"})
+            self.logger.info(f"Saved {path}.")
+            return path
+
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            written_paths = list(executor.map(write, jobs))
+
+        for plan in plans:
+            if plan.index_name is None:
+                continue
+            index_path = os.path.join(plan.output_dir, plan.index_name)
+            tensor_to_filename = {name: filename for filename, names in plan.shards.items() for name in names}
+            with open(index_path, "w", encoding="utf-8") as f:
+                index = {"metadata": plan.metadata, "weight_map": tensor_to_filename}
+                f.write(json.dumps(index, indent=2, sort_keys=True) + "\n")
+            written_paths.append(index_path)
+
+        return written_paths
+
     def run(self):
         if version.parse(huggingface_hub.__version__) < version.parse("0.9.0"):
             raise ImportError(
@@ -86,35 +414,18 @@ class FP16SafetensorsCommand(BaseDiffusersCLICommand):
             from huggingface_hub import create_commit
             from huggingface_hub._commit_api import CommitOperationAdd
 
-        model_index = hf_hub_download(repo_id=self.ckpt_id, filename="model_index.json")
-        with open(model_index, "r") as f:
-            pipeline_class_name = json.load(f)["_class_name"]
-        pipeline_class = getattr(import_module("diffusers"), pipeline_class_name)
-        self.logger.info(f"Pipeline class imported: {pipeline_class_name}.")
-
-        # Load the appropriate pipeline. We could have use `DiffusionPipeline`
-        # here, but just to avoid any rough edge cases.
-        pipeline = pipeline_class.from_pretrained(
-            self.ckpt_id, torch_dtype=torch.float16 if self.fp16 else torch.float32
-        )
-        pipeline.save_pretrained(
-            self.local_ckpt_dir,
-            safe_serialization=True if self.use_safetensors else False,
-            variant="fp16" if self.fp16 else None,
-        )
-        self.logger.info(f"Pipeline locally saved to {self.local_ckpt_dir}.")
+        modified_paths = self.convert()
+        self.logger.info(f"Converted checkpoint saved to {self.local_ckpt_dir}.")
 
-        # Fetch all the paths.
-        if self.fp16:
-            modified_paths = glob.glob(f"{self.local_ckpt_dir}/*/*.fp16.*")
-        elif self.use_safetensors:
-            modified_paths = glob.glob(f"{self.local_ckpt_dir}/*/*.safetensors")
+        if not self.create_pr:
+            return
 
         # Prepare for the PR.
-        commit_message = f"Serialize variables with FP16: {self.fp16} and safetensors: {self.use_safetensors}."
+        commit_message = f"Serialize variables with dtype: {self.dtype} and safetensors: True."
         operations = []
         for path in modified_paths:
-            operations.append(CommitOperationAdd(path_in_repo="/".join(path.split("/")[4:]), path_or_fileobj=path))
+            path_in_repo = os.path.relpath(path, self.local_ckpt_dir).replace(os.path.sep, "/")
+            operations.append(CommitOperationAdd(path_in_repo=path_in_repo, path_or_fileobj=path))
 
         # Open the PR.
         commit_description = (
@@ -14,6 +14,7 @@
 
 import math
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Tuple, Union
 
 import numpy as np
@@ -37,6 +38,15 @@ PipelineImageInput = Union[
 
 PipelineDepthInput = PipelineImageInput
 
+# `torch.nn.functional.interpolate` modes closest to the PIL resampling filters, torch has no lanczos filter
+PT_INTERPOLATION = {
+    "linear": "bilinear",
+    "bilinear": "bilinear",
+    "bicubic": "bicubic",
+    "lanczos": "bicubic",
+    "nearest": "nearest-exact",
+}
+
 
 def is_valid_image(image) -> bool:
     r"""
@@ -144,7 +154,8 @@ class VaeImageProcessor(ConfigMixin):
         """
         if images.ndim == 3:
             images = images[None, ...]
-        images = (images * 255).round().astype("uint8")
+        if images.dtype != np.uint8:
+            images = (images * 255).round().astype("uint8")
         if images.shape[-1] == 1:
             # special case for grayscale (single channel) images
             pil_images = [Image.fromarray(image.squeeze(), mode="L") for image in images]
@@ -208,6 +219,22 @@ class VaeImageProcessor(ConfigMixin):
         images = images.cpu().permute(0, 2, 3, 1).float().numpy()
         return images
 
+    @staticmethod
+    def pt_to_uint8(images: torch.Tensor) -> torch.Tensor:
+        r"""
+        Quantize a PyTorch tensor in [0,1] to a `uint8` tensor in NHWC order, on the device of `images`.
+
+        Args:
+            images (`torch.Tensor`):
+                The PyTorch tensor to quantize.
+
+        Returns:
+            `torch.Tensor`:
+                A `uint8` tensor of shape `B x H x W x C`.
+        """
+        images = images.float().mul(255).round().clamp(0, 255).to(torch.uint8)
+        return images.permute(0, 2, 3, 1).contiguous()
+
     @staticmethod
     def normalize(images: Union[np.ndarray, torch.Tensor]) -> Union[np.ndarray, torch.Tensor]:
         r"""
@@ -520,6 +547,28 @@ class VaeImageProcessor(ConfigMixin):
             image = self.pt_to_numpy(image)
         return image
 
+    def resize_pt(self, image: torch.Tensor, height: int, width: int) -> torch.Tensor:
+        r"""
+        Resize a batch of images with `torch.nn.functional.interpolate` on the device of `image`. The `resample` filter
+        of the config is mapped to the closest interpolation mode of torch and antialiased like PIL when downscaling.
+
+        Args:
+            image (`torch.Tensor`):
+                The images to resize, a float tensor of shape `[batch, channels, height, width]` in the range [0, 1].
+            height (`int`):
+                The height to resize to.
+            width (`int`):
+                The width to resize to.
+
+        Returns:
+            `torch.Tensor`:
+                The resized images, clamped to [0, 1].
+        """
+        mode = PT_INTERPOLATION[self.config.resample]
+        image = F.interpolate(image, size=(height, width), mode=mode, antialias=mode in ("bilinear", "bicubic"))
+        # bicubic filters overshoot around edges
+        return image.clamp(0, 1)
+
     def binarize(self, image: PIL.Image.Image) -> PIL.Image.Image:
         """
         Create a mask.
@@ -591,6 +640,8 @@ class VaeImageProcessor(ConfigMixin):
         width: Optional[int] = None,
         resize_mode: str = "default",  # "default", "fill", "crop"
         crops_coords: Optional[Tuple[int, int, int, int]] = None,
+        device: Optional[Union[str, torch.device]] = None,
+        num_workers: Optional[int] = None,
     ) -> torch.Tensor:
         """
         Preprocess the image input.
@@ -614,6 +665,14 @@ class VaeImageProcessor(ConfigMixin):
                 supported for PIL image input.
             crops_coords (`List[Tuple[int, int, int, int]]`, *optional*, defaults to `None`):
                 The crop coordinates for each image in the batch. If `None`, will not crop the image.
+            device (`str` or `torch.device`, *optional*, defaults to `None`):
+                The device to preprocess the image on. If set, PIL images and NumPy arrays are moved to `device` as
+                soon as they are converted to tensors. PIL images with resize_mode `default` are then resized on
+                `device` with [`~VaeImageProcessor.resize_pt`] instead of PIL, which is faster for large batches but
+                doesn't match the PIL filters exactly. If `None`, PIL images and NumPy arrays are preprocessed on the CPU.
+            num_workers (`int`, *optional*, defaults to `None`):
+                The number of threads to resize and convert a batch of PIL images with. PIL releases the GIL while
+                resizing, so the images are processed in parallel. If `None`, the images are processed one at a time.
 
         Returns:
             `torch.Tensor`:
@@ -666,18 +725,36 @@ class VaeImageProcessor(ConfigMixin):
                 image = [i.crop(crops_coords) for i in image]
             if self.config.do_resize:
                 height, width = self.get_default_height_width(image[0], height, width)
-                image = [self.resize(i, height, width, resize_mode=resize_mode) for i in image]
-            if self.config.do_convert_rgb:
-                image = [self.convert_to_rgb(i) for i in image]
-            elif self.config.do_convert_grayscale:
-                image = [self.convert_to_grayscale(i) for i in image]
-            image = self.pil_to_numpy(image)  # to np
-            image = self.numpy_to_pt(image)  # to pt
+
+            if device is not None and resize_mode == "default":
+                image = self._map_images(self._convert_pil_image, image, num_workers)
+                image = [torch.from_numpy(np.array(i)).to(device) for i in image]
+                image = [i[..., None] if i.ndim == 2 else i for i in image]
+                # resize images of the same size as one batch
+                image = [torch.stack(image)] if len({i.shape for i in image}) == 1 else [i[None] for i in image]
+                image = [i.permute(0, 3, 1, 2) / 255.0 for i in image]
+                if self.config.do_resize:
+                    image = [self.resize_pt(i, height, width) for i in image]
+                image = torch.cat(image, dim=0)
+            else:
+
+                def resize_and_convert(i):
+                    if self.config.do_resize:
+                        i = self.resize(i, height, width, resize_mode=resize_mode)
+                    return self._convert_pil_image(i)
+
+                image = self._map_images(resize_and_convert, image, num_workers)
+                image = self.pil_to_numpy(image)  # to np
+                image = self.numpy_to_pt(image)  # to pt
+                if device is not None:
+                    image = image.to(device)
 
         elif isinstance(image[0], np.ndarray):
             image = np.concatenate(image, axis=0) if image[0].ndim == 4 else np.stack(image, axis=0)
 
             image = self.numpy_to_pt(image)
+            if device is not None:
+                image = image.to(device)
 
             height, width = self.get_default_height_width(image, height, width)
             if self.config.do_resize:
@@ -685,6 +762,8 @@ class VaeImageProcessor(ConfigMixin):
 
         elif isinstance(image[0], torch.Tensor):
             image = torch.cat(image, axis=0) if image[0].ndim == 4 else torch.stack(image, axis=0)
+            if device is not None:
+                image = image.to(device)
 
             if self.config.do_convert_grayscale and image.ndim == 3:
                 image = image.unsqueeze(1)
@@ -715,6 +794,43 @@ class VaeImageProcessor(ConfigMixin):
 
         return image
 
+    def _convert_pil_image(self, image: PIL.Image.Image) -> PIL.Image.Image:
+        if self.config.do_convert_rgb:
+            image = self.convert_to_rgb(image)
+        elif self.config.do_convert_grayscale:
+            image = self.convert_to_grayscale(image)
+        return image
+
+    @staticmethod
+    def _map_images(fn, images: List, num_workers: Optional[int] = None) -> List:
+        r"""
+        Applies `fn` to every image, in a pool of `num_workers` threads if there is more than one image.
+        """
+        if num_workers is None or num_workers <= 1 or len(images) <= 1:
+            return [fn(image) for image in images]
+        with ThreadPoolExecutor(max_workers=min(num_workers, len(images))) as executor:
+            return list(executor.map(fn, images))
+
+    def _denormalize_conditionally(
+        self, images: torch.Tensor, do_denormalize: Optional[List[bool]] = None
+    ) -> torch.Tensor:
+        r"""
+        Denormalize a batch of images based on a condition list.
+
+        Args:
+            images (`torch.Tensor`):
+                The input image tensor.
+            do_denormalize (`Optional[List[bool]`, *optional*, defaults to `None`):
+                A list of booleans indicating whether to denormalize each image in the batch. If `None`, will use the
+                value of `do_normalize` in the `VaeImageProcessor` config.
+        """
+        if do_denormalize is None:
+            return self.denormalize(images) if self.config.do_normalize else images
+
+        return torch.stack(
+            [self.denormalize(images[i]) if do_denormalize[i] else images[i] for i in range(images.shape[0])]
+        )
+
     def postprocess(
         self,
         image: torch.Tensor,
@@ -728,7 +844,10 @@ class VaeImageProcessor(ConfigMixin):
             image (`torch.Tensor`):
                 The image input, should be a pytorch tensor with shape `B x C x H x W`.
             output_type (`str`, *optional*, defaults to `pil`):
-                The output type of the image, can be one of `pil`, `np`, `pt`, `latent`.
+                The output type of the image, can be one of `pil`, `np`, `pt`, `uint8`, `latent`. With `uint8`, the
+                images are quantized on their device and returned as a `uint8` tensor of shape `B x H x W x C`, which
+                can be handed to an image encoder through DLPack. The `pil` images are quantized on the device too, so
+                only `uint8` data is copied to the CPU.
             do_denormalize (`List[bool]`, *optional*, defaults to `None`):
                 Whether to denormalize the image to [0,1]. If `None`, will use the value of `do_normalize` in the
                 `VaeImageProcessor` config.
@@ -741,10 +860,10 @@ class VaeImageProcessor(ConfigMixin):
             raise ValueError(
                 f"Input for postprocessing is in incorrect format: {type(image)}. We only support pytorch tensor"
             )
-        if output_type not in ["latent", "pt", "np", "pil"]:
+        if output_type not in ["latent", "pt", "np", "pil", "uint8"]:
             deprecation_message = (
                 f"the output_type {output_type} is outdated and has been set to `np`. Please make sure to set it to one of these instead: "
-                "`pil`, `np`, `pt`, `latent`"
+                "`pil`, `np`, `pt`, `uint8`, `latent`"
             )
             deprecate("Unsupported output_type", "1.0.0", deprecation_message, standard_warn=False)
             output_type = "np"
@@ -752,24 +871,22 @@ class VaeImageProcessor(ConfigMixin):
         if output_type == "latent":
             return image
 
-        if do_denormalize is None:
-            do_denormalize = [self.config.do_normalize] * image.shape[0]
-
-        image = torch.stack(
-            [self.denormalize(image[i]) if do_denormalize[i] else image[i] for i in range(image.shape[0])]
-        )
+        image = self._denormalize_conditionally(image, do_denormalize)
 
         if output_type == "pt":
             return image
 
+        if output_type in ["uint8", "pil"]:
+            image = self.pt_to_uint8(image)
+            if output_type == "uint8":
+                return image
+            return self.numpy_to_pil(image.cpu().numpy())
+
         image = self.pt_to_numpy(image)
 
         if output_type == "np":
             return image
 
-        if output_type == "pil":
-            return self.numpy_to_pil(image)
-
     def apply_overlay(
         self,
         mask: PIL.Image.Image,
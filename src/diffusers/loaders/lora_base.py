@@ -15,6 +15,7 @@
 import copy
 import inspect
 import os
+from collections import OrderedDict
 from pathlib import Path
 from typing import Callable, Dict, List, Optional, Union
 
@@ -31,28 +32,33 @@ from ..utils import (
     delete_adapter_layers,
     deprecate,
     is_accelerate_available,
-    is_peft_available,
     is_transformers_available,
     logging,
+    merge_lora_layer_with_delta,
     recurse_remove_peft_layers,
     set_adapter_layers,
     set_weights_and_activate_adapters,
+    unmerge_lora_layer,
 )
 
 
 if is_transformers_available():
     from transformers import PreTrainedModel
 
-if is_peft_available():
-    from peft.tuners.tuners_utils import BaseTunerLayer
-
 if is_accelerate_available():
     from accelerate.hooks import AlignDevicesHook, CpuOffload, remove_hook_from_module
 
 logger = logging.get_logger(__name__)
 
 
-def fuse_text_encoder_lora(text_encoder, lora_scale=1.0, safe_fusing=False, adapter_names=None):
+def fuse_text_encoder_lora(
+    text_encoder,
+    lora_scale=1.0,
+    safe_fusing=False,
+    adapter_names=None,
+    keep_fused_delta=False,
+    fused_delta_device=None,
+):
     """
     Fuses LoRAs for the text encoder.
 
@@ -66,7 +72,13 @@ def fuse_text_encoder_lora(text_encoder, lora_scale=1.0, safe_fusing=False, adap
             Whether to check fused weights for NaN values before fusing and if values are NaN not fusing them.
         adapter_names (`List[str]` or `str`):
             The names of the adapters to use.
+        keep_fused_delta (`bool`, defaults to `False`):
+            Whether to keep the weight deltas of the fused LoRAs so that unfusing is an exact subtraction.
+        fused_delta_device (`str` or `torch.device`, *optional*):
+            The device to keep the deltas on. Defaults to the device of the fused weights.
     """
+    from peft.tuners.tuners_utils import BaseTunerLayer
+
     merge_kwargs = {"safe_merge": safe_fusing}
 
     for module in text_encoder.modules():
@@ -74,6 +86,12 @@ def fuse_text_encoder_lora(text_encoder, lora_scale=1.0, safe_fusing=False, adap
             if lora_scale != 1.0:
                 module.scale_layer(lora_scale)
 
+            if keep_fused_delta:
+                merge_lora_layer_with_delta(
+                    module, adapter_names=adapter_names, delta_device=fused_delta_device, **merge_kwargs
+                )
+                continue
+
             # For BC with previous PEFT versions, we need to check the signature
             # of the `merge` method to see if it supports the `adapter_names` argument.
             supported_merge_kwargs = list(inspect.signature(module.merge).parameters)
@@ -97,9 +115,11 @@ def unfuse_text_encoder_lora(text_encoder):
             The text encoder module to set the adapter layers for. If `None`, it will try to get the `text_encoder`
             attribute.
     """
+    from peft.tuners.tuners_utils import BaseTunerLayer
+
     for module in text_encoder.modules():
         if isinstance(module, BaseTunerLayer):
-            module.unmerge()
+            unmerge_lora_layer(module)
 
 
 def set_adapters_for_text_encoder(
@@ -248,67 +268,165 @@ class LoraBaseMixin:
         subfolder,
         user_agent,
         allow_pickle,
+    ):
+        if isinstance(pretrained_model_name_or_path_or_dict, dict):
+            return pretrained_model_name_or_path_or_dict
+
+        hub_kwargs = {
+            "local_files_only": local_files_only,
+            "cache_dir": cache_dir,
+            "force_download": force_download,
+            "proxies": proxies,
+            "token": token,
+            "revision": revision,
+            "subfolder": subfolder,
+            "user_agent": user_agent,
+        }
+        model_file = cls._resolve_lora_file(
+            pretrained_model_name_or_path_or_dict, weight_name, use_safetensors, allow_pickle, **hub_kwargs
+        )
+        if model_file.endswith(".safetensors"):
+            try:
+                return safetensors.torch.load_file(model_file, device="cpu")
+            except safetensors.SafetensorError as e:
+                if not allow_pickle:
+                    raise e
+                # try loading non-safetensors weights
+                model_file = cls._resolve_lora_file(
+                    pretrained_model_name_or_path_or_dict, weight_name, False, allow_pickle, **hub_kwargs
+                )
+
+        return load_state_dict(model_file)
+
+    @classmethod
+    def _resolve_lora_file(
+        cls,
+        pretrained_model_name_or_path,
+        weight_name,
+        use_safetensors,
+        allow_pickle,
+        local_files_only,
+        cache_dir,
+        force_download,
+        proxies,
+        token,
+        revision,
+        subfolder,
+        user_agent,
     ):
         from .lora_pipeline import LORA_WEIGHT_NAME, LORA_WEIGHT_NAME_SAFE
 
-        model_file = None
-        if not isinstance(pretrained_model_name_or_path_or_dict, dict):
-            # Let's first try to load .safetensors weights
-            if (use_safetensors and weight_name is None) or (
-                weight_name is not None and weight_name.endswith(".safetensors")
-            ):
-                try:
-                    # Here we're relaxing the loading check to enable more Inference API
-                    # friendliness where sometimes, it's not at all possible to automatically
-                    # determine `weight_name`.
-                    if weight_name is None:
-                        weight_name = cls._best_guess_weight_name(
-                            pretrained_model_name_or_path_or_dict,
-                            file_extension=".safetensors",
-                            local_files_only=local_files_only,
-                        )
-                    model_file = _get_model_file(
-                        pretrained_model_name_or_path_or_dict,
-                        weights_name=weight_name or LORA_WEIGHT_NAME_SAFE,
-                        cache_dir=cache_dir,
-                        force_download=force_download,
-                        proxies=proxies,
+        hub_kwargs = {
+            "cache_dir": cache_dir,
+            "force_download": force_download,
+            "proxies": proxies,
+            "local_files_only": local_files_only,
+            "token": token,
+            "revision": revision,
+            "subfolder": subfolder,
+            "user_agent": user_agent,
+        }
+
+        # Let's first try to resolve .safetensors weights
+        if (use_safetensors and weight_name is None) or (
+            weight_name is not None and weight_name.endswith(".safetensors")
+        ):
+            try:
+                # Here we're relaxing the loading check to enable more Inference API
+                # friendliness where sometimes, it's not at all possible to automatically
+                # determine `weight_name`.
+                safetensors_weight_name = weight_name
+                if safetensors_weight_name is None:
+                    safetensors_weight_name = cls._best_guess_weight_name(
+                        pretrained_model_name_or_path,
+                        file_extension=".safetensors",
                         local_files_only=local_files_only,
-                        token=token,
-                        revision=revision,
-                        subfolder=subfolder,
-                        user_agent=user_agent,
-                    )
-                    state_dict = safetensors.torch.load_file(model_file, device="cpu")
-                except (IOError, safetensors.SafetensorError) as e:
-                    if not allow_pickle:
-                        raise e
-                    # try loading non-safetensors weights
-                    model_file = None
-                    pass
-
-            if model_file is None:
-                if weight_name is None:
-                    weight_name = cls._best_guess_weight_name(
-                        pretrained_model_name_or_path_or_dict, file_extension=".bin", local_files_only=local_files_only
                     )
-                model_file = _get_model_file(
-                    pretrained_model_name_or_path_or_dict,
-                    weights_name=weight_name or LORA_WEIGHT_NAME,
-                    cache_dir=cache_dir,
-                    force_download=force_download,
-                    proxies=proxies,
-                    local_files_only=local_files_only,
-                    token=token,
-                    revision=revision,
-                    subfolder=subfolder,
-                    user_agent=user_agent,
+                return _get_model_file(
+                    pretrained_model_name_or_path,
+                    weights_name=safetensors_weight_name or LORA_WEIGHT_NAME_SAFE,
+                    **hub_kwargs,
                 )
-                state_dict = load_state_dict(model_file)
+            except IOError as e:
+                if not allow_pickle:
+                    raise e
+                # try resolving non-safetensors weights
+
+        if weight_name is None:
+            weight_name = cls._best_guess_weight_name(
+                pretrained_model_name_or_path, file_extension=".bin", local_files_only=local_files_only
+            )
+        return _get_model_file(
+            pretrained_model_name_or_path, weights_name=weight_name or LORA_WEIGHT_NAME, **hub_kwargs
+        )
+
+    def _cached_lora_state_dict(self, pretrained_model_name_or_path_or_dict, **kwargs):
+        # Returns the output of `self.lora_state_dict()`, reusing the converted state dict of a previous call for the
+        # same file when the state dict cache is enabled. Files are identified by their resolved path, size and
+        # modification time. For Hub checkpoints the resolved path points to a content-addressed blob.
+        cache = getattr(self, "_lora_state_dict_cache", None)
+        if cache is None or isinstance(pretrained_model_name_or_path_or_dict, dict) or kwargs.get("force_download"):
+            return self.lora_state_dict(pretrained_model_name_or_path_or_dict, **kwargs)
+
+        allow_pickle = kwargs.get("use_safetensors") is None
+        model_file = self._resolve_lora_file(
+            pretrained_model_name_or_path_or_dict,
+            weight_name=kwargs.get("weight_name"),
+            use_safetensors=True if allow_pickle else kwargs["use_safetensors"],
+            allow_pickle=allow_pickle,
+            local_files_only=kwargs.get("local_files_only"),
+            cache_dir=kwargs.get("cache_dir"),
+            force_download=False,
+            proxies=kwargs.get("proxies"),
+            token=kwargs.get("token"),
+            revision=kwargs.get("revision"),
+            subfolder=kwargs.get("subfolder"),
+            user_agent={"file_type": "attn_procs_weights", "framework": "pytorch"},
+        )
+        stat = os.stat(model_file)
+        cache_key = (os.path.realpath(model_file), stat.st_size, stat.st_mtime_ns)
+
+        if cache_key in cache:
+            cache.move_to_end(cache_key)
+            output = cache[cache_key]
         else:
-            state_dict = pretrained_model_name_or_path_or_dict
+            output = self.lora_state_dict(pretrained_model_name_or_path_or_dict, **kwargs)
+            cache[cache_key] = output
+            while len(cache) > self._lora_state_dict_cache_size:
+                cache.popitem(last=False)
+
+        # the loading methods filter and rename the state dicts, so hand out shallow copies of the cached ones
+        if isinstance(output, tuple):
+            return tuple(dict(item) if isinstance(item, dict) else item for item in output)
+        return dict(output)
+
+    def enable_lora_state_dict_cache(self, max_size: int = 8):
+        """
+        Caches the converted state dicts of the LoRA checkpoints loaded with `load_lora_weights()`, so that loading the
+        same file again skips reading it from disk and converting it from the Kohya, XLabs or other non-Diffusers
+        formats. Useful when switching back and forth between a set of LoRAs.
+
+        The cached tensors are kept in CPU memory and shared with the state dicts returned by the cache, so they
+        shouldn't be modified in place.
+
+        Args:
+            max_size (`int`, defaults to `8`):
+                The maximum number of state dicts to keep. The least recently used state dict is evicted first.
+        """
+        if max_size < 1:
+            raise ValueError(f"`max_size` has to be a positive integer but is {max_size}.")
 
-        return state_dict
+        if getattr(self, "_lora_state_dict_cache", None) is None:
+            self._lora_state_dict_cache = OrderedDict()
+        self._lora_state_dict_cache_size = max_size
+        while len(self._lora_state_dict_cache) > max_size:
+            self._lora_state_dict_cache.popitem(last=False)
+
+    def disable_lora_state_dict_cache(self):
+        """
+        Disables and clears the LoRA state dict cache enabled with `enable_lora_state_dict_cache()`.
+        """
+        self._lora_state_dict_cache = None
 
     @classmethod
     def _best_guess_weight_name(
@@ -382,6 +500,8 @@ class LoraBaseMixin:
         lora_scale: float = 1.0,
         safe_fusing: bool = False,
         adapter_names: Optional[List[str]] = None,
+        keep_fused_delta: bool = False,
+        fused_delta_device: Optional[Union[str, torch.device]] = None,
         **kwargs,
     ):
         r"""
@@ -401,6 +521,13 @@ class LoraBaseMixin:
                 Whether to check fused weights for NaN values before fusing and if values are NaN not fusing them.
             adapter_names (`List[str]`, *optional*):
                 Adapter names to be used for fusing. If nothing is passed, all active adapters will be fused.
+            keep_fused_delta (`bool`, defaults to `False`):
+                Whether to keep the weight delta of every fused layer. [`~LoraBaseMixin.unfuse_lora`] then restores
+                the original weights exactly with a subtraction instead of recomputing the LoRA deltas. The deltas
+                are kept in `float32` and take as much memory as the fused weights in `float32`.
+            fused_delta_device (`str` or `torch.device`, *optional*):
+                The device to keep the deltas on when `keep_fused_delta=True`, e.g. `"cpu"` to save accelerator
+                memory. Defaults to the device of the fused weights.
 
         Example:
 
@@ -448,11 +575,22 @@ class LoraBaseMixin:
             if model is not None:
                 # check if diffusers model
                 if issubclass(model.__class__, ModelMixin):
-                    model.fuse_lora(lora_scale, safe_fusing=safe_fusing, adapter_names=adapter_names)
+                    model.fuse_lora(
+                        lora_scale,
+                        safe_fusing=safe_fusing,
+                        adapter_names=adapter_names,
+                        keep_fused_delta=keep_fused_delta,
+                        fused_delta_device=fused_delta_device,
+                    )
                 # handle transformers models.
                 if issubclass(model.__class__, PreTrainedModel):
                     fuse_text_encoder_lora(
-                        model, lora_scale=lora_scale, safe_fusing=safe_fusing, adapter_names=adapter_names
+                        model,
+                        lora_scale=lora_scale,
+                        safe_fusing=safe_fusing,
+                        adapter_names=adapter_names,
+                        keep_fused_delta=keep_fused_delta,
+                        fused_delta_device=fused_delta_device,
                     )
 
         self.num_fused_loras += 1
@@ -475,6 +613,8 @@ class LoraBaseMixin:
                 Whether to unfuse the text encoder LoRA parameters. If the text encoder wasn't monkey-patched with the
                 LoRA parameters then it won't have any effect.
         """
+        from peft.tuners.tuners_utils import BaseTunerLayer
+
         if "unfuse_unet" in kwargs:
             depr_message = "Passing `unfuse_unet` to `unfuse_lora()` is deprecated and will be ignored. Please use the `components` argument. `unfuse_unet` will be removed in a future version."
             deprecate(
@@ -509,7 +649,7 @@ class LoraBaseMixin:
                 if issubclass(model.__class__, (ModelMixin, PreTrainedModel)):
                     for module in model.modules():
                         if isinstance(module, BaseTunerLayer):
-                            module.unmerge()
+                            unmerge_lora_layer(module)
 
         self.num_fused_loras -= 1
 
@@ -604,6 +744,43 @@ class LoraBaseMixin:
                 elif issubclass(model.__class__, PreTrainedModel):
                     enable_lora_for_text_encoder(model)
 
+    def set_batch_adapters(self, adapter_names: Optional[List[Optional[str]]]):
+        """
+        Uses a different adapter for each sample of the batch in the denoiser of the pipeline. See
+        [`~loaders.PeftAdapterMixin.set_batch_adapters`] for more details. The LoRA layers of the text encoders keep
+        using the adapters activated with `set_adapters`.
+
+        Args:
+            adapter_names (`List[Optional[str]]`, *optional*):
+                The name of the adapter for each sample of the batch, or `None` to use the base model for that sample.
+                The list should have one entry per generated image, i.e. `batch_size * num_images_per_prompt`
+                entries.
+        """
+        if not USE_PEFT_BACKEND:
+            raise ValueError("PEFT backend is required for this method.")
+
+        for component in self._lora_loadable_modules:
+            model = getattr(self, component, None)
+            if model is not None and issubclass(model.__class__, ModelMixin) and hasattr(model, "set_batch_adapters"):
+                model.set_batch_adapters(adapter_names)
+
+    def enable_lora_hotswap(self, target_rank: int = 128):
+        """
+        Enables LoRA hot-swapping (`load_lora_weights(..., hotswap=True)`) for the denoiser of the pipeline. See
+        [`~loaders.PeftAdapterMixin.enable_lora_hotswap`] for more details.
+
+        Args:
+            target_rank (`int`, defaults to `128`):
+                The highest rank among all the adapters that will be hot-swapped into the pipeline.
+        """
+        if not USE_PEFT_BACKEND:
+            raise ValueError("PEFT backend is required for this method.")
+
+        for component in self._lora_loadable_modules:
+            model = getattr(self, component, None)
+            if model is not None and issubclass(model.__class__, ModelMixin) and hasattr(model, "enable_lora_hotswap"):
+                model.enable_lora_hotswap(target_rank=target_rank)
+
     def delete_adapters(self, adapter_names: Union[List[str], str]):
         """
         Args:
@@ -647,6 +824,8 @@ class LoraBaseMixin:
                 "PEFT backend is required for this method. Please install the latest version of PEFT `pip install -U peft`"
             )
 
+        from peft.tuners.tuners_utils import BaseTunerLayer
+
         active_adapters = []
 
         for component in self._lora_loadable_modules:
@@ -695,6 +874,8 @@ class LoraBaseMixin:
         if not USE_PEFT_BACKEND:
             raise ValueError("PEFT backend is required for this method.")
 
+        from peft.tuners.tuners_utils import BaseTunerLayer
+
         for component in self._lora_loadable_modules:
             model = getattr(self, component, None)
             if model is not None:
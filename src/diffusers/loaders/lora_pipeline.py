@@ -103,6 +103,10 @@ class StableDiffusionLoraLoaderMixin(LoraBaseMixin):
             low_cpu_mem_usage (`bool`, *optional*):
                 Speed up model loading by only loading the pretrained LoRA weights and not initializing the random
                 weights.
+            hotswap (`bool`, *optional*, defaults to `False`):
+                Whether to copy the LoRA weights in place into the already loaded adapter `adapter_name` instead of
+                loading a new adapter, which avoids recompiling a compiled denoiser. See
+                [`~loaders.PeftAdapterMixin.enable_lora_hotswap`].
             kwargs (`dict`, *optional*):
                 See [`~loaders.StableDiffusionLoraLoaderMixin.lora_state_dict`].
         """
@@ -110,6 +114,7 @@ class StableDiffusionLoraLoaderMixin(LoraBaseMixin):
             raise ValueError("PEFT backend is required for this method.")
 
         low_cpu_mem_usage = kwargs.pop("low_cpu_mem_usage", _LOW_CPU_MEM_USAGE_DEFAULT_LORA)
+        hotswap = kwargs.pop("hotswap", False)
         if low_cpu_mem_usage and not is_peft_version(">=", "0.13.1"):
             raise ValueError(
                 "`low_cpu_mem_usage=True` is not compatible with this `peft` version. Please update it with `pip install -U peft`."
@@ -120,11 +125,15 @@ class StableDiffusionLoraLoaderMixin(LoraBaseMixin):
             pretrained_model_name_or_path_or_dict = pretrained_model_name_or_path_or_dict.copy()
 
         # First, ensure that the checkpoint is a compatible one and can be successfully loaded.
-        state_dict, network_alphas = self.lora_state_dict(pretrained_model_name_or_path_or_dict, **kwargs)
+        state_dict, network_alphas = self._cached_lora_state_dict(pretrained_model_name_or_path_or_dict, **kwargs)
 
         is_correct_format = all("lora" in key for key in state_dict.keys())
         if not is_correct_format:
             raise ValueError("Invalid LoRA checkpoint.")
+        if hotswap and any("text_encoder" in key for key in state_dict.keys()):
+            raise ValueError(
+                "Hot-swapping is only supported for the LoRA layers of the denoiser, not the text encoders."
+            )
 
         self.load_lora_into_unet(
             state_dict,
@@ -133,6 +142,7 @@ class StableDiffusionLoraLoaderMixin(LoraBaseMixin):
             adapter_name=adapter_name,
             _pipeline=self,
             low_cpu_mem_usage=low_cpu_mem_usage,
+            hotswap=hotswap,
         )
         self.load_lora_into_text_encoder(
             state_dict,
@@ -263,7 +273,14 @@ class StableDiffusionLoraLoaderMixin(LoraBaseMixin):
 
     @classmethod
     def load_lora_into_unet(
-        cls, state_dict, network_alphas, unet, adapter_name=None, _pipeline=None, low_cpu_mem_usage=False
+        cls,
+        state_dict,
+        network_alphas,
+        unet,
+        adapter_name=None,
+        _pipeline=None,
+        low_cpu_mem_usage=False,
+        hotswap=False,
     ):
         """
         This will load the LoRA layers specified in `state_dict` into `unet`.
@@ -283,6 +300,9 @@ class StableDiffusionLoraLoaderMixin(LoraBaseMixin):
                 Adapter name to be used for referencing the loaded adapter model. If not specified, it will use
                 `default_{i}` where i is the total number of adapters being loaded.
             Speed up model loading only loading the pretrained LoRA weights and not initializing the random weights.
+            hotswap (`bool`, *optional*, defaults to `False`):
+                Whether to copy the LoRA weights in place into the already loaded adapter `adapter_name`. See
+                [`~loaders.PeftAdapterMixin.enable_lora_hotswap`].
         """
         if not USE_PEFT_BACKEND:
             raise ValueError("PEFT backend is required for this method.")
@@ -306,6 +326,7 @@ class StableDiffusionLoraLoaderMixin(LoraBaseMixin):
                 adapter_name=adapter_name,
                 _pipeline=_pipeline,
                 low_cpu_mem_usage=low_cpu_mem_usage,
+                hotswap=hotswap,
             )
 
     @classmethod
@@ -524,6 +545,11 @@ class StableDiffusionLoraLoaderMixin(LoraBaseMixin):
                 Whether to check fused weights for NaN values before fusing and if values are NaN not fusing them.
             adapter_names (`List[str]`, *optional*):
                 Adapter names to be used for fusing. If nothing is passed, all active adapters will be fused.
+            keep_fused_delta (`bool`, defaults to `False`):
+                Whether to keep the weight delta of every fused layer so that [`~LoraBaseMixin.unfuse_lora`] restores
+                the original weights exactly with a subtraction. See [`~LoraBaseMixin.fuse_lora`].
+            fused_delta_device (`str` or `torch.device`, *optional*):
+                The device to keep the deltas on when `keep_fused_delta=True`, e.g. `"cpu"`.
 
         Example:
 
@@ -539,7 +565,11 @@ class StableDiffusionLoraLoaderMixin(LoraBaseMixin):
         ```
         """
         super().fuse_lora(
-            components=components, lora_scale=lora_scale, safe_fusing=safe_fusing, adapter_names=adapter_names
+            components=components,
+            lora_scale=lora_scale,
+            safe_fusing=safe_fusing,
+            adapter_names=adapter_names,
+            **kwargs,
         )
 
     def unfuse_lora(self, components: List[str] = ["unet", "text_encoder"], **kwargs):
@@ -602,6 +632,10 @@ class StableDiffusionXLLoraLoaderMixin(LoraBaseMixin):
                 Adapter name to be used for referencing the loaded adapter model. If not specified, it will use
                 `default_{i}` where i is the total number of adapters being loaded.
             Speed up model loading by only loading the pretrained LoRA weights and not initializing the random weights.:
+            hotswap (`bool`, *optional*, defaults to `False`):
+                Whether to copy the LoRA weights in place into the already loaded adapter `adapter_name` instead of
+                loading a new adapter, which avoids recompiling a compiled denoiser. See
+                [`~loaders.PeftAdapterMixin.enable_lora_hotswap`].
             kwargs (`dict`, *optional*):
                 See [`~loaders.StableDiffusionLoraLoaderMixin.lora_state_dict`].
         """
@@ -609,6 +643,7 @@ class StableDiffusionXLLoraLoaderMixin(LoraBaseMixin):
             raise ValueError("PEFT backend is required for this method.")
 
         low_cpu_mem_usage = kwargs.pop("low_cpu_mem_usage", _LOW_CPU_MEM_USAGE_DEFAULT_LORA)
+        hotswap = kwargs.pop("hotswap", False)
         if low_cpu_mem_usage and not is_peft_version(">=", "0.13.1"):
             raise ValueError(
                 "`low_cpu_mem_usage=True` is not compatible with this `peft` version. Please update it with `pip install -U peft`."
@@ -623,7 +658,7 @@ class StableDiffusionXLLoraLoaderMixin(LoraBaseMixin):
             pretrained_model_name_or_path_or_dict = pretrained_model_name_or_path_or_dict.copy()
 
         # First, ensure that the checkpoint is a compatible one and can be successfully loaded.
-        state_dict, network_alphas = self.lora_state_dict(
+        state_dict, network_alphas = self._cached_lora_state_dict(
             pretrained_model_name_or_path_or_dict,
             unet_config=self.unet.config,
             **kwargs,
@@ -632,6 +667,10 @@ class StableDiffusionXLLoraLoaderMixin(LoraBaseMixin):
         is_correct_format = all("lora" in key for key in state_dict.keys())
         if not is_correct_format:
             raise ValueError("Invalid LoRA checkpoint.")
+        if hotswap and any("text_encoder" in key for key in state_dict.keys()):
+            raise ValueError(
+                "Hot-swapping is only supported for the LoRA layers of the denoiser, not the text encoders."
+            )
 
         self.load_lora_into_unet(
             state_dict,
@@ -640,6 +679,7 @@ class StableDiffusionXLLoraLoaderMixin(LoraBaseMixin):
             adapter_name=adapter_name,
             _pipeline=self,
             low_cpu_mem_usage=low_cpu_mem_usage,
+            hotswap=hotswap,
         )
         text_encoder_state_dict = {k: v for k, v in state_dict.items() if "text_encoder." in k}
         if len(text_encoder_state_dict) > 0:
@@ -786,7 +826,14 @@ class StableDiffusionXLLoraLoaderMixin(LoraBaseMixin):
     @classmethod
     # Copied from diffusers.loaders.lora_pipeline.StableDiffusionLoraLoaderMixin.load_lora_into_unet
     def load_lora_into_unet(
-        cls, state_dict, network_alphas, unet, adapter_name=None, _pipeline=None, low_cpu_mem_usage=False
+        cls,
+        state_dict,
+        network_alphas,
+        unet,
+        adapter_name=None,
+        _pipeline=None,
+        low_cpu_mem_usage=False,
+        hotswap=False,
     ):
         """
         This will load the LoRA layers specified in `state_dict` into `unet`.
@@ -806,6 +853,9 @@ class StableDiffusionXLLoraLoaderMixin(LoraBaseMixin):
                 Adapter name to be used for referencing the loaded adapter model. If not specified, it will use
                 `default_{i}` where i is the total number of adapters being loaded.
             Speed up model loading only loading the pretrained LoRA weights and not initializing the random weights.
+            hotswap (`bool`, *optional*, defaults to `False`):
+                Whether to copy the LoRA weights in place into the already loaded adapter `adapter_name`. See
+                [`~loaders.PeftAdapterMixin.enable_lora_hotswap`].
         """
         if not USE_PEFT_BACKEND:
             raise ValueError("PEFT backend is required for this method.")
@@ -829,6 +879,7 @@ class StableDiffusionXLLoraLoaderMixin(LoraBaseMixin):
                 adapter_name=adapter_name,
                 _pipeline=_pipeline,
                 low_cpu_mem_usage=low_cpu_mem_usage,
+                hotswap=hotswap,
             )
 
     @classmethod
@@ -1056,6 +1107,11 @@ class StableDiffusionXLLoraLoaderMixin(LoraBaseMixin):
                 Whether to check fused weights for NaN values before fusing and if values are NaN not fusing them.
             adapter_names (`List[str]`, *optional*):
                 Adapter names to be used for fusing. If nothing is passed, all active adapters will be fused.
+            keep_fused_delta (`bool`, defaults to `False`):
+                Whether to keep the weight delta of every fused layer so that [`~LoraBaseMixin.unfuse_lora`] restores
+                the original weights exactly with a subtraction. See [`~LoraBaseMixin.fuse_lora`].
+            fused_delta_device (`str` or `torch.device`, *optional*):
+                The device to keep the deltas on when `keep_fused_delta=True`, e.g. `"cpu"`.
 
         Example:
 
@@ -1071,7 +1127,11 @@ class StableDiffusionXLLoraLoaderMixin(LoraBaseMixin):
         ```
         """
         super().fuse_lora(
-            components=components, lora_scale=lora_scale, safe_fusing=safe_fusing, adapter_names=adapter_names
+            components=components,
+            lora_scale=lora_scale,
+            safe_fusing=safe_fusing,
+            adapter_names=adapter_names,
+            **kwargs,
         )
 
     def unfuse_lora(self, components: List[str] = ["unet", "text_encoder", "text_encoder_2"], **kwargs):
@@ -1227,6 +1287,10 @@ class SD3LoraLoaderMixin(LoraBaseMixin):
                 Adapter name to be used for referencing the loaded adapter model. If not specified, it will use
                 `default_{i}` where i is the total number of adapters being loaded.
             Speed up model loading by only loading the pretrained LoRA weights and not initializing the random weights.:
+            hotswap (`bool`, *optional*, defaults to `False`):
+                Whether to copy the LoRA weights in place into the already loaded adapter `adapter_name` instead of
+                loading a new adapter, which avoids recompiling a compiled denoiser. See
+                [`~loaders.PeftAdapterMixin.enable_lora_hotswap`].
             kwargs (`dict`, *optional*):
                 See [`~loaders.StableDiffusionLoraLoaderMixin.lora_state_dict`].
         """
@@ -1234,6 +1298,7 @@ class SD3LoraLoaderMixin(LoraBaseMixin):
             raise ValueError("PEFT backend is required for this method.")
 
         low_cpu_mem_usage = kwargs.pop("low_cpu_mem_usage", _LOW_CPU_MEM_USAGE_DEFAULT_LORA)
+        hotswap = kwargs.pop("hotswap", False)
         if low_cpu_mem_usage and is_peft_version("<", "0.13.0"):
             raise ValueError(
                 "`low_cpu_mem_usage=True` is not compatible with this `peft` version. Please update it with `pip install -U peft`."
@@ -1244,11 +1309,15 @@ class SD3LoraLoaderMixin(LoraBaseMixin):
             pretrained_model_name_or_path_or_dict = pretrained_model_name_or_path_or_dict.copy()
 
         # First, ensure that the checkpoint is a compatible one and can be successfully loaded.
-        state_dict = self.lora_state_dict(pretrained_model_name_or_path_or_dict, **kwargs)
+        state_dict = self._cached_lora_state_dict(pretrained_model_name_or_path_or_dict, **kwargs)
 
         is_correct_format = all("lora" in key for key in state_dict.keys())
         if not is_correct_format:
             raise ValueError("Invalid LoRA checkpoint.")
+        if hotswap and any("text_encoder" in key for key in state_dict.keys()):
+            raise ValueError(
+                "Hot-swapping is only supported for the LoRA layers of the denoiser, not the text encoders."
+            )
 
         self.load_lora_into_transformer(
             state_dict,
@@ -1256,6 +1325,7 @@ class SD3LoraLoaderMixin(LoraBaseMixin):
             adapter_name=adapter_name,
             _pipeline=self,
             low_cpu_mem_usage=low_cpu_mem_usage,
+            hotswap=hotswap,
         )
 
         text_encoder_state_dict = {k: v for k, v in state_dict.items() if "text_encoder." in k}
@@ -1286,7 +1356,7 @@ class SD3LoraLoaderMixin(LoraBaseMixin):
 
     @classmethod
     def load_lora_into_transformer(
-        cls, state_dict, transformer, adapter_name=None, _pipeline=None, low_cpu_mem_usage=False
+        cls, state_dict, transformer, adapter_name=None, _pipeline=None, low_cpu_mem_usage=False, hotswap=False
     ):
         """
         This will load the LoRA layers specified in `state_dict` into `transformer`.
@@ -1302,6 +1372,9 @@ class SD3LoraLoaderMixin(LoraBaseMixin):
                 Adapter name to be used for referencing the loaded adapter model. If not specified, it will use
                 `default_{i}` where i is the total number of adapters being loaded.
             Speed up model loading by only loading the pretrained LoRA weights and not initializing the random weights.:
+            hotswap (`bool`, *optional*, defaults to `False`):
+                Whether to copy the LoRA weights in place into the already loaded adapter `adapter_name`. See
+                [`~loaders.PeftAdapterMixin.enable_lora_hotswap`].
         """
         if low_cpu_mem_usage and is_peft_version("<", "0.13.0"):
             raise ValueError(
@@ -1323,7 +1396,7 @@ class SD3LoraLoaderMixin(LoraBaseMixin):
             if "lora_A" not in first_key:
                 state_dict = convert_unet_state_dict_to_peft(state_dict)
 
-            if adapter_name in getattr(transformer, "peft_config", {}):
+            if adapter_name in getattr(transformer, "peft_config", {}) and not hotswap:
                 raise ValueError(
                     f"Adapter name {adapter_name} already in use in the transformer - please select a new adapter name."
                 )
@@ -1343,6 +1416,10 @@ class SD3LoraLoaderMixin(LoraBaseMixin):
                     lora_config_kwargs.pop("use_dora")
             lora_config = LoraConfig(**lora_config_kwargs)
 
+            if hotswap:
+                transformer._hotswap_lora_adapter(state_dict, adapter_name, lora_config)
+                return
+
             # adapter_name
             if adapter_name is None:
                 adapter_name = get_adapter_name(transformer)
@@ -1357,6 +1434,7 @@ class SD3LoraLoaderMixin(LoraBaseMixin):
 
             inject_adapter_in_model(lora_config, transformer, adapter_name=adapter_name, **peft_kwargs)
             incompatible_keys = set_peft_model_state_dict(transformer, state_dict, adapter_name, **peft_kwargs)
+            transformer._prepare_lora_for_hotswap(adapter_name)
 
             warn_msg = ""
             if incompatible_keys is not None:
@@ -1616,6 +1694,11 @@ class SD3LoraLoaderMixin(LoraBaseMixin):
                 Whether to check fused weights for NaN values before fusing and if values are NaN not fusing them.
             adapter_names (`List[str]`, *optional*):
                 Adapter names to be used for fusing. If nothing is passed, all active adapters will be fused.
+            keep_fused_delta (`bool`, defaults to `False`):
+                Whether to keep the weight delta of every fused layer so that [`~LoraBaseMixin.unfuse_lora`] restores
+                the original weights exactly with a subtraction. See [`~LoraBaseMixin.fuse_lora`].
+            fused_delta_device (`str` or `torch.device`, *optional*):
+                The device to keep the deltas on when `keep_fused_delta=True`, e.g. `"cpu"`.
 
         Example:
 
@@ -1631,7 +1714,11 @@ class SD3LoraLoaderMixin(LoraBaseMixin):
         ```
         """
         super().fuse_lora(
-            components=components, lora_scale=lora_scale, safe_fusing=safe_fusing, adapter_names=adapter_names
+            components=components,
+            lora_scale=lora_scale,
+            safe_fusing=safe_fusing,
+            adapter_names=adapter_names,
+            **kwargs,
         )
 
     def unfuse_lora(self, components: List[str] = ["transformer", "text_encoder", "text_encoder_2"], **kwargs):
@@ -1814,6 +1901,10 @@ class FluxLoraLoaderMixin(LoraBaseMixin):
         Parameters:
             pretrained_model_name_or_path_or_dict (`str` or `os.PathLike` or `dict`):
                 See [`~loaders.StableDiffusionLoraLoaderMixin.lora_state_dict`].
+            hotswap (`bool`, *optional*, defaults to `False`):
+                Whether to copy the LoRA weights in place into the already loaded adapter `adapter_name` instead of
+                loading a new adapter, which avoids recompiling a compiled denoiser. See
+                [`~loaders.PeftAdapterMixin.enable_lora_hotswap`].
             kwargs (`dict`, *optional*):
                 See [`~loaders.StableDiffusionLoraLoaderMixin.lora_state_dict`].
             adapter_name (`str`, *optional*):
@@ -1825,6 +1916,7 @@ class FluxLoraLoaderMixin(LoraBaseMixin):
             raise ValueError("PEFT backend is required for this method.")
 
         low_cpu_mem_usage = kwargs.pop("low_cpu_mem_usage", _LOW_CPU_MEM_USAGE_DEFAULT_LORA)
+        hotswap = kwargs.pop("hotswap", False)
         if low_cpu_mem_usage and not is_peft_version(">=", "0.13.1"):
             raise ValueError(
                 "`low_cpu_mem_usage=True` is not compatible with this `peft` version. Please update it with `pip install -U peft`."
@@ -1835,13 +1927,17 @@ class FluxLoraLoaderMixin(LoraBaseMixin):
             pretrained_model_name_or_path_or_dict = pretrained_model_name_or_path_or_dict.copy()
 
         # First, ensure that the checkpoint is a compatible one and can be successfully loaded.
-        state_dict, network_alphas = self.lora_state_dict(
+        state_dict, network_alphas = self._cached_lora_state_dict(
             pretrained_model_name_or_path_or_dict, return_alphas=True, **kwargs
         )
 
         is_correct_format = all("lora" in key for key in state_dict.keys())
         if not is_correct_format:
             raise ValueError("Invalid LoRA checkpoint.")
+        if hotswap and any("text_encoder" in key for key in state_dict.keys()):
+            raise ValueError(
+                "Hot-swapping is only supported for the LoRA layers of the denoiser, not the text encoders."
+            )
 
         self.load_lora_into_transformer(
             state_dict,
@@ -1850,6 +1946,7 @@ class FluxLoraLoaderMixin(LoraBaseMixin):
             adapter_name=adapter_name,
             _pipeline=self,
             low_cpu_mem_usage=low_cpu_mem_usage,
+            hotswap=hotswap,
         )
 
         text_encoder_state_dict = {k: v for k, v in state_dict.items() if "text_encoder." in k}
@@ -1867,7 +1964,14 @@ class FluxLoraLoaderMixin(LoraBaseMixin):
 
     @classmethod
     def load_lora_into_transformer(
-        cls, state_dict, network_alphas, transformer, adapter_name=None, _pipeline=None, low_cpu_mem_usage=False
+        cls,
+        state_dict,
+        network_alphas,
+        transformer,
+        adapter_name=None,
+        _pipeline=None,
+        low_cpu_mem_usage=False,
+        hotswap=False,
     ):
         """
         This will load the LoRA layers specified in `state_dict` into `transformer`.
@@ -1887,6 +1991,9 @@ class FluxLoraLoaderMixin(LoraBaseMixin):
                 Adapter name to be used for referencing the loaded adapter model. If not specified, it will use
                 `default_{i}` where i is the total number of adapters being loaded.
             Speed up model loading by only loading the pretrained LoRA weights and not initializing the random weights.:
+            hotswap (`bool`, *optional*, defaults to `False`):
+                Whether to copy the LoRA weights in place into the already loaded adapter `adapter_name`. See
+                [`~loaders.PeftAdapterMixin.enable_lora_hotswap`].
         """
         if low_cpu_mem_usage and not is_peft_version(">=", "0.13.1"):
             raise ValueError(
@@ -1908,7 +2015,7 @@ class FluxLoraLoaderMixin(LoraBaseMixin):
             if "lora_A" not in first_key:
                 state_dict = convert_unet_state_dict_to_peft(state_dict)
 
-            if adapter_name in getattr(transformer, "peft_config", {}):
+            if adapter_name in getattr(transformer, "peft_config", {}) and not hotswap:
                 raise ValueError(
                     f"Adapter name {adapter_name} already in use in the transformer - please select a new adapter name."
                 )
@@ -1933,6 +2040,10 @@ class FluxLoraLoaderMixin(LoraBaseMixin):
                     lora_config_kwargs.pop("use_dora")
             lora_config = LoraConfig(**lora_config_kwargs)
 
+            if hotswap:
+                transformer._hotswap_lora_adapter(state_dict, adapter_name, lora_config)
+                return
+
             # adapter_name
             if adapter_name is None:
                 adapter_name = get_adapter_name(transformer)
@@ -1947,6 +2058,7 @@ class FluxLoraLoaderMixin(LoraBaseMixin):
 
             inject_adapter_in_model(lora_config, transformer, adapter_name=adapter_name, **peft_kwargs)
             incompatible_keys = set_peft_model_state_dict(transformer, state_dict, adapter_name, **peft_kwargs)
+            transformer._prepare_lora_for_hotswap(adapter_name)
 
             warn_msg = ""
             if incompatible_keys is not None:
@@ -2199,6 +2311,11 @@ class FluxLoraLoaderMixin(LoraBaseMixin):
                 Whether to check fused weights for NaN values before fusing and if values are NaN not fusing them.
             adapter_names (`List[str]`, *optional*):
                 Adapter names to be used for fusing. If nothing is passed, all active adapters will be fused.
+            keep_fused_delta (`bool`, defaults to `False`):
+                Whether to keep the weight delta of every fused layer so that [`~LoraBaseMixin.unfuse_lora`] restores
+                the original weights exactly with a subtraction. See [`~LoraBaseMixin.fuse_lora`].
+            fused_delta_device (`str` or `torch.device`, *optional*):
+                The device to keep the deltas on when `keep_fused_delta=True`, e.g. `"cpu"`.
 
         Example:
 
@@ -2214,7 +2331,11 @@ class FluxLoraLoaderMixin(LoraBaseMixin):
         ```
         """
         super().fuse_lora(
-            components=components, lora_scale=lora_scale, safe_fusing=safe_fusing, adapter_names=adapter_names
+            components=components,
+            lora_scale=lora_scale,
+            safe_fusing=safe_fusing,
+            adapter_names=adapter_names,
+            **kwargs,
         )
 
     def unfuse_lora(self, components: List[str] = ["transformer", "text_encoder"], **kwargs):
@@ -2659,6 +2780,10 @@ class CogVideoXLoraLoaderMixin(LoraBaseMixin):
                 Adapter name to be used for referencing the loaded adapter model. If not specified, it will use
                 `default_{i}` where i is the total number of adapters being loaded.
             Speed up model loading by only loading the pretrained LoRA weights and not initializing the random weights.:
+            hotswap (`bool`, *optional*, defaults to `False`):
+                Whether to copy the LoRA weights in place into the already loaded adapter `adapter_name` instead of
+                loading a new adapter, which avoids recompiling a compiled denoiser. See
+                [`~loaders.PeftAdapterMixin.enable_lora_hotswap`].
             kwargs (`dict`, *optional*):
                 See [`~loaders.StableDiffusionLoraLoaderMixin.lora_state_dict`].
         """
@@ -2666,6 +2791,7 @@ class CogVideoXLoraLoaderMixin(LoraBaseMixin):
             raise ValueError("PEFT backend is required for this method.")
 
         low_cpu_mem_usage = kwargs.pop("low_cpu_mem_usage", _LOW_CPU_MEM_USAGE_DEFAULT_LORA)
+        hotswap = kwargs.pop("hotswap", False)
         if low_cpu_mem_usage and is_peft_version("<", "0.13.0"):
             raise ValueError(
                 "`low_cpu_mem_usage=True` is not compatible with this `peft` version. Please update it with `pip install -U peft`."
@@ -2676,7 +2802,7 @@ class CogVideoXLoraLoaderMixin(LoraBaseMixin):
             pretrained_model_name_or_path_or_dict = pretrained_model_name_or_path_or_dict.copy()
 
         # First, ensure that the checkpoint is a compatible one and can be successfully loaded.
-        state_dict = self.lora_state_dict(pretrained_model_name_or_path_or_dict, **kwargs)
+        state_dict = self._cached_lora_state_dict(pretrained_model_name_or_path_or_dict, **kwargs)
 
         is_correct_format = all("lora" in key for key in state_dict.keys())
         if not is_correct_format:
@@ -2688,12 +2814,13 @@ class CogVideoXLoraLoaderMixin(LoraBaseMixin):
             adapter_name=adapter_name,
             _pipeline=self,
             low_cpu_mem_usage=low_cpu_mem_usage,
+            hotswap=hotswap,
         )
 
     @classmethod
     # Copied from diffusers.loaders.lora_pipeline.SD3LoraLoaderMixin.load_lora_into_transformer
     def load_lora_into_transformer(
-        cls, state_dict, transformer, adapter_name=None, _pipeline=None, low_cpu_mem_usage=False
+        cls, state_dict, transformer, adapter_name=None, _pipeline=None, low_cpu_mem_usage=False, hotswap=False
     ):
         """
         This will load the LoRA layers specified in `state_dict` into `transformer`.
@@ -2709,6 +2836,9 @@ class CogVideoXLoraLoaderMixin(LoraBaseMixin):
                 Adapter name to be used for referencing the loaded adapter model. If not specified, it will use
                 `default_{i}` where i is the total number of adapters being loaded.
             Speed up model loading by only loading the pretrained LoRA weights and not initializing the random weights.:
+            hotswap (`bool`, *optional*, defaults to `False`):
+                Whether to copy the LoRA weights in place into the already loaded adapter `adapter_name`. See
+                [`~loaders.PeftAdapterMixin.enable_lora_hotswap`].
         """
         if low_cpu_mem_usage and is_peft_version("<", "0.13.0"):
             raise ValueError(
@@ -2730,7 +2860,7 @@ class CogVideoXLoraLoaderMixin(LoraBaseMixin):
             if "lora_A" not in first_key:
                 state_dict = convert_unet_state_dict_to_peft(state_dict)
 
-            if adapter_name in getattr(transformer, "peft_config", {}):
+            if adapter_name in getattr(transformer, "peft_config", {}) and not hotswap:
                 raise ValueError(
                     f"Adapter name {adapter_name} already in use in the transformer - please select a new adapter name."
                 )
@@ -2750,6 +2880,10 @@ class CogVideoXLoraLoaderMixin(LoraBaseMixin):
                     lora_config_kwargs.pop("use_dora")
             lora_config = LoraConfig(**lora_config_kwargs)
 
+            if hotswap:
+                transformer._hotswap_lora_adapter(state_dict, adapter_name, lora_config)
+                return
+
             # adapter_name
             if adapter_name is None:
                 adapter_name = get_adapter_name(transformer)
@@ -2764,6 +2898,7 @@ class CogVideoXLoraLoaderMixin(LoraBaseMixin):
 
             inject_adapter_in_model(lora_config, transformer, adapter_name=adapter_name, **peft_kwargs)
             incompatible_keys = set_peft_model_state_dict(transformer, state_dict, adapter_name, **peft_kwargs)
+            transformer._prepare_lora_for_hotswap(adapter_name)
 
             warn_msg = ""
             if incompatible_keys is not None:
@@ -2871,6 +3006,11 @@ class CogVideoXLoraLoaderMixin(LoraBaseMixin):
                 Whether to check fused weights for NaN values before fusing and if values are NaN not fusing them.
             adapter_names (`List[str]`, *optional*):
                 Adapter names to be used for fusing. If nothing is passed, all active adapters will be fused.
+            keep_fused_delta (`bool`, defaults to `False`):
+                Whether to keep the weight delta of every fused layer so that [`~LoraBaseMixin.unfuse_lora`] restores
+                the original weights exactly with a subtraction. See [`~LoraBaseMixin.fuse_lora`].
+            fused_delta_device (`str` or `torch.device`, *optional*):
+                The device to keep the deltas on when `keep_fused_delta=True`, e.g. `"cpu"`.
 
         Example:
 
@@ -2886,7 +3026,11 @@ class CogVideoXLoraLoaderMixin(LoraBaseMixin):
         ```
         """
         super().fuse_lora(
-            components=components, lora_scale=lora_scale, safe_fusing=safe_fusing, adapter_names=adapter_names
+            components=components,
+            lora_scale=lora_scale,
+            safe_fusing=safe_fusing,
+            adapter_names=adapter_names,
+            **kwargs,
         )
 
     # Copied from diffusers.loaders.lora_pipeline.StableDiffusionLoraLoaderMixin.unfuse_lora with unet->transformer
@@ -22,9 +22,13 @@ from ..utils import (
     check_peft_version,
     delete_adapter_layers,
     is_peft_available,
+    merge_lora_layer_with_delta,
     set_adapter_layers,
+    set_batch_adapter_layers,
     set_weights_and_activate_adapters,
+    unmerge_lora_layer,
 )
+from ..utils.peft_utils import _clear_batch_lora_weights, _restore_lora_scaling_tensors
 from .unet_loader_utils import _maybe_expand_lora_scales
 
 
@@ -262,15 +266,24 @@ class PeftAdapterMixin:
             if isinstance(module, BaseTunerLayer):
                 return module.active_adapter
 
-    def fuse_lora(self, lora_scale=1.0, safe_fusing=False, adapter_names=None):
+    def fuse_lora(
+        self, lora_scale=1.0, safe_fusing=False, adapter_names=None, keep_fused_delta=False, fused_delta_device=None
+    ):
         if not USE_PEFT_BACKEND:
             raise ValueError("PEFT backend is required for `fuse_lora()`.")
 
         self.lora_scale = lora_scale
         self._safe_fusing = safe_fusing
-        self.apply(partial(self._fuse_lora_apply, adapter_names=adapter_names))
+        self.apply(
+            partial(
+                self._fuse_lora_apply,
+                adapter_names=adapter_names,
+                keep_fused_delta=keep_fused_delta,
+                fused_delta_device=fused_delta_device,
+            )
+        )
 
-    def _fuse_lora_apply(self, module, adapter_names=None):
+    def _fuse_lora_apply(self, module, adapter_names=None, keep_fused_delta=False, fused_delta_device=None):
         from peft.tuners.tuners_utils import BaseTunerLayer
 
         merge_kwargs = {"safe_merge": self._safe_fusing}
@@ -279,6 +292,12 @@ class PeftAdapterMixin:
             if self.lora_scale != 1.0:
                 module.scale_layer(self.lora_scale)
 
+            if keep_fused_delta:
+                merge_lora_layer_with_delta(
+                    module, adapter_names=adapter_names, delta_device=fused_delta_device, **merge_kwargs
+                )
+                return
+
             # For BC with prevous PEFT versions, we need to check the signature
             # of the `merge` method to see if it supports the `adapter_names` argument.
             supported_merge_kwargs = list(inspect.signature(module.merge).parameters)
@@ -301,7 +320,7 @@ class PeftAdapterMixin:
         from peft.tuners.tuners_utils import BaseTunerLayer
 
         if isinstance(module, BaseTunerLayer):
-            module.unmerge()
+            unmerge_lora_layer(module)
 
     def unload_lora(self):
         if not USE_PEFT_BACKEND:
@@ -394,3 +413,242 @@ class PeftAdapterMixin:
             # Pop also the corresponding adapter from the config
             if hasattr(self, "peft_config"):
                 self.peft_config.pop(adapter_name, None)
+
+    def set_batch_adapters(self, adapter_names: Optional[List[Optional[str]]]) -> None:
+        """
+        Uses a different loaded adapter for each sample of the batch, so that requests with different LoRAs can share a
+        forward pass. The LoRA weights of all the adapters are gathered per sample and applied with batched matmuls.
+        Call `set_batch_adapters(None)` to go back to the adapters activated with `set_adapters`.
+
+        Args:
+            adapter_names (`List[Optional[str]]`, *optional*):
+                The name of the adapter for each sample of the batch, or `None` to use the base model for that sample.
+                When the model is called with a batch that is a multiple of `len(adapter_names)`, as it happens with
+                classifier-free guidance, `adapter_names` is repeated for each chunk of the batch.
+
+        Example:
+
+        ```py
+        from diffusers import AutoPipelineForText2Image
+        import torch
+
+        pipeline = AutoPipelineForText2Image.from_pretrained(
+            "stabilityai/stable-diffusion-xl-base-1.0", torch_dtype=torch.float16
+        ).to("cuda")
+        pipeline.load_lora_weights("nerijs/pixel-art-xl", weight_name="pixel-art-xl.safetensors", adapter_name="pixel")
+        pipeline.load_lora_weights("CiroN2022/toy-face", weight_name="toy_face_sdxl.safetensors", adapter_name="toy")
+        pipeline.unet.set_batch_adapters(["pixel", "toy", None])
+        images = pipeline(["a cat", "a dog", "a bird"]).images
+        ```
+        """
+        if not USE_PEFT_BACKEND:
+            raise ValueError("PEFT backend is required for this method.")
+
+        if adapter_names is not None:
+            if not self._hf_peft_config_loaded:
+                raise ValueError("No adapter loaded. Please load an adapter first.")
+
+            missing = {name for name in adapter_names if name is not None} - set(self.peft_config)
+            if len(missing) > 0:
+                raise ValueError(
+                    f"Following adapter(s) could not be found: {', '.join(missing)}. Make sure you are passing the"
+                    f" correct adapter name(s). Current loaded adapters are: {list(self.peft_config.keys())}"
+                )
+
+        set_batch_adapter_layers(self, adapter_names)
+
+    def enable_lora_hotswap(self, target_rank: int = 128) -> None:
+        """
+        Prepares the LoRA layers of the model so that new adapters can be hot-swapped into them with `hotswap=True`.
+
+        The `lora_A` and `lora_B` weights of every loaded (and subsequently loaded) adapter are zero-padded to
+        `target_rank` and the LoRA scalings are stored as tensors. Hot-swapping then copies the weights and scalings of
+        a new adapter into these pre-allocated buffers in place, so that the model does not need to be re-allocated
+        or, when it was compiled with `torch.compile`, recompiled. Call this method before compiling the model.
+
+        Args:
+            target_rank (`int`, defaults to `128`):
+                The highest rank among all the adapters that will be hot-swapped into the model.
+
+        Example:
+
+        ```py
+        from diffusers import FluxPipeline
+        import torch
+
+        pipeline = FluxPipeline.from_pretrained("black-forest-labs/FLUX.1-dev", torch_dtype=torch.bfloat16).to("cuda")
+        pipeline.transformer.enable_lora_hotswap(target_rank=64)
+        pipeline.load_lora_weights("path/to/lora_1", adapter_name="default_0")
+        pipeline.transformer = torch.compile(pipeline.transformer, mode="max-autotune")
+        image = pipeline("a photo of a cat").images[0]
+
+        # replaces the weights of "default_0" in place, without triggering a recompilation
+        pipeline.load_lora_weights("path/to/lora_2", adapter_name="default_0", hotswap=True)
+        ```
+        """
+        if not USE_PEFT_BACKEND:
+            raise ValueError("PEFT backend is required for this method.")
+
+        if target_rank < 1:
+            raise ValueError(f"`target_rank` has to be a positive integer but is {target_rank}.")
+
+        current_target_rank = getattr(self, "_lora_hotswap_target_rank", None)
+        if current_target_rank is not None and current_target_rank != target_rank:
+            raise ValueError(
+                f"LoRA hot-swapping was already enabled with `target_rank={current_target_rank}`. The target rank"
+                " cannot be changed once the LoRA layers have been padded."
+            )
+
+        self._lora_hotswap_target_rank = target_rank
+        for adapter_name in getattr(self, "peft_config", {}):
+            self._prepare_lora_for_hotswap(adapter_name)
+
+    def _prepare_lora_for_hotswap(self, adapter_name: str) -> None:
+        target_rank = getattr(self, "_lora_hotswap_target_rank", None)
+        if target_rank is None:
+            return
+
+        import torch
+        from peft.tuners.tuners_utils import BaseTunerLayer
+
+        _clear_batch_lora_weights(self)
+        for name, module in self.named_modules():
+            if not isinstance(module, BaseTunerLayer) or adapter_name not in getattr(module, "lora_A", {}):
+                continue
+
+            if getattr(module, "use_dora", {}).get(adapter_name, False):
+                raise ValueError("LoRA hot-swapping is not supported for DoRA adapters.")
+
+            rank = module.r[adapter_name]
+            if rank > target_rank:
+                raise ValueError(
+                    f"The rank of the LoRA layer {name} ({rank}) is larger than the hot-swapping `target_rank`"
+                    f" ({target_rank}). Call `enable_lora_hotswap` with a `target_rank` of at least {rank}."
+                )
+
+            lora_A = module.lora_A[adapter_name]
+            lora_B = module.lora_B[adapter_name]
+            # The padded weights are always freshly allocated, so that hot-swapping never writes into tensors that
+            # are shared with a (cached) state dict.
+            with torch.no_grad():
+                weight_A = lora_A.weight.new_zeros((target_rank,) + tuple(lora_A.weight.shape[1:]))
+                weight_A[:rank].copy_(lora_A.weight)
+                weight_B = lora_B.weight.new_zeros(
+                    (lora_B.weight.shape[0], target_rank) + tuple(lora_B.weight.shape[2:])
+                )
+                weight_B[:, :rank].copy_(lora_B.weight)
+            lora_A.weight = torch.nn.Parameter(weight_A, requires_grad=lora_A.weight.requires_grad)
+            lora_B.weight = torch.nn.Parameter(weight_B, requires_grad=lora_B.weight.requires_grad)
+            if isinstance(lora_A, torch.nn.Linear):
+                lora_A.out_features = target_rank
+                lora_B.in_features = target_rank
+            else:
+                lora_A.out_channels = target_rank
+                lora_B.in_channels = target_rank
+
+            # The scaling is kept in a persistent tensor that is updated in place, also after PEFT's `set_scale`
+            # replaced it with a float (see `_restore_lora_scaling_tensors`). `lora_alpha` is adjusted so that
+            # `set_scale` still recovers the original scaling with the padded rank.
+            scaling = module.scaling[adapter_name]
+            scaling = scaling.item() if torch.is_tensor(scaling) else scaling
+            if not hasattr(module, "_diffusers_lora_hotswap_scaling"):
+                module._diffusers_lora_hotswap_scaling = {}
+            module._diffusers_lora_hotswap_scaling[adapter_name] = torch.tensor(
+                scaling, dtype=torch.float32, device=lora_A.weight.device
+            )
+            module.scaling[adapter_name] = module._diffusers_lora_hotswap_scaling[adapter_name]
+            module.lora_alpha[adapter_name] = scaling * target_rank
+            module.r[adapter_name] = target_rank
+
+    def _hotswap_lora_adapter(self, state_dict: Dict, adapter_name: Optional[str], lora_config) -> str:
+        # Copies the weights of `state_dict` (in PEFT format, i.e. with keys ending in `lora_A.weight` and
+        # `lora_B.weight`) into the pre-allocated LoRA layers of `adapter_name`. Layers targeted by the adapter but
+        # absent from `state_dict` are zeroed out. No module or parameter is replaced, so compiled graphs stay valid.
+        import torch
+        from peft.tuners.tuners_utils import BaseTunerLayer
+
+        if getattr(self, "_lora_hotswap_target_rank", None) is None:
+            raise ValueError(
+                "LoRA hot-swapping is not enabled for this model. Call `enable_lora_hotswap` before loading the first"
+                " adapter."
+            )
+
+        loaded_adapters = list(getattr(self, "peft_config", {}))
+        if adapter_name is None:
+            if len(loaded_adapters) != 1:
+                raise ValueError(
+                    "`adapter_name` has to be passed to hot-swap a LoRA when the model does not have exactly one"
+                    f" adapter loaded. Currently loaded adapters are: {loaded_adapters}."
+                )
+            adapter_name = loaded_adapters[0]
+        elif adapter_name not in loaded_adapters:
+            raise ValueError(
+                f"Cannot hot-swap adapter {adapter_name} because it is not loaded. Currently loaded adapters are:"
+                f" {loaded_adapters}."
+            )
+
+        if getattr(lora_config, "use_dora", False):
+            raise ValueError("LoRA hot-swapping is not supported for DoRA adapters.")
+
+        lora_modules = {
+            name: module
+            for name, module in self.named_modules()
+            if isinstance(module, BaseTunerLayer) and adapter_name in getattr(module, "lora_A", {})
+        }
+
+        unexpected_keys = [
+            key
+            for key in state_dict
+            if not key.endswith((".lora_A.weight", ".lora_B.weight")) or key.rsplit(".", 2)[0] not in lora_modules
+        ]
+        if unexpected_keys:
+            raise ValueError(
+                f"Cannot hot-swap adapter {adapter_name} because the new LoRA targets layers or parameters that are not"
+                f" part of the loaded adapter: {', '.join(unexpected_keys)}. Only the weights of already injected LoRA"
+                " layers can be hot-swapped."
+            )
+
+        def _get_pattern_value(pattern, module_name, default):
+            for key, value in pattern.items():
+                if module_name == key or module_name.endswith(f".{key}"):
+                    return value
+            return default
+
+        alpha_pattern = getattr(lora_config, "alpha_pattern", None) or {}
+        _clear_batch_lora_weights(self)
+        with torch.no_grad():
+            for name, module in lora_modules.items():
+                weight_A = module.lora_A[adapter_name].weight
+                weight_B = module.lora_B[adapter_name].weight
+                new_weight_A = state_dict.get(f"{name}.lora_A.weight")
+                new_weight_B = state_dict.get(f"{name}.lora_B.weight")
+
+                if new_weight_A is None or new_weight_B is None:
+                    if new_weight_A is not None or new_weight_B is not None:
+                        raise ValueError(f"Both `lora_A` and `lora_B` weights are required to hot-swap {name}.")
+                    weight_A.zero_()
+                    weight_B.zero_()
+                    continue
+
+                rank = new_weight_A.shape[0]
+                if rank > weight_A.shape[0]:
+                    raise ValueError(
+                        f"The rank of the new LoRA layer {name} ({rank}) is larger than the allocated rank"
+                        f" ({weight_A.shape[0]}). Call `enable_lora_hotswap` with a larger `target_rank`."
+                    )
+                if new_weight_A.shape[1:] != weight_A.shape[1:] or new_weight_B.shape[0] != weight_B.shape[0]:
+                    raise ValueError(f"The shapes of the new LoRA weights of {name} do not match the loaded adapter.")
+
+                weight_A.zero_()
+                weight_B.zero_()
+                weight_A[:rank].copy_(new_weight_A)
+                weight_B[:, :rank].copy_(new_weight_B)
+
+                alpha = _get_pattern_value(alpha_pattern, name, lora_config.lora_alpha)
+                scaling = alpha / rank
+                target_rank = module.r[adapter_name]
+                module.scaling[adapter_name] = scaling
+                module.lora_alpha[adapter_name] = scaling * target_rank
+                _restore_lora_scaling_tensors(module)
+
+        return adapter_name
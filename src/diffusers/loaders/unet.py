@@ -118,6 +118,10 @@ class UNet2DConditionLoadersMixin:
             low_cpu_mem_usage (`bool`, *optional*):
                 Speed up model loading by only loading the pretrained LoRA weights and not initializing the random
                 weights.
+            hotswap (`bool`, *optional*, defaults to `False`):
+                Whether to copy the LoRA weights in place into the already loaded adapter `adapter_name` instead of
+                injecting new LoRA layers. Requires [`~loaders.PeftAdapterMixin.enable_lora_hotswap`] to have been
+                called before the first adapter was loaded. Hot-swapping avoids recompilation of a compiled UNet.
 
         Example:
 
@@ -146,6 +150,7 @@ class UNet2DConditionLoadersMixin:
         _pipeline = kwargs.pop("_pipeline", None)
         network_alphas = kwargs.pop("network_alphas", None)
         low_cpu_mem_usage = kwargs.pop("low_cpu_mem_usage", False)
+        hotswap = kwargs.pop("hotswap", False)
         allow_pickle = False
 
         if low_cpu_mem_usage and is_peft_version("<=", "0.13.0"):
@@ -219,6 +224,7 @@ class UNet2DConditionLoadersMixin:
                 adapter_name=adapter_name,
                 _pipeline=_pipeline,
                 low_cpu_mem_usage=low_cpu_mem_usage,
+                hotswap=hotswap,
             )
         else:
             raise ValueError(
@@ -279,7 +285,14 @@ class UNet2DConditionLoadersMixin:
         return attn_processors
 
     def _process_lora(
-        self, state_dict, unet_identifier_key, network_alphas, adapter_name, _pipeline, low_cpu_mem_usage
+        self,
+        state_dict,
+        unet_identifier_key,
+        network_alphas,
+        adapter_name,
+        _pipeline,
+        low_cpu_mem_usage,
+        hotswap=False,
     ):
         # This method does the following things:
         # 1. Filters the `state_dict` with keys matching  `unet_identifier_key` when using the non-legacy
@@ -288,6 +301,7 @@ class UNet2DConditionLoadersMixin:
         # 3. Creates a `LoraConfig` and then injects the converted `state_dict` into the UNet per the
         #    `LoraConfig` specs.
         # 4. It also reports if the underlying `_pipeline` has any kind of offloading inside of it.
+        # When `hotswap` is set, step 3 copies the weights in place into the already injected LoRA layers instead.
         if not USE_PEFT_BACKEND:
             raise ValueError("PEFT backend is required for this method.")
 
@@ -311,7 +325,7 @@ class UNet2DConditionLoadersMixin:
         state_dict_to_be_used = unet_state_dict if len(unet_state_dict) > 0 else state_dict
 
         if len(state_dict_to_be_used) > 0:
-            if adapter_name in getattr(self, "peft_config", {}):
+            if adapter_name in getattr(self, "peft_config", {}) and not hotswap:
                 raise ValueError(
                     f"Adapter name {adapter_name} already in use in the Unet - please select a new adapter name."
                 )
@@ -340,6 +354,10 @@ class UNet2DConditionLoadersMixin:
                         lora_config_kwargs.pop("use_dora")
             lora_config = LoraConfig(**lora_config_kwargs)
 
+            if hotswap:
+                self._hotswap_lora_adapter(state_dict, adapter_name, lora_config)
+                return is_model_cpu_offload, is_sequential_cpu_offload
+
             # adapter_name
             if adapter_name is None:
                 adapter_name = get_adapter_name(self)
@@ -353,6 +371,7 @@ class UNet2DConditionLoadersMixin:
 
             inject_adapter_in_model(lora_config, self, adapter_name=adapter_name, **peft_kwargs)
             incompatible_keys = set_peft_model_state_dict(self, state_dict, adapter_name, **peft_kwargs)
+            self._prepare_lora_for_hotswap(adapter_name)
 
             warn_msg = ""
             if incompatible_keys is not None:
@@ -23,6 +23,7 @@ from .activations import GEGLU, GELU, ApproximateGELU, FP32SiLU, SwiGLU
 from .attention_processor import Attention, JointAttnProcessor2_0
 from .embeddings import SinusoidalPositionalEmbedding
 from .normalization import AdaLayerNorm, AdaLayerNormContinuous, AdaLayerNormZero, RMSNorm, SD35AdaLayerNormZeroX
+from .token_merging import TokenMerging
 
 
 logger = logging.get_logger(__name__)
@@ -454,11 +455,17 @@ class BasicTransformerBlock(nn.Module):
         self._chunk_size = None
         self._chunk_dim = 0
 
+        self._token_merging = None
+
     def set_chunk_feed_forward(self, chunk_size: Optional[int], dim: int = 0):
         # Sets chunk feed-forward
         self._chunk_size = chunk_size
         self._chunk_dim = dim
 
+    def set_token_merging(self, token_merging: Optional[TokenMerging]):
+        # Sets token merging, shared by all the blocks of the model
+        self._token_merging = token_merging
+
     def forward(
         self,
         hidden_states: torch.Tensor,
@@ -504,12 +511,21 @@ class BasicTransformerBlock(nn.Module):
         cross_attention_kwargs = cross_attention_kwargs.copy() if cross_attention_kwargs is not None else {}
         gligen_kwargs = cross_attention_kwargs.pop("gligen", None)
 
+        # 1.1 Token merging
+        token_merging_fns = None
+        if self._token_merging is not None and hidden_states.ndim == 3 and attention_mask is None:
+            token_merging_fns = self._token_merging.compute_merge(hidden_states)
+            merge_attn, merge_crossattn, merge_mlp, unmerge_attn, unmerge_crossattn, unmerge_mlp = token_merging_fns
+            norm_hidden_states = merge_attn(norm_hidden_states)
+
         attn_output = self.attn1(
             norm_hidden_states,
             encoder_hidden_states=encoder_hidden_states if self.only_cross_attention else None,
             attention_mask=attention_mask,
             **cross_attention_kwargs,
         )
+        if token_merging_fns is not None:
+            attn_output = unmerge_attn(attn_output)
 
         if self.norm_type == "ada_norm_zero":
             attn_output = gate_msa.unsqueeze(1) * attn_output
@@ -542,12 +558,17 @@ class BasicTransformerBlock(nn.Module):
             if self.pos_embed is not None and self.norm_type != "ada_norm_single":
                 norm_hidden_states = self.pos_embed(norm_hidden_states)
 
+            if token_merging_fns is not None:
+                norm_hidden_states = merge_crossattn(norm_hidden_states)
+
             attn_output = self.attn2(
                 norm_hidden_states,
                 encoder_hidden_states=encoder_hidden_states,
                 attention_mask=encoder_attention_mask,
                 **cross_attention_kwargs,
             )
+            if token_merging_fns is not None:
+                attn_output = unmerge_crossattn(attn_output)
             hidden_states = attn_output + hidden_states
 
         # 4. Feed-forward
@@ -564,12 +585,18 @@ class BasicTransformerBlock(nn.Module):
             norm_hidden_states = self.norm2(hidden_states)
             norm_hidden_states = norm_hidden_states * (1 + scale_mlp) + shift_mlp
 
+        if token_merging_fns is not None:
+            norm_hidden_states = merge_mlp(norm_hidden_states)
+
         if self._chunk_size is not None:
             # "feed_forward_chunk_size" can be used to save memory
             ff_output = _chunked_feed_forward(self.ff, norm_hidden_states, self._chunk_dim, self._chunk_size)
         else:
             ff_output = self.ff(norm_hidden_states)
 
+        if token_merging_fns is not None:
+            ff_output = unmerge_mlp(ff_output)
+
         if self.norm_type == "ada_norm_zero":
             ff_output = gate_mlp.unsqueeze(1) * ff_output
         elif self.norm_type == "ada_norm_single":
@@ -627,8 +654,32 @@ class LuminaFeedForward(nn.Module):
             bias=False,
         )
         self.silu = FP32SiLU()
+        self.fused_projections = False
+
+    @torch.no_grad()
+    def fuse_projections(self):
+        r"""
+        Fuses the gate (`linear_1`) and up (`linear_3`) projections into a single projection.
+        """
+        weight = torch.cat([self.linear_1.weight.data, self.linear_3.weight.data])
+        self.linear_13 = nn.Linear(
+            weight.shape[1], weight.shape[0], bias=False, device=weight.device, dtype=weight.dtype
+        )
+        self.linear_13.weight.copy_(weight)
+        self.fused_projections = True
+
+    def unfuse_projections(self):
+        r"""
+        Removes the fused projection created by [`~LuminaFeedForward.fuse_projections`].
+        """
+        if hasattr(self, "linear_13"):
+            del self.linear_13
+        self.fused_projections = False
 
     def forward(self, x):
+        if self.fused_projections:
+            gate, up = self.linear_13(x).chunk(2, dim=-1)
+            return self.linear_2(self.silu(gate) * up)
         return self.linear_2(self.silu(self.linear_1(x)) * self.linear_3(x))
 
 
@@ -0,0 +1,504 @@
+# Copyright 2024 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Central dispatch for the `softmax(QK^T / sqrt(d))V` computation of the attention processors.
+
+Attention processors compute their projections, normalizations and rotary embeddings themselves and call
+[`dispatch_attention_fn`] for the core attention. The kernel that is used is looked up by name in a registry of
+attention backends, so that a new kernel only needs to be registered once with [`register_attention_backend`] instead
+of being added to every processor class. The backend is selected globally with [`set_attention_backend`] or
+[`attention_backend`], or per module with `Attention.set_attention_backend` / `ModelMixin.set_attention_backend`.
+
+The `"auto"` backend benchmarks all the available backends the first time it sees an input shape and caches the
+fastest one for that shape.
+"""
+
+import contextlib
+import functools
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+import torch
+import torch.nn.functional as F
+
+from ..utils import is_flash_attn_available, is_torch_npu_available, is_xformers_available, logging
+from ..utils.torch_utils import is_torch_version
+
+
+if TYPE_CHECKING:
+    from .context_parallel import ContextParallel
+
+
+logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
+
+AUTOTUNE_BACKEND = "auto"
+DEFAULT_BACKEND = "native"
+
+
+class AttentionBackend:
+    r"""
+    An attention kernel registered with [`register_attention_backend`].
+
+    Args:
+        name (`str`):
+            The name the backend is selected with.
+        fn (`Callable`):
+            The attention function. It takes `query`, `key` and `value` tensors of shape `(batch_size, heads,
+            seq_len, head_dim)` and the `attn_mask`, `dropout_p`, `is_causal` and `scale` keyword arguments of
+            `torch.nn.functional.scaled_dot_product_attention`, and returns a tensor of shape `(batch_size, heads,
+            query_seq_len, head_dim)`.
+        is_available (`Callable[[], bool]`, *optional*):
+            Returns whether the dependencies of the backend are installed.
+        supports (`Callable`, *optional*):
+            Called with the same arguments as `fn`. Returns whether the backend can handle these inputs (device,
+            dtype, attention mask...). Inputs that are not supported fall back to the `"native"` backend.
+        kwargs:
+            Additional keyword arguments passed to `fn` on every call, e.g. the chunk sizes of [`chunked_attention`].
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable,
+        is_available: Optional[Callable[[], bool]] = None,
+        supports: Optional[Callable[..., bool]] = None,
+        **kwargs,
+    ):
+        self.name = name
+        self.fn = functools.partial(fn, **kwargs) if kwargs else fn
+        self._is_available = is_available
+        self._supports = supports
+
+    def is_available(self) -> bool:
+        return self._is_available is None or self._is_available()
+
+    def supports(self, query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None) -> bool:
+        if self._supports is None:
+            return True
+        return self._supports(
+            query, key, value, attn_mask=attn_mask, dropout_p=dropout_p, is_causal=is_causal, scale=scale
+        )
+
+
+_ATTENTION_BACKENDS: Dict[str, AttentionBackend] = {}
+_AUTOTUNE_CACHE: Dict[Tuple, str] = {}
+_current_backend: Optional[str] = None
+
+
+def register_attention_backend(
+    name: str,
+    fn: Optional[Callable] = None,
+    is_available: Optional[Callable[[], bool]] = None,
+    supports: Optional[Callable[..., bool]] = None,
+    **kwargs,
+):
+    r"""
+    Registers an attention backend under `name`. Can be used as a decorator. Additional keyword arguments are passed
+    to `fn` on every call, so that a configurable kernel can be registered with different settings.
+
+    Example:
+
+    ```py
+    from diffusers.models.attention_dispatch import chunked_attention, register_attention_backend, set_attention_backend
+
+
+    @register_attention_backend("my_kernel", supports=lambda query, key, value, attn_mask=None, **kwargs: attn_mask is None)
+    def my_attention(query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None):
+        ...
+
+
+    set_attention_backend("my_kernel")
+
+    # use smaller blocks for the built-in "chunked" backend
+    register_attention_backend("chunked", chunked_attention, query_chunk_size=256, key_chunk_size=1024)
+    ```
+    """
+    if name == AUTOTUNE_BACKEND:
+        raise ValueError(f"`{AUTOTUNE_BACKEND}` is reserved for autotuning and cannot be registered.")
+
+    def decorator(fn):
+        _ATTENTION_BACKENDS[name] = AttentionBackend(name, fn, is_available=is_available, supports=supports, **kwargs)
+        _AUTOTUNE_CACHE.clear()
+        return fn
+
+    if fn is not None:
+        return decorator(fn)
+    return decorator
+
+
+def list_attention_backends(only_available: bool = True) -> List[str]:
+    r"""
+    Returns the names of the registered attention backends, by default only the ones whose dependencies are installed.
+    """
+    return [name for name, backend in _ATTENTION_BACKENDS.items() if not only_available or backend.is_available()]
+
+
+def _check_backend(name: Optional[str]) -> None:
+    if name is None or name == AUTOTUNE_BACKEND:
+        return
+    if name not in _ATTENTION_BACKENDS:
+        raise ValueError(
+            f"Unknown attention backend {name}. Registered backends are: {list(_ATTENTION_BACKENDS)} and"
+            f" `{AUTOTUNE_BACKEND}`."
+        )
+    if not _ATTENTION_BACKENDS[name].is_available():
+        raise ImportError(f"The dependencies of the attention backend {name} are not installed.")
+
+
+def set_attention_backend(name: Optional[str]) -> None:
+    r"""
+    Sets the attention backend used by all the attention processors that don't have a per-module backend.
+
+    Args:
+        name (`str`, *optional*):
+            The name of a registered backend (see [`list_attention_backends`]), `"auto"` to benchmark the available
+            backends for every new input shape, or `None` to go back to `torch.nn.functional.scaled_dot_product_attention`.
+    """
+    global _current_backend
+
+    _check_backend(name)
+    _current_backend = name
+
+
+def get_attention_backend() -> Optional[str]:
+    r"""
+    Returns the name of the global attention backend, or `None` when the default one is used.
+    """
+    return _current_backend
+
+
+@contextlib.contextmanager
+def attention_backend(name: Optional[str]):
+    r"""
+    Context manager that temporarily sets the global attention backend. See [`set_attention_backend`].
+    """
+    previous_backend = _current_backend
+    set_attention_backend(name)
+    try:
+        yield
+    finally:
+        set_attention_backend(previous_backend)
+
+
+def _native_attention(query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None):
+    # `scale` was only added in PyTorch 2.1, so it is only passed when needed
+    kwargs = {} if scale is None else {"scale": scale}
+    return F.scaled_dot_product_attention(
+        query, key, value, attn_mask=attn_mask, dropout_p=dropout_p, is_causal=is_causal, **kwargs
+    )
+
+
+def dispatch_attention_fn(
+    query: torch.Tensor,
+    key: torch.Tensor,
+    value: torch.Tensor,
+    attn_mask: Optional[torch.Tensor] = None,
+    dropout_p: float = 0.0,
+    is_causal: bool = False,
+    scale: Optional[float] = None,
+    backend: Optional[str] = None,
+    context_parallel: Optional["ContextParallel"] = None,
+) -> torch.Tensor:
+    r"""
+    Computes scaled dot product attention with the selected attention backend. Has the same semantics as
+    `torch.nn.functional.scaled_dot_product_attention`.
+
+    Args:
+        query (`torch.Tensor`): Query of shape `(batch_size, heads, query_seq_len, head_dim)`.
+        key (`torch.Tensor`): Key of shape `(batch_size, heads, kv_seq_len, head_dim)`.
+        value (`torch.Tensor`): Value of shape `(batch_size, heads, kv_seq_len, head_dim)`.
+        attn_mask (`torch.Tensor`, *optional*):
+            Boolean or additive attention mask broadcastable to `(batch_size, heads, query_seq_len, kv_seq_len)`.
+        dropout_p (`float`, defaults to `0.0`): Dropout probability.
+        is_causal (`bool`, defaults to `False`): Whether to apply a causal mask.
+        scale (`float`, *optional*): Scaling factor of the attention scores. Defaults to `1 / sqrt(head_dim)`.
+        backend (`str`, *optional*):
+            The backend to use. Defaults to the global backend set with [`set_attention_backend`].
+        context_parallel ([`~models.context_parallel.ContextParallel`], *optional*):
+            If passed, the inputs are the local shards of a sequence split across processes and the attention is
+            computed over the full sequence with ring or Ulysses attention.
+    """
+    if context_parallel is not None:
+        return context_parallel.attention(
+            query, key, value, attn_mask=attn_mask, dropout_p=dropout_p, is_causal=is_causal, scale=scale
+        )
+
+    name = backend if backend is not None else _current_backend
+    if name is None or name == DEFAULT_BACKEND:
+        return _native_attention(query, key, value, attn_mask, dropout_p, is_causal, scale)
+
+    if name == AUTOTUNE_BACKEND:
+        name = _autotune(query, key, value, attn_mask, dropout_p, is_causal, scale)
+
+    attention_backend = _ATTENTION_BACKENDS[name]
+    if not attention_backend.supports(query, key, value, attn_mask, dropout_p, is_causal, scale):
+        return _native_attention(query, key, value, attn_mask, dropout_p, is_causal, scale)
+    return attention_backend.fn(
+        query, key, value, attn_mask=attn_mask, dropout_p=dropout_p, is_causal=is_causal, scale=scale
+    )
+
+
+def _autotune(query, key, value, attn_mask, dropout_p, is_causal, scale, num_iterations: int = 3) -> str:
+    shape_key = (
+        query.device.type,
+        query.dtype,
+        query.shape[1],
+        query.shape[2],
+        key.shape[2],
+        query.shape[3],
+        attn_mask is not None,
+        is_causal,
+    )
+    if shape_key in _AUTOTUNE_CACHE:
+        return _AUTOTUNE_CACHE[shape_key]
+
+    # benchmarking can't be traced, compiled graphs use the native backend for shapes that weren't tuned eagerly
+    if is_torch_version(">=", "2.3") and torch.compiler.is_compiling():
+        return DEFAULT_BACKEND
+
+    def synchronize():
+        if query.device.type == "cuda":
+            torch.cuda.synchronize(query.device)
+
+    timings = {}
+    for name, candidate in _ATTENTION_BACKENDS.items():
+        if not candidate.is_available() or not candidate.supports(
+            query, key, value, attn_mask, dropout_p, is_causal, scale
+        ):
+            continue
+        try:
+            # warmup
+            candidate.fn(query, key, value, attn_mask=attn_mask, dropout_p=dropout_p, is_causal=is_causal, scale=scale)
+            synchronize()
+            start = time.perf_counter()
+            for _ in range(num_iterations):
+                candidate.fn(
+                    query, key, value, attn_mask=attn_mask, dropout_p=dropout_p, is_causal=is_causal, scale=scale
+                )
+            synchronize()
+            timings[name] = time.perf_counter() - start
+        except Exception as e:
+            logger.debug(f"Attention backend {name} failed while autotuning: {e}")
+
+    best_backend = min(timings, key=timings.get) if timings else DEFAULT_BACKEND
+    logger.debug(f"Autotuned attention backend for {shape_key}: {best_backend} ({timings})")
+    _AUTOTUNE_CACHE[shape_key] = best_backend
+    return best_backend
+
+
+def clear_attention_autotune_cache() -> None:
+    r"""
+    Clears the per-shape cache of the fastest backends found by the `"auto"` attention backend.
+    """
+    _AUTOTUNE_CACHE.clear()
+
+
+# Built-in backends
+
+
+def _sdpa_kernel(backend_name: str):
+    if is_torch_version(">=", "2.3"):
+        from torch.nn.attention import SDPBackend, sdpa_kernel
+
+        return sdpa_kernel(getattr(SDPBackend, backend_name))
+
+    flags = {"enable_flash": False, "enable_math": False, "enable_mem_efficient": False}
+    flags[
+        {"MATH": "enable_math", "FLASH_ATTENTION": "enable_flash", "EFFICIENT_ATTENTION": "enable_mem_efficient"}[
+            backend_name
+        ]
+    ] = True
+    return torch.backends.cuda.sdp_kernel(**flags)
+
+
+def _make_sdpa_backend(backend_name: str):
+    def sdpa_attention(query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None):
+        with _sdpa_kernel(backend_name):
+            return _native_attention(query, key, value, attn_mask, dropout_p, is_causal, scale)
+
+    return sdpa_attention
+
+
+def _is_cuda(query, *args, **kwargs) -> bool:
+    return query.device.type == "cuda"
+
+
+def _supports_flash(query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None) -> bool:
+    return (
+        query.device.type == "cuda"
+        and query.dtype in (torch.float16, torch.bfloat16)
+        and attn_mask is None
+        and query.shape[-1] <= 256
+    )
+
+
+register_attention_backend(DEFAULT_BACKEND, _native_attention)
+register_attention_backend("sdpa_math", _make_sdpa_backend("MATH"))
+register_attention_backend("sdpa_efficient", _make_sdpa_backend("EFFICIENT_ATTENTION"), supports=_is_cuda)
+register_attention_backend("sdpa_flash", _make_sdpa_backend("FLASH_ATTENTION"), supports=_supports_flash)
+
+
+@register_attention_backend(
+    "xformers",
+    is_available=is_xformers_available,
+    supports=lambda query, key, value, attn_mask=None, dropout_p=0.0, **kwargs: query.device.type == "cuda"
+    and attn_mask is None,
+)
+def _xformers_attention(query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None):
+    import xformers.ops
+
+    attn_bias = xformers.ops.LowerTriangularMask() if is_causal else None
+    # xformers expects `(batch_size, seq_len, heads, head_dim)` inputs
+    hidden_states = xformers.ops.memory_efficient_attention(
+        query.transpose(1, 2),
+        key.transpose(1, 2),
+        value.transpose(1, 2),
+        attn_bias=attn_bias,
+        p=dropout_p,
+        scale=scale,
+    )
+    return hidden_states.transpose(1, 2)
+
+
+@register_attention_backend("flash_attn", is_available=is_flash_attn_available, supports=_supports_flash)
+def _flash_attention(query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None):
+    from flash_attn import flash_attn_func
+
+    # flash-attn expects `(batch_size, seq_len, heads, head_dim)` inputs
+    hidden_states = flash_attn_func(
+        query.transpose(1, 2),
+        key.transpose(1, 2),
+        value.transpose(1, 2),
+        dropout_p=dropout_p,
+        softmax_scale=scale,
+        causal=is_causal,
+    )
+    return hidden_states.transpose(1, 2)
+
+
+@register_attention_backend(
+    "npu",
+    is_available=is_torch_npu_available,
+    supports=lambda query, key, value, dropout_p=0.0, is_causal=False, **kwargs: query.dtype
+    in (torch.float16, torch.bfloat16)
+    and dropout_p == 0.0
+    and not is_causal,
+)
+def _npu_attention(query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None):
+    import torch_npu
+
+    return torch_npu.npu_fusion_attention(
+        query,
+        key,
+        value,
+        query.shape[1],
+        input_layout="BNSD",
+        pse=None,
+        atten_mask=attn_mask,
+        scale=scale if scale is not None else query.shape[-1] ** -0.5,
+        pre_tockens=65536,
+        next_tockens=65536,
+        keep_prob=1.0,
+        sync=False,
+        inner_precise=0,
+    )[0]
+
+
+def chunked_attention(
+    query: torch.Tensor,
+    key: torch.Tensor,
+    value: torch.Tensor,
+    attn_mask: Optional[torch.Tensor] = None,
+    dropout_p: float = 0.0,
+    is_causal: bool = False,
+    scale: Optional[float] = None,
+    query_chunk_size: int = 1024,
+    key_chunk_size: int = 4096,
+) -> torch.Tensor:
+    r"""
+    Memory-efficient scaled dot product attention in pure PyTorch. Has the same semantics as
+    `torch.nn.functional.scaled_dot_product_attention`.
+
+    The queries and keys are processed in blocks and the softmax is accumulated online (as in FlashAttention), so only
+    a `(query_chunk_size, key_chunk_size)` block of attention scores per head is materialized at a time instead of the
+    full `(query_seq_len, kv_seq_len)` matrix. This bounds the peak memory of attention on devices where
+    `scaled_dot_product_attention` falls back to the math kernel, such as CPUs.
+
+    This is the `"chunked"` attention backend. Its chunk sizes are set by registering it again, e.g.
+    `register_attention_backend("chunked", chunked_attention, query_chunk_size=256, key_chunk_size=1024)`.
+
+    Args:
+        query_chunk_size (`int`, defaults to `1024`): Number of queries processed at a time.
+        key_chunk_size (`int`, defaults to `4096`): Number of keys and values processed at a time.
+    """
+    query_len, key_len = query.shape[-2], key.shape[-2]
+    if query_len <= query_chunk_size and key_len <= key_chunk_size:
+        return _native_attention(query, key, value, attn_mask, dropout_p, is_causal, scale)
+
+    if scale is None:
+        scale = query.shape[-1] ** -0.5
+    # accumulate in float32 so that half precision inputs don't lose precision over the key blocks
+    compute_dtype = torch.float32 if query.dtype in (torch.float16, torch.bfloat16) else query.dtype
+
+    output = query.new_empty(query.shape[:-1] + (value.shape[-1],))
+    for query_start in range(0, query_len, query_chunk_size):
+        query_end = min(query_start + query_chunk_size, query_len)
+        query_chunk = query[..., query_start:query_end, :].to(compute_dtype) * scale
+
+        row_max = None
+        row_sum = None
+        accumulator = None
+        for key_start in range(0, key_len, key_chunk_size):
+            if is_causal and key_start >= query_end:
+                break
+            key_end = min(key_start + key_chunk_size, key_len)
+
+            scores = query_chunk @ key[..., key_start:key_end, :].to(compute_dtype).transpose(-1, -2)
+            if attn_mask is not None:
+                mask = attn_mask[..., key_start:key_end]
+                if mask.shape[-2] > 1:
+                    mask = mask[..., query_start:query_end, :]
+                if mask.dtype == torch.bool:
+                    scores = scores.masked_fill(~mask, float("-inf"))
+                else:
+                    scores = scores + mask.to(compute_dtype)
+            if is_causal:
+                query_positions = torch.arange(query_start, query_end, device=query.device)[:, None]
+                key_positions = torch.arange(key_start, key_end, device=query.device)[None, :]
+                scores = scores.masked_fill(key_positions > query_positions, float("-inf"))
+
+            block_max = scores.amax(dim=-1, keepdim=True)
+            new_max = block_max if row_max is None else torch.maximum(row_max, block_max)
+            # rows that are fully masked so far have a max of -inf, use 0 instead to avoid `-inf - -inf = nan`
+            safe_max = torch.where(torch.isinf(new_max), torch.zeros_like(new_max), new_max)
+
+            probs = torch.exp(scores - safe_max)
+            block_sum = probs.sum(dim=-1, keepdim=True)
+            if dropout_p > 0.0:
+                probs = F.dropout(probs, p=dropout_p)
+            block_output = probs @ value[..., key_start:key_end, :].to(compute_dtype)
+
+            if accumulator is None:
+                row_sum, accumulator = block_sum, block_output
+            else:
+                correction = torch.exp(row_max - safe_max)
+                row_sum = row_sum * correction + block_sum
+                accumulator = accumulator * correction + block_output
+            row_max = new_max
+
+        output[..., query_start:query_end, :] = (accumulator / row_sum).to(output.dtype)
+    return output
+
+
+register_attention_backend("chunked", chunked_attention)
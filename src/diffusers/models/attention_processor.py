@@ -13,7 +13,7 @@
 # limitations under the License.
 import inspect
 import math
-from typing import Callable, List, Optional, Tuple, Union
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple, Union
 
 import torch
 import torch.nn.functional as F
@@ -23,6 +23,11 @@ from ..image_processor import IPAdapterMaskProcessor
 from ..utils import deprecate, logging
 from ..utils.import_utils import is_torch_npu_available, is_xformers_available
 from ..utils.torch_utils import is_torch_version, maybe_allow_in_graph
+from .attention_dispatch import _check_backend, dispatch_attention_fn
+
+
+if TYPE_CHECKING:
+    from .context_parallel import ContextParallel
 
 
 logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
@@ -141,6 +146,10 @@ class Attention(nn.Module):
         self.residual_connection = residual_connection
         self.dropout = dropout
         self.fused_projections = False
+        # backend of `dispatch_attention_fn` used by the processor, `None` uses the global backend
+        self.attention_backend = None
+        # set by `ModelMixin.enable_context_parallel` in models that split their sequences across processes
+        self.context_parallel = None
         self.out_dim = out_dim if out_dim is not None else query_dim
         self.context_pre_only = context_pre_only
         self.pre_only = pre_only
@@ -420,6 +429,27 @@ class Attention(nn.Module):
 
         self.set_processor(processor)
 
+    def set_attention_backend(self, backend: Optional[str]) -> None:
+        r"""
+        Set the backend the attention processor computes scaled dot product attention with. Only processors that use
+        `torch.nn.functional.scaled_dot_product_attention` take the backend into account.
+
+        Args:
+            backend (`str`, *optional*):
+                The name of a backend registered with [`~models.attention_dispatch.register_attention_backend`] or
+                `"auto"` to select the fastest available backend for each input shape. `None` uses the global backend
+                set with [`~models.attention_dispatch.set_attention_backend`].
+        """
+        _check_backend(backend)
+        self.attention_backend = backend
+
+    def set_context_parallel(self, context_parallel: Optional["ContextParallel"]) -> None:
+        r"""
+        Set the [`~models.context_parallel.ContextParallel`] the attention over sequences split across processes is
+        computed with. Only the processors in `CONTEXT_PARALLEL_ATTENTION_PROCESSORS` support it.
+        """
+        self.context_parallel = context_parallel
+
     def set_processor(self, processor: "AttnProcessor") -> None:
         r"""
         Set the attention processor to use.
@@ -482,7 +512,7 @@ class Attention(nn.Module):
         # For standard processors that are defined here, `**cross_attention_kwargs` is empty
 
         attn_parameters = set(inspect.signature(self.processor.__call__).parameters.keys())
-        quiet_attn_parameters = {"ip_adapter_masks"}
+        quiet_attn_parameters = {"ip_adapter_masks", "video_shape"}
         unused_kwargs = [
             k for k, _ in cross_attention_kwargs.items() if k not in attn_parameters and k not in quiet_attn_parameters
         ]
@@ -716,6 +746,70 @@ class Attention(nn.Module):
 
         self.fused_projections = fuse
 
+    def unfuse_projections(self):
+        r"""
+        Removes the fused projection layers created by [`~Attention.fuse_projections`].
+        """
+        for name in ["to_qkv", "to_kv", "to_added_qkv"]:
+            if hasattr(self, name):
+                delattr(self, name)
+        self.fused_projections = False
+
+    def project_qkv(
+        self, hidden_states: torch.Tensor, encoder_hidden_states: Optional[torch.Tensor] = None
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        r"""
+        Computes the query projection of `hidden_states` and the key and value projections of `encoder_hidden_states`
+        (or of `hidden_states` for self-attention). After [`~Attention.fuse_projections`], the projections of the same
+        input are computed with a single matmul.
+
+        Args:
+            hidden_states (`torch.Tensor`): The hidden states of the query.
+            encoder_hidden_states (`torch.Tensor`, *optional*): The hidden states of the key and value.
+
+        Returns:
+            `Tuple[torch.Tensor, torch.Tensor, torch.Tensor]`: The query, key and value.
+        """
+        if encoder_hidden_states is None:
+            encoder_hidden_states = hidden_states
+
+        if self.fused_projections and encoder_hidden_states is hidden_states and hasattr(self, "to_qkv"):
+            split_sizes = [self.to_q.out_features, self.to_k.out_features, self.to_v.out_features]
+            return self.to_qkv(hidden_states).split(split_sizes, dim=-1)
+
+        query = self.to_q(hidden_states)
+        if self.fused_projections and hasattr(self, "to_kv"):
+            key, value = self.to_kv(encoder_hidden_states).split(
+                [self.to_k.out_features, self.to_v.out_features], dim=-1
+            )
+        else:
+            key = self.to_k(encoder_hidden_states)
+            value = self.to_v(encoder_hidden_states)
+        return query, key, value
+
+    def project_added_qkv(
+        self, encoder_hidden_states: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        r"""
+        Computes the added query, key and value projections of `encoder_hidden_states` in joint attention. After
+        [`~Attention.fuse_projections`], they are computed with a single matmul.
+
+        Args:
+            encoder_hidden_states (`torch.Tensor`): The hidden states of the context tokens.
+
+        Returns:
+            `Tuple[torch.Tensor, torch.Tensor, torch.Tensor]`: The added query, key and value.
+        """
+        if self.fused_projections and hasattr(self, "to_added_qkv"):
+            split_sizes = [self.add_q_proj.out_features, self.add_k_proj.out_features, self.add_v_proj.out_features]
+            return self.to_added_qkv(encoder_hidden_states).split(split_sizes, dim=-1)
+
+        return (
+            self.add_q_proj(encoder_hidden_states),
+            self.add_k_proj(encoder_hidden_states),
+            self.add_v_proj(encoder_hidden_states),
+        )
+
 
 class AttnProcessor:
     r"""
@@ -1020,8 +1114,8 @@ class AttnAddedKVProcessor2_0:
 
         # the output of sdp = (batch, num_heads, seq_len, head_dim)
         # TODO: add support for attn.scale when we move to Torch 2.1
-        hidden_states = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+        hidden_states = dispatch_attention_fn(
+            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False, backend=attn.attention_backend
         )
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, residual.shape[1])
 
@@ -1057,9 +1151,7 @@ class JointAttnProcessor2_0:
         batch_size = hidden_states.shape[0]
 
         # `sample` projections.
-        query = attn.to_q(hidden_states)
-        key = attn.to_k(hidden_states)
-        value = attn.to_v(hidden_states)
+        query, key, value = attn.project_qkv(hidden_states)
 
         inner_dim = key.shape[-1]
         head_dim = inner_dim // attn.heads
@@ -1075,9 +1167,11 @@ class JointAttnProcessor2_0:
 
         # `context` projections.
         if encoder_hidden_states is not None:
-            encoder_hidden_states_query_proj = attn.add_q_proj(encoder_hidden_states)
-            encoder_hidden_states_key_proj = attn.add_k_proj(encoder_hidden_states)
-            encoder_hidden_states_value_proj = attn.add_v_proj(encoder_hidden_states)
+            (
+                encoder_hidden_states_query_proj,
+                encoder_hidden_states_key_proj,
+                encoder_hidden_states_value_proj,
+            ) = attn.project_added_qkv(encoder_hidden_states)
 
             encoder_hidden_states_query_proj = encoder_hidden_states_query_proj.view(
                 batch_size, -1, attn.heads, head_dim
@@ -1098,7 +1192,15 @@ class JointAttnProcessor2_0:
             key = torch.cat([key, encoder_hidden_states_key_proj], dim=2)
             value = torch.cat([value, encoder_hidden_states_value_proj], dim=2)
 
-        hidden_states = F.scaled_dot_product_attention(query, key, value, dropout_p=0.0, is_causal=False)
+        hidden_states = dispatch_attention_fn(
+            query,
+            key,
+            value,
+            dropout_p=0.0,
+            is_causal=False,
+            backend=attn.attention_backend,
+            context_parallel=attn.context_parallel,
+        )
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
         hidden_states = hidden_states.to(query.dtype)
 
@@ -1180,8 +1282,8 @@ class PAGJointAttnProcessor2_0:
         key_org = key_org.view(batch_size, -1, attn.heads, head_dim).transpose(1, 2)
         value_org = value_org.view(batch_size, -1, attn.heads, head_dim).transpose(1, 2)
 
-        hidden_states_org = F.scaled_dot_product_attention(
-            query_org, key_org, value_org, dropout_p=0.0, is_causal=False
+        hidden_states_org = dispatch_attention_fn(
+            query_org, key_org, value_org, dropout_p=0.0, is_causal=False, backend=attn.attention_backend
         )
         hidden_states_org = hidden_states_org.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
         hidden_states_org = hidden_states_org.to(query_org.dtype)
@@ -1244,8 +1346,14 @@ class PAGJointAttnProcessor2_0:
         # expand the mask to match the attention weights shape
         full_mask = full_mask.unsqueeze(0).unsqueeze(0)  # Add batch and num_heads dimensions
 
-        hidden_states_ptb = F.scaled_dot_product_attention(
-            query_ptb, key_ptb, value_ptb, attn_mask=full_mask, dropout_p=0.0, is_causal=False
+        hidden_states_ptb = dispatch_attention_fn(
+            query_ptb,
+            key_ptb,
+            value_ptb,
+            attn_mask=full_mask,
+            dropout_p=0.0,
+            is_causal=False,
+            backend=attn.attention_backend,
         )
         hidden_states_ptb = hidden_states_ptb.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
         hidden_states_ptb = hidden_states_ptb.to(query_ptb.dtype)
@@ -1345,8 +1453,8 @@ class PAGCFGJointAttnProcessor2_0:
         key_org = key_org.view(batch_size, -1, attn.heads, head_dim).transpose(1, 2)
         value_org = value_org.view(batch_size, -1, attn.heads, head_dim).transpose(1, 2)
 
-        hidden_states_org = F.scaled_dot_product_attention(
-            query_org, key_org, value_org, dropout_p=0.0, is_causal=False
+        hidden_states_org = dispatch_attention_fn(
+            query_org, key_org, value_org, dropout_p=0.0, is_causal=False, backend=attn.attention_backend
         )
         hidden_states_org = hidden_states_org.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
         hidden_states_org = hidden_states_org.to(query_org.dtype)
@@ -1409,8 +1517,14 @@ class PAGCFGJointAttnProcessor2_0:
         # expand the mask to match the attention weights shape
         full_mask = full_mask.unsqueeze(0).unsqueeze(0)  # Add batch and num_heads dimensions
 
-        hidden_states_ptb = F.scaled_dot_product_attention(
-            query_ptb, key_ptb, value_ptb, attn_mask=full_mask, dropout_p=0.0, is_causal=False
+        hidden_states_ptb = dispatch_attention_fn(
+            query_ptb,
+            key_ptb,
+            value_ptb,
+            attn_mask=full_mask,
+            dropout_p=0.0,
+            is_causal=False,
+            backend=attn.attention_backend,
         )
         hidden_states_ptb = hidden_states_ptb.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
         hidden_states_ptb = hidden_states_ptb.to(query_ptb.dtype)
@@ -1496,7 +1610,15 @@ class FusedJointAttnProcessor2_0:
         key = key.view(batch_size, -1, attn.heads, head_dim).transpose(1, 2)
         value = value.view(batch_size, -1, attn.heads, head_dim).transpose(1, 2)
 
-        hidden_states = F.scaled_dot_product_attention(query, key, value, dropout_p=0.0, is_causal=False)
+        hidden_states = dispatch_attention_fn(
+            query,
+            key,
+            value,
+            dropout_p=0.0,
+            is_causal=False,
+            backend=attn.attention_backend,
+            context_parallel=attn.context_parallel,
+        )
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
         hidden_states = hidden_states.to(query.dtype)
 
@@ -1541,15 +1663,15 @@ class AuraFlowAttnProcessor2_0:
         batch_size = hidden_states.shape[0]
 
         # `sample` projections.
-        query = attn.to_q(hidden_states)
-        key = attn.to_k(hidden_states)
-        value = attn.to_v(hidden_states)
+        query, key, value = attn.project_qkv(hidden_states)
 
         # `context` projections.
         if encoder_hidden_states is not None:
-            encoder_hidden_states_query_proj = attn.add_q_proj(encoder_hidden_states)
-            encoder_hidden_states_key_proj = attn.add_k_proj(encoder_hidden_states)
-            encoder_hidden_states_value_proj = attn.add_v_proj(encoder_hidden_states)
+            (
+                encoder_hidden_states_query_proj,
+                encoder_hidden_states_key_proj,
+                encoder_hidden_states_value_proj,
+            ) = attn.project_added_qkv(encoder_hidden_states)
 
         # Reshape.
         inner_dim = key.shape[-1]
@@ -1588,8 +1710,8 @@ class AuraFlowAttnProcessor2_0:
         value = value.transpose(1, 2)
 
         # Attention.
-        hidden_states = F.scaled_dot_product_attention(
-            query, key, value, dropout_p=0.0, scale=attn.scale, is_causal=False
+        hidden_states = dispatch_attention_fn(
+            query, key, value, dropout_p=0.0, scale=attn.scale, is_causal=False, backend=attn.attention_backend
         )
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
         hidden_states = hidden_states.to(query.dtype)
@@ -1685,8 +1807,8 @@ class FusedAuraFlowAttnProcessor2_0:
         value = value.transpose(1, 2)
 
         # Attention.
-        hidden_states = F.scaled_dot_product_attention(
-            query, key, value, dropout_p=0.0, scale=attn.scale, is_causal=False
+        hidden_states = dispatch_attention_fn(
+            query, key, value, dropout_p=0.0, scale=attn.scale, is_causal=False, backend=attn.attention_backend
         )
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
         hidden_states = hidden_states.to(query.dtype)
@@ -1729,9 +1851,7 @@ class FluxAttnProcessor2_0:
         batch_size, _, _ = hidden_states.shape if encoder_hidden_states is None else encoder_hidden_states.shape
 
         # `sample` projections.
-        query = attn.to_q(hidden_states)
-        key = attn.to_k(hidden_states)
-        value = attn.to_v(hidden_states)
+        query, key, value = attn.project_qkv(hidden_states)
 
         inner_dim = key.shape[-1]
         head_dim = inner_dim // attn.heads
@@ -1748,9 +1868,11 @@ class FluxAttnProcessor2_0:
         # the attention in FluxSingleTransformerBlock does not use `encoder_hidden_states`
         if encoder_hidden_states is not None:
             # `context` projections.
-            encoder_hidden_states_query_proj = attn.add_q_proj(encoder_hidden_states)
-            encoder_hidden_states_key_proj = attn.add_k_proj(encoder_hidden_states)
-            encoder_hidden_states_value_proj = attn.add_v_proj(encoder_hidden_states)
+            (
+                encoder_hidden_states_query_proj,
+                encoder_hidden_states_key_proj,
+                encoder_hidden_states_value_proj,
+            ) = attn.project_added_qkv(encoder_hidden_states)
 
             encoder_hidden_states_query_proj = encoder_hidden_states_query_proj.view(
                 batch_size, -1, attn.heads, head_dim
@@ -1778,7 +1900,15 @@ class FluxAttnProcessor2_0:
             query = apply_rotary_emb(query, image_rotary_emb)
             key = apply_rotary_emb(key, image_rotary_emb)
 
-        hidden_states = F.scaled_dot_product_attention(query, key, value, dropout_p=0.0, is_causal=False)
+        hidden_states = dispatch_attention_fn(
+            query,
+            key,
+            value,
+            dropout_p=0.0,
+            is_causal=False,
+            backend=attn.attention_backend,
+            context_parallel=attn.context_parallel,
+        )
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
         hidden_states = hidden_states.to(query.dtype)
 
@@ -1872,7 +2002,15 @@ class FusedFluxAttnProcessor2_0:
             query = apply_rotary_emb(query, image_rotary_emb)
             key = apply_rotary_emb(key, image_rotary_emb)
 
-        hidden_states = F.scaled_dot_product_attention(query, key, value, dropout_p=0.0, is_causal=False)
+        hidden_states = dispatch_attention_fn(
+            query,
+            key,
+            value,
+            dropout_p=0.0,
+            is_causal=False,
+            backend=attn.attention_backend,
+            context_parallel=attn.context_parallel,
+        )
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
         hidden_states = hidden_states.to(query.dtype)
 
@@ -1947,8 +2085,15 @@ class CogVideoXAttnProcessor2_0:
             if not attn.is_cross_attention:
                 key[:, :, text_seq_length:] = apply_rotary_emb(key[:, :, text_seq_length:], image_rotary_emb)
 
-        hidden_states = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+        hidden_states = dispatch_attention_fn(
+            query,
+            key,
+            value,
+            attn_mask=attention_mask,
+            dropout_p=0.0,
+            is_causal=False,
+            backend=attn.attention_backend,
+            context_parallel=attn.context_parallel,
         )
 
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
@@ -2018,10 +2163,237 @@ class FusedCogVideoXAttnProcessor2_0:
             if not attn.is_cross_attention:
                 key[:, :, text_seq_length:] = apply_rotary_emb(key[:, :, text_seq_length:], image_rotary_emb)
 
-        hidden_states = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+        hidden_states = dispatch_attention_fn(
+            query,
+            key,
+            value,
+            attn_mask=attention_mask,
+            dropout_p=0.0,
+            is_causal=False,
+            backend=attn.attention_backend,
+            context_parallel=attn.context_parallel,
+        )
+
+        hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
+
+        # linear proj
+        hidden_states = attn.to_out[0](hidden_states)
+        # dropout
+        hidden_states = attn.to_out[1](hidden_states)
+
+        encoder_hidden_states, hidden_states = hidden_states.split(
+            [text_seq_length, hidden_states.size(1) - text_seq_length], dim=1
+        )
+        return hidden_states, encoder_hidden_states
+
+
+class CogVideoXSparseAttnProcessor2_0:
+    r"""
+    Sparse attention processor for the CogVideoX model and a drop-in replacement of [`CogVideoXAttnProcessor2_0`].
+
+    Instead of attending to all the `frames x height x width` video tokens, every video token only attends to the text
+    tokens and to the video tokens in the same local 3D window, so that the cost of attention grows linearly with the
+    number of frames and the resolution. The text tokens still attend to all the tokens. With `temporal_stride`, the
+    video tokens additionally attend to the tokens at the same spatial window of every `temporal_stride`-th frame,
+    which keeps some global temporal context.
+
+    The model passes the `(frames, height, width)` shape of the token grid as `video_shape`. When it is not available
+    or an attention mask is used, full attention is computed as in [`CogVideoXAttnProcessor2_0`].
+
+    Args:
+        window_size (`Tuple[int, int, int]`, defaults to `(4, 8, 8)`):
+            The `(frames, height, width)` size of the local windows in tokens, i.e. after patchifying.
+        temporal_stride (`int`, *optional*):
+            If set, video tokens also attend to their spatial window in every `temporal_stride`-th frame.
+    """
+
+    def __init__(self, window_size: Tuple[int, int, int] = (4, 8, 8), temporal_stride: Optional[int] = None):
+        if not hasattr(F, "scaled_dot_product_attention"):
+            raise ImportError(
+                "CogVideoXSparseAttnProcessor2_0 requires PyTorch 2.0, to use it, please upgrade PyTorch to 2.0."
+            )
+        self.window_size = tuple(window_size)
+        self.temporal_stride = temporal_stride
+
+    @staticmethod
+    def _partition(x: torch.Tensor, window_size: Tuple[int, int, int]) -> torch.Tensor:
+        # (batch, heads, frames, height, width, dim) -> (batch, num_windows, heads, window_length, dim)
+        batch_size, heads, frames, height, width, dim = x.shape
+        wt, wh, ww = window_size
+        x = x.view(batch_size, heads, frames // wt, wt, height // wh, wh, width // ww, ww, dim)
+        x = x.permute(0, 2, 4, 6, 1, 3, 5, 7, 8)
+        return x.reshape(batch_size, -1, heads, wt * wh * ww, dim)
+
+    def _sparse_attention(
+        self,
+        query: torch.Tensor,
+        key: torch.Tensor,
+        value: torch.Tensor,
+        text_seq_length: int,
+        video_shape: Tuple[int, int, int],
+        backend: Optional[str],
+    ) -> torch.Tensor:
+        batch_size, heads, _, head_dim = query.shape
+        frames, height, width = video_shape
+        window_size = tuple(min(w, s) for w, s in zip(self.window_size, video_shape))
+        padded_shape = tuple(math.ceil(s / w) * w for s, w in zip(video_shape, window_size))
+        padding = [0, 0] + [x for s, p in zip(reversed(video_shape), reversed(padded_shape)) for x in (0, p - s)]
+
+        # text queries attend to all the tokens
+        text_hidden_states = dispatch_attention_fn(
+            query[:, :, :text_seq_length], key, value, dropout_p=0.0, is_causal=False, backend=backend
+        )
+
+        def to_grid(x):
+            x = x[:, :, text_seq_length:].unflatten(2, video_shape)
+            return F.pad(x, padding) if padded_shape != video_shape else x
+
+        video_query = self._partition(to_grid(query), window_size)
+        video_key = to_grid(key)
+        video_value = to_grid(value)
+        num_windows, window_length = video_query.shape[1], video_query.shape[3]
+
+        key_chunks = [
+            key[:, None, :, :text_seq_length].expand(-1, num_windows, -1, -1, -1),
+            self._partition(video_key, window_size),
+        ]
+        value_chunks = [
+            value[:, None, :, :text_seq_length].expand(-1, num_windows, -1, -1, -1),
+            self._partition(video_value, window_size),
+        ]
+
+        # keys outside of the (unpadded) video or already in the local window are masked out
+        valid = torch.zeros(padded_shape, dtype=torch.bool, device=query.device)
+        valid[:frames, :height, :width] = True
+        mask_chunks = [
+            torch.ones(num_windows, text_seq_length, dtype=torch.bool, device=query.device),
+            self._partition(valid[None, None, ..., None], window_size).reshape(num_windows, window_length),
+        ]
+
+        if self.temporal_stride is not None:
+            stride = self.temporal_stride
+            strided_window_size = (math.ceil(padded_shape[0] / stride),) + window_size[1:]
+            num_temporal_windows = padded_shape[0] // window_size[0]
+
+            for chunks, x in ((key_chunks, video_key), (value_chunks, video_value)):
+                # (batch, spatial_windows, heads, length, dim), shared by all the temporal windows
+                strided = self._partition(x[:, :, ::stride], strided_window_size)
+                strided = strided[:, None].expand(-1, num_temporal_windows, -1, -1, -1, -1)
+                chunks.append(strided.flatten(1, 2))
+
+            frame_index = torch.arange(padded_shape[0], device=query.device)[:, None, None].expand(padded_shape)
+            strided_frames = self._partition(frame_index[::stride][None, None, ..., None], strided_window_size)
+            strided_valid = self._partition(valid[::stride][None, None, ..., None], strided_window_size)
+            window_start = torch.arange(num_temporal_windows, device=query.device) * window_size[0]
+            # (temporal_windows, spatial_windows, length)
+            in_local_window = (strided_frames.view(1, -1, strided_frames.shape[3]) >= window_start[:, None, None]) & (
+                strided_frames.view(1, -1, strided_frames.shape[3]) < window_start[:, None, None] + window_size[0]
+            )
+            strided_mask = strided_valid.view(1, -1, strided_valid.shape[3]) & ~in_local_window
+            mask_chunks.append(strided_mask.flatten(0, 1))
+
+        window_key = torch.cat(key_chunks, dim=3).flatten(0, 1)
+        window_value = torch.cat(value_chunks, dim=3).flatten(0, 1)
+        attn_mask = torch.cat(mask_chunks, dim=1)
+        if attn_mask.all():
+            attn_mask = None
+        else:
+            attn_mask = attn_mask[None, :, None, None, :].expand(batch_size, -1, -1, -1, -1).flatten(0, 1)
+
+        video_hidden_states = dispatch_attention_fn(
+            video_query.flatten(0, 1),
+            window_key,
+            window_value,
+            attn_mask=attn_mask,
+            dropout_p=0.0,
+            is_causal=False,
+            backend=backend,
+        )
+
+        # (batch * num_windows, heads, window_length, dim) -> (batch, heads, frames * height * width, dim)
+        wt, wh, ww = window_size
+        video_hidden_states = video_hidden_states.view(
+            batch_size,
+            padded_shape[0] // wt,
+            padded_shape[1] // wh,
+            padded_shape[2] // ww,
+            heads,
+            wt,
+            wh,
+            ww,
+            head_dim,
+        )
+        video_hidden_states = video_hidden_states.permute(0, 4, 1, 5, 2, 6, 3, 7, 8).reshape(
+            batch_size, heads, *padded_shape, head_dim
+        )
+        video_hidden_states = video_hidden_states[:, :, :frames, :height, :width].flatten(2, 4)
+
+        return torch.cat([text_hidden_states, video_hidden_states], dim=2)
+
+    def __call__(
+        self,
+        attn: Attention,
+        hidden_states: torch.Tensor,
+        encoder_hidden_states: torch.Tensor,
+        attention_mask: Optional[torch.Tensor] = None,
+        image_rotary_emb: Optional[torch.Tensor] = None,
+        video_shape: Optional[Tuple[int, int, int]] = None,
+    ) -> torch.Tensor:
+        text_seq_length = encoder_hidden_states.size(1)
+
+        hidden_states = torch.cat([encoder_hidden_states, hidden_states], dim=1)
+
+        batch_size, sequence_length, _ = (
+            hidden_states.shape if encoder_hidden_states is None else encoder_hidden_states.shape
         )
 
+        if attention_mask is not None:
+            attention_mask = attn.prepare_attention_mask(attention_mask, sequence_length, batch_size)
+            attention_mask = attention_mask.view(batch_size, attn.heads, -1, attention_mask.shape[-1])
+
+        query = attn.to_q(hidden_states)
+        key = attn.to_k(hidden_states)
+        value = attn.to_v(hidden_states)
+
+        inner_dim = key.shape[-1]
+        head_dim = inner_dim // attn.heads
+
+        query = query.view(batch_size, -1, attn.heads, head_dim).transpose(1, 2)
+        key = key.view(batch_size, -1, attn.heads, head_dim).transpose(1, 2)
+        value = value.view(batch_size, -1, attn.heads, head_dim).transpose(1, 2)
+
+        if attn.norm_q is not None:
+            query = attn.norm_q(query)
+        if attn.norm_k is not None:
+            key = attn.norm_k(key)
+
+        # Apply RoPE if needed
+        if image_rotary_emb is not None:
+            from .embeddings import apply_rotary_emb
+
+            query[:, :, text_seq_length:] = apply_rotary_emb(query[:, :, text_seq_length:], image_rotary_emb)
+            if not attn.is_cross_attention:
+                key[:, :, text_seq_length:] = apply_rotary_emb(key[:, :, text_seq_length:], image_rotary_emb)
+
+        if (
+            video_shape is not None
+            and attention_mask is None
+            and math.prod(video_shape) == query.shape[2] - text_seq_length
+        ):
+            hidden_states = self._sparse_attention(
+                query, key, value, text_seq_length, tuple(video_shape), attn.attention_backend
+            )
+        else:
+            hidden_states = dispatch_attention_fn(
+                query,
+                key,
+                value,
+                attn_mask=attention_mask,
+                dropout_p=0.0,
+                is_causal=False,
+                backend=attn.attention_backend,
+            )
+
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
 
         # linear proj
@@ -2286,8 +2658,14 @@ class AttnProcessorNPU:
             )[0]
         else:
             # TODO: add support for attn.scale when we move to Torch 2.1
-            hidden_states = F.scaled_dot_product_attention(
-                query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+            hidden_states = dispatch_attention_fn(
+                query,
+                key,
+                value,
+                attn_mask=attention_mask,
+                dropout_p=0.0,
+                is_causal=False,
+                backend=attn.attention_backend,
             )
 
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
@@ -2355,15 +2733,10 @@ class AttnProcessor2_0:
         if attn.group_norm is not None:
             hidden_states = attn.group_norm(hidden_states.transpose(1, 2)).transpose(1, 2)
 
-        query = attn.to_q(hidden_states)
-
-        if encoder_hidden_states is None:
-            encoder_hidden_states = hidden_states
-        elif attn.norm_cross:
+        if encoder_hidden_states is not None and attn.norm_cross:
             encoder_hidden_states = attn.norm_encoder_hidden_states(encoder_hidden_states)
 
-        key = attn.to_k(encoder_hidden_states)
-        value = attn.to_v(encoder_hidden_states)
+        query, key, value = attn.project_qkv(hidden_states, encoder_hidden_states)
 
         inner_dim = key.shape[-1]
         head_dim = inner_dim // attn.heads
@@ -2380,8 +2753,8 @@ class AttnProcessor2_0:
 
         # the output of sdp = (batch, num_heads, seq_len, head_dim)
         # TODO: add support for attn.scale when we move to Torch 2.1
-        hidden_states = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+        hidden_states = dispatch_attention_fn(
+            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False, backend=attn.attention_backend
         )
 
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
@@ -2458,15 +2831,10 @@ class StableAudioAttnProcessor2_0:
             # (batch, heads, source_length, target_length)
             attention_mask = attention_mask.view(batch_size, attn.heads, -1, attention_mask.shape[-1])
 
-        query = attn.to_q(hidden_states)
-
-        if encoder_hidden_states is None:
-            encoder_hidden_states = hidden_states
-        elif attn.norm_cross:
+        if encoder_hidden_states is not None and attn.norm_cross:
             encoder_hidden_states = attn.norm_encoder_hidden_states(encoder_hidden_states)
 
-        key = attn.to_k(encoder_hidden_states)
-        value = attn.to_v(encoder_hidden_states)
+        query, key, value = attn.project_qkv(hidden_states, encoder_hidden_states)
 
         head_dim = query.shape[-1] // attn.heads
         kv_heads = key.shape[-1] // head_dim
@@ -2511,8 +2879,8 @@ class StableAudioAttnProcessor2_0:
 
         # the output of sdp = (batch, num_heads, seq_len, head_dim)
         # TODO: add support for attn.scale when we move to Torch 2.1
-        hidden_states = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+        hidden_states = dispatch_attention_fn(
+            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False, backend=attn.attention_backend
         )
 
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
@@ -2578,15 +2946,10 @@ class HunyuanAttnProcessor2_0:
         if attn.group_norm is not None:
             hidden_states = attn.group_norm(hidden_states.transpose(1, 2)).transpose(1, 2)
 
-        query = attn.to_q(hidden_states)
-
-        if encoder_hidden_states is None:
-            encoder_hidden_states = hidden_states
-        elif attn.norm_cross:
+        if encoder_hidden_states is not None and attn.norm_cross:
             encoder_hidden_states = attn.norm_encoder_hidden_states(encoder_hidden_states)
 
-        key = attn.to_k(encoder_hidden_states)
-        value = attn.to_v(encoder_hidden_states)
+        query, key, value = attn.project_qkv(hidden_states, encoder_hidden_states)
 
         inner_dim = key.shape[-1]
         head_dim = inner_dim // attn.heads
@@ -2609,8 +2972,8 @@ class HunyuanAttnProcessor2_0:
 
         # the output of sdp = (batch, num_heads, seq_len, head_dim)
         # TODO: add support for attn.scale when we move to Torch 2.1
-        hidden_states = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+        hidden_states = dispatch_attention_fn(
+            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False, backend=attn.attention_backend
         )
 
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
@@ -2712,8 +3075,8 @@ class FusedHunyuanAttnProcessor2_0:
 
         # the output of sdp = (batch, num_heads, seq_len, head_dim)
         # TODO: add support for attn.scale when we move to Torch 2.1
-        hidden_states = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+        hidden_states = dispatch_attention_fn(
+            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False, backend=attn.attention_backend
         )
 
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
@@ -2817,8 +3180,8 @@ class PAGHunyuanAttnProcessor2_0:
 
         # the output of sdp = (batch, num_heads, seq_len, head_dim)
         # TODO: add support for attn.scale when we move to Torch 2.1
-        hidden_states_org = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+        hidden_states_org = dispatch_attention_fn(
+            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False, backend=attn.attention_backend
         )
 
         hidden_states_org = hidden_states_org.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
@@ -2941,8 +3304,8 @@ class PAGCFGHunyuanAttnProcessor2_0:
 
         # the output of sdp = (batch, num_heads, seq_len, head_dim)
         # TODO: add support for attn.scale when we move to Torch 2.1
-        hidden_states_org = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+        hidden_states_org = dispatch_attention_fn(
+            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False, backend=attn.attention_backend
         )
 
         hidden_states_org = hidden_states_org.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
@@ -3013,9 +3376,7 @@ class LuminaAttnProcessor2_0:
         batch_size, sequence_length, _ = hidden_states.shape
 
         # Get Query-Key-Value Pair
-        query = attn.to_q(hidden_states)
-        key = attn.to_k(encoder_hidden_states)
-        value = attn.to_v(encoder_hidden_states)
+        query, key, value = attn.project_qkv(hidden_states, encoder_hidden_states)
 
         query_dim = query.shape[-1]
         inner_dim = key.shape[-1]
@@ -3070,8 +3431,8 @@ class LuminaAttnProcessor2_0:
 
         # the output of sdp = (batch, num_heads, seq_len, head_dim)
         # TODO: add support for attn.scale when we move to Torch 2.1
-        hidden_states = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, scale=softmax_scale
+        hidden_states = dispatch_attention_fn(
+            query, key, value, attn_mask=attention_mask, scale=softmax_scale, backend=attn.attention_backend
         )
         hidden_states = hidden_states.transpose(1, 2).to(dtype)
 
@@ -3161,8 +3522,8 @@ class FusedAttnProcessor2_0:
 
         # the output of sdp = (batch, num_heads, seq_len, head_dim)
         # TODO: add support for attn.scale when we move to Torch 2.1
-        hidden_states = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+        hidden_states = dispatch_attention_fn(
+            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False, backend=attn.attention_backend
         )
 
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
@@ -3393,8 +3754,8 @@ class CustomDiffusionAttnProcessor2_0(nn.Module):
 
         # the output of sdp = (batch, num_heads, seq_len, head_dim)
         # TODO: add support for attn.scale when we move to Torch 2.1
-        hidden_states = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+        hidden_states = dispatch_attention_fn(
+            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False, backend=attn.attention_backend
         )
 
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
@@ -3933,8 +4294,8 @@ class IPAdapterAttnProcessor2_0(torch.nn.Module):
 
         # the output of sdp = (batch, num_heads, seq_len, head_dim)
         # TODO: add support for attn.scale when we move to Torch 2.1
-        hidden_states = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+        hidden_states = dispatch_attention_fn(
+            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False, backend=attn.attention_backend
         )
 
         hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
@@ -3996,8 +4357,14 @@ class IPAdapterAttnProcessor2_0(torch.nn.Module):
 
                         # the output of sdp = (batch, num_heads, seq_len, head_dim)
                         # TODO: add support for attn.scale when we move to Torch 2.1
-                        _current_ip_hidden_states = F.scaled_dot_product_attention(
-                            query, ip_key, ip_value, attn_mask=None, dropout_p=0.0, is_causal=False
+                        _current_ip_hidden_states = dispatch_attention_fn(
+                            query,
+                            ip_key,
+                            ip_value,
+                            attn_mask=None,
+                            dropout_p=0.0,
+                            is_causal=False,
+                            backend=attn.attention_backend,
                         )
 
                         _current_ip_hidden_states = _current_ip_hidden_states.transpose(1, 2).reshape(
@@ -4023,8 +4390,14 @@ class IPAdapterAttnProcessor2_0(torch.nn.Module):
 
                     # the output of sdp = (batch, num_heads, seq_len, head_dim)
                     # TODO: add support for attn.scale when we move to Torch 2.1
-                    current_ip_hidden_states = F.scaled_dot_product_attention(
-                        query, ip_key, ip_value, attn_mask=None, dropout_p=0.0, is_causal=False
+                    current_ip_hidden_states = dispatch_attention_fn(
+                        query,
+                        ip_key,
+                        ip_value,
+                        attn_mask=None,
+                        dropout_p=0.0,
+                        is_causal=False,
+                        backend=attn.attention_backend,
                     )
 
                     current_ip_hidden_states = current_ip_hidden_states.transpose(1, 2).reshape(
@@ -4107,8 +4480,8 @@ class PAGIdentitySelfAttnProcessor2_0:
 
         # the output of sdp = (batch, num_heads, seq_len, head_dim)
         # TODO: add support for attn.scale when we move to Torch 2.1
-        hidden_states_org = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+        hidden_states_org = dispatch_attention_fn(
+            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False, backend=attn.attention_backend
         )
         hidden_states_org = hidden_states_org.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
         hidden_states_org = hidden_states_org.to(query.dtype)
@@ -4208,8 +4581,8 @@ class PAGCFGIdentitySelfAttnProcessor2_0:
 
         # the output of sdp = (batch, num_heads, seq_len, head_dim)
         # TODO: add support for attn.scale when we move to Torch 2.1
-        hidden_states_org = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+        hidden_states_org = dispatch_attention_fn(
+            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False, backend=attn.attention_backend
         )
 
         hidden_states_org = hidden_states_org.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
@@ -4299,6 +4672,15 @@ CROSS_ATTENTION_PROCESSORS = (
     IPAdapterAttnProcessor2_0,
 )
 
+CONTEXT_PARALLEL_ATTENTION_PROCESSORS = (
+    JointAttnProcessor2_0,
+    FusedJointAttnProcessor2_0,
+    FluxAttnProcessor2_0,
+    FusedFluxAttnProcessor2_0,
+    CogVideoXAttnProcessor2_0,
+    FusedCogVideoXAttnProcessor2_0,
+)
+
 AttentionProcessor = Union[
     AttnProcessor,
     AttnProcessor2_0,
@@ -1,8 +1,31 @@
-from .autoencoder_asym_kl import AsymmetricAutoencoderKL
-from .autoencoder_kl import AutoencoderKL
-from .autoencoder_kl_cogvideox import AutoencoderKLCogVideoX
-from .autoencoder_kl_temporal_decoder import AutoencoderKLTemporalDecoder
-from .autoencoder_oobleck import AutoencoderOobleck
-from .autoencoder_tiny import AutoencoderTiny
-from .consistency_decoder_vae import ConsistencyDecoderVAE
-from .vq_model import VQModel
+from typing import TYPE_CHECKING
+
+from ...utils import DIFFUSERS_SLOW_IMPORT, _LazyModule
+
+
+_import_structure = {
+    "autoencoder_asym_kl": ["AsymmetricAutoencoderKL"],
+    "autoencoder_kl": ["AutoencoderKL"],
+    "autoencoder_kl_cogvideox": ["AutoencoderKLCogVideoX"],
+    "autoencoder_kl_temporal_decoder": ["AutoencoderKLTemporalDecoder"],
+    "autoencoder_oobleck": ["AutoencoderOobleck"],
+    "autoencoder_tiny": ["AutoencoderTiny"],
+    "consistency_decoder_vae": ["ConsistencyDecoderVAE"],
+    "vq_model": ["VQModel"],
+}
+
+
+if TYPE_CHECKING or DIFFUSERS_SLOW_IMPORT:
+    from .autoencoder_asym_kl import AsymmetricAutoencoderKL
+    from .autoencoder_kl import AutoencoderKL
+    from .autoencoder_kl_cogvideox import AutoencoderKLCogVideoX
+    from .autoencoder_kl_temporal_decoder import AutoencoderKLTemporalDecoder
+    from .autoencoder_oobleck import AutoencoderOobleck
+    from .autoencoder_tiny import AutoencoderTiny
+    from .consistency_decoder_vae import ConsistencyDecoderVAE
+    from .vq_model import VQModel
+
+else:
+    import sys
+
+    sys.modules[__name__] = _LazyModule(__name__, globals()["__file__"], _import_structure, module_spec=__spec__)
@@ -11,7 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from typing import Optional, Tuple, Union
+from typing import Iterator, Optional, Tuple, Union
 
 import torch
 import torch.nn as nn
@@ -108,6 +108,11 @@ class AsymmetricAutoencoderKL(ModelMixin, ConfigMixin):
         self.use_slicing = False
         self.use_tiling = False
 
+        # only relevant for `decode_tiles_iter`
+        self.tile_sample_min_size = sample_size
+        self.tile_latent_min_size = int(sample_size / (2 ** (len(up_block_out_channels) - 1)))
+        self.tile_overlap_factor = 0.25
+
         self.register_to_config(block_out_channels=up_block_out_channels)
         self.register_to_config(force_upcast=False)
 
@@ -153,6 +158,94 @@ class AsymmetricAutoencoderKL(ModelMixin, ConfigMixin):
 
         return DecoderOutput(sample=decoded)
 
+    # Copied from diffusers.models.autoencoders.autoencoder_kl.AutoencoderKL.blend_v
+    def blend_v(self, a: torch.Tensor, b: torch.Tensor, blend_extent: int) -> torch.Tensor:
+        blend_extent = min(a.shape[2], b.shape[2], blend_extent)
+        for y in range(blend_extent):
+            b[:, :, y, :] = a[:, :, -blend_extent + y, :] * (1 - y / blend_extent) + b[:, :, y, :] * (y / blend_extent)
+        return b
+
+    # Copied from diffusers.models.autoencoders.autoencoder_kl.AutoencoderKL.blend_h
+    def blend_h(self, a: torch.Tensor, b: torch.Tensor, blend_extent: int) -> torch.Tensor:
+        blend_extent = min(a.shape[3], b.shape[3], blend_extent)
+        for x in range(blend_extent):
+            b[:, :, :, x] = a[:, :, :, -blend_extent + x] * (1 - x / blend_extent) + b[:, :, :, x] * (x / blend_extent)
+        return b
+
+    @apply_forward_hook
+    def decode_tiles_iter(
+        self,
+        z: torch.Tensor,
+        image: Optional[torch.Tensor] = None,
+        mask: Optional[torch.Tensor] = None,
+    ) -> Iterator[Tuple[torch.Tensor, int, int]]:
+        r"""
+        Decode a batch of latents tile by tile, without assembling the decoded images.
+
+        The latents are split into overlapping tiles of `tile_latent_min_size`, and every tile is decoded with the
+        matching crops of `image` and `mask`. The tiles stop at the borders of the latents, so the decoded images have
+        the same size as with [`~AsymmetricAutoencoderKL.decode`]. The decoded tiles are blended with their top and
+        left neighbours and yielded as soon as they are ready, so only two rows of decoded tiles are kept in memory,
+        whatever the size of the decoded images.
+
+        The yielded tiles are views of the decoded rows and shouldn't be modified in place.
+
+        Args:
+            z (`torch.Tensor`): Input batch of latent vectors.
+            image (`torch.Tensor`, *optional*): The image to condition the decoder on.
+            mask (`torch.Tensor`, *optional*): The inpainting mask to condition the decoder on.
+
+        Returns:
+            `Iterator[Tuple[torch.Tensor, int, int]]`:
+                An iterator over the decoded tiles, in raster order, with the coordinates (row, column) of their
+                top-left pixel in the decoded images.
+        """
+        tile_size = self.tile_latent_min_size
+        scale_factor = self.tile_sample_min_size // tile_size
+        overlap_size = int(tile_size * (1 - self.tile_overlap_factor))
+        blend_extent = int(self.tile_sample_min_size * self.tile_overlap_factor)
+        row_limit = self.tile_sample_min_size - blend_extent
+
+        def crop(x: Optional[torch.Tensor], i: int, j: int) -> Optional[torch.Tensor]:
+            if x is None:
+                return None
+            return x[
+                :,
+                :,
+                i * scale_factor : (i + tile_size) * scale_factor,
+                j * scale_factor : (j + tile_size) * scale_factor,
+            ]
+
+        def tile_starts(size: int) -> range:
+            # the tiles stop at the first one that reaches the border, so the last tiles aren't too small for the
+            # condition encoder
+            return range(0, max(size - tile_size + overlap_size, 1), overlap_size)
+
+        previous_row = None
+        y = 0
+        for i in tile_starts(z.shape[2]):
+            row = []
+            x_start = 0
+            for j in tile_starts(z.shape[3]):
+                tile = z[:, :, i : i + tile_size, j : j + tile_size]
+                tile = self._decode(tile, crop(image, i, j), crop(mask, i, j)).sample
+                row.append(tile)
+
+                # blend the above tile and the left tile to the current tile
+                if previous_row is not None:
+                    tile = self.blend_v(previous_row[len(row) - 1], tile, blend_extent)
+                if len(row) > 1:
+                    tile = self.blend_h(row[-2], tile, blend_extent)
+                # the tiles at the border aren't overlapped by other tiles and are kept whole
+                height = tile.shape[2] if i + tile_size >= z.shape[2] else row_limit
+                width = tile.shape[3] if j + tile_size >= z.shape[3] else row_limit
+                tile = tile[:, :, :height, :width]
+                yield tile, y, x_start
+                x_start += tile.shape[3]
+
+            y += tile.shape[2]
+            previous_row = row
+
     def forward(
         self,
         sample: torch.Tensor,
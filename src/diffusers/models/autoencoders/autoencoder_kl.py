@@ -11,7 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from typing import Dict, Optional, Tuple, Union
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 import torch
 import torch.nn as nn
@@ -31,7 +31,7 @@ from ..attention_processor import (
 )
 from ..modeling_outputs import AutoencoderKLOutput
 from ..modeling_utils import ModelMixin
-from .vae import Decoder, DecoderOutput, DiagonalGaussianDistribution, Encoder
+from .vae import Decoder, DecoderOutput, DiagonalGaussianDistribution, Encoder, VaeEncodeCache
 
 
 class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalModelMixin):
@@ -136,6 +136,10 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalModelMixin):
         )
         self.tile_latent_min_size = int(sample_size / (2 ** (len(self.config.block_out_channels) - 1)))
         self.tile_overlap_factor = 0.25
+        # number of tiles of a row that are encoded or decoded together
+        self.tile_batch_size = 1
+
+        self.encode_cache = None
 
     def _set_gradient_checkpointing(self, module, value=False):
         if isinstance(module, (Encoder, Decoder)):
@@ -170,6 +174,33 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalModelMixin):
         """
         self.use_slicing = False
 
+    def enable_encode_cache(self, max_size: int = 8):
+        r"""
+        Enable the cache of encoded images. The posterior parameters of the last `max_size` encoded batches are kept,
+        and encoding the same images again returns them without running the encoder. The latents are still sampled
+        from the posterior with the generator of every request. This is useful to edit the same image many times with
+        image-to-image or inpainting pipelines.
+
+        The cached entries are keyed by a hash of the images, the weights, dtype and device of the VAE, and the tiling
+        settings. The cache is only used when gradients are disabled.
+
+        Args:
+            max_size (`int`, *optional*, defaults to 8): The maximum number of encoded batches to keep.
+        """
+        self.encode_cache = VaeEncodeCache(max_size)
+
+    def disable_encode_cache(self):
+        r"""
+        Disable the cache of encoded images and free the cached posterior parameters.
+        """
+        self.encode_cache = None
+
+    def _encode_cache_key(self, x: torch.Tensor) -> Tuple:
+        # in-place updates of the weights (e.g. `load_state_dict`) bump the version counters of the parameters
+        weights_version = tuple((id(param), param._version) for param in self.parameters())
+        tiling = (self.use_tiling, self.tile_sample_min_size, self.tile_overlap_factor) if self.use_tiling else None
+        return (VaeEncodeCache.hash_tensor(x), hash(weights_version), self.dtype, self.device, tiling)
+
     @property
     # Copied from diffusers.models.unets.unet_2d_condition.UNet2DConditionModel.attn_processors
     def attn_processors(self) -> Dict[str, AttentionProcessor]:
@@ -274,12 +305,24 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalModelMixin):
                 The latent representations of the encoded images. If `return_dict` is True, a
                 [`~models.autoencoder_kl.AutoencoderKLOutput`] is returned, otherwise a plain `tuple` is returned.
         """
-        if self.use_slicing and x.shape[0] > 1:
-            encoded_slices = [self._encode(x_slice) for x_slice in x.split(1)]
-            h = torch.cat(encoded_slices)
-        else:
-            h = self._encode(x)
-
+        use_cache = self.encode_cache is not None and not torch.is_grad_enabled()
+        h = None
+        if use_cache:
+            key = self._encode_cache_key(x)
+            h = self.encode_cache.get(key)
+
+        if h is None:
+            if self.use_slicing and x.shape[0] > 1:
+                encoded_slices = [self._encode(x_slice) for x_slice in x.split(1)]
+                h = torch.cat(encoded_slices)
+            else:
+                h = self._encode(x)
+            if use_cache:
+                self.encode_cache.put(key, h)
+
+        if use_cache:
+            # the cached parameters mustn't be modified by in-place operations on the latents
+            h = h.clone()
         posterior = DiagonalGaussianDistribution(h)
 
         if not return_dict:
@@ -342,6 +385,93 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalModelMixin):
             b[:, :, :, x] = a[:, :, :, -blend_extent + x] * (1 - x / blend_extent) + b[:, :, :, x] * (x / blend_extent)
         return b
 
+    def _tiled_output_size(self, size: int, tile_size: int, overlap_size: int, output_tile_size: int, row_limit: int):
+        # sum of the sizes of the cropped output tiles along one dimension
+        return sum(
+            min(min(tile_size, size - start) * output_tile_size // tile_size, row_limit)
+            for start in range(0, size, overlap_size)
+        )
+
+    def _process_tiles(
+        self, tiles: List[torch.Tensor], fn: Callable[[torch.Tensor], torch.Tensor]
+    ) -> List[torch.Tensor]:
+        # consecutive tiles of the same shape are processed together, `tile_batch_size` at a time
+        outputs = []
+        start = 0
+        while start < len(tiles):
+            end = start + 1
+            while end < len(tiles) and end - start < self.tile_batch_size and tiles[end].shape == tiles[start].shape:
+                end += 1
+            outputs.extend(fn(torch.cat(tiles[start:end])).split(tiles[start].shape[0]))
+            start = end
+        return outputs
+
+    def _iter_blended_tiles(
+        self,
+        x: torch.Tensor,
+        fn: Callable[[torch.Tensor], torch.Tensor],
+        tile_size: int,
+        overlap_size: int,
+        blend_extent: int,
+        row_limit: int,
+    ) -> Iterator[Tuple[torch.Tensor, int, int]]:
+        r"""
+        Splits `x` into overlapping tiles, processes them with `fn` one row of tiles at a time and yields the blended
+        and cropped output tiles with the coordinates of their top-left corner in the output. Only the processed tiles
+        of the current and previous rows are kept in memory.
+        """
+        previous_row = None
+        y = 0
+        for i in range(0, x.shape[2], overlap_size):
+            tiles = [x[:, :, i : i + tile_size, j : j + tile_size] for j in range(0, x.shape[3], overlap_size)]
+            row = self._process_tiles(tiles, fn)
+
+            x_start = 0
+            for j, tile in enumerate(row):
+                # blend the above tile and the left tile to the current tile
+                if previous_row is not None:
+                    tile = self.blend_v(previous_row[j], tile, blend_extent)
+                if j > 0:
+                    tile = self.blend_h(row[j - 1], tile, blend_extent)
+                tile = tile[:, :, :row_limit, :row_limit]
+                yield tile, y, x_start
+                x_start += tile.shape[3]
+
+            y += tile.shape[2]
+            previous_row = row
+
+    def _tiled_apply(
+        self,
+        x: torch.Tensor,
+        fn: Callable[[torch.Tensor], torch.Tensor],
+        tile_size: int,
+        output_tile_size: int,
+    ) -> torch.Tensor:
+        overlap_size = int(tile_size * (1 - self.tile_overlap_factor))
+        blend_extent = int(output_tile_size * self.tile_overlap_factor)
+        row_limit = output_tile_size - blend_extent
+        height = self._tiled_output_size(x.shape[2], tile_size, overlap_size, output_tile_size, row_limit)
+        width = self._tiled_output_size(x.shape[3], tile_size, overlap_size, output_tile_size, row_limit)
+
+        # the blended tiles are written into the output as soon as they are ready
+        output = None
+        for tile, y, x_start in self._iter_blended_tiles(x, fn, tile_size, overlap_size, blend_extent, row_limit):
+            if output is None:
+                output = tile.new_empty(tile.shape[0], tile.shape[1], height, width)
+            output[:, :, y : y + tile.shape[2], x_start : x_start + tile.shape[3]] = tile
+        return output
+
+    def _encode_tile(self, tile: torch.Tensor) -> torch.Tensor:
+        tile = self.encoder(tile)
+        if self.config.use_quant_conv:
+            tile = self.quant_conv(tile)
+        return tile
+
+    def _decode_tile(self, tile: torch.Tensor) -> torch.Tensor:
+        if self.config.use_post_quant_conv:
+            tile = self.post_quant_conv(tile)
+        return self.decoder(tile)
+
     def _tiled_encode(self, x: torch.Tensor) -> torch.Tensor:
         r"""Encode a batch of images using a tiled encoder.
 
@@ -351,6 +481,9 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalModelMixin):
         tiles overlap and are blended together to form a smooth output. You may still see tile-sized changes in the
         output, but they should be much less noticeable.
 
+        `tile_batch_size` tiles of a row are encoded together, and the rows are blended into the output as soon as
+        they are encoded.
+
         Args:
             x (`torch.Tensor`): Input batch of images.
 
@@ -358,37 +491,7 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalModelMixin):
             `torch.Tensor`:
                 The latent representation of the encoded videos.
         """
-
-        overlap_size = int(self.tile_sample_min_size * (1 - self.tile_overlap_factor))
-        blend_extent = int(self.tile_latent_min_size * self.tile_overlap_factor)
-        row_limit = self.tile_latent_min_size - blend_extent
-
-        # Split the image into 512x512 tiles and encode them separately.
-        rows = []
-        for i in range(0, x.shape[2], overlap_size):
-            row = []
-            for j in range(0, x.shape[3], overlap_size):
-                tile = x[:, :, i : i + self.tile_sample_min_size, j : j + self.tile_sample_min_size]
-                tile = self.encoder(tile)
-                if self.config.use_quant_conv:
-                    tile = self.quant_conv(tile)
-                row.append(tile)
-            rows.append(row)
-        result_rows = []
-        for i, row in enumerate(rows):
-            result_row = []
-            for j, tile in enumerate(row):
-                # blend the above tile and the left tile
-                # to the current tile and add the current tile to the result row
-                if i > 0:
-                    tile = self.blend_v(rows[i - 1][j], tile, blend_extent)
-                if j > 0:
-                    tile = self.blend_h(row[j - 1], tile, blend_extent)
-                result_row.append(tile[:, :, :row_limit, :row_limit])
-            result_rows.append(torch.cat(result_row, dim=3))
-
-        enc = torch.cat(result_rows, dim=2)
-        return enc
+        return self._tiled_apply(x, self._encode_tile, self.tile_sample_min_size, self.tile_latent_min_size)
 
     def tiled_encode(self, x: torch.Tensor, return_dict: bool = True) -> AutoencoderKLOutput:
         r"""Encode a batch of images using a tiled encoder.
@@ -416,35 +519,7 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalModelMixin):
         )
         deprecate("tiled_encode", "1.0.0", deprecation_message, standard_warn=False)
 
-        overlap_size = int(self.tile_sample_min_size * (1 - self.tile_overlap_factor))
-        blend_extent = int(self.tile_latent_min_size * self.tile_overlap_factor)
-        row_limit = self.tile_latent_min_size - blend_extent
-
-        # Split the image into 512x512 tiles and encode them separately.
-        rows = []
-        for i in range(0, x.shape[2], overlap_size):
-            row = []
-            for j in range(0, x.shape[3], overlap_size):
-                tile = x[:, :, i : i + self.tile_sample_min_size, j : j + self.tile_sample_min_size]
-                tile = self.encoder(tile)
-                if self.config.use_quant_conv:
-                    tile = self.quant_conv(tile)
-                row.append(tile)
-            rows.append(row)
-        result_rows = []
-        for i, row in enumerate(rows):
-            result_row = []
-            for j, tile in enumerate(row):
-                # blend the above tile and the left tile
-                # to the current tile and add the current tile to the result row
-                if i > 0:
-                    tile = self.blend_v(rows[i - 1][j], tile, blend_extent)
-                if j > 0:
-                    tile = self.blend_h(row[j - 1], tile, blend_extent)
-                result_row.append(tile[:, :, :row_limit, :row_limit])
-            result_rows.append(torch.cat(result_row, dim=3))
-
-        moments = torch.cat(result_rows, dim=2)
+        moments = self._tiled_encode(x)
         posterior = DiagonalGaussianDistribution(moments)
 
         if not return_dict:
@@ -456,6 +531,11 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalModelMixin):
         r"""
         Decode a batch of images using a tiled decoder.
 
+        The latents are split into overlapping tiles and `tile_batch_size` tiles of a row are decoded together (set
+        `vae.tile_batch_size` to use the device better with small tiles). Every row of decoded tiles is blended with
+        the previous row and written into the preallocated output, so only two rows of decoded tiles are kept in
+        memory.
+
         Args:
             z (`torch.Tensor`): Input batch of latent vectors.
             return_dict (`bool`, *optional*, defaults to `True`):
@@ -466,41 +546,37 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalModelMixin):
                 If return_dict is True, a [`~models.vae.DecoderOutput`] is returned, otherwise a plain `tuple` is
                 returned.
         """
-        overlap_size = int(self.tile_latent_min_size * (1 - self.tile_overlap_factor))
-        blend_extent = int(self.tile_sample_min_size * self.tile_overlap_factor)
-        row_limit = self.tile_sample_min_size - blend_extent
-
-        # Split z into overlapping 64x64 tiles and decode them separately.
-        # The tiles have an overlap to avoid seams between tiles.
-        rows = []
-        for i in range(0, z.shape[2], overlap_size):
-            row = []
-            for j in range(0, z.shape[3], overlap_size):
-                tile = z[:, :, i : i + self.tile_latent_min_size, j : j + self.tile_latent_min_size]
-                if self.config.use_post_quant_conv:
-                    tile = self.post_quant_conv(tile)
-                decoded = self.decoder(tile)
-                row.append(decoded)
-            rows.append(row)
-        result_rows = []
-        for i, row in enumerate(rows):
-            result_row = []
-            for j, tile in enumerate(row):
-                # blend the above tile and the left tile
-                # to the current tile and add the current tile to the result row
-                if i > 0:
-                    tile = self.blend_v(rows[i - 1][j], tile, blend_extent)
-                if j > 0:
-                    tile = self.blend_h(row[j - 1], tile, blend_extent)
-                result_row.append(tile[:, :, :row_limit, :row_limit])
-            result_rows.append(torch.cat(result_row, dim=3))
-
-        dec = torch.cat(result_rows, dim=2)
+        dec = self._tiled_apply(z, self._decode_tile, self.tile_latent_min_size, self.tile_sample_min_size)
         if not return_dict:
             return (dec,)
 
         return DecoderOutput(sample=dec)
 
+    @apply_forward_hook
+    def decode_tiles_iter(self, z: torch.Tensor) -> Iterator[Tuple[torch.Tensor, int, int]]:
+        r"""
+        Decode a batch of latents tile by tile, without assembling the decoded images.
+
+        The tiles are split, decoded and blended like in [`~AutoencoderKL.tiled_decode`], but every blended tile is
+        yielded as soon as it is ready, so it can be written to disk or post-processed right away. Only two rows of
+        decoded tiles are kept in memory, whatever the size of the decoded images.
+
+        The yielded tiles are views of the decoded rows and shouldn't be modified in place.
+
+        Args:
+            z (`torch.Tensor`): Input batch of latent vectors.
+
+        Returns:
+            `Iterator[Tuple[torch.Tensor, int, int]]`:
+                An iterator over the decoded tiles, in raster order, with the coordinates (row, column) of their
+                top-left pixel in the decoded images.
+        """
+        tile_size = self.tile_latent_min_size
+        overlap_size = int(tile_size * (1 - self.tile_overlap_factor))
+        blend_extent = int(self.tile_sample_min_size * self.tile_overlap_factor)
+        row_limit = self.tile_sample_min_size - blend_extent
+        return self._iter_blended_tiles(z, self._decode_tile, tile_size, overlap_size, blend_extent, row_limit)
+
     def forward(
         self,
         sample: torch.Tensor,
@@ -568,3 +644,7 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalModelMixin):
         """
         if self.original_attn_processors is not None:
             self.set_attn_processor(self.original_attn_processors)
+
+        for module in self.modules():
+            if isinstance(module, Attention):
+                module.unfuse_projections()
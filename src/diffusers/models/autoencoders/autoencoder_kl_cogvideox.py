@@ -13,7 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Dict, Optional, Tuple, Union
+from typing import Dict, Iterator, Optional, Tuple, Union
 
 import numpy as np
 import torch
@@ -35,6 +35,15 @@ from .vae import DecoderOutput, DiagonalGaussianDistribution
 logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
 
 
+def _move_conv_cache(conv_cache, device: Optional[torch.device]):
+    # The conv cache of the decoder is a nested dict of tensors
+    if device is None or conv_cache is None:
+        return conv_cache
+    if isinstance(conv_cache, dict):
+        return {key: _move_conv_cache(value, device) for key, value in conv_cache.items()}
+    return conv_cache.to(device, non_blocking=True)
+
+
 class CogVideoXSafeConv3d(nn.Conv3d):
     r"""
     A 3D convolution layer that splits the input tensor into smaller parts to avoid OOM in CogVideoX Model.
@@ -1228,16 +1237,12 @@ class AutoencoderKLCogVideoX(ModelMixin, ConfigMixin, FromOriginalModelMixin):
             return (posterior,)
         return AutoencoderKLOutput(latent_dist=posterior)
 
-    def _decode(self, z: torch.Tensor, return_dict: bool = True) -> Union[DecoderOutput, torch.Tensor]:
+    def _iter_decode(self, z: torch.Tensor) -> Iterator[torch.Tensor]:
         batch_size, num_channels, num_frames, height, width = z.shape
 
-        if self.use_tiling and (width > self.tile_latent_min_width or height > self.tile_latent_min_height):
-            return self.tiled_decode(z, return_dict=return_dict)
-
         frame_batch_size = self.num_latent_frames_batch_size
         num_batches = max(num_frames // frame_batch_size, 1)
         conv_cache = None
-        dec = []
 
         for i in range(num_batches):
             remaining_frames = num_frames % frame_batch_size
@@ -1247,9 +1252,15 @@ class AutoencoderKLCogVideoX(ModelMixin, ConfigMixin, FromOriginalModelMixin):
             if self.post_quant_conv is not None:
                 z_intermediate = self.post_quant_conv(z_intermediate)
             z_intermediate, conv_cache = self.decoder(z_intermediate, conv_cache=conv_cache)
-            dec.append(z_intermediate)
+            yield z_intermediate
+
+    def _decode(self, z: torch.Tensor, return_dict: bool = True) -> Union[DecoderOutput, torch.Tensor]:
+        batch_size, num_channels, num_frames, height, width = z.shape
+
+        if self.use_tiling and (width > self.tile_latent_min_width or height > self.tile_latent_min_height):
+            return self.tiled_decode(z, return_dict=return_dict)
 
-        dec = torch.cat(dec, dim=2)
+        dec = torch.cat(list(self._iter_decode(z)), dim=2)
 
         if not return_dict:
             return (dec,)
@@ -1281,6 +1292,35 @@ class AutoencoderKLCogVideoX(ModelMixin, ConfigMixin, FromOriginalModelMixin):
             return (decoded,)
         return DecoderOutput(sample=decoded)
 
+    @apply_forward_hook
+    def decode_frames_iter(self, z: torch.Tensor) -> Iterator[torch.Tensor]:
+        r"""
+        Decode a batch of videos frame batch by frame batch.
+
+        The latent frames are decoded `num_latent_frames_batch_size` at a time, like in
+        [`~AutoencoderKLCogVideoX.decode`], but every batch of decoded frames is yielded as soon as it is ready instead
+        of being concatenated with the others. The decoded frames can be post-processed, encoded or streamed while the
+        next frames are being decoded. Tiling is used if it is enabled, but slicing isn't.
+
+        With tiling, every tile keeps the conv cache of the causal decoder from one batch of frames to the next. The
+        caches of the tiles that are not being decoded are moved to the CPU, so that the device only holds the cache of
+        one tile and one batch of decoded frames at a time. This costs a copy of every cache to and from the CPU per
+        batch of frames, in exchange for a lower peak memory than [`~AutoencoderKLCogVideoX.tiled_decode`], which keeps
+        all the decoded frames on the device.
+
+        Args:
+            z (`torch.Tensor`): Input batch of latent vectors.
+
+        Returns:
+            `Iterator[torch.Tensor]`:
+                An iterator over the batches of decoded frames, of shape `(batch_size, num_channels, num_frames, height,
+                width)`. Their concatenation along the frames is the output of [`~AutoencoderKLCogVideoX.decode`].
+        """
+        height, width = z.shape[-2:]
+        if self.use_tiling and (width > self.tile_latent_min_width or height > self.tile_latent_min_height):
+            return self._iter_tiled_decode(z)
+        return self._iter_decode(z)
+
     def blend_v(self, a: torch.Tensor, b: torch.Tensor, blend_extent: int) -> torch.Tensor:
         blend_extent = min(a.shape[3], b.shape[3], blend_extent)
         for y in range(blend_extent):
@@ -1454,6 +1494,65 @@ class AutoencoderKLCogVideoX(ModelMixin, ConfigMixin, FromOriginalModelMixin):
 
         return DecoderOutput(sample=dec)
 
+    def _iter_tiled_decode(self, z: torch.Tensor) -> Iterator[torch.Tensor]:
+        batch_size, num_channels, num_frames, height, width = z.shape
+
+        overlap_height = int(self.tile_latent_min_height * (1 - self.tile_overlap_factor_height))
+        overlap_width = int(self.tile_latent_min_width * (1 - self.tile_overlap_factor_width))
+        blend_extent_height = int(self.tile_sample_min_height * self.tile_overlap_factor_height)
+        blend_extent_width = int(self.tile_sample_min_width * self.tile_overlap_factor_width)
+        row_limit_height = self.tile_sample_min_height - blend_extent_height
+        row_limit_width = self.tile_sample_min_width - blend_extent_width
+        frame_batch_size = self.num_latent_frames_batch_size
+
+        num_batches = max(num_frames // frame_batch_size, 1)
+        # Every tile carries its own conv cache from one batch of frames to the next. Together, they are about as large
+        # as the conv cache of a full frame, so the caches of the idle tiles are kept on the CPU.
+        offload_device = torch.device("cpu") if z.device.type != "cpu" else None
+        conv_caches = {}
+
+        for k in range(num_batches):
+            remaining_frames = num_frames % frame_batch_size
+            start_frame = frame_batch_size * k + (0 if k == 0 else remaining_frames)
+            end_frame = frame_batch_size * (k + 1) + remaining_frames
+
+            # Split z into overlapping tiles and decode them separately.
+            # The tiles have an overlap to avoid seams between tiles.
+            rows = []
+            for i in range(0, height, overlap_height):
+                row = []
+                for j in range(0, width, overlap_width):
+                    tile = z[
+                        :,
+                        :,
+                        start_frame:end_frame,
+                        i : i + self.tile_latent_min_height,
+                        j : j + self.tile_latent_min_width,
+                    ]
+                    if self.post_quant_conv is not None:
+                        tile = self.post_quant_conv(tile)
+                    conv_cache = _move_conv_cache(conv_caches.pop((i, j), None), z.device)
+                    tile, conv_cache = self.decoder(tile, conv_cache=conv_cache)
+                    if k < num_batches - 1:
+                        conv_caches[i, j] = _move_conv_cache(conv_cache, offload_device)
+                    row.append(tile)
+                rows.append(row)
+
+            result_rows = []
+            for i, row in enumerate(rows):
+                result_row = []
+                for j, tile in enumerate(row):
+                    # blend the above tile and the left tile
+                    # to the current tile and add the current tile to the result row
+                    if i > 0:
+                        tile = self.blend_v(rows[i - 1][j], tile, blend_extent_height)
+                    if j > 0:
+                        tile = self.blend_h(row[j - 1], tile, blend_extent_width)
+                    result_row.append(tile[:, :, :, :row_limit_height, :row_limit_width])
+                result_rows.append(torch.cat(result_row, dim=4))
+
+            yield torch.cat(result_rows, dim=3)
+
     def forward(
         self,
         sample: torch.Tensor,
@@ -11,7 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from typing import Dict, Optional, Tuple, Union
+from typing import Dict, Iterator, Optional, Tuple, Union
 
 import torch
 import torch.nn as nn
@@ -370,6 +370,36 @@ class AutoencoderKLTemporalDecoder(ModelMixin, ConfigMixin):
 
         return DecoderOutput(sample=decoded)
 
+    @apply_forward_hook
+    def decode_frames_iter(
+        self, z: torch.Tensor, num_frames: int, decode_chunk_size: Optional[int] = None
+    ) -> Iterator[torch.Tensor]:
+        """
+        Decode a batch of frames chunk by chunk.
+
+        The latent frames are decoded `decode_chunk_size` at a time, and every chunk of decoded frames is yielded as
+        soon as it is ready instead of being concatenated with the others. The decoded frames can be post-processed,
+        encoded or streamed while the next frames are being decoded.
+
+        Args:
+            z (`torch.Tensor`): Input batch of latent vectors, with the frames of all the videos along the first axis.
+            num_frames (`int`): The number of frames of each video.
+            decode_chunk_size (`int`, *optional*):
+                The number of frames to decode at a time. Every chunk is decoded as a separate video, so smaller chunks
+                use less memory at the expense of temporal consistency. Defaults to `num_frames`, which decodes the
+                videos one by one like [`~AutoencoderKLTemporalDecoder.decode`].
+
+        Returns:
+            `Iterator[torch.Tensor]`:
+                An iterator over the chunks of decoded frames. Their concatenation along the first axis is the decoded
+                batch of frames.
+        """
+        decode_chunk_size = decode_chunk_size or num_frames
+        for i in range(0, z.shape[0], decode_chunk_size):
+            z_chunk = z[i : i + decode_chunk_size]
+            image_only_indicator = torch.zeros(1, z_chunk.shape[0], dtype=z.dtype, device=z.device)
+            yield self.decoder(z_chunk, num_frames=z_chunk.shape[0], image_only_indicator=image_only_indicator)
+
     def forward(
         self,
         sample: torch.Tensor,
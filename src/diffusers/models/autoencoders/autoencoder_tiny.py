@@ -14,7 +14,7 @@
 
 
 from dataclasses import dataclass
-from typing import Optional, Tuple, Union
+from typing import Iterator, Optional, Tuple, Union
 
 import torch
 
@@ -243,19 +243,7 @@ class AutoencoderTiny(ModelMixin, ConfigMixin):
                 tile_out.copy_(blend_mask * tile + (1 - blend_mask) * tile_out)
         return out
 
-    def _tiled_decode(self, x: torch.Tensor) -> torch.Tensor:
-        r"""Encode a batch of images using a tiled encoder.
-
-        When this option is enabled, the VAE will split the input tensor into tiles to compute encoding in several
-        steps. This is useful to keep memory use constant regardless of image size. To avoid tiling artifacts, the
-        tiles overlap and are blended together to form a smooth output.
-
-        Args:
-            x (`torch.Tensor`): Input batch of images.
-
-        Returns:
-            `torch.Tensor`: Encoded batch of images.
-        """
+    def _iter_tiled_decode(self, x: torch.Tensor) -> Iterator[Tuple[torch.Tensor, int, int]]:
         # scale of decoder output relative to input
         sf = self.spatial_scale_factor
         tile_size = self.tile_latent_min_size
@@ -274,13 +262,15 @@ class AutoencoderTiny(ModelMixin, ConfigMixin):
         )
         blend_masks = blend_masks.clamp(0, 1).to(x.device)
 
-        # output array
-        out = torch.zeros(x.shape[0], 3, x.shape[-2] * sf, x.shape[-1] * sf, device=x.device)
+        # output rows covered by the current row of tiles
+        strip = torch.zeros(x.shape[0], 3, tile_size * sf, x.shape[-1] * sf, device=x.device)
         for i in ti:
+            # the output rows above the next row of tiles are final once the current row of tiles is blended
+            rows = traverse_size * sf if i + traverse_size < x.shape[-2] else min(tile_size, x.shape[-2] - i) * sf
             for j in tj:
                 tile_in = x[..., i : i + tile_size, j : j + tile_size]
                 # tile result
-                tile_out = out[..., i * sf : (i + tile_size) * sf, j * sf : (j + tile_size) * sf]
+                tile_out = strip[..., : tile_in.shape[-2] * sf, j * sf : (j + tile_size) * sf]
                 tile = self.decoder(tile_in)
                 h, w = tile.shape[-2], tile.shape[-1]
                 # blend tile result into output
@@ -288,8 +278,55 @@ class AutoencoderTiny(ModelMixin, ConfigMixin):
                 blend_mask_j = torch.ones_like(blend_masks[1]) if j == 0 else blend_masks[1]
                 blend_mask = (blend_mask_i * blend_mask_j)[..., :h, :w]
                 tile_out.copy_(blend_mask * tile + (1 - blend_mask) * tile_out)
+                # and so are the output columns left of the next tile
+                columns = traverse_size * sf if j + traverse_size < x.shape[-1] else w
+                yield strip[..., :rows, j * sf : j * sf + columns], i * sf, j * sf
+
+            # the overlap with the next row of tiles is moved to the top of a new strip
+            next_strip = torch.zeros_like(strip)
+            next_strip[..., : strip.shape[-2] - rows, :] = strip[..., rows:, :]
+            strip = next_strip
+
+    def _tiled_decode(self, x: torch.Tensor) -> torch.Tensor:
+        r"""Encode a batch of images using a tiled encoder.
+
+        When this option is enabled, the VAE will split the input tensor into tiles to compute encoding in several
+        steps. This is useful to keep memory use constant regardless of image size. To avoid tiling artifacts, the
+        tiles overlap and are blended together to form a smooth output.
+
+        Args:
+            x (`torch.Tensor`): Input batch of images.
+
+        Returns:
+            `torch.Tensor`: Encoded batch of images.
+        """
+        sf = self.spatial_scale_factor
+
+        # output array
+        out = torch.zeros(x.shape[0], 3, x.shape[-2] * sf, x.shape[-1] * sf, device=x.device)
+        for tile, i, j in self._iter_tiled_decode(x):
+            out[..., i : i + tile.shape[-2], j : j + tile.shape[-1]] = tile
         return out
 
+    @apply_forward_hook
+    def decode_tiles_iter(self, x: torch.Tensor) -> Iterator[Tuple[torch.Tensor, int, int]]:
+        r"""
+        Decode a batch of latents tile by tile, without assembling the decoded images.
+
+        The tiles are decoded and blended like with tiling enabled, but every part of the output is yielded as soon as
+        no later tile overlaps it, so it can be written to disk or post-processed right away. Only the output rows
+        covered by one row of tiles are kept in memory, whatever the height of the decoded images.
+
+        Args:
+            x (`torch.Tensor`): Input batch of latents.
+
+        Returns:
+            `Iterator[Tuple[torch.Tensor, int, int]]`:
+                An iterator over the decoded tiles, in raster order, with the coordinates (row, column) of their
+                top-left pixel in the decoded images.
+        """
+        return self._iter_tiled_decode(x)
+
     @apply_forward_hook
     def encode(self, x: torch.Tensor, return_dict: bool = True) -> Union[AutoencoderTinyOutput, Tuple[torch.Tensor]]:
         if self.use_slicing and x.shape[0] > 1:
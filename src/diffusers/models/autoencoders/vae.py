@@ -11,8 +11,10 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import hashlib
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Hashable, Optional, Tuple
 
 import numpy as np
 import torch
@@ -820,6 +822,48 @@ class DiagonalGaussianDistribution(object):
         return self.mean
 
 
+class VaeEncodeCache:
+    r"""
+    Bounded cache of the posterior parameters of encoded images, with a least recently used eviction policy. Created by
+    [`~AutoencoderKL.enable_encode_cache`].
+
+    Args:
+        max_size (`int`, *optional*, defaults to 8): The maximum number of encoded batches to keep.
+    """
+
+    def __init__(self, max_size: int = 8):
+        if max_size < 1:
+            raise ValueError(f"The maximum size of the encode cache has to be positive, but is {max_size}.")
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def hash_tensor(tensor: torch.Tensor) -> str:
+        r"""Returns a hash of the shape, dtype and content of `tensor`."""
+        data = tensor.detach().contiguous().flatten().view(torch.uint8).cpu().numpy()
+        digest = hashlib.sha256(data.tobytes())
+        digest.update(f"{tuple(tensor.shape)}{tensor.dtype}".encode())
+        return digest.hexdigest()
+
+    def get(self, key: Hashable) -> Optional[torch.Tensor]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: torch.Tensor) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class EncoderTiny(nn.Module):
     r"""
     The `EncoderTiny` layer is a simpler version of the `Encoder` layer.
@@ -0,0 +1,308 @@
+# Copyright 2024 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Context (sequence) parallelism for transformers with joint text and image/video attention.
+
+The text and image tokens are split along the sequence dimension across the ranks of a `torch.distributed` process
+group. Every layer of the supported transformers is token-wise except the attention, so each rank only runs the
+projections, normalizations and feed-forwards on its own tokens. The attention over the full sequence is computed
+with either:
+
+- ring attention: the key/value shards are passed around the ranks in a ring and the partial attention outputs are
+  merged with their log-sum-exp, so no rank ever holds the full keys and values.
+- Ulysses attention: an all-to-all exchanges the sequence shards of all the heads for all the tokens of a subset of
+  the heads, the attention is computed locally and a second all-to-all scatters the tokens back.
+
+The attention is invariant to the order of the keys, so the shards of the different sequences (text, image) that
+make up the attention sequence don't need to be contiguous.
+"""
+
+import itertools
+from typing import Dict, List, Optional, Set, Tuple
+
+import torch
+import torch.distributed as dist
+
+from ..utils.torch_utils import is_torch_version
+from .attention_dispatch import dispatch_attention_fn
+
+
+CONTEXT_PARALLEL_MODES = ("ring", "ulysses")
+
+
+def _shard_sizes(length: int, world_size: int) -> List[int]:
+    # sizes of `torch.tensor_split(x, world_size)`
+    return [length // world_size + (1 if rank < length % world_size else 0) for rank in range(world_size)]
+
+
+def _pad(tensor: torch.Tensor, length: int, dim: int) -> torch.Tensor:
+    # zero-pads `tensor` to `length` elements along `dim`
+    if tensor.shape[dim] == length:
+        return tensor
+    padding = list(tensor.shape)
+    padding[dim] = length - tensor.shape[dim]
+    return torch.cat([tensor, tensor.new_zeros(padding)], dim=dim)
+
+
+def _attention_with_lse(
+    query: torch.Tensor, key: torch.Tensor, value: torch.Tensor, scale: float
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    # returns the attention output and the log-sum-exp of the scores in float32
+    if query.is_cuda and is_torch_version(">=", "2.1"):
+        # the memory efficient kernel returns the log-sum-exp without materializing the scores
+        outputs = torch.ops.aten._scaled_dot_product_efficient_attention(query, key, value, None, True, scale=scale)
+        out, lse = outputs[:2]
+        # the log-sum-exp may be padded along the query length
+        return out.float(), lse[:, :, : query.shape[2], None]
+
+    # fallback, e.g. for CPU tensors with a gloo process group, that computes the full scores
+    scores = torch.matmul(query.float(), key.float().transpose(-1, -2)) * scale
+    lse = torch.logsumexp(scores, dim=-1, keepdim=True)
+    out = torch.matmul(torch.exp(scores - lse), value.float())
+    return out, lse
+
+
+def _merge_attention(
+    out: torch.Tensor, lse: torch.Tensor, block_out: torch.Tensor, block_lse: torch.Tensor
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    new_lse = torch.logaddexp(lse, block_lse)
+    out = out * torch.exp(lse - new_lse) + block_out * torch.exp(block_lse - new_lse)
+    return out, new_lse
+
+
+def ring_attention(
+    query: torch.Tensor,
+    key: torch.Tensor,
+    value: torch.Tensor,
+    kv_lengths: List[int],
+    group: Optional[dist.ProcessGroup] = None,
+    scale: Optional[float] = None,
+) -> torch.Tensor:
+    r"""
+    Attention of the local queries over the keys and values of all the ranks of `group`. The key/value shards are
+    sent to the next rank of the ring while the attention over the current shard is computed.
+
+    Args:
+        query (`torch.Tensor`): Local query of shape `(batch_size, heads, local_seq_len, head_dim)`.
+        key (`torch.Tensor`): Local key of shape `(batch_size, heads, local_seq_len, head_dim)`.
+        value (`torch.Tensor`): Local value of shape `(batch_size, heads, local_seq_len, head_dim)`.
+        kv_lengths (`List[int]`): The key/value sequence length of every rank.
+        group (`torch.distributed.ProcessGroup`, *optional*): The process group. Defaults to the default group.
+        scale (`float`, *optional*): Scaling factor of the attention scores. Defaults to `1 / sqrt(head_dim)`.
+
+    Returns:
+        `torch.Tensor`: The attention output of shape `(batch_size, heads, local_seq_len, head_dim)`.
+    """
+    world_size = dist.get_world_size(group)
+    rank = dist.get_rank(group)
+    scale = scale if scale is not None else query.shape[-1] ** -0.5
+
+    send_rank = dist.get_global_rank(group, (rank + 1) % world_size) if group is not None else (rank + 1) % world_size
+    recv_rank = dist.get_global_rank(group, (rank - 1) % world_size) if group is not None else (rank - 1) % world_size
+
+    key_value = torch.stack([key, value]).contiguous()
+    out = lse = None
+    for step in range(world_size):
+        if step < world_size - 1:
+            # shard received at this step comes from `step + 1` ranks before
+            source = (rank - step - 1) % world_size
+            next_key_value = key_value.new_empty(key_value.shape[:3] + (kv_lengths[source],) + key_value.shape[4:])
+            requests = dist.batch_isend_irecv(
+                [
+                    dist.P2POp(dist.isend, key_value, send_rank, group),
+                    dist.P2POp(dist.irecv, next_key_value, recv_rank, group),
+                ]
+            )
+
+        block_out, block_lse = _attention_with_lse(query, key_value[0], key_value[1], scale)
+        if out is None:
+            out, lse = block_out, block_lse
+        else:
+            out, lse = _merge_attention(out, lse, block_out, block_lse)
+
+        if step < world_size - 1:
+            for request in requests:
+                request.wait()
+            key_value = next_key_value
+
+    return out.to(query.dtype)
+
+
+def ulysses_attention(
+    query: torch.Tensor,
+    key: torch.Tensor,
+    value: torch.Tensor,
+    kv_lengths: List[int],
+    group: Optional[dist.ProcessGroup] = None,
+    scale: Optional[float] = None,
+) -> torch.Tensor:
+    r"""
+    Attention of the local queries over the keys and values of all the ranks of `group`, computed by exchanging the
+    sequence shards of every head with two all-to-all. The number of heads must be divisible by the world size.
+
+    Args:
+        query (`torch.Tensor`): Local query of shape `(batch_size, heads, local_seq_len, head_dim)`.
+        key (`torch.Tensor`): Local key of shape `(batch_size, heads, local_seq_len, head_dim)`.
+        value (`torch.Tensor`): Local value of shape `(batch_size, heads, local_seq_len, head_dim)`.
+        kv_lengths (`List[int]`): The sequence length of every rank.
+        group (`torch.distributed.ProcessGroup`, *optional*): The process group. Defaults to the default group.
+        scale (`float`, *optional*): Scaling factor of the attention scores. Defaults to `1 / sqrt(head_dim)`.
+
+    Returns:
+        `torch.Tensor`: The attention output of shape `(batch_size, heads, local_seq_len, head_dim)`.
+    """
+    world_size = dist.get_world_size(group)
+    rank = dist.get_rank(group)
+    heads = query.shape[1]
+    if heads % world_size != 0:
+        raise ValueError(
+            f"Ulysses attention requires the number of heads ({heads}) to be divisible by the world size ({world_size})."
+        )
+
+    # all the tensors exchanged by an all-to-all have the same shape, shorter shards are padded
+    max_length = max(kv_lengths)
+
+    # (3, batch_size, heads, local_seq_len, head_dim) -> heads / world_size heads of the full sequence
+    qkv = _pad(torch.stack([query, key, value]), max_length, dim=3)
+    send = [chunk.contiguous() for chunk in qkv.chunk(world_size, dim=2)]
+    recv = [torch.empty_like(send[0]) for _ in range(world_size)]
+    dist.all_to_all(recv, send, group=group)
+    query, key, value = torch.cat([chunk[:, :, :, :length] for chunk, length in zip(recv, kv_lengths)], dim=3)
+
+    out = dispatch_attention_fn(query, key, value, scale=scale)
+
+    # scatter the tokens back to their rank and gather all the heads
+    send = [_pad(chunk, max_length, dim=2).contiguous() for chunk in out.split(kv_lengths, dim=2)]
+    recv = [torch.empty_like(send[0]) for _ in range(world_size)]
+    dist.all_to_all(recv, send, group=group)
+    return torch.cat(recv, dim=1)[:, :, : kv_lengths[rank]]
+
+
+class ContextParallel:
+    r"""
+    Splits the sequences of a transformer across the ranks of a process group and computes the attention over the
+    full sequence. Created by [`~ModelMixin.enable_context_parallel`].
+
+    The sequence an attention layer attends over must be the concatenation (in any order) of some of the sequences
+    passed to [`~ContextParallel.prepare`] at the beginning of every forward, e.g. the text and image tokens for joint
+    attention or only the image tokens. The combination is identified by the local sequence length. When the shards of
+    different combinations have the same length on a rank, the ranks exchange their sequence lengths instead.
+
+    Args:
+        group (`torch.distributed.ProcessGroup`, *optional*):
+            The process group to split the sequences over. Defaults to the default process group.
+        mode (`str`, defaults to `"ring"`):
+            `"ring"` for ring attention or `"ulysses"` for all-to-all attention. Ulysses attention requires the number
+            of heads to be divisible by the world size.
+    """
+
+    def __init__(self, group: Optional[dist.ProcessGroup] = None, mode: str = "ring"):
+        if not dist.is_available() or not dist.is_initialized():
+            raise RuntimeError("Context parallelism requires an initialized `torch.distributed` process group.")
+        if mode not in CONTEXT_PARALLEL_MODES:
+            raise ValueError(f"`mode` has to be one of {CONTEXT_PARALLEL_MODES}, but is {mode}.")
+
+        self.group = group
+        self.mode = mode
+        self.world_size = dist.get_world_size(group)
+        self.rank = dist.get_rank(group)
+        # local sequence length -> sequence lengths of every rank of the combinations with that local length
+        self._kv_lengths: Optional[Dict[int, List[Tuple[int, ...]]]] = None
+        # combinations that can't be identified by the local sequence length on at least one rank
+        self._ambiguous_kv_lengths: Set[Tuple[int, ...]] = set()
+
+    def prepare(self, *sequence_lengths: int) -> None:
+        r"""
+        Records the (full) lengths of the sequences that are split in the current forward and concatenated for the
+        attention, e.g. the number of text and image tokens.
+        """
+        shard_sizes = [_shard_sizes(length, self.world_size) for length in sequence_lengths]
+        combinations = {
+            tuple(sum(rank_sizes) for rank_sizes in zip(*sizes))
+            for num_sequences in range(1, len(shard_sizes) + 1)
+            for sizes in itertools.combinations(shard_sizes, num_sequences)
+        }
+
+        self._kv_lengths = {}
+        for kv_lengths in combinations:
+            self._kv_lengths.setdefault(kv_lengths[self.rank], []).append(kv_lengths)
+        # e.g. the lengths 3 and 4 are split into shards of (2, 1) and (2, 2) tokens on 2 ranks, which the first rank
+        # can't tell apart. All the ranks know such combinations, so they all exchange their lengths for them.
+        self._ambiguous_kv_lengths = {
+            kv_lengths
+            for kv_lengths, other in itertools.permutations(combinations, 2)
+            if any(length == other_length for length, other_length in zip(kv_lengths, other))
+        }
+
+    def _gather_lengths(self, length: int, device: torch.device) -> List[int]:
+        # the local sequence length of every rank
+        length = torch.tensor([length], device=device)
+        lengths = [torch.empty_like(length) for _ in range(self.world_size)]
+        dist.all_gather(lengths, length, group=self.group)
+        return torch.cat(lengths).tolist()
+
+    def shard(self, tensor: torch.Tensor, dim: int = 1) -> torch.Tensor:
+        r"""
+        Returns the part of `tensor` along `dim` that belongs to this rank.
+        """
+        return tensor.tensor_split(self.world_size, dim=dim)[self.rank]
+
+    def gather(self, tensor: torch.Tensor, length: int, dim: int = 1) -> torch.Tensor:
+        r"""
+        Concatenates the shards of all the ranks of a tensor of `length` elements along `dim` split with
+        [`~ContextParallel.shard`].
+        """
+        shard_sizes = _shard_sizes(length, self.world_size)
+        tensor = _pad(tensor.movedim(dim, 0), shard_sizes[0], dim=0).contiguous()
+
+        shards = [torch.empty_like(tensor) for _ in range(self.world_size)]
+        dist.all_gather(shards, tensor, group=self.group)
+        tensor = torch.cat([shard[:size] for shard, size in zip(shards, shard_sizes)])
+        return tensor.movedim(0, dim)
+
+    def attention(
+        self,
+        query: torch.Tensor,
+        key: torch.Tensor,
+        value: torch.Tensor,
+        attn_mask: Optional[torch.Tensor] = None,
+        dropout_p: float = 0.0,
+        is_causal: bool = False,
+        scale: Optional[float] = None,
+    ) -> torch.Tensor:
+        r"""
+        Attention of the local `query` over the keys and values of all the ranks. Has the same arguments as
+        `torch.nn.functional.scaled_dot_product_attention`, but masks and dropout are not supported.
+        """
+        if attn_mask is not None or is_causal or dropout_p > 0.0:
+            raise ValueError(
+                "Context parallel attention doesn't support attention masks, causal attention or dropout."
+            )
+        if self._kv_lengths is None:
+            raise RuntimeError("`ContextParallel.prepare` has to be called before computing the attention.")
+        if key.shape[2] not in self._kv_lengths:
+            raise ValueError(
+                f"The local sequence length {key.shape[2]} doesn't match any combination of the sequences passed to "
+                "`ContextParallel.prepare`."
+            )
+
+        candidates = self._kv_lengths[key.shape[2]]
+        if len(candidates) == 1 and candidates[0] not in self._ambiguous_kv_lengths:
+            kv_lengths = list(candidates[0])
+        else:
+            kv_lengths = self._gather_lengths(key.shape[2], key.device)
+
+        if self.mode == "ring":
+            return ring_attention(query, key, value, kv_lengths, group=self.group, scale=scale)
+        return ulysses_attention(query, key, value, kv_lengths, group=self.group, scale=scale)
@@ -324,8 +324,7 @@ class FluxControlNetModel(ModelMixin, ConfigMixin, PeftAdapterMixin):
             )
             img_ids = img_ids[0]
 
-        ids = torch.cat((txt_ids, img_ids), dim=0)
-        image_rotary_emb = self.pos_embed(ids)
+        image_rotary_emb = self.pos_embed.forward_cached(txt_ids, img_ids)
 
         block_samples = ()
         for index_block, block in enumerate(self.transformer_blocks):
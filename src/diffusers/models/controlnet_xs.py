@@ -1018,6 +1018,10 @@ class UNetControlNetXSModel(ModelMixin, ConfigMixin):
         if self.original_attn_processors is not None:
             self.set_attn_processor(self.original_attn_processors)
 
+        for module in self.modules():
+            if isinstance(module, Attention):
+                module.unfuse_projections()
+
     def forward(
         self,
         sample: Tensor,
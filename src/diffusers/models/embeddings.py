@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import math
-from typing import List, Optional, Tuple, Union
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple, Union
 
 import numpy as np
 import torch
@@ -20,6 +22,7 @@ import torch.nn.functional as F
 from torch import nn
 
 from ..utils import deprecate
+from ..utils.torch_utils import is_torch_version
 from .activations import FP32SiLU, get_activation
 from .attention_processor import Attention
 
@@ -78,13 +81,47 @@ def get_timestep_embedding(
     return emb
 
 
+_POS_EMBED_CACHE: "OrderedDict[Tuple, Any]" = OrderedDict()
+_POS_EMBED_CACHE_SIZE = 32
+
+
+def get_cached_pos_embed(fn: Callable, *args, **kwargs) -> Any:
+    r"""
+    Returns `fn(*args, **kwargs)` from a least-recently-used cache keyed by `fn` and its arguments. Used to compute the
+    positional embeddings of a given grid shape once per device instead of at every forward.
+
+    The arguments must be hashable values such as ints, floats, tuples, `torch.device` and `torch.dtype` (not tensors),
+    and the returned tensors are shared between calls, so they must not be modified in-place.
+    """
+    if is_torch_version(">=", "2.1") and torch.compiler.is_compiling():
+        return fn(*args, **kwargs)
+
+    key = (fn, args, tuple(sorted(kwargs.items())))
+    if key in _POS_EMBED_CACHE:
+        _POS_EMBED_CACHE.move_to_end(key)
+        return _POS_EMBED_CACHE[key]
+
+    pos_embed = fn(*args, **kwargs)
+    _POS_EMBED_CACHE[key] = pos_embed
+    if len(_POS_EMBED_CACHE) > _POS_EMBED_CACHE_SIZE:
+        _POS_EMBED_CACHE.popitem(last=False)
+    return pos_embed
+
+
+def _get_pos_embed_dtype(device: Optional[torch.device]) -> torch.dtype:
+    # MPS doesn't support float64
+    return torch.float32 if device is not None and torch.device(device).type == "mps" else torch.float64
+
+
 def get_3d_sincos_pos_embed(
     embed_dim: int,
     spatial_size: Union[int, Tuple[int, int]],
     temporal_size: int,
     spatial_interpolation_scale: float = 1.0,
     temporal_interpolation_scale: float = 1.0,
-) -> np.ndarray:
+    device: Optional[torch.device] = None,
+    output_type: str = "np",
+) -> Union[np.ndarray, torch.Tensor]:
     r"""
     Args:
         embed_dim (`int`):
@@ -92,6 +129,10 @@ def get_3d_sincos_pos_embed(
         temporal_size (`int`):
         spatial_interpolation_scale (`float`, defaults to 1.0):
         temporal_interpolation_scale (`float`, defaults to 1.0):
+        device (`torch.device`, *optional*):
+            The device the embeddings are computed on when `output_type="pt"`.
+        output_type (`str`, defaults to `"np"`):
+            `"np"` to compute the embeddings with NumPy, `"pt"` to compute them with PyTorch.
     """
     if embed_dim % 4 != 0:
         raise ValueError("`embed_dim` must be divisible by 4")
@@ -101,6 +142,25 @@ def get_3d_sincos_pos_embed(
     embed_dim_spatial = 3 * embed_dim // 4
     embed_dim_temporal = embed_dim // 4
 
+    if output_type == "pt":
+        # 1. Spatial
+        grid_h = torch.arange(spatial_size[1], device=device, dtype=torch.float32) / spatial_interpolation_scale
+        grid_w = torch.arange(spatial_size[0], device=device, dtype=torch.float32) / spatial_interpolation_scale
+        grid = torch.stack(torch.meshgrid(grid_w, grid_h, indexing="xy"), dim=0)  # here w goes first
+
+        grid = grid.reshape(2, 1, spatial_size[1], spatial_size[0])
+        pos_embed_spatial = get_2d_sincos_pos_embed_from_grid(embed_dim_spatial, grid, output_type="pt")
+
+        # 2. Temporal
+        grid_t = torch.arange(temporal_size, device=device, dtype=torch.float32) / temporal_interpolation_scale
+        pos_embed_temporal = get_1d_sincos_pos_embed_from_grid(embed_dim_temporal, grid_t, output_type="pt")
+
+        # 3. Concat
+        pos_embed_spatial = pos_embed_spatial[None].expand(temporal_size, -1, -1)  # [T, H*W, D // 4 * 3]
+        pos_embed_temporal = pos_embed_temporal[:, None].expand(-1, spatial_size[0] * spatial_size[1], -1)
+
+        return torch.cat([pos_embed_temporal, pos_embed_spatial], dim=-1)  # [T, H*W, D]
+
     # 1. Spatial
     grid_h = np.arange(spatial_size[1], dtype=np.float32) / spatial_interpolation_scale
     grid_w = np.arange(spatial_size[0], dtype=np.float32) / spatial_interpolation_scale
@@ -126,15 +186,36 @@ def get_3d_sincos_pos_embed(
 
 
 def get_2d_sincos_pos_embed(
-    embed_dim, grid_size, cls_token=False, extra_tokens=0, interpolation_scale=1.0, base_size=16
+    embed_dim,
+    grid_size,
+    cls_token=False,
+    extra_tokens=0,
+    interpolation_scale=1.0,
+    base_size=16,
+    device: Optional[torch.device] = None,
+    output_type: str = "np",
 ):
     """
     grid_size: int of the grid height and width return: pos_embed: [grid_size*grid_size, embed_dim] or
-    [1+grid_size*grid_size, embed_dim] (w/ or w/o cls_token)
+    [1+grid_size*grid_size, embed_dim] (w/ or w/o cls_token). With `output_type="pt"`, the embeddings are computed
+    with PyTorch on `device`.
     """
     if isinstance(grid_size, int):
         grid_size = (grid_size, grid_size)
 
+    if output_type == "pt":
+        grid_h = torch.arange(grid_size[0], device=device, dtype=torch.float32)
+        grid_h = grid_h / (grid_size[0] / base_size) / interpolation_scale
+        grid_w = torch.arange(grid_size[1], device=device, dtype=torch.float32)
+        grid_w = grid_w / (grid_size[1] / base_size) / interpolation_scale
+        grid = torch.stack(torch.meshgrid(grid_w, grid_h, indexing="xy"), dim=0)  # here w goes first
+
+        grid = grid.reshape(2, 1, grid_size[1], grid_size[0])
+        pos_embed = get_2d_sincos_pos_embed_from_grid(embed_dim, grid, output_type="pt")
+        if cls_token and extra_tokens > 0:
+            pos_embed = torch.cat([pos_embed.new_zeros(extra_tokens, embed_dim), pos_embed], dim=0)
+        return pos_embed
+
     grid_h = np.arange(grid_size[0], dtype=np.float32) / (grid_size[0] / base_size) / interpolation_scale
     grid_w = np.arange(grid_size[1], dtype=np.float32) / (grid_size[1] / base_size) / interpolation_scale
     grid = np.meshgrid(grid_w, grid_h)  # here w goes first
@@ -147,25 +228,36 @@ def get_2d_sincos_pos_embed(
     return pos_embed
 
 
-def get_2d_sincos_pos_embed_from_grid(embed_dim, grid):
+def get_2d_sincos_pos_embed_from_grid(embed_dim, grid, output_type: str = "np"):
     if embed_dim % 2 != 0:
         raise ValueError("embed_dim must be divisible by 2")
 
     # use half of dimensions to encode grid_h
-    emb_h = get_1d_sincos_pos_embed_from_grid(embed_dim // 2, grid[0])  # (H*W, D/2)
-    emb_w = get_1d_sincos_pos_embed_from_grid(embed_dim // 2, grid[1])  # (H*W, D/2)
+    emb_h = get_1d_sincos_pos_embed_from_grid(embed_dim // 2, grid[0], output_type=output_type)  # (H*W, D/2)
+    emb_w = get_1d_sincos_pos_embed_from_grid(embed_dim // 2, grid[1], output_type=output_type)  # (H*W, D/2)
+
+    if output_type == "pt":
+        return torch.cat([emb_h, emb_w], dim=1)  # (H*W, D)
 
     emb = np.concatenate([emb_h, emb_w], axis=1)  # (H*W, D)
     return emb
 
 
-def get_1d_sincos_pos_embed_from_grid(embed_dim, pos):
+def get_1d_sincos_pos_embed_from_grid(embed_dim, pos, output_type: str = "np"):
     """
     embed_dim: output dimension for each position pos: a list of positions to be encoded: size (M,) out: (M, D)
     """
     if embed_dim % 2 != 0:
         raise ValueError("embed_dim must be divisible by 2")
 
+    if output_type == "pt":
+        dtype = _get_pos_embed_dtype(pos.device)
+        omega = torch.arange(embed_dim // 2, device=pos.device, dtype=dtype) / (embed_dim / 2.0)
+        omega = 1.0 / 10000**omega  # (D/2,)
+
+        out = torch.outer(pos.reshape(-1).to(dtype), omega)  # (M, D/2), outer product
+        return torch.cat([torch.sin(out), torch.cos(out)], dim=1)  # (M, D)
+
     omega = np.arange(embed_dim // 2, dtype=np.float64)
     omega /= embed_dim / 2.0
     omega = 1.0 / 10000**omega  # (D/2,)
@@ -180,6 +272,53 @@ def get_1d_sincos_pos_embed_from_grid(embed_dim, pos):
     return emb
 
 
+def _get_2d_sincos_pos_embed_pt(
+    embed_dim: int,
+    grid_size: Tuple[int, int],
+    base_size: int,
+    interpolation_scale: float,
+    device: Optional[torch.device] = None,
+) -> torch.Tensor:
+    pos_embed = get_2d_sincos_pos_embed(
+        embed_dim,
+        grid_size,
+        base_size=base_size,
+        interpolation_scale=interpolation_scale,
+        device=device,
+        output_type="pt",
+    )
+    return pos_embed.float().unsqueeze(0)
+
+
+def _get_cogvideox_pos_embed_pt(
+    embed_dim: int,
+    spatial_size: Tuple[int, int],
+    temporal_size: int,
+    spatial_interpolation_scale: float,
+    temporal_interpolation_scale: float,
+    max_text_seq_length: int,
+    device: Optional[torch.device] = None,
+    dtype: torch.dtype = torch.float32,
+) -> torch.Tensor:
+    # positional embeddings of the video tokens, preceded by zeros for the text tokens
+    pos_embedding = get_3d_sincos_pos_embed(
+        embed_dim,
+        spatial_size,
+        temporal_size,
+        spatial_interpolation_scale,
+        temporal_interpolation_scale,
+        device=device,
+        output_type="pt",
+    )
+    pos_embedding = pos_embedding.flatten(0, 1)
+    joint_pos_embedding = torch.zeros(
+        1, max_text_seq_length + pos_embedding.shape[0], embed_dim, device=device, dtype=dtype, requires_grad=False
+    )
+    joint_pos_embedding.data[:, max_text_seq_length:].copy_(pos_embedding)
+
+    return joint_pos_embedding
+
+
 class PatchEmbed(nn.Module):
     """2D Image to Patch Embedding with support for SD3 cropping."""
 
@@ -227,10 +366,14 @@ class PatchEmbed(nn.Module):
             self.pos_embed = None
         elif pos_embed_type == "sincos":
             pos_embed = get_2d_sincos_pos_embed(
-                embed_dim, grid_size, base_size=self.base_size, interpolation_scale=self.interpolation_scale
+                embed_dim,
+                grid_size,
+                base_size=self.base_size,
+                interpolation_scale=self.interpolation_scale,
+                output_type="pt",
             )
             persistent = True if pos_embed_max_size else False
-            self.register_buffer("pos_embed", torch.from_numpy(pos_embed).float().unsqueeze(0), persistent=persistent)
+            self.register_buffer("pos_embed", pos_embed.float().unsqueeze(0), persistent=persistent)
         else:
             raise ValueError(f"Unsupported pos_embed_type: {pos_embed_type}")
 
@@ -275,13 +418,14 @@ class PatchEmbed(nn.Module):
             pos_embed = self.cropped_pos_embed(height, width)
         else:
             if self.height != height or self.width != width:
-                pos_embed = get_2d_sincos_pos_embed(
-                    embed_dim=self.pos_embed.shape[-1],
-                    grid_size=(height, width),
-                    base_size=self.base_size,
-                    interpolation_scale=self.interpolation_scale,
+                pos_embed = get_cached_pos_embed(
+                    _get_2d_sincos_pos_embed_pt,
+                    self.pos_embed.shape[-1],
+                    (height, width),
+                    self.base_size,
+                    self.interpolation_scale,
+                    latent.device,
                 )
-                pos_embed = torch.from_numpy(pos_embed).float().unsqueeze(0).to(latent.device)
             else:
                 pos_embed = self.pos_embed
 
@@ -376,26 +520,22 @@ class CogVideoXPatchEmbed(nn.Module):
             pos_embedding = self._get_positional_embeddings(sample_height, sample_width, sample_frames)
             self.register_buffer("pos_embedding", pos_embedding, persistent=persistent)
 
-    def _get_positional_embeddings(self, sample_height: int, sample_width: int, sample_frames: int) -> torch.Tensor:
+    def _get_positional_embeddings(
+        self, sample_height: int, sample_width: int, sample_frames: int, device: Optional[torch.device] = None
+    ) -> torch.Tensor:
         post_patch_height = sample_height // self.patch_size
         post_patch_width = sample_width // self.patch_size
         post_time_compression_frames = (sample_frames - 1) // self.temporal_compression_ratio + 1
-        num_patches = post_patch_height * post_patch_width * post_time_compression_frames
 
-        pos_embedding = get_3d_sincos_pos_embed(
+        return _get_cogvideox_pos_embed_pt(
             self.embed_dim,
             (post_patch_width, post_patch_height),
             post_time_compression_frames,
             self.spatial_interpolation_scale,
             self.temporal_interpolation_scale,
+            self.max_text_seq_length,
+            device,
         )
-        pos_embedding = torch.from_numpy(pos_embedding).flatten(0, 1)
-        joint_pos_embedding = torch.zeros(
-            1, self.max_text_seq_length + num_patches, self.embed_dim, requires_grad=False
-        )
-        joint_pos_embedding.data[:, self.max_text_seq_length :].copy_(pos_embedding)
-
-        return joint_pos_embedding
 
     def forward(self, text_embeds: torch.Tensor, image_embeds: torch.Tensor):
         r"""
@@ -432,8 +572,17 @@ class CogVideoXPatchEmbed(nn.Module):
                 or self.sample_width != width
                 or self.sample_frames != pre_time_compression_frames
             ):
-                pos_embedding = self._get_positional_embeddings(height, width, pre_time_compression_frames)
-                pos_embedding = pos_embedding.to(embeds.device, dtype=embeds.dtype)
+                pos_embedding = get_cached_pos_embed(
+                    _get_cogvideox_pos_embed_pt,
+                    self.embed_dim,
+                    (width // self.patch_size, height // self.patch_size),
+                    num_frames,
+                    self.spatial_interpolation_scale,
+                    self.temporal_interpolation_scale,
+                    self.max_text_seq_length,
+                    embeds.device,
+                    embeds.dtype,
+                )
             else:
                 pos_embedding = self.pos_embedding
 
@@ -463,9 +612,11 @@ class CogView3PlusPatchEmbed(nn.Module):
         # Linear projection for text embeddings
         self.text_proj = nn.Linear(text_hidden_size, hidden_size)
 
-        pos_embed = get_2d_sincos_pos_embed(hidden_size, pos_embed_max_size, base_size=pos_embed_max_size)
+        pos_embed = get_2d_sincos_pos_embed(
+            hidden_size, pos_embed_max_size, base_size=pos_embed_max_size, output_type="pt"
+        )
         pos_embed = pos_embed.reshape(pos_embed_max_size, pos_embed_max_size, hidden_size)
-        self.register_buffer("pos_embed", torch.from_numpy(pos_embed).float(), persistent=False)
+        self.register_buffer("pos_embed", pos_embed.float(), persistent=False)
 
     def forward(self, hidden_states: torch.Tensor, encoder_hidden_states: torch.Tensor) -> torch.Tensor:
         batch_size, channel, height, width = hidden_states.shape
@@ -497,7 +648,13 @@ class CogView3PlusPatchEmbed(nn.Module):
 
 
 def get_3d_rotary_pos_embed(
-    embed_dim, crops_coords, grid_size, temporal_size, theta: int = 10000, use_real: bool = True
+    embed_dim,
+    crops_coords,
+    grid_size,
+    temporal_size,
+    theta: int = 10000,
+    use_real: bool = True,
+    device: Optional[torch.device] = None,
 ) -> Union[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
     """
     RoPE for video tokens with 3D structure.
@@ -513,6 +670,8 @@ def get_3d_rotary_pos_embed(
         The size of the temporal dimension.
     theta (`float`):
         Scaling factor for frequency computation.
+    device (`torch.device`, *optional*):
+        The device the embeddings are computed on.
 
     Returns:
         `torch.Tensor`: positional embedding with shape `(temporal_size * grid_size[0] * grid_size[1], embed_dim/2)`.
@@ -521,9 +680,9 @@ def get_3d_rotary_pos_embed(
         raise ValueError(" `use_real = False` is not currently supported for get_3d_rotary_pos_embed")
     start, stop = crops_coords
     grid_size_h, grid_size_w = grid_size
-    grid_h = np.linspace(start[0], stop[0], grid_size_h, endpoint=False, dtype=np.float32)
-    grid_w = np.linspace(start[1], stop[1], grid_size_w, endpoint=False, dtype=np.float32)
-    grid_t = np.linspace(0, temporal_size, temporal_size, endpoint=False, dtype=np.float32)
+    grid_h = _linspace_no_endpoint(start[0], stop[0], grid_size_h, device=device)
+    grid_w = _linspace_no_endpoint(start[1], stop[1], grid_size_w, device=device)
+    grid_t = _linspace_no_endpoint(0, temporal_size, temporal_size, device=device)
 
     # Compute dimensions for each axis
     dim_t = embed_dim // 4
@@ -564,6 +723,12 @@ def get_3d_rotary_pos_embed(
     return cos, sin
 
 
+def _linspace_no_endpoint(start: float, stop: float, num: int, device: Optional[torch.device] = None) -> torch.Tensor:
+    # torch equivalent of `np.linspace(start, stop, num, endpoint=False, dtype=np.float32)`
+    step = (stop - start) / num
+    return (start + torch.arange(num, device=device, dtype=_get_pos_embed_dtype(device)) * step).float()
+
+
 def get_2d_rotary_pos_embed(embed_dim, crops_coords, grid_size, use_real=True):
     """
     RoPE for image tokens with 2d structure.
@@ -749,6 +914,26 @@ class FluxPosEmbed(nn.Module):
         super().__init__()
         self.theta = theta
         self.axes_dim = axes_dim
+        self._cached_ids = None
+        self._cached_freqs = None
+
+    def forward_cached(self, *ids: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        r"""
+        Same as `forward(torch.cat(ids))`, but the embeddings are only recomputed when different (or modified in-place)
+        id tensors are passed. The pipelines pass the same `txt_ids` and `img_ids` at every denoising step.
+        """
+        if is_torch_version(">=", "2.1") and torch.compiler.is_compiling():
+            return self.forward(torch.cat(ids, dim=0))
+
+        # weak references so that the cache doesn't keep the ids of a previous call alive
+        is_cached = self._cached_ids is not None and len(self._cached_ids) == len(ids)
+        is_cached = is_cached and all(
+            ref() is t and version == t._version for (ref, version), t in zip(self._cached_ids, ids)
+        )
+        if not is_cached:
+            self._cached_freqs = self.forward(torch.cat(ids, dim=0))
+            self._cached_ids = tuple((weakref.ref(t), t._version) for t in ids)
+        return self._cached_freqs
 
     def forward(self, ids: torch.Tensor) -> torch.Tensor:
         n_axes = ids.shape[-1]
@@ -129,6 +129,10 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
     config_name = CONFIG_NAME
     _automatically_saved_args = ["_diffusers_version", "_class_name", "_name_or_path"]
     _supports_gradient_checkpointing = False
+    _supports_context_parallel = False
+    _context_parallel = None
+    _supports_tensor_parallel = False
+    _tensor_parallel = None
     _keys_to_ignore_on_load_unexpected = None
     _no_split_modules = None
     _keep_in_fp32_modules = None
@@ -208,6 +212,242 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
         """
         self.set_use_npu_flash_attention(False)
 
+    def set_attention_backend(self, backend: Optional[str]) -> None:
+        r"""
+        Set the backend used to compute scaled dot product attention in all the attention layers of the model.
+
+        Args:
+            backend (`str`, *optional*):
+                The name of a backend registered with [`~models.attention_dispatch.register_attention_backend`] (for
+                example `"native"`, `"sdpa_flash"`, `"xformers"`, `"flash_attn"` or `"chunked"`), `"auto"` to
+                benchmark the available backends once per input shape and use the fastest one, or `None` to use the
+                global backend set with [`~models.attention_dispatch.set_attention_backend`].
+
+        Examples:
+
+        ```py
+        >>> from diffusers import FluxTransformer2DModel
+
+        >>> transformer = FluxTransformer2DModel.from_pretrained("black-forest-labs/FLUX.1-dev", subfolder="transformer")
+        >>> transformer.set_attention_backend("auto")
+        ```
+        """
+
+        def fn_recursive_set_attention_backend(module: torch.nn.Module):
+            if hasattr(module, "set_attention_backend"):
+                module.set_attention_backend(backend)
+
+            for child in module.children():
+                fn_recursive_set_attention_backend(child)
+
+        for module in self.children():
+            if isinstance(module, torch.nn.Module):
+                fn_recursive_set_attention_backend(module)
+
+    def enable_token_merging(
+        self,
+        ratio: float = 0.5,
+        max_downsample: int = 1,
+        sx: int = 2,
+        sy: int = 2,
+        use_rand: bool = True,
+        merge_attn: bool = True,
+        merge_crossattn: bool = False,
+        merge_mlp: bool = False,
+        seed: int = 0,
+    ) -> None:
+        r"""
+        Enable [Token Merging](https://arxiv.org/abs/2303.17604) (ToMe) in the transformer blocks of the model.
+        Similar image tokens are merged before the attention and feed-forward layers and unmerged afterwards, which
+        speeds up inference at high resolutions at a small cost in quality.
+
+        Args:
+            ratio (`float`, defaults to `0.5`):
+                The ratio of tokens to merge. Higher values are faster but degrade the quality more.
+            max_downsample (`int`, defaults to `1`):
+                Only apply token merging to the blocks whose token grid is at most `max_downsample` times smaller than
+                the (patched) latent. `1` only applies it to the highest resolution blocks. Can be `1`, `2`, `4` or
+                `8`.
+            sx (`int`, defaults to `2`):
+                The width of the windows in which a destination token is chosen.
+            sy (`int`, defaults to `2`):
+                The height of the windows in which a destination token is chosen.
+            use_rand (`bool`, defaults to `True`):
+                Whether to choose the destination tokens randomly or always use the top-left token of every window.
+            merge_attn (`bool`, defaults to `True`):
+                Whether to merge tokens for the self-attention.
+            merge_crossattn (`bool`, defaults to `False`):
+                Whether to merge tokens for the cross-attention.
+            merge_mlp (`bool`, defaults to `False`):
+                Whether to merge tokens for the feed-forward.
+            seed (`int`, defaults to `0`):
+                Seed of the generator used to choose the destination tokens.
+
+        Examples:
+
+        ```py
+        >>> from diffusers import UNet2DConditionModel
+
+        >>> unet = UNet2DConditionModel.from_pretrained(
+        ...     "stabilityai/stable-diffusion-xl-base-1.0", subfolder="unet", torch_dtype=torch.float16
+        ... )
+        >>> unet.enable_token_merging(ratio=0.5)
+        ```
+        """
+        from .token_merging import TokenMerging
+
+        self.disable_token_merging()
+
+        blocks = [module for module in self.modules() if hasattr(module, "set_token_merging")]
+        if len(blocks) == 0:
+            raise ValueError(f"{self.__class__.__name__} doesn't have any transformer block supporting token merging.")
+
+        token_merging = TokenMerging(
+            ratio=ratio,
+            max_downsample=max_downsample,
+            sx=sx,
+            sy=sy,
+            use_rand=use_rand,
+            merge_attn=merge_attn,
+            merge_crossattn=merge_crossattn,
+            merge_mlp=merge_mlp,
+            seed=seed,
+        )
+        patch_size = getattr(self.config, "patch_size", None)
+        token_merging.patch_size = patch_size if isinstance(patch_size, int) else 1
+
+        for block in blocks:
+            block.set_token_merging(token_merging)
+        self._token_merging_hook = self.register_forward_pre_hook(token_merging._pre_forward_hook, with_kwargs=True)
+
+    def disable_token_merging(self) -> None:
+        r"""
+        Disable token merging if [`~ModelMixin.enable_token_merging`] was previously called.
+        """
+        hook = getattr(self, "_token_merging_hook", None)
+        if hook is None:
+            return
+
+        hook.remove()
+        self._token_merging_hook = None
+        for module in self.modules():
+            if hasattr(module, "set_token_merging"):
+                module.set_token_merging(None)
+
+    def enable_context_parallel(self, group: Optional["torch.distributed.ProcessGroup"] = None, mode: str = "ring"):
+        r"""
+        Enable context (sequence) parallelism. The text and image/video tokens are split across the ranks of a
+        `torch.distributed` process group, every rank only processes its own tokens and the attention over the full
+        sequence is computed with ring or Ulysses attention. All the ranks have to call the model with the same inputs
+        and get the same output.
+
+        Args:
+            group (`torch.distributed.ProcessGroup`, *optional*):
+                The process group to split the sequences over. Defaults to the default process group.
+            mode (`str`, defaults to `"ring"`):
+                `"ring"` passes the keys and values around the ranks in a ring, `"ulysses"` exchanges the heads with
+                all-to-all communication and requires the number of attention heads to be divisible by the world size.
+
+        Examples:
+
+        ```py
+        >>> # torchrun --nproc_per_node=2 run_flux.py
+        >>> import torch
+        >>> import torch.distributed as dist
+        >>> from diffusers import FluxTransformer2DModel
+
+        >>> dist.init_process_group("nccl")
+        >>> torch.cuda.set_device(dist.get_rank())
+        >>> transformer = FluxTransformer2DModel.from_pretrained(
+        ...     "black-forest-labs/FLUX.1-dev", subfolder="transformer", torch_dtype=torch.bfloat16
+        ... ).to("cuda")
+        >>> transformer.enable_context_parallel(mode="ring")
+        ```
+        """
+        from .attention_processor import CONTEXT_PARALLEL_ATTENTION_PROCESSORS
+        from .context_parallel import ContextParallel
+
+        if not self._supports_context_parallel:
+            raise ValueError(f"{self.__class__.__name__} does not support context parallelism.")
+
+        attention_modules = [module for module in self.modules() if hasattr(module, "set_context_parallel")]
+        for module in attention_modules:
+            if not isinstance(module.processor, CONTEXT_PARALLEL_ATTENTION_PROCESSORS):
+                raise ValueError(
+                    f"The attention processor {module.processor.__class__.__name__} doesn't support context "
+                    f"parallelism. Supported processors: {[p.__name__ for p in CONTEXT_PARALLEL_ATTENTION_PROCESSORS]}."
+                )
+
+        context_parallel = ContextParallel(group=group, mode=mode)
+        for module in attention_modules:
+            module.set_context_parallel(context_parallel)
+        self._context_parallel = context_parallel
+
+    def disable_context_parallel(self) -> None:
+        r"""
+        Disable context parallelism if [`~ModelMixin.enable_context_parallel`] was previously called.
+        """
+        for module in self.modules():
+            if hasattr(module, "set_context_parallel"):
+                module.set_context_parallel(None)
+        self._context_parallel = None
+
+    def enable_tensor_parallel(self, group: Optional["torch.distributed.ProcessGroup"] = None) -> None:
+        r"""
+        Enable tensor parallelism. The attention heads and the hidden dimension of the feed-forwards are sharded
+        across the ranks of a `torch.distributed` process group and the outputs of the attention and feed-forward
+        layers are summed with all-reduces. Every rank only stores its share of these weights, so large models fit on
+        smaller devices. All the ranks have to call the model with the same inputs and get the same output.
+
+        The weights are sharded in place and can't be unsharded. To avoid loading the full weights on every rank,
+        pass `tensor_parallel=True` to [`~ModelMixin.from_pretrained`] instead.
+
+        Args:
+            group (`torch.distributed.ProcessGroup`, *optional*):
+                The process group to shard the model over. Defaults to the default process group.
+        """
+        from .tensor_parallel import TensorParallel, apply_tensor_parallel
+
+        if not self._supports_tensor_parallel:
+            raise ValueError(f"{self.__class__.__name__} does not support tensor parallelism.")
+        if self._tensor_parallel is not None:
+            raise ValueError(f"{self.__class__.__name__} is already sharded for tensor parallelism.")
+
+        tensor_parallel = TensorParallel(group=group)
+        apply_tensor_parallel(self, tensor_parallel)
+        self._tensor_parallel = tensor_parallel
+
+    def fuse_qkv_projections(self) -> None:
+        r"""
+        Enables fused projections. The projections of the attention layers that share an input (query, key and value
+        for self-attention, key and value for cross-attention, and the added query, key and value of joint attention)
+        and the gate and up projections of gated feed-forwards are each computed with a single matmul. The attention
+        processors that don't support fused projections keep using the separate projections.
+
+        <Tip warning={true}>
+
+        This API is 🧪 experimental.
+
+        </Tip>
+        """
+        for module in self.modules():
+            if module is not self and hasattr(module, "fuse_projections"):
+                module.fuse_projections()
+
+    def unfuse_qkv_projections(self) -> None:
+        r"""
+        Disables the fused projections if [`~ModelMixin.fuse_qkv_projections`] was previously called.
+
+        <Tip warning={true}>
+
+        This API is 🧪 experimental.
+
+        </Tip>
+        """
+        for module in self.modules():
+            if module is not self and hasattr(module, "unfuse_projections"):
+                module.unfuse_projections()
+
     def set_use_memory_efficient_attention_xformers(
         self, valid: bool, attention_op: Optional[Callable] = None
     ) -> None:
@@ -512,6 +752,13 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
                 If set to `None`, the `safetensors` weights are downloaded if they're available **and** if the
                 `safetensors` library is installed. If set to `True`, the model is forcibly loaded from `safetensors`
                 weights. If set to `False`, `safetensors` weights are not loaded.
+            tensor_parallel (`bool`, *optional*, defaults to `False`):
+                Whether to shard the model for tensor parallelism (see [`~ModelMixin.enable_tensor_parallel`]) before
+                loading the weights. Every rank only loads its share of the weights of the sharded layers. Requires
+                `low_cpu_mem_usage=True` and an initialized `torch.distributed` process group.
+            tensor_parallel_group (`torch.distributed.ProcessGroup`, *optional*):
+                The process group to shard the model over when `tensor_parallel=True`. Defaults to the default process
+                group.
 
         <Tip>
 
@@ -557,6 +804,8 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
         variant = kwargs.pop("variant", None)
         use_safetensors = kwargs.pop("use_safetensors", None)
         quantization_config = kwargs.pop("quantization_config", None)
+        tensor_parallel = kwargs.pop("tensor_parallel", False)
+        tensor_parallel_group = kwargs.pop("tensor_parallel_group", None)
 
         allow_pickle = False
         if use_safetensors is None:
@@ -622,6 +871,14 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
             elif not low_cpu_mem_usage:
                 raise ValueError("Passing along a `device_map` requires `low_cpu_mem_usage=True`")
 
+        if tensor_parallel:
+            if not low_cpu_mem_usage:
+                raise ValueError("Loading a model with `tensor_parallel=True` requires `low_cpu_mem_usage=True`.")
+            if device_map is not None or quantization_config is not None or from_flax:
+                raise ValueError(
+                    "`tensor_parallel=True` can't be combined with `device_map`, `quantization_config` or `from_flax`."
+                )
+
         if low_cpu_mem_usage:
             if device_map is not None and not is_torch_version(">=", "1.10"):
                 # The max memory utils require PyTorch >= 1.10 to have torch.cuda.mem_get_info.
@@ -820,13 +1077,16 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
                 with accelerate.init_empty_weights():
                     model = cls.from_config(config, **unused_kwargs)
 
+                if tensor_parallel:
+                    model.enable_tensor_parallel(tensor_parallel_group)
+
                 if hf_quantizer is not None:
                     hf_quantizer.preprocess_model(
                         model=model, device_map=device_map, keep_in_fp32_modules=keep_in_fp32_modules
                     )
 
                 # if device_map is None, load the state dict and move the params from meta device to the cpu
-                if device_map is None and not is_sharded:
+                if device_map is None and (not is_sharded or tensor_parallel):
                     # `torch.cuda.current_device()` is fine here when `hf_quantizer` is not None.
                     # It would error out during the `validate_environment()` call above in the absence of cuda.
                     is_quant_method_bnb = (
@@ -837,7 +1097,20 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
                     # TODO (sayakpaul,  SunMarc): remove this after model loading refactor
                     elif is_quant_method_bnb:
                         param_device = torch.cuda.current_device()
-                    state_dict = load_state_dict(model_file, variant=variant)
+                    if tensor_parallel:
+                        from .tensor_parallel import shard_state_dict
+
+                        # shard the checkpoint files one at a time to only keep one full file in memory
+                        if is_sharded:
+                            shard_files = sorted(set(sharded_metadata["weight_map"].values()))
+                            shard_files = [os.path.join(sharded_ckpt_cached_folder, f) for f in shard_files]
+                        else:
+                            shard_files = [model_file]
+                        state_dict = {}
+                        for shard_file in shard_files:
+                            state_dict.update(shard_state_dict(model, load_state_dict(shard_file, variant=variant)))
+                    else:
+                        state_dict = load_state_dict(model_file, variant=variant)
                     model._convert_deprecated_attention_blocks(state_dict)
 
                     # move the params from meta device to cpu
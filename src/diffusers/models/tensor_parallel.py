@@ -0,0 +1,216 @@
+# Copyright 2024 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tensor parallelism for diffusion transformers (Megatron-LM, https://arxiv.org/abs/1909.08053).
+
+The attention heads and the hidden dimension of the feed-forwards are split across the ranks of a `torch.distributed`
+process group. The query, key and value projections and the first projection of the feed-forwards are column
+parallel: every rank computes the outputs of its own heads or hidden channels. The output projections are row
+parallel: every rank multiplies its share of the channels with its share of the weight and the partial results are
+summed with an all-reduce. The other layers (embeddings, normalizations, final projection) are replicated, so all the
+ranks get the same output.
+"""
+
+from typing import Dict, List, Optional
+
+import torch
+import torch.distributed as dist
+import torch.nn.functional as F
+from torch import nn
+
+from .activations import GEGLU, SwiGLU
+from .attention import FeedForward
+from .attention_processor import Attention
+from .transformers.auraflow_transformer_2d import AuraFlowFeedForward
+from .transformers.transformer_flux import FluxSingleTransformerBlock
+
+
+class TensorParallel:
+    r"""
+    Process group of a tensor parallel model. Created by [`~ModelMixin.enable_tensor_parallel`].
+
+    Args:
+        group (`torch.distributed.ProcessGroup`, *optional*):
+            The process group to shard the model over. Defaults to the default process group.
+    """
+
+    def __init__(self, group: Optional[dist.ProcessGroup] = None):
+        if not dist.is_available() or not dist.is_initialized():
+            raise RuntimeError("Tensor parallelism requires an initialized `torch.distributed` process group.")
+
+        self.group = group
+        self.world_size = dist.get_world_size(group)
+        self.rank = dist.get_rank(group)
+
+    def shard(self, tensor: torch.Tensor, dim: int, segments: Optional[List[int]] = None) -> torch.Tensor:
+        r"""
+        Returns the shard of `tensor` along `dim` that belongs to this rank. If `tensor` is the concatenation of
+        several `segments` along `dim` (e.g. the hidden states and gates of a GEGLU), every segment is sharded
+        separately.
+        """
+        segments = segments or [tensor.shape[dim]]
+        for size in segments:
+            if size % self.world_size != 0:
+                raise ValueError(
+                    f"Dimension of size {size} can't be split evenly across {self.world_size} processes for tensor "
+                    "parallelism."
+                )
+        chunks = tensor.split(segments, dim=dim)
+        return torch.cat([chunk.chunk(self.world_size, dim=dim)[self.rank] for chunk in chunks], dim=dim)
+
+    def all_reduce(self, tensor: torch.Tensor) -> torch.Tensor:
+        dist.all_reduce(tensor, group=self.group)
+        return tensor
+
+
+class ColumnParallelLinear(nn.Linear):
+    r"""
+    Linear layer whose output features are sharded across the ranks. Every rank returns its share of the outputs.
+
+    Args:
+        linear (`nn.Linear`): The layer to shard.
+        tensor_parallel (`TensorParallel`): The process group to shard the layer over.
+        segments (`List[int]`, *optional*): Sizes of the concatenated outputs of `linear` that are sharded separately.
+    """
+
+    def __init__(self, linear: nn.Linear, tensor_parallel: TensorParallel, segments: Optional[List[int]] = None):
+        super().__init__(
+            linear.in_features,
+            linear.out_features // tensor_parallel.world_size,
+            bias=linear.bias is not None,
+            device="meta",
+        )
+        self.tensor_parallel = tensor_parallel
+        self.segments = segments
+        self.weight = nn.Parameter(self.shard_parameter("weight", linear.weight), linear.weight.requires_grad)
+        if linear.bias is not None:
+            self.bias = nn.Parameter(self.shard_parameter("bias", linear.bias), linear.bias.requires_grad)
+
+    def shard_parameter(self, name: str, tensor: torch.Tensor) -> torch.Tensor:
+        return self.tensor_parallel.shard(tensor.data, dim=0, segments=self.segments)
+
+
+class RowParallelLinear(nn.Linear):
+    r"""
+    Linear layer whose input features are sharded across the ranks. The partial outputs of all the ranks are summed
+    with an all-reduce, so every rank returns the full outputs.
+
+    Args:
+        linear (`nn.Linear`): The layer to shard.
+        tensor_parallel (`TensorParallel`): The process group to shard the layer over.
+        segments (`List[int]`, *optional*): Sizes of the concatenated inputs of `linear` that are sharded separately.
+    """
+
+    def __init__(self, linear: nn.Linear, tensor_parallel: TensorParallel, segments: Optional[List[int]] = None):
+        super().__init__(
+            linear.in_features // tensor_parallel.world_size,
+            linear.out_features,
+            bias=linear.bias is not None,
+            device="meta",
+        )
+        self.tensor_parallel = tensor_parallel
+        self.segments = segments
+        self.weight = nn.Parameter(self.shard_parameter("weight", linear.weight), linear.weight.requires_grad)
+        if linear.bias is not None:
+            # the bias is added once, after the all-reduce
+            self.bias = nn.Parameter(linear.bias.data, linear.bias.requires_grad)
+
+    def shard_parameter(self, name: str, tensor: torch.Tensor) -> torch.Tensor:
+        if name == "bias":
+            return tensor
+        return self.tensor_parallel.shard(tensor.data, dim=1, segments=self.segments)
+
+    def forward(self, hidden_states: torch.Tensor) -> torch.Tensor:
+        hidden_states = self.tensor_parallel.all_reduce(F.linear(hidden_states, self.weight))
+        if self.bias is not None:
+            hidden_states = hidden_states + self.bias
+        return hidden_states
+
+
+def _norm_size(norm: Optional[nn.Module]) -> Optional[int]:
+    if norm is None:
+        return None
+    if isinstance(norm, nn.LayerNorm):
+        return norm.normalized_shape[-1]
+    return norm.dim[-1]
+
+
+def _shard_attention(attn: Attention, tensor_parallel: TensorParallel) -> None:
+    world_size = tensor_parallel.world_size
+    if attn.fused_projections:
+        raise ValueError("Tensor parallelism has to be enabled before fusing the attention projections.")
+
+    head_dim = attn.inner_dim // attn.heads
+    if attn.heads % world_size != 0 or (attn.inner_kv_dim // head_dim) % world_size != 0:
+        raise ValueError(
+            f"The number of attention heads ({attn.heads}) has to be divisible by the number of processes "
+            f"({world_size}) for tensor parallelism."
+        )
+    for name in ["norm_q", "norm_k", "norm_added_q", "norm_added_k"]:
+        size = _norm_size(getattr(attn, name, None))
+        if size is not None and size != head_dim:
+            raise ValueError(f"Tensor parallelism doesn't support the `{name}` normalization across the heads.")
+
+    for name in ["to_q", "to_k", "to_v", "add_q_proj", "add_k_proj", "add_v_proj"]:
+        if getattr(attn, name, None) is not None:
+            setattr(attn, name, ColumnParallelLinear(getattr(attn, name), tensor_parallel))
+    if getattr(attn, "to_out", None) is not None:
+        attn.to_out[0] = RowParallelLinear(attn.to_out[0], tensor_parallel)
+    if getattr(attn, "to_add_out", None) is not None:
+        attn.to_add_out = RowParallelLinear(attn.to_add_out, tensor_parallel)
+
+    attn.heads //= world_size
+    attn.sliceable_head_dim = attn.heads
+    attn.inner_dim //= world_size
+    attn.inner_kv_dim //= world_size
+
+
+def apply_tensor_parallel(model: nn.Module, tensor_parallel: TensorParallel) -> None:
+    r"""
+    Shards the attention layers and feed-forwards of `model` across the ranks of `tensor_parallel`. Works on models
+    with real weights and on models with empty weights on the meta device (before loading a checkpoint with
+    [`shard_state_dict`]).
+    """
+    for module in list(model.modules()):
+        if isinstance(module, Attention):
+            _shard_attention(module, tensor_parallel)
+        elif isinstance(module, FeedForward):
+            act_fn = module.net[0]
+            # the projection of gated activations returns the concatenated hidden states and gates
+            segments = [act_fn.proj.out_features // 2] * 2 if isinstance(act_fn, (GEGLU, SwiGLU)) else None
+            act_fn.proj = ColumnParallelLinear(act_fn.proj, tensor_parallel, segments=segments)
+            module.net[2] = RowParallelLinear(module.net[2], tensor_parallel)
+        elif isinstance(module, AuraFlowFeedForward):
+            module.linear_1 = ColumnParallelLinear(module.linear_1, tensor_parallel)
+            module.linear_2 = ColumnParallelLinear(module.linear_2, tensor_parallel)
+            module.out_projection = RowParallelLinear(module.out_projection, tensor_parallel)
+        elif isinstance(module, FluxSingleTransformerBlock):
+            # the output projection takes the concatenated attention and MLP hidden states
+            segments = [module.proj_out.in_features - module.mlp_hidden_dim, module.mlp_hidden_dim]
+            module.proj_mlp = ColumnParallelLinear(module.proj_mlp, tensor_parallel)
+            module.proj_out = RowParallelLinear(module.proj_out, tensor_parallel, segments=segments)
+
+
+def shard_state_dict(model: nn.Module, state_dict: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
+    r"""
+    Shards the full `state_dict` of a model into the layout of `model`, which was sharded with
+    [`apply_tensor_parallel`].
+    """
+    modules = dict(model.named_modules())
+    for key in list(state_dict.keys()):
+        module_name, _, name = key.rpartition(".")
+        module = modules.get(module_name)
+        if isinstance(module, (ColumnParallelLinear, RowParallelLinear)):
+            state_dict[key] = module.shard_parameter(name, state_dict[key])
+    return state_dict
@@ -0,0 +1,241 @@
+# Copyright 2024 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Token Merging for Stable Diffusion (ToMe, https://arxiv.org/abs/2303.17604).
+
+Similar image tokens are merged with bipartite soft matching before the self-attention (and optionally the
+cross-attention and feed-forward) of a [`~models.attention.BasicTransformerBlock`], and unmerged afterwards, which
+reduces the number of tokens the attention is computed over.
+"""
+
+import math
+from typing import Callable, Optional, Tuple
+
+import torch
+
+
+def _identity(x: torch.Tensor, mode: Optional[str] = None) -> torch.Tensor:
+    return x
+
+
+def bipartite_soft_matching_random2d(
+    metric: torch.Tensor,
+    width: int,
+    height: int,
+    stride_x: int,
+    stride_y: int,
+    num_merged: int,
+    use_rand: bool = True,
+    generator: Optional[torch.Generator] = None,
+) -> Tuple[Callable, Callable]:
+    r"""
+    Partitions the tokens into a destination set, with one randomly chosen token in every `stride_y x stride_x`
+    window of the `height x width` grid, and a source set with the remaining tokens. The `num_merged` source tokens
+    that are the most similar to a destination token are merged into it.
+
+    Args:
+        metric (`torch.Tensor`): Tokens of shape `(batch_size, height * width, channels)` used to compute similarities.
+        width (`int`): The width of the token grid.
+        height (`int`): The height of the token grid.
+        stride_x (`int`): The width of the windows destination tokens are chosen in.
+        stride_y (`int`): The height of the windows destination tokens are chosen in.
+        num_merged (`int`): The number of tokens to remove by merging.
+        use_rand (`bool`, defaults to `True`):
+            Whether to choose the destination token of every window randomly or always use the top-left one.
+        generator (`torch.Generator`, *optional*): CPU generator used to choose the destination tokens.
+
+    Returns:
+        `Tuple[Callable, Callable]`: The `merge` function, which maps `(batch_size, height * width, channels)` tensors
+        to `(batch_size, height * width - num_merged, channels)`, and the `unmerge` function that reverses it.
+    """
+    batch_size, num_tokens, _ = metric.shape
+
+    if num_merged <= 0:
+        return _identity, _identity
+
+    with torch.no_grad():
+        height_windows, width_windows = height // stride_y, width // stride_x
+
+        # one destination token per window, marked with -1
+        if use_rand:
+            rand_idx = torch.randint(stride_y * stride_x, size=(height_windows, width_windows, 1), generator=generator)
+            rand_idx = rand_idx.to(metric.device)
+        else:
+            rand_idx = torch.zeros(height_windows, width_windows, 1, device=metric.device, dtype=torch.int64)
+
+        idx_buffer_view = torch.zeros(
+            height_windows, width_windows, stride_y * stride_x, device=metric.device, dtype=torch.int64
+        )
+        idx_buffer_view.scatter_(dim=2, index=rand_idx, src=-torch.ones_like(rand_idx))
+        idx_buffer_view = idx_buffer_view.view(height_windows, width_windows, stride_y, stride_x).transpose(1, 2)
+        idx_buffer_view = idx_buffer_view.reshape(height_windows * stride_y, width_windows * stride_x)
+
+        # tokens outside of the windows when the grid is not divisible by the strides are always sources
+        if height_windows * stride_y < height or width_windows * stride_x < width:
+            idx_buffer = torch.zeros(height, width, device=metric.device, dtype=torch.int64)
+            idx_buffer[: height_windows * stride_y, : width_windows * stride_x] = idx_buffer_view
+        else:
+            idx_buffer = idx_buffer_view
+
+        # destination tokens (-1) are sorted first
+        rand_idx = idx_buffer.reshape(1, -1, 1).argsort(dim=1)
+        num_dst = height_windows * width_windows
+        a_idx = rand_idx[:, num_dst:, :]
+        b_idx = rand_idx[:, :num_dst, :]
+
+        def split(x):
+            channels = x.shape[-1]
+            src = torch.gather(x, dim=1, index=a_idx.expand(batch_size, num_tokens - num_dst, channels))
+            dst = torch.gather(x, dim=1, index=b_idx.expand(batch_size, num_dst, channels))
+            return src, dst
+
+        metric = metric / metric.norm(dim=-1, keepdim=True)
+        a, b = split(metric)
+        scores = a @ b.transpose(-1, -2)
+
+        num_merged = min(a.shape[1], num_merged)
+
+        node_max, node_idx = scores.max(dim=-1)
+        edge_idx = node_max.argsort(dim=-1, descending=True)[..., None]
+
+        unm_idx = edge_idx[:, num_merged:, :]  # unmerged source tokens
+        src_idx = edge_idx[:, :num_merged, :]  # merged source tokens
+        dst_idx = torch.gather(node_idx[..., None], dim=1, index=src_idx)
+
+    def merge(x: torch.Tensor, mode: str = "mean") -> torch.Tensor:
+        src, dst = split(x)
+        n, t1, c = src.shape
+
+        unm = torch.gather(src, dim=1, index=unm_idx.expand(n, t1 - num_merged, c))
+        src = torch.gather(src, dim=1, index=src_idx.expand(n, num_merged, c))
+        dst = dst.scatter_reduce(1, dst_idx.expand(n, num_merged, c), src, reduce=mode)
+
+        return torch.cat([unm, dst], dim=1)
+
+    def unmerge(x: torch.Tensor) -> torch.Tensor:
+        unm_len = unm_idx.shape[1]
+        unm, dst = x[:, :unm_len, :], x[:, unm_len:, :]
+        _, _, c = unm.shape
+
+        src = torch.gather(dst, dim=1, index=dst_idx.expand(batch_size, num_merged, c))
+
+        out = torch.zeros(batch_size, num_tokens, c, device=x.device, dtype=x.dtype)
+        out.scatter_(dim=1, index=b_idx.expand(batch_size, num_dst, c), src=dst)
+        unm_positions = torch.gather(a_idx.expand(batch_size, a_idx.shape[1], 1), dim=1, index=unm_idx)
+        out.scatter_(dim=1, index=unm_positions.expand(batch_size, unm_len, c), src=unm)
+        src_positions = torch.gather(a_idx.expand(batch_size, a_idx.shape[1], 1), dim=1, index=src_idx)
+        out.scatter_(dim=1, index=src_positions.expand(batch_size, num_merged, c), src=src)
+
+        return out
+
+    return merge, unmerge
+
+
+class TokenMerging:
+    r"""
+    Settings and per-forward state of token merging shared by all the transformer blocks of a model. Created by
+    [`~ModelMixin.enable_token_merging`].
+
+    Args:
+        ratio (`float`, defaults to `0.5`):
+            The ratio of tokens to merge. `0.5` removes half of the tokens.
+        max_downsample (`int`, defaults to `1`):
+            Token merging is only applied to blocks whose token grid is at most `max_downsample` times smaller than the
+            (patched) latent. `1` only applies it to the highest resolution blocks, `2`, `4` or `8` to more blocks.
+        sx (`int`, defaults to `2`):
+            The width of the windows in which a destination token is chosen.
+        sy (`int`, defaults to `2`):
+            The height of the windows in which a destination token is chosen.
+        use_rand (`bool`, defaults to `True`):
+            Whether to choose the destination tokens randomly or always use the top-left token of every window.
+        merge_attn (`bool`, defaults to `True`):
+            Whether to merge tokens for the self-attention.
+        merge_crossattn (`bool`, defaults to `False`):
+            Whether to merge tokens for the cross-attention.
+        merge_mlp (`bool`, defaults to `False`):
+            Whether to merge tokens for the feed-forward.
+        seed (`int`, defaults to `0`):
+            Seed of the generator used to choose the destination tokens.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.5,
+        max_downsample: int = 1,
+        sx: int = 2,
+        sy: int = 2,
+        use_rand: bool = True,
+        merge_attn: bool = True,
+        merge_crossattn: bool = False,
+        merge_mlp: bool = False,
+        seed: int = 0,
+    ):
+        if not 0.0 <= ratio < 1.0:
+            raise ValueError(f"`ratio` has to be in [0, 1), but is {ratio}.")
+
+        self.ratio = ratio
+        self.max_downsample = max_downsample
+        self.sx = sx
+        self.sy = sy
+        self.use_rand = use_rand
+        self.merge_attn = merge_attn
+        self.merge_crossattn = merge_crossattn
+        self.merge_mlp = merge_mlp
+        self.generator = torch.Generator().manual_seed(seed)
+
+        # set by a forward pre-hook of the model at every forward
+        self.latent_size: Optional[Tuple[int, int]] = None
+        self.patch_size = 1
+
+    def compute_merge(
+        self, hidden_states: torch.Tensor
+    ) -> Tuple[Callable, Callable, Callable, Callable, Callable, Callable]:
+        r"""
+        Returns the merge and unmerge functions of the self-attention, cross-attention and feed-forward for the
+        `(batch_size, num_tokens, channels)` input of a transformer block.
+        """
+        merge = unmerge = _identity
+        num_tokens = hidden_states.shape[1]
+
+        if self.latent_size is not None and self.ratio > 0:
+            latent_height, latent_width = self.latent_size
+            downsample = int(math.ceil(math.sqrt(latent_height * latent_width / num_tokens)))
+            height = int(math.ceil(latent_height / downsample))
+            width = int(math.ceil(latent_width / downsample))
+
+            # blocks whose tokens are not a grid of the latent (e.g. with extra text tokens) are skipped
+            if downsample <= self.max_downsample * self.patch_size and height * width == num_tokens:
+                merge, unmerge = bipartite_soft_matching_random2d(
+                    hidden_states,
+                    width,
+                    height,
+                    self.sx,
+                    self.sy,
+                    int(num_tokens * self.ratio),
+                    use_rand=self.use_rand,
+                    generator=self.generator,
+                )
+
+        merge_attn, unmerge_attn = (merge, unmerge) if self.merge_attn else (_identity, _identity)
+        merge_crossattn, unmerge_crossattn = (merge, unmerge) if self.merge_crossattn else (_identity, _identity)
+        merge_mlp, unmerge_mlp = (merge, unmerge) if self.merge_mlp else (_identity, _identity)
+
+        return merge_attn, merge_crossattn, merge_mlp, unmerge_attn, unmerge_crossattn, unmerge_mlp
+
+    def _pre_forward_hook(self, module, args, kwargs):
+        sample = args[0] if len(args) > 0 else kwargs.get("sample", kwargs.get("hidden_states"))
+        if isinstance(sample, torch.Tensor) and sample.ndim >= 4:
+            self.latent_size = tuple(sample.shape[-2:])
+        else:
+            self.latent_size = None
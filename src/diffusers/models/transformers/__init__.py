@@ -1,20 +1,49 @@
-from ...utils import is_torch_available
+from typing import TYPE_CHECKING
 
+from ...utils import DIFFUSERS_SLOW_IMPORT, _LazyModule, is_torch_available
+
+
+_import_structure = {}
 
 if is_torch_available():
-    from .auraflow_transformer_2d import AuraFlowTransformer2DModel
-    from .cogvideox_transformer_3d import CogVideoXTransformer3DModel
-    from .dit_transformer_2d import DiTTransformer2DModel
-    from .dual_transformer_2d import DualTransformer2DModel
-    from .hunyuan_transformer_2d import HunyuanDiT2DModel
-    from .latte_transformer_3d import LatteTransformer3DModel
-    from .lumina_nextdit2d import LuminaNextDiT2DModel
-    from .pixart_transformer_2d import PixArtTransformer2DModel
-    from .prior_transformer import PriorTransformer
-    from .stable_audio_transformer import StableAudioDiTModel
-    from .t5_film_transformer import T5FilmDecoder
-    from .transformer_2d import Transformer2DModel
-    from .transformer_cogview3plus import CogView3PlusTransformer2DModel
-    from .transformer_flux import FluxTransformer2DModel
-    from .transformer_sd3 import SD3Transformer2DModel
-    from .transformer_temporal import TransformerTemporalModel
+    _import_structure["auraflow_transformer_2d"] = ["AuraFlowTransformer2DModel"]
+    _import_structure["cogvideox_transformer_3d"] = ["CogVideoXTransformer3DModel"]
+    _import_structure["dit_transformer_2d"] = ["DiTTransformer2DModel"]
+    _import_structure["dual_transformer_2d"] = ["DualTransformer2DModel"]
+    _import_structure["hunyuan_transformer_2d"] = ["HunyuanDiT2DModel"]
+    _import_structure["latte_transformer_3d"] = ["LatteTransformer3DModel"]
+    _import_structure["lumina_nextdit2d"] = ["LuminaNextDiT2DModel"]
+    _import_structure["pixart_transformer_2d"] = ["PixArtTransformer2DModel"]
+    _import_structure["prior_transformer"] = ["PriorTransformer"]
+    _import_structure["stable_audio_transformer"] = ["StableAudioDiTModel"]
+    _import_structure["t5_film_transformer"] = ["T5FilmDecoder"]
+    _import_structure["transformer_2d"] = ["Transformer2DModel"]
+    _import_structure["transformer_cogview3plus"] = ["CogView3PlusTransformer2DModel"]
+    _import_structure["transformer_flux"] = ["FluxTransformer2DModel"]
+    _import_structure["transformer_sd3"] = ["SD3Transformer2DModel"]
+    _import_structure["transformer_temporal"] = ["TransformerTemporalModel"]
+
+
+if TYPE_CHECKING or DIFFUSERS_SLOW_IMPORT:
+    if is_torch_available():
+        from .auraflow_transformer_2d import AuraFlowTransformer2DModel
+        from .cogvideox_transformer_3d import CogVideoXTransformer3DModel
+        from .dit_transformer_2d import DiTTransformer2DModel
+        from .dual_transformer_2d import DualTransformer2DModel
+        from .hunyuan_transformer_2d import HunyuanDiT2DModel
+        from .latte_transformer_3d import LatteTransformer3DModel
+        from .lumina_nextdit2d import LuminaNextDiT2DModel
+        from .pixart_transformer_2d import PixArtTransformer2DModel
+        from .prior_transformer import PriorTransformer
+        from .stable_audio_transformer import StableAudioDiTModel
+        from .t5_film_transformer import T5FilmDecoder
+        from .transformer_2d import Transformer2DModel
+        from .transformer_cogview3plus import CogView3PlusTransformer2DModel
+        from .transformer_flux import FluxTransformer2DModel
+        from .transformer_sd3 import SD3Transformer2DModel
+        from .transformer_temporal import TransformerTemporalModel
+
+else:
+    import sys
+
+    sys.modules[__name__] = _LazyModule(__name__, globals()["__file__"], _import_structure, module_spec=__spec__)
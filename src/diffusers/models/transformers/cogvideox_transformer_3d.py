@@ -120,8 +120,10 @@ class CogVideoXBlock(nn.Module):
         encoder_hidden_states: torch.Tensor,
         temb: torch.Tensor,
         image_rotary_emb: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
+        attention_kwargs: Optional[Dict[str, Any]] = None,
     ) -> torch.Tensor:
         text_seq_length = encoder_hidden_states.size(1)
+        attention_kwargs = attention_kwargs or {}
 
         # norm & modulate
         norm_hidden_states, norm_encoder_hidden_states, gate_msa, enc_gate_msa = self.norm1(
@@ -133,6 +135,7 @@ class CogVideoXBlock(nn.Module):
             hidden_states=norm_hidden_states,
             encoder_hidden_states=norm_encoder_hidden_states,
             image_rotary_emb=image_rotary_emb,
+            **attention_kwargs,
         )
 
         hidden_states = hidden_states + gate_msa * attn_hidden_states
@@ -208,6 +211,8 @@ class CogVideoXTransformer3DModel(ModelMixin, ConfigMixin, PeftAdapterMixin):
     """
 
     _supports_gradient_checkpointing = True
+    _supports_context_parallel = True
+    _supports_tensor_parallel = True
 
     @register_to_config
     def __init__(
@@ -405,6 +410,10 @@ class CogVideoXTransformer3DModel(ModelMixin, ConfigMixin, PeftAdapterMixin):
         if self.original_attn_processors is not None:
             self.set_attn_processor(self.original_attn_processors)
 
+        for module in self.modules():
+            if isinstance(module, Attention):
+                module.unfuse_projections()
+
     def forward(
         self,
         hidden_states: torch.Tensor,
@@ -450,6 +459,19 @@ class CogVideoXTransformer3DModel(ModelMixin, ConfigMixin, PeftAdapterMixin):
         encoder_hidden_states = hidden_states[:, :text_seq_length]
         hidden_states = hidden_states[:, text_seq_length:]
 
+        if self._context_parallel is not None:
+            # every rank only processes its shard of the text and video tokens
+            video_seq_length = hidden_states.shape[1]
+            self._context_parallel.prepare(text_seq_length, video_seq_length)
+            hidden_states = self._context_parallel.shard(hidden_states)
+            encoder_hidden_states = self._context_parallel.shard(encoder_hidden_states)
+            if image_rotary_emb is not None:
+                image_rotary_emb = tuple(self._context_parallel.shard(emb, dim=0) for emb in image_rotary_emb)
+
+        # the shape of the token grid, used by sparse attention processors
+        p = self.config.patch_size
+        attention_kwargs = {**(attention_kwargs or {}), "video_shape": (num_frames, height // p, width // p)}
+
         # 3. Transformer blocks
         for i, block in enumerate(self.transformer_blocks):
             if self.training and self.gradient_checkpointing:
@@ -467,6 +489,7 @@ class CogVideoXTransformer3DModel(ModelMixin, ConfigMixin, PeftAdapterMixin):
                     encoder_hidden_states,
                     emb,
                     image_rotary_emb,
+                    attention_kwargs,
                     **ckpt_kwargs,
                 )
             else:
@@ -475,6 +498,7 @@ class CogVideoXTransformer3DModel(ModelMixin, ConfigMixin, PeftAdapterMixin):
                     encoder_hidden_states=encoder_hidden_states,
                     temb=emb,
                     image_rotary_emb=image_rotary_emb,
+                    attention_kwargs=attention_kwargs,
                 )
 
         if not self.config.use_rotary_positional_embeddings:
@@ -484,7 +508,10 @@ class CogVideoXTransformer3DModel(ModelMixin, ConfigMixin, PeftAdapterMixin):
             # CogVideoX-5B
             hidden_states = torch.cat([encoder_hidden_states, hidden_states], dim=1)
             hidden_states = self.norm_final(hidden_states)
-            hidden_states = hidden_states[:, text_seq_length:]
+            hidden_states = hidden_states[:, encoder_hidden_states.shape[1] :]
+
+        if self._context_parallel is not None:
+            hidden_states = self._context_parallel.gather(hidden_states, video_seq_length)
 
         # 4. Final block
         hidden_states = self.norm_out(hidden_states, temb=emb)
@@ -357,6 +357,10 @@ class HunyuanDiT2DModel(ModelMixin, ConfigMixin):
         if self.original_attn_processors is not None:
             self.set_attn_processor(self.original_attn_processors)
 
+        for module in self.modules():
+            if isinstance(module, Attention):
+                module.unfuse_projections()
+
     @property
     # Copied from diffusers.models.unets.unet_2d_condition.UNet2DConditionModel.attn_processors
     def attn_processors(self) -> Dict[str, AttentionProcessor]:
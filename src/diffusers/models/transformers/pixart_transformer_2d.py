@@ -295,6 +295,10 @@ class PixArtTransformer2DModel(ModelMixin, ConfigMixin):
         if self.original_attn_processors is not None:
             self.set_attn_processor(self.original_attn_processors)
 
+        for module in self.modules():
+            if isinstance(module, Attention):
+                module.unfuse_projections()
+
     def forward(
         self,
         hidden_states: torch.Tensor,
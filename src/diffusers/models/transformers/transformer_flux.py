@@ -226,6 +226,8 @@ class FluxTransformer2DModel(ModelMixin, ConfigMixin, PeftAdapterMixin, FromOrig
     """
 
     _supports_gradient_checkpointing = True
+    _supports_context_parallel = True
+    _supports_tensor_parallel = True
     _no_split_modules = ["FluxTransformerBlock", "FluxSingleTransformerBlock"]
 
     @register_to_config
@@ -385,6 +387,10 @@ class FluxTransformer2DModel(ModelMixin, ConfigMixin, PeftAdapterMixin, FromOrig
         if self.original_attn_processors is not None:
             self.set_attn_processor(self.original_attn_processors)
 
+        for module in self.modules():
+            if isinstance(module, Attention):
+                module.unfuse_projections()
+
     def _set_gradient_checkpointing(self, module, value=False):
         if hasattr(module, "gradient_checkpointing"):
             module.gradient_checkpointing = value
@@ -471,8 +477,30 @@ class FluxTransformer2DModel(ModelMixin, ConfigMixin, PeftAdapterMixin, FromOrig
             )
             img_ids = img_ids[0]
 
-        ids = torch.cat((txt_ids, img_ids), dim=0)
-        image_rotary_emb = self.pos_embed(ids)
+        image_rotary_emb = self.pos_embed.forward_cached(txt_ids, img_ids)
+
+        if self._context_parallel is not None:
+            # every rank only processes its shard of the text and image tokens
+            context_parallel = self._context_parallel
+            text_seq_length, image_seq_length = encoder_hidden_states.shape[1], hidden_states.shape[1]
+            context_parallel.prepare(text_seq_length, image_seq_length)
+            image_rotary_emb = tuple(
+                torch.cat(
+                    [
+                        context_parallel.shard(emb[:text_seq_length], dim=0),
+                        context_parallel.shard(emb[text_seq_length:], dim=0),
+                    ]
+                )
+                for emb in image_rotary_emb
+            )
+            hidden_states = context_parallel.shard(hidden_states)
+            encoder_hidden_states = context_parallel.shard(encoder_hidden_states)
+            if controlnet_block_samples is not None:
+                controlnet_block_samples = [context_parallel.shard(sample) for sample in controlnet_block_samples]
+            if controlnet_single_block_samples is not None:
+                controlnet_single_block_samples = [
+                    context_parallel.shard(sample) for sample in controlnet_single_block_samples
+                ]
 
         for index_block, block in enumerate(self.transformer_blocks):
             if self.training and self.gradient_checkpointing:
@@ -559,6 +587,9 @@ class FluxTransformer2DModel(ModelMixin, ConfigMixin, PeftAdapterMixin, FromOrig
 
         hidden_states = hidden_states[:, encoder_hidden_states.shape[1] :, ...]
 
+        if self._context_parallel is not None:
+            hidden_states = self._context_parallel.gather(hidden_states, image_seq_length)
+
         hidden_states = self.norm_out(hidden_states, temb)
         output = self.proj_out(hidden_states)
 
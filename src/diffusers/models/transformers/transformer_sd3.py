@@ -54,6 +54,8 @@ class SD3Transformer2DModel(ModelMixin, ConfigMixin, PeftAdapterMixin, FromOrigi
     """
 
     _supports_gradient_checkpointing = True
+    _supports_context_parallel = True
+    _supports_tensor_parallel = True
 
     @register_to_config
     def __init__(
@@ -255,6 +257,10 @@ class SD3Transformer2DModel(ModelMixin, ConfigMixin, PeftAdapterMixin, FromOrigi
         if self.original_attn_processors is not None:
             self.set_attn_processor(self.original_attn_processors)
 
+        for module in self.modules():
+            if isinstance(module, Attention):
+                module.unfuse_projections()
+
     def _set_gradient_checkpointing(self, module, value=False):
         if hasattr(module, "gradient_checkpointing"):
             module.gradient_checkpointing = value
@@ -316,6 +322,17 @@ class SD3Transformer2DModel(ModelMixin, ConfigMixin, PeftAdapterMixin, FromOrigi
         temb = self.time_text_embed(timestep, pooled_projections)
         encoder_hidden_states = self.context_embedder(encoder_hidden_states)
 
+        if self._context_parallel is not None:
+            # every rank only processes its shard of the image and text tokens
+            image_seq_length = hidden_states.shape[1]
+            self._context_parallel.prepare(image_seq_length, encoder_hidden_states.shape[1])
+            hidden_states = self._context_parallel.shard(hidden_states)
+            encoder_hidden_states = self._context_parallel.shard(encoder_hidden_states)
+            if block_controlnet_hidden_states is not None:
+                block_controlnet_hidden_states = [
+                    self._context_parallel.shard(sample) for sample in block_controlnet_hidden_states
+                ]
+
         for index_block, block in enumerate(self.transformer_blocks):
             if self.training and self.gradient_checkpointing:
 
@@ -347,6 +364,9 @@ class SD3Transformer2DModel(ModelMixin, ConfigMixin, PeftAdapterMixin, FromOrigi
                 interval_control = len(self.transformer_blocks) // len(block_controlnet_hidden_states)
                 hidden_states = hidden_states + block_controlnet_hidden_states[index_block // interval_control]
 
+        if self._context_parallel is not None:
+            hidden_states = self._context_parallel.gather(hidden_states, image_seq_length)
+
         hidden_states = self.norm_out(hidden_states, temb)
         hidden_states = self.proj_out(hidden_states)
 
@@ -1,18 +1,43 @@
-from ...utils import is_flax_available, is_torch_available
+from typing import TYPE_CHECKING
 
+from ...utils import DIFFUSERS_SLOW_IMPORT, _LazyModule, is_flax_available, is_torch_available
 
-if is_torch_available():
-    from .unet_1d import UNet1DModel
-    from .unet_2d import UNet2DModel
-    from .unet_2d_condition import UNet2DConditionModel
-    from .unet_3d_condition import UNet3DConditionModel
-    from .unet_i2vgen_xl import I2VGenXLUNet
-    from .unet_kandinsky3 import Kandinsky3UNet
-    from .unet_motion_model import MotionAdapter, UNetMotionModel
-    from .unet_spatio_temporal_condition import UNetSpatioTemporalConditionModel
-    from .unet_stable_cascade import StableCascadeUNet
-    from .uvit_2d import UVit2DModel
 
+_import_structure = {}
+
+if is_torch_available():
+    _import_structure["unet_1d"] = ["UNet1DModel"]
+    _import_structure["unet_2d"] = ["UNet2DModel"]
+    _import_structure["unet_2d_condition"] = ["UNet2DConditionModel"]
+    _import_structure["unet_3d_condition"] = ["UNet3DConditionModel"]
+    _import_structure["unet_i2vgen_xl"] = ["I2VGenXLUNet"]
+    _import_structure["unet_kandinsky3"] = ["Kandinsky3UNet"]
+    _import_structure["unet_motion_model"] = ["MotionAdapter", "UNetMotionModel"]
+    _import_structure["unet_spatio_temporal_condition"] = ["UNetSpatioTemporalConditionModel"]
+    _import_structure["unet_stable_cascade"] = ["StableCascadeUNet"]
+    _import_structure["uvit_2d"] = ["UVit2DModel"]
 
 if is_flax_available():
-    from .unet_2d_condition_flax import FlaxUNet2DConditionModel
+    _import_structure["unet_2d_condition_flax"] = ["FlaxUNet2DConditionModel"]
+
+
+if TYPE_CHECKING or DIFFUSERS_SLOW_IMPORT:
+    if is_torch_available():
+        from .unet_1d import UNet1DModel
+        from .unet_2d import UNet2DModel
+        from .unet_2d_condition import UNet2DConditionModel
+        from .unet_3d_condition import UNet3DConditionModel
+        from .unet_i2vgen_xl import I2VGenXLUNet
+        from .unet_kandinsky3 import Kandinsky3UNet
+        from .unet_motion_model import MotionAdapter, UNetMotionModel
+        from .unet_spatio_temporal_condition import UNetSpatioTemporalConditionModel
+        from .unet_stable_cascade import StableCascadeUNet
+        from .uvit_2d import UVit2DModel
+
+    if is_flax_available():
+        from .unet_2d_condition_flax import FlaxUNet2DConditionModel
+
+else:
+    import sys
+
+    sys.modules[__name__] = _LazyModule(__name__, globals()["__file__"], _import_structure, module_spec=__spec__)
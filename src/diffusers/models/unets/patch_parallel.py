@@ -0,0 +1,262 @@
+# Copyright 2024 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Displaced patch parallelism for UNets (DistriFusion, https://arxiv.org/abs/2402.19481).
+
+The latent is split along its height into one patch per rank of a `torch.distributed` process group and every rank
+runs the UNet on its own patch. The only layers that need activations of the other patches are the convolutions (the
+rows at the patch boundaries), the group normalizations (the statistics over the whole image) and the self-attention
+(the keys and values of all the tokens).
+
+Consecutive denoising steps have very similar activations, so after a few synchronous warmup steps these layers use
+the activations of the other patches from the *previous* step. The activations of the current step are exchanged
+asynchronously while the rest of the UNet runs, which hides the communication behind the computation.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import torch
+import torch.distributed as dist
+import torch.nn.functional as F
+from torch import nn
+
+from ..attention_dispatch import dispatch_attention_fn
+from ..attention_processor import Attention
+
+
+class PatchParallel:
+    r"""
+    Shared state of the patch parallel layers of a UNet. Created by [`~UNet2DConditionModel.enable_patch_parallel`].
+
+    Args:
+        group (`torch.distributed.ProcessGroup`, *optional*):
+            The process group to split the latent over. Defaults to the default process group.
+        num_warmup_steps (`int`, defaults to `1`):
+            The number of forwards after [`~PatchParallel.reset`] during which the activations are exchanged
+            synchronously. The following forwards use the activations of the other patches from the previous forward.
+    """
+
+    def __init__(self, group: Optional[dist.ProcessGroup] = None, num_warmup_steps: int = 1):
+        if not dist.is_available() or not dist.is_initialized():
+            raise RuntimeError("Patch parallelism requires an initialized `torch.distributed` process group.")
+        if num_warmup_steps < 1:
+            raise ValueError(f"`num_warmup_steps` has to be at least 1, but is {num_warmup_steps}.")
+
+        self.group = group
+        self.num_warmup_steps = num_warmup_steps
+        self.world_size = dist.get_world_size(group)
+        self.rank = dist.get_rank(group)
+        self.step = 0
+        # layer -> (async work, gathered activations of the previous step)
+        self._buffers: Dict[nn.Module, Tuple[Optional[dist.Work], List[torch.Tensor]]] = {}
+        self._processors: Dict[Attention, object] = {}
+
+    @property
+    def is_warmup(self) -> bool:
+        return self.step < self.num_warmup_steps
+
+    def reset(self) -> None:
+        r"""
+        Starts a new denoising loop: waits for the pending communication and drops the activations of the previous
+        steps. Has to be called before every generation.
+        """
+        for work, _ in self._buffers.values():
+            if work is not None:
+                work.wait()
+        self._buffers = {}
+        self.step = 0
+
+    def split(self, tensor: torch.Tensor) -> torch.Tensor:
+        r"""
+        Returns the patch of a `(..., height, width)` tensor that belongs to this rank.
+        """
+        if tensor.shape[-2] % self.world_size != 0:
+            raise ValueError(
+                f"The height of the latent ({tensor.shape[-2]}) has to be divisible by the number of processes "
+                f"({self.world_size})."
+            )
+        return tensor.chunk(self.world_size, dim=-2)[self.rank]
+
+    def gather(self, tensor: torch.Tensor) -> torch.Tensor:
+        r"""
+        Concatenates the patches of all the ranks along the height.
+        """
+        patches = [torch.empty_like(tensor) for _ in range(self.world_size)]
+        dist.all_gather(patches, tensor.contiguous(), group=self.group)
+        return torch.cat(patches, dim=-2)
+
+    def exchange(self, layer: nn.Module, tensor: torch.Tensor) -> List[torch.Tensor]:
+        r"""
+        Returns the `tensor` of every rank for `layer`. During the warmup steps the tensors of the current step are
+        gathered synchronously. Afterwards, the tensors of the previous step are returned (with the fresh local
+        tensor) and the tensors of the current step are gathered asynchronously for the next step.
+        """
+        tensor = tensor.contiguous()
+        gathered = [torch.empty_like(tensor) for _ in range(self.world_size)]
+
+        if self.is_warmup:
+            dist.all_gather(gathered, tensor, group=self.group)
+            self._buffers[layer] = (None, gathered)
+            return gathered
+
+        if layer not in self._buffers:
+            raise RuntimeError("Patch parallel layers have to be called in the same order at every step.")
+        work, stale = self._buffers[layer]
+        if work is not None:
+            work.wait()
+        stale = list(stale)
+        stale[self.rank] = tensor
+
+        work = dist.all_gather(gathered, tensor, group=self.group, async_op=True)
+        self._buffers[layer] = (work, gathered)
+        return stale
+
+    def conv2d_forward(self, conv: nn.Conv2d, hidden_states: torch.Tensor) -> torch.Tensor:
+        # the rows above and below the patch are the boundary rows of the neighboring patches
+        padding_h, padding_w = conv.padding
+        boundaries = torch.cat([hidden_states[..., :padding_h, :], hidden_states[..., -padding_h:, :]], dim=-2)
+        boundaries = self.exchange(conv, boundaries)
+
+        zeros = hidden_states.new_zeros(hidden_states.shape[:-2] + (padding_h, hidden_states.shape[-1]))
+        top = boundaries[self.rank - 1][..., padding_h:, :] if self.rank > 0 else zeros
+        bottom = boundaries[self.rank + 1][..., :padding_h, :] if self.rank < self.world_size - 1 else zeros
+        hidden_states = torch.cat([top, hidden_states, bottom], dim=-2)
+
+        return F.conv2d(hidden_states, conv.weight, conv.bias, conv.stride, (0, padding_w), conv.dilation, conv.groups)
+
+    def group_norm_forward(self, norm: nn.GroupNorm, hidden_states: torch.Tensor) -> torch.Tensor:
+        # all the patches have the same size, so the statistics of the image are the means of the patch statistics
+        batch_size = hidden_states.shape[0]
+        grouped = hidden_states.reshape(batch_size, norm.num_groups, -1).float()
+        stats = torch.stack([grouped.mean(dim=-1), grouped.pow(2).mean(dim=-1)])
+        mean, mean_sq = torch.stack(self.exchange(norm, stats)).mean(dim=0)
+        var = (mean_sq - mean.pow(2)).clamp(min=0)
+
+        grouped = (grouped - mean[..., None]) * torch.rsqrt(var[..., None] + norm.eps)
+        hidden_states = grouped.reshape(hidden_states.shape).to(hidden_states.dtype)
+        if norm.affine:
+            shape = (1, -1) + (1,) * (hidden_states.ndim - 2)
+            hidden_states = hidden_states * norm.weight.view(shape) + norm.bias.view(shape)
+        return hidden_states
+
+
+class PatchParallelAttnProcessor:
+    r"""
+    Self-attention processor of the patch parallel UNet. The queries of the local tokens attend to the keys and values
+    of the tokens of all the patches (the other patches' from the previous step after the warmup).
+
+    Args:
+        patch_parallel (`PatchParallel`): The shared state of the patch parallel layers.
+    """
+
+    def __init__(self, patch_parallel: PatchParallel):
+        self.patch_parallel = patch_parallel
+
+    def __call__(
+        self,
+        attn: Attention,
+        hidden_states: torch.Tensor,
+        encoder_hidden_states: Optional[torch.Tensor] = None,
+        attention_mask: Optional[torch.Tensor] = None,
+        temb: Optional[torch.Tensor] = None,
+        *args,
+        **kwargs,
+    ) -> torch.Tensor:
+        if encoder_hidden_states is not None or attention_mask is not None:
+            raise ValueError("`PatchParallelAttnProcessor` only supports self-attention without attention mask.")
+
+        residual = hidden_states
+        if attn.spatial_norm is not None:
+            hidden_states = attn.spatial_norm(hidden_states, temb)
+
+        input_ndim = hidden_states.ndim
+
+        if input_ndim == 4:
+            batch_size, channel, height, width = hidden_states.shape
+            hidden_states = hidden_states.view(batch_size, channel, height * width).transpose(1, 2)
+
+        batch_size = hidden_states.shape[0]
+
+        if attn.group_norm is not None:
+            hidden_states = attn.group_norm(hidden_states.transpose(1, 2)).transpose(1, 2)
+
+        query = attn.to_q(hidden_states)
+        key = attn.to_k(hidden_states)
+        value = attn.to_v(hidden_states)
+
+        # the keys and values of the tokens of all the patches
+        key_value = self.patch_parallel.exchange(attn, torch.stack([key, value]))
+        key, value = torch.cat(key_value, dim=2)
+
+        inner_dim = key.shape[-1]
+        head_dim = inner_dim // attn.heads
+
+        query = query.view(batch_size, -1, attn.heads, head_dim).transpose(1, 2)
+        key = key.view(batch_size, -1, attn.heads, head_dim).transpose(1, 2)
+        value = value.view(batch_size, -1, attn.heads, head_dim).transpose(1, 2)
+
+        if attn.norm_q is not None:
+            query = attn.norm_q(query)
+        if attn.norm_k is not None:
+            key = attn.norm_k(key)
+
+        hidden_states = dispatch_attention_fn(
+            query, key, value, dropout_p=0.0, is_causal=False, backend=attn.attention_backend
+        )
+
+        hidden_states = hidden_states.transpose(1, 2).reshape(batch_size, -1, attn.heads * head_dim)
+        hidden_states = hidden_states.to(query.dtype)
+
+        # linear proj
+        hidden_states = attn.to_out[0](hidden_states)
+        # dropout
+        hidden_states = attn.to_out[1](hidden_states)
+
+        if input_ndim == 4:
+            hidden_states = hidden_states.transpose(-1, -2).reshape(batch_size, channel, height, width)
+
+        if attn.residual_connection:
+            hidden_states = hidden_states + residual
+
+        hidden_states = hidden_states / attn.rescale_output_factor
+
+        return hidden_states
+
+
+def apply_patch_parallel(model: nn.Module, patch_parallel: PatchParallel) -> None:
+    r"""
+    Makes the convolutions, group normalizations and self-attention layers of `model` exchange the activations of the
+    patches with `patch_parallel`.
+    """
+    for module in model.modules():
+        if isinstance(module, nn.Conv2d) and module.padding_mode == "zeros" and module.padding[0] > 0:
+            module.forward = lambda hidden_states, conv=module: patch_parallel.conv2d_forward(conv, hidden_states)
+        elif isinstance(module, nn.GroupNorm):
+            module.forward = lambda hidden_states, norm=module: patch_parallel.group_norm_forward(norm, hidden_states)
+        elif isinstance(module, Attention) and not module.is_cross_attention:
+            patch_parallel._processors[module] = module.processor
+            module.set_processor(PatchParallelAttnProcessor(patch_parallel))
+
+
+def remove_patch_parallel(model: nn.Module, patch_parallel: PatchParallel) -> None:
+    r"""
+    Reverts [`apply_patch_parallel`].
+    """
+    patch_parallel.reset()
+    for module in model.modules():
+        if isinstance(module, (nn.Conv2d, nn.GroupNorm)) and "forward" in module.__dict__:
+            del module.forward
+    for module, processor in patch_parallel._processors.items():
+        module.set_processor(processor)
+    patch_parallel._processors = {}
@@ -165,6 +165,7 @@ class UNet2DConditionModel(
     """
 
     _supports_gradient_checkpointing = True
+    _patch_parallel = None
     _no_split_modules = ["BasicTransformerBlock", "ResnetBlock2D", "CrossAttnUpBlock2D"]
 
     @register_to_config
@@ -869,6 +870,44 @@ class UNet2DConditionModel(
                 if hasattr(upsample_block, k) or getattr(upsample_block, k, None) is not None:
                     setattr(upsample_block, k, None)
 
+    def enable_patch_parallel(
+        self, group: Optional["torch.distributed.ProcessGroup"] = None, num_warmup_steps: int = 1
+    ) -> None:
+        r"""
+        Enables displaced patch parallelism ([DistriFusion](https://arxiv.org/abs/2402.19481)). The latent is split
+        along its height into one patch per rank of a `torch.distributed` process group and every rank denoises its own
+        patch. After `num_warmup_steps` synchronous steps, the convolutions, group normalizations and self-attention
+        layers use the activations of the other patches from the previous step, which are exchanged asynchronously.
+
+        All the ranks have to call the UNet with the same inputs and get the same output. The height of the latent has
+        to be divisible by the number of processes times `2 ** (len(block_out_channels) - 1)`, and
+        [`~models.unets.patch_parallel.PatchParallel.reset`] has to be called before every denoising loop (the
+        pipelines supporting patch parallelism do it).
+
+        Args:
+            group (`torch.distributed.ProcessGroup`, *optional*):
+                The process group to split the latent over. Defaults to the default process group.
+            num_warmup_steps (`int`, defaults to `1`):
+                The number of steps at the beginning of the denoising loop during which the activations are exchanged
+                synchronously.
+        """
+        from .patch_parallel import PatchParallel, apply_patch_parallel
+
+        self.disable_patch_parallel()
+        patch_parallel = PatchParallel(group=group, num_warmup_steps=num_warmup_steps)
+        apply_patch_parallel(self, patch_parallel)
+        self._patch_parallel = patch_parallel
+
+    def disable_patch_parallel(self) -> None:
+        """Disables patch parallelism."""
+        if self._patch_parallel is None:
+            return
+
+        from .patch_parallel import remove_patch_parallel
+
+        remove_patch_parallel(self, self._patch_parallel)
+        self._patch_parallel = None
+
     def fuse_qkv_projections(self):
         """
         Enables fused QKV projections. For self-attention modules, all projection matrices (i.e., query, key, value)
@@ -907,6 +946,10 @@ class UNet2DConditionModel(
         if self.original_attn_processors is not None:
             self.set_attn_processor(self.original_attn_processors)
 
+        for module in self.modules():
+            if isinstance(module, Attention):
+                module.unfuse_projections()
+
     def get_time_embed(
         self, sample: torch.Tensor, timestep: Union[torch.Tensor, float, int]
     ) -> Optional[torch.Tensor]:
@@ -1097,6 +1140,20 @@ class UNet2DConditionModel(
                 If `return_dict` is True, an [`~models.unets.unet_2d_condition.UNet2DConditionOutput`] is returned,
                 otherwise a `tuple` is returned where the first element is the sample tensor.
         """
+        if self._patch_parallel is not None:
+            # every rank only denoises its own patch of the latent
+            sample = self._patch_parallel.split(sample)
+            if down_block_additional_residuals is not None:
+                down_block_additional_residuals = [
+                    self._patch_parallel.split(res) for res in down_block_additional_residuals
+                ]
+            if mid_block_additional_residual is not None:
+                mid_block_additional_residual = self._patch_parallel.split(mid_block_additional_residual)
+            if down_intrablock_additional_residuals is not None:
+                down_intrablock_additional_residuals = [
+                    self._patch_parallel.split(res) for res in down_intrablock_additional_residuals
+                ]
+
         # By default samples have to be AT least a multiple of the overall upsampling factor.
         # The overall upsampling factor is equal to 2 ** (# num of upsampling layers).
         # However, the upsampling interpolation output size can be forced to fit any upsampling size
@@ -1302,6 +1359,10 @@ class UNet2DConditionModel(
             sample = self.conv_act(sample)
         sample = self.conv_out(sample)
 
+        if self._patch_parallel is not None:
+            sample = self._patch_parallel.gather(sample)
+            self._patch_parallel.step += 1
+
         if USE_PEFT_BACKEND:
             # remove `lora_scale` from each PEFT layer
             unscale_lora_layers(self, lora_scale)
@@ -54,6 +54,7 @@ else:
     _import_structure["latent_diffusion"].extend(["LDMSuperResolutionPipeline"])
     _import_structure["pipeline_utils"] = [
         "AudioPipelineOutput",
+        "CFGParallelMixin",
         "DiffusionPipeline",
         "StableDiffusionMixin",
         "ImagePipelineOutput",
@@ -435,6 +436,7 @@ if TYPE_CHECKING or DIFFUSERS_SLOW_IMPORT:
         from .latent_diffusion import LDMSuperResolutionPipeline
         from .pipeline_utils import (
             AudioPipelineOutput,
+            CFGParallelMixin,
             DiffusionPipeline,
             ImagePipelineOutput,
             StableDiffusionMixin,
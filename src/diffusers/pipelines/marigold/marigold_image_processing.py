@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Tuple, Union
 
 import numpy as np
@@ -140,6 +141,66 @@ class MarigoldImageProcessor(ConfigMixin):
 
         return image
 
+    @staticmethod
+    def get_tile_coords(
+        height: int, width: int, tile_size: int, tile_overlap: float, align: int
+    ) -> Tuple[List[Tuple[int, int]], Tuple[int, int], int]:
+        """
+        Returns the top-left corners of overlapping tiles of size at most `tile_size` that cover an image of size
+        `(height, width)`, the tile size, and the overlap of the tiles in pixels. The corners, sizes and overlaps are
+        multiples of `align`, and the last tiles of every row and column end at the border of the image.
+        """
+        if height % align != 0 or width % align != 0:
+            raise ValueError(f"Image dimensions {(height, width)} are not multiples of {align}.")
+
+        tile_h, tile_w = min(tile_size, height), min(tile_size, width)
+        overlap = int(tile_size * tile_overlap) // align * align
+        overlap = min(overlap, min(tile_h, tile_w) - align)
+
+        def starts(size, tile):
+            return list(range(0, size - tile, tile - overlap)) + [size - tile]
+
+        coords = [(y, x) for y in starts(height, tile_h) for x in starts(width, tile_w)]
+
+        return coords, (tile_h, tile_w), overlap
+
+    @staticmethod
+    def split_tiles(image: torch.Tensor, coords: List[Tuple[int, int]], tile_size: Tuple[int, int]) -> torch.Tensor:
+        """
+        Crops the tiles with top-left corners `coords` out of the images `[N,C,H,W]`, as a tensor of shape
+        `[N*T,C,TH,TW]`, where the tiles of every image are consecutive.
+        """
+        tile_h, tile_w = tile_size
+        tiles = [image[:, :, y : y + tile_h, x : x + tile_w] for y, x in coords]
+
+        return torch.stack(tiles, dim=1).flatten(0, 1)  # [N*T,C,TH,TW]
+
+    @staticmethod
+    def merge_tiles(
+        tiles: torch.Tensor, coords: List[Tuple[int, int]], size: Tuple[int, int], overlap: int
+    ) -> torch.Tensor:
+        """
+        Merges tiles of shape `[T,B,C,TH,TW]` with top-left corners `coords` into images of shape `[B,C,H,W]`. The
+        overlapping tiles are blended with weights that ramp down linearly towards the tile borders.
+        """
+        num_tiles, batch_size, num_channels, tile_h, tile_w = tiles.shape
+        if len(coords) != num_tiles:
+            raise ValueError(f"Expecting {len(coords)} tiles; got {num_tiles}.")
+
+        def ramp(n):
+            k = torch.arange(n, device=tiles.device, dtype=torch.float32)
+            return (torch.minimum(k + 1, n - k) / (overlap + 1)).clamp(max=1.0)
+
+        weight = (ramp(tile_h)[:, None] * ramp(tile_w)[None, :]).to(tiles.dtype)  # [TH,TW]
+
+        image = tiles.new_zeros(batch_size, num_channels, *size)
+        weights = tiles.new_zeros(1, 1, *size)
+        for tile, (y, x) in zip(tiles, coords):
+            image[:, :, y : y + tile_h, x : x + tile_w] += tile * weight
+            weights[:, :, y : y + tile_h, x : x + tile_w] += weight
+
+        return image / weights  # [B,C,H,W]
+
     @staticmethod
     def load_image_canonical(
         image: Union[torch.Tensor, np.ndarray, Image.Image],
@@ -163,7 +224,8 @@ class MarigoldImageProcessor(ConfigMixin):
                 raise ValueError(f"Input image dtype={image.dtype} cannot be boolean.")
             if np.issubdtype(image.dtype, np.unsignedinteger):
                 image_dtype_max = np.iinfo(image.dtype).max
-                image = image.astype(np.float32)  # because torch does not have unsigned dtypes beyond torch.uint8
+                if image.dtype != np.uint8:
+                    image = image.astype(np.float32)  # because torch does not have unsigned dtypes beyond torch.uint8
             image = MarigoldImageProcessor.numpy_to_pt(image)
 
         if torch.is_tensor(image) and not torch.is_floating_point(image) and image_dtype_max is None:
@@ -179,7 +241,8 @@ class MarigoldImageProcessor(ConfigMixin):
         if image.shape[1] != 3:
             raise ValueError(f"Input image is not 1- or 3-channel: {image.shape}.")
 
-        image = image.to(device=device, dtype=dtype)
+        # move integer images before casting them, to copy fewer bytes to the device
+        image = image.to(device=device).to(dtype=dtype)
 
         if image_dtype_max is not None:
             image = image / image_dtype_max
@@ -202,21 +265,25 @@ class MarigoldImageProcessor(ConfigMixin):
         resample_method_input: str = "bilinear",
         device: torch.device = torch.device("cpu"),
         dtype: torch.dtype = torch.float32,
+        num_workers: Optional[int] = None,
     ):
         if isinstance(image, list):
-            images = None
-            for i, img in enumerate(image):
-                img = self.load_image_canonical(img, device, dtype)  # [N,3,H,W]
-                if images is None:
-                    images = img
-                else:
-                    if images.shape[2:] != img.shape[2:]:
-                        raise ValueError(
-                            f"Input image[{i}] has incompatible dimensions {img.shape[2:]} with the previous images "
-                            f"{images.shape[2:]}"
-                        )
-                    images = torch.cat((images, img), dim=0)
-            image = images
+
+            def load(img):
+                return self.load_image_canonical(img, device, dtype)  # [N,3,H,W]
+
+            if num_workers is not None and num_workers > 1 and len(image) > 1:
+                with ThreadPoolExecutor(max_workers=min(num_workers, len(image))) as executor:
+                    images = list(executor.map(load, image))
+            else:
+                images = [load(img) for img in image]
+            for i, img in enumerate(images):
+                if images[0].shape[2:] != img.shape[2:]:
+                    raise ValueError(
+                        f"Input image[{i}] has incompatible dimensions {img.shape[2:]} with the previous images "
+                        f"{images[0].shape[2:]}"
+                    )
+            image = torch.cat(images, dim=0)
             del images
         else:
             image = self.load_image_canonical(image, device, dtype)  # [N,3,H,W]
@@ -16,6 +16,8 @@
 # More information and citation instructions are available on the
 # Marigold project website: https://marigoldmonodepth.github.io
 # --------------------------------------------------------------------------
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from functools import partial
 from typing import Any, Dict, List, Optional, Tuple, Union
@@ -199,6 +201,8 @@ class MarigoldDepthPipeline(DiffusionPipeline):
         generator: Optional[Union[torch.Generator, List[torch.Generator]]],
         output_type: str,
         output_uncertainty: bool,
+        tile_size: Optional[int] = None,
+        tile_overlap: float = 0.25,
     ) -> int:
         if num_inference_steps is None:
             raise ValueError("`num_inference_steps` is not specified and could not be resolved from the model config.")
@@ -251,6 +255,16 @@ class MarigoldDepthPipeline(DiffusionPipeline):
             if "reduction" in ensembling_kwargs and ensembling_kwargs["reduction"] not in ("mean", "median"):
                 raise ValueError("`ensembling_kwargs['reduction']` can be either `'mean'` or `'median'`.")
 
+        if tile_size is not None:
+            if tile_size <= 0 or tile_size % self.vae_scale_factor != 0:
+                raise ValueError(f"`tile_size` must be a positive multiple of {self.vae_scale_factor}.")
+            if not 0 <= tile_overlap < 1:
+                raise ValueError("`tile_overlap` must be in the range [0, 1).")
+            if latents is not None:
+                raise ValueError("`latents` cannot be used together with `tile_size`.")
+            if isinstance(generator, list):
+                raise ValueError("A list of generators cannot be used together with `tile_size`.")
+
         # image checks
         num_images = 0
         W, H = None, None
@@ -343,6 +357,8 @@ class MarigoldDepthPipeline(DiffusionPipeline):
         resample_method_output: str = "bilinear",
         batch_size: int = 1,
         ensembling_kwargs: Optional[Dict[str, Any]] = None,
+        tile_size: Optional[int] = None,
+        tile_overlap: float = 0.25,
         latents: Optional[Union[torch.Tensor, List[torch.Tensor]]] = None,
         generator: Optional[Union[torch.Generator, List[torch.Generator]]] = None,
         output_type: str = "np",
@@ -394,6 +410,16 @@ class MarigoldDepthPipeline(DiffusionPipeline):
                   tolerance is reached.
                 - max_res (`int`, *optional*, defaults to `None`): Resolution at which the alignment is performed;
                   `None` matches the `processing_resolution`.
+            tile_size (`int`, *optional*, defaults to `None`):
+                Enables the tiled high-resolution mode. The input image is additionally processed at its native
+                resolution in overlapping tiles of size `tile_size` (a multiple of the VAE scale factor, e.g. the
+                `processing_resolution`), batched together with the ensemble members. The tile predictions are aligned
+                in scale and shift to the prediction at `processing_resolution`, which provides the global context, and
+                blended into a native resolution prediction. `latents` and lists of generators are not supported in
+                this mode, and the output's `latent` field contains the latents of the tiles.
+            tile_overlap (`float`, *optional*, defaults to `0.25`):
+                Overlap of neighboring tiles, as a fraction of `tile_size`. Larger values blend the seams more smoothly
+                at the cost of more tiles.
             latents (`torch.Tensor`, or `List[torch.Tensor]`, *optional*, defaults to `None`):
                 Latent noise tensors to replace the random initialization. These can be taken from the previous
                 function call's output.
@@ -445,6 +471,8 @@ class MarigoldDepthPipeline(DiffusionPipeline):
             generator,
             output_type,
             output_uncertainty,
+            tile_size,
+            tile_overlap,
         )
 
         # 2. Prepare empty text conditioning.
@@ -468,6 +496,7 @@ class MarigoldDepthPipeline(DiffusionPipeline):
         # of `processing_resolution` resolves to the optimal value from the model config. It is a recommended mode of
         # operation and leads to the most reasonable results. Using the native image resolution or any other processing
         # resolution can lead to loss of either fine details or global context in the output predictions.
+        input_image = image
         image, padding, original_resolution = self.image_processor.preprocess(
             image, processing_resolution, resample_method_input, device, dtype
         )  # [N,3,PPH,PPW]
@@ -483,96 +512,87 @@ class MarigoldDepthPipeline(DiffusionPipeline):
         # noise. This behavior can be achieved by setting the `output_latent` argument to `True`. The latent space
         # dimensions are `(h, w)`. Encoding into latent space happens in batches of size `batch_size`.
         # Model invocation: self.vae.encoder.
-        image_latent, pred_latent = self.prepare_latents(
-            image, latents, generator, ensemble_size, batch_size
-        )  # [N*E,4,h,w], [N*E,4,h,w]
-
-        del image
-
-        batch_empty_text_embedding = self.empty_text_embedding.to(device=device, dtype=dtype).repeat(
-            batch_size, 1, 1
-        )  # [B,1024,2]
-
+        #
         # 5. Process the denoising loop. All `N * E` latents are processed sequentially in batches of size `batch_size`.
         # The unet model takes concatenated latent spaces of the input image and the predicted modality as an input, and
         # outputs noise for the predicted modality's latent space. The number of denoising diffusion steps is defined by
         # `num_inference_steps`. It is either set directly, or resolves to the optimal value specific to the loaded
         # model.
         # Model invocation: self.unet.
-        pred_latents = []
+        #
+        # 6. Decode predictions from latent into pixel space. The resulting `N * E` predictions have shape `(PPH, PPW)`,
+        # which requires slight postprocessing. Decoding into pixel space happens in batches of size `batch_size`.
+        # Model invocation: self.vae.decoder.
+        prediction, pred_latent = self.predict(
+            image, latents, generator, ensemble_size, batch_size, num_inference_steps
+        )  # [N*E,1,PPH,PPW], [N*E,4,h,w]
 
-        for i in self.progress_bar(
-            range(0, num_images * ensemble_size, batch_size), leave=True, desc="Marigold predictions..."
-        ):
-            batch_image_latent = image_latent[i : i + batch_size]  # [B,4,h,w]
-            batch_pred_latent = pred_latent[i : i + batch_size]  # [B,4,h,w]
-            effective_batch_size = batch_image_latent.shape[0]
-            text = batch_empty_text_embedding[:effective_batch_size]  # [B,2,1024]
+        del image
 
-            self.scheduler.set_timesteps(num_inference_steps, device=device)
-            for t in self.progress_bar(self.scheduler.timesteps, leave=False, desc="Diffusion steps..."):
-                batch_latent = torch.cat([batch_image_latent, batch_pred_latent], dim=1)  # [B,8,h,w]
-                noise = self.unet(batch_latent, t, encoder_hidden_states=text, return_dict=False)[0]  # [B,4,h,w]
-                batch_pred_latent = self.scheduler.step(
-                    noise, t, batch_pred_latent, generator=generator
-                ).prev_sample  # [B,4,h,w]
+        # 7. Remove padding. The output shape is (PH, PW).
+        prediction = self.image_processor.unpad_image(prediction, padding)  # [N*E,1,PH,PW]
 
-            pred_latents.append(batch_pred_latent)
+        # 7.1. In the tiled mode, the input images are also processed at their native resolution `(H, W)`, padded to
+        # `(NH, NW)`, in `T` overlapping tiles of size `(TH, TW)`. The tiles of all the images are encoded, denoised
+        # and decoded together with their ensemble members, in batches of size `batch_size`. The prediction of every
+        # tile is aligned in scale and shift to the matching crop of the prediction at the processing resolution,
+        # which carries the global context, and the aligned tiles are blended into predictions of the native
+        # resolution.
+        if tile_size is not None:
+            image, padding, _ = self.image_processor.preprocess(
+                input_image, 0, resample_method_input, device, dtype
+            )  # [N,3,NH,NW]
+            native_size = image.shape[2:]
+            coords, tile_shape, overlap = self.image_processor.get_tile_coords(
+                *native_size, tile_size, tile_overlap, self.vae_scale_factor
+            )
+            num_tiles = len(coords)
+            image = self.image_processor.split_tiles(image, coords, tile_shape)  # [N*T,3,TH,TW]
 
-        pred_latent = torch.cat(pred_latents, dim=0)  # [N*E,4,h,w]
+            tile_prediction, pred_latent = self.predict(
+                image, None, generator, ensemble_size, batch_size, num_inference_steps
+            )  # [N*T*E,1,TH,TW], [N*T*E,4,th,tw]
 
-        del (
-            pred_latents,
-            image_latent,
-            batch_empty_text_embedding,
-            batch_image_latent,
-            batch_pred_latent,
-            text,
-            batch_latent,
-            noise,
-        )
+            del image
 
-        # 6. Decode predictions from latent into pixel space. The resulting `N * E` predictions have shape `(PPH, PPW)`,
-        # which requires slight postprocessing. Decoding into pixel space happens in batches of size `batch_size`.
-        # Model invocation: self.vae.decoder.
-        prediction = torch.cat(
-            [
-                self.decode_prediction(pred_latent[i : i + batch_size])
-                for i in range(0, pred_latent.shape[0], batch_size)
-            ],
-            dim=0,
-        )  # [N*E,1,PPH,PPW]
+            reference = self.image_processor.resize_antialias(
+                prediction, original_resolution, "bilinear", is_aa=False
+            )  # [N*E,1,H,W]
+            reference, _ = self.image_processor.pad_image(reference, self.vae_scale_factor)  # [N*E,1,NH,NW]
+            reference = self.image_processor.split_tiles(reference, coords, tile_shape)  # [N*E*T,1,TH,TW]
+            reference = reference.reshape(num_images, ensemble_size, num_tiles, *tile_prediction.shape[1:])
+            reference = reference.transpose(1, 2).flatten(0, 2)  # [N*T*E,1,TH,TW]
+
+            tile_prediction = self.align_depth_tiles(
+                tile_prediction, reference, self.scale_invariant, self.shift_invariant
+            )  # [N*T*E,1,TH,TW]
+            tile_prediction = tile_prediction.reshape(num_images, num_tiles, ensemble_size, *tile_prediction.shape[1:])
+            tile_prediction = tile_prediction.transpose(0, 1).flatten(1, 2)  # [T,N*E,1,TH,TW]
+
+            prediction = self.image_processor.merge_tiles(
+                tile_prediction, coords, native_size, overlap
+            )  # [N*E,1,NH,NW]
+            prediction = self.image_processor.unpad_image(prediction, padding)  # [N*E,1,H,W]
+
+            del reference, tile_prediction
 
         if not output_latent:
             pred_latent = None
 
-        # 7. Remove padding. The output shape is (PH, PW).
-        prediction = self.image_processor.unpad_image(prediction, padding)  # [N*E,1,PH,PW]
-
-        # 8. Ensemble and compute uncertainty (when `output_uncertainty` is set). This code treats each of the `N`
-        # groups of `E` ensemble predictions independently. For each group it computes an ensembled prediction of shape
-        # `(PH, PW)` and an optional uncertainty map of the same dimensions. After computing this pair of outputs for
-        # each group independently, it stacks them respectively into batches of `N` almost final predictions and
-        # uncertainty maps.
+        # 8. Ensemble and compute uncertainty (when `output_uncertainty` is set). The `N` groups of `E` ensemble
+        # predictions are ensembled by a single call, which aligns every group independently (with its own solver)
+        # while evaluating the alignment costs of all groups in batched calls. It returns batches of `N` almost final
+        # predictions of shape `(PH, PW)` and, optionally, uncertainty maps of the same dimensions.
         uncertainty = None
         if ensemble_size > 1:
             prediction = prediction.reshape(num_images, ensemble_size, *prediction.shape[1:])  # [N,E,1,PH,PW]
-            prediction = [
-                self.ensemble_depth(
-                    prediction[i],
-                    self.scale_invariant,
-                    self.shift_invariant,
-                    output_uncertainty,
-                    **(ensembling_kwargs or {}),
-                )
-                for i in range(num_images)
-            ]  # [ [[1,1,PH,PW], [1,1,PH,PW]], ... ]
-            prediction, uncertainty = zip(*prediction)  # [[1,1,PH,PW], ... ], [[1,1,PH,PW], ... ]
-            prediction = torch.cat(prediction, dim=0)  # [N,1,PH,PW]
-            if output_uncertainty:
-                uncertainty = torch.cat(uncertainty, dim=0)  # [N,1,PH,PW]
-            else:
-                uncertainty = None
+            prediction, uncertainty = self.ensemble_depth(
+                prediction,
+                self.scale_invariant,
+                self.shift_invariant,
+                output_uncertainty,
+                **(ensembling_kwargs or {}),
+            )  # [N,1,PH,PW], [N,1,PH,PW]
 
         # 9. If `match_input_resolution` is set, the output prediction and the uncertainty are upsampled to match the
         # input resolution `(H, W)`. This step may introduce upsampling artifacts, and therefore can be disabled.
@@ -605,6 +625,60 @@ class MarigoldDepthPipeline(DiffusionPipeline):
             latent=pred_latent,
         )
 
+    def predict(
+        self,
+        image: torch.Tensor,
+        latents: Optional[torch.Tensor],
+        generator: Optional[Union[torch.Generator, List[torch.Generator]]],
+        ensemble_size: int,
+        batch_size: int,
+        num_inference_steps: int,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        device = self._execution_device
+        dtype = self.dtype
+
+        image_latent, pred_latent = self.prepare_latents(
+            image, latents, generator, ensemble_size, batch_size
+        )  # [N*E,4,h,w], [N*E,4,h,w]
+
+        batch_empty_text_embedding = self.empty_text_embedding.to(device=device, dtype=dtype).repeat(
+            batch_size, 1, 1
+        )  # [B,1024,2]
+
+        pred_latents = []
+
+        for i in self.progress_bar(
+            range(0, image_latent.shape[0], batch_size), leave=True, desc="Marigold predictions..."
+        ):
+            batch_image_latent = image_latent[i : i + batch_size]  # [B,4,h,w]
+            batch_pred_latent = pred_latent[i : i + batch_size]  # [B,4,h,w]
+            effective_batch_size = batch_image_latent.shape[0]
+            text = batch_empty_text_embedding[:effective_batch_size]  # [B,2,1024]
+
+            self.scheduler.set_timesteps(num_inference_steps, device=device)
+            for t in self.progress_bar(self.scheduler.timesteps, leave=False, desc="Diffusion steps..."):
+                batch_latent = torch.cat([batch_image_latent, batch_pred_latent], dim=1)  # [B,8,h,w]
+                noise = self.unet(batch_latent, t, encoder_hidden_states=text, return_dict=False)[0]  # [B,4,h,w]
+                batch_pred_latent = self.scheduler.step(
+                    noise, t, batch_pred_latent, generator=generator
+                ).prev_sample  # [B,4,h,w]
+
+            pred_latents.append(batch_pred_latent)
+
+        pred_latent = torch.cat(pred_latents, dim=0)  # [N*E,4,h,w]
+
+        del image_latent, batch_empty_text_embedding
+
+        prediction = torch.cat(
+            [
+                self.decode_prediction(pred_latent[i : i + batch_size])
+                for i in range(0, pred_latent.shape[0], batch_size)
+            ],
+            dim=0,
+        )  # [N*E,C,PPH,PPW]
+
+        return prediction, pred_latent
+
     def prepare_latents(
         self,
         image: torch.Tensor,
@@ -656,6 +730,58 @@ class MarigoldDepthPipeline(DiffusionPipeline):
 
         return prediction  # [B,1,H,W]
 
+    @staticmethod
+    def align_depth_tiles(
+        tiles: torch.Tensor,
+        reference: torch.Tensor,
+        scale_invariant: bool = True,
+        shift_invariant: bool = True,
+    ) -> torch.Tensor:
+        """
+        Aligns every depth tile of the `tiles` tensor with expected shape `(B, 1, TH, TW)` to the matching tile of the
+        `reference` tensor of the same shape, with a least squares fit of the scale and shift of the tile. Only the
+        degrees of freedom of the predictions are fitted; absolute predictions are returned as is.
+
+        Args:
+            tiles (`torch.Tensor`):
+                Depth tiles to align.
+            reference (`torch.Tensor`):
+                Depth tiles to align to, e.g. crops of the prediction at a lower resolution.
+            scale_invariant (`bool`, *optional*, defaults to `True`):
+                Whether to treat predictions as scale-invariant.
+            shift_invariant (`bool`, *optional*, defaults to `True`):
+                Whether to treat predictions as shift-invariant.
+
+        Returns:
+            A tensor of aligned depth tiles clipped to the unit range, of shape `(B, 1, TH, TW)`.
+        """
+        if tiles.shape != reference.shape:
+            raise ValueError(
+                f"Expecting tiles and reference of the same shape; got {tiles.shape} and {reference.shape}."
+            )
+        if not scale_invariant and not shift_invariant:
+            return tiles
+
+        x = tiles.flatten(1).to(torch.float32)  # [B,TH*TW]
+        y = reference.flatten(1).to(torch.float32)  # [B,TH*TW]
+
+        if scale_invariant and shift_invariant:
+            x_mean, y_mean = x.mean(dim=1, keepdim=True), y.mean(dim=1, keepdim=True)
+            x_centered = x - x_mean
+            var = (x_centered**2).mean(dim=1, keepdim=True)
+            scale = (x_centered * (y - y_mean)).mean(dim=1, keepdim=True) / var.clamp(min=1e-6)
+            shift = y_mean - scale * x_mean
+        elif scale_invariant:
+            scale = (x * y).mean(dim=1, keepdim=True) / (x**2).mean(dim=1, keepdim=True).clamp(min=1e-6)
+            shift = 0.0
+        else:
+            scale = 1.0
+            shift = (y - x).mean(dim=1, keepdim=True)
+
+        aligned = (x * scale + shift).clamp(0.0, 1.0)
+
+        return aligned.reshape(tiles.shape).to(tiles.dtype)  # [B,1,TH,TW]
+
     @staticmethod
     def ensemble_depth(
         depth: torch.Tensor,
@@ -677,9 +803,14 @@ class MarigoldDepthPipeline(DiffusionPipeline):
         `scale_invariant=True`). For absolute predictions (`scale_invariant=False` and `shift_invariant=False`)
         alignment is skipped and only ensembling is performed.
 
+        The ensembles of several predictions can be passed at once as a tensor of shape `(N, B, 1, H, W)`. Every
+        prediction is aligned by its own solver, but the solvers run in lockstep: the costs they request are evaluated
+        for all the predictions in a single batched call. The results are the same as when ensembling the predictions
+        one by one.
+
         Args:
             depth (`torch.Tensor`):
-                Input ensemble depth maps.
+                Input ensemble depth maps, of shape `(B, 1, H, W)` or `(N, B, 1, H, W)`.
             scale_invariant (`bool`, *optional*, defaults to `True`):
                 Whether to treat predictions as scale-invariant.
             shift_invariant (`bool`, *optional*, defaults to `True`):
@@ -700,39 +831,44 @@ class MarigoldDepthPipeline(DiffusionPipeline):
                 Resolution at which the alignment is performed; `None` matches the `processing_resolution`.
         Returns:
             A tensor of aligned and ensembled depth maps and optionally a tensor of uncertainties of the same shape:
-            `(1, 1, H, W)`.
+            `(1, 1, H, W)`, or `(N, 1, H, W)` for a batch of ensembles.
         """
-        if depth.dim() != 4 or depth.shape[1] != 1:
-            raise ValueError(f"Expecting 4D tensor of shape [B,1,H,W]; got {depth.shape}.")
+        is_batched = depth.dim() == 5
+        if not is_batched:
+            if depth.dim() != 4 or depth.shape[1] != 1:
+                raise ValueError(f"Expecting 4D tensor of shape [B,1,H,W]; got {depth.shape}.")
+            depth = depth.unsqueeze(0)
+        elif depth.shape[2] != 1:
+            raise ValueError(f"Expecting 5D tensor of shape [N,B,1,H,W]; got {depth.shape}.")
         if reduction not in ("mean", "median"):
             raise ValueError(f"Unrecognized reduction method: {reduction}.")
         if not scale_invariant and shift_invariant:
             raise ValueError("Pure shift-invariant ensembling is not supported.")
 
-        def init_param(depth: torch.Tensor):
-            init_min = depth.reshape(ensemble_size, -1).min(dim=1).values
-            init_max = depth.reshape(ensemble_size, -1).max(dim=1).values
+        def init_param(depth: torch.Tensor) -> np.ndarray:
+            init_min = depth.flatten(2).min(dim=2).values
+            init_max = depth.flatten(2).max(dim=2).values
 
             if scale_invariant and shift_invariant:
                 init_s = 1.0 / (init_max - init_min).clamp(min=1e-6)
                 init_t = -init_s * init_min
-                param = torch.cat((init_s, init_t)).cpu().numpy()
+                param = torch.cat((init_s, init_t), dim=1).cpu().numpy()
             elif scale_invariant:
                 init_s = 1.0 / init_max.clamp(min=1e-6)
                 param = init_s.cpu().numpy()
             else:
                 raise ValueError("Unrecognized alignment.")
 
-            return param
+            return param  # [N,P]
 
         def align(depth: torch.Tensor, param: np.ndarray) -> torch.Tensor:
             if scale_invariant and shift_invariant:
-                s, t = np.split(param, 2)
-                s = torch.from_numpy(s).to(depth).view(ensemble_size, 1, 1, 1)
-                t = torch.from_numpy(t).to(depth).view(ensemble_size, 1, 1, 1)
+                s, t = np.split(param, 2, axis=1)
+                s = torch.from_numpy(s).to(depth).view(-1, ensemble_size, 1, 1, 1)
+                t = torch.from_numpy(t).to(depth).view(-1, ensemble_size, 1, 1, 1)
                 out = depth * s + t
             elif scale_invariant:
-                s = torch.from_numpy(param).to(depth).view(ensemble_size, 1, 1, 1)
+                s = torch.from_numpy(param).to(depth).view(-1, ensemble_size, 1, 1, 1)
                 out = depth * s
             else:
                 raise ValueError("Unrecognized alignment.")
@@ -743,64 +879,126 @@ class MarigoldDepthPipeline(DiffusionPipeline):
         ) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
             uncertainty = None
             if reduction == "mean":
-                prediction = torch.mean(depth_aligned, dim=0, keepdim=True)
+                prediction = torch.mean(depth_aligned, dim=1)
                 if return_uncertainty:
-                    uncertainty = torch.std(depth_aligned, dim=0, keepdim=True)
+                    uncertainty = torch.std(depth_aligned, dim=1)
             elif reduction == "median":
-                prediction = torch.median(depth_aligned, dim=0, keepdim=True).values
+                prediction = torch.median(depth_aligned, dim=1, keepdim=True).values
                 if return_uncertainty:
-                    uncertainty = torch.median(torch.abs(depth_aligned - prediction), dim=0, keepdim=True).values
+                    uncertainty = torch.median(torch.abs(depth_aligned - prediction), dim=1).values
+                prediction = prediction.squeeze(1)
             else:
                 raise ValueError(f"Unrecognized reduction method: {reduction}.")
-            return prediction, uncertainty
+            return prediction, uncertainty  # [N,1,H,W]
 
-        def cost_fn(param: np.ndarray, depth: torch.Tensor) -> float:
-            cost = 0.0
+        def cost_terms(depth: torch.Tensor, param: np.ndarray) -> torch.Tensor:
             depth_aligned = align(depth, param)
 
-            for i, j in torch.combinations(torch.arange(ensemble_size)):
-                diff = depth_aligned[i] - depth_aligned[j]
-                cost += (diff**2).mean().sqrt().item()
-
+            # The RMS differences between all the pairs of ensemble members (in the order of `torch.combinations`) and
+            # the regularizer errors are computed on the device, so that they can be copied to the host at once.
+            terms = [
+                ((depth_aligned[:, i + 1 :] - depth_aligned[:, i : i + 1]) ** 2).mean(dim=(2, 3, 4)).sqrt()
+                for i in range(ensemble_size - 1)
+            ]
             if regularizer_strength > 0:
                 prediction, _ = ensemble(depth_aligned, return_uncertainty=False)
-                err_near = (0.0 - prediction.min()).abs().item()
-                err_far = (1.0 - prediction.max()).abs().item()
-                cost += (err_near + err_far) * regularizer_strength
+                terms.append((0.0 - prediction.amin(dim=(1, 2, 3))).abs()[:, None])
+                terms.append((1.0 - prediction.amax(dim=(1, 2, 3))).abs()[:, None])
+            return torch.cat(terms, dim=1)  # [N,T]
+
+        def cost_fn(depth: torch.Tensor, param: np.ndarray) -> List[float]:
+            # Returns the cost of every prediction, the costs of all the predictions are copied to the host at once.
+            num_pairs = ensemble_size * (ensemble_size - 1) // 2
+            costs = []
+            for terms in cost_terms(depth, param).tolist():
+                cost = 0.0
+                for pair_cost in terms[:num_pairs]:
+                    cost += pair_cost
+
+                if regularizer_strength > 0:
+                    err_near, err_far = terms[num_pairs:]
+                    cost += (err_near + err_far) * regularizer_strength
 
-            return cost
+                costs.append(cost)
 
-        def compute_param(depth: torch.Tensor):
+            return costs
+
+        def compute_param(depth: torch.Tensor) -> np.ndarray:
             import scipy
 
             depth_to_align = depth.to(torch.float32)
-            if max_res is not None and max(depth_to_align.shape[2:]) > max_res:
-                depth_to_align = MarigoldImageProcessor.resize_to_max_edge(depth_to_align, max_res, "nearest-exact")
+            if max_res is not None and max(depth_to_align.shape[3:]) > max_res:
+                depth_to_align = MarigoldImageProcessor.resize_to_max_edge(
+                    depth_to_align.flatten(0, 1), max_res, "nearest-exact"
+                ).unflatten(0, (num_images, ensemble_size))
 
             param = init_param(depth_to_align)
 
-            res = scipy.optimize.minimize(
-                partial(cost_fn, depth=depth_to_align),
-                param,
-                method="BFGS",
-                tol=tol,
-                options={"maxiter": max_iter, "disp": False},
-            )
-
-            return res.x
+            def minimize(fun, x0):
+                res = scipy.optimize.minimize(
+                    fun, x0, method="BFGS", tol=tol, options={"maxiter": max_iter, "disp": False}
+                )
+                return res.x
+
+            if num_images == 1:
+                return minimize(lambda x: cost_fn(depth_to_align, x[None])[0], param[0])[None]
+
+            # Every prediction is aligned by its own solver on its own thread. The solvers wait for each other, so that
+            # the cost evaluations requested by all the running solvers are computed with one batched call.
+            condition = threading.Condition()
+            requests, results = {}, {}
+            num_running = [num_images]
+            # the depth maps of the running solvers, which only change when a solver finishes
+            running = [list(range(num_images)), depth_to_align]
+
+            def evaluate_requests():
+                indices = sorted(requests)
+                if indices != running[0]:
+                    running[:] = indices, depth_to_align[indices]
+                try:
+                    outputs = cost_fn(running[1], np.stack([requests[n] for n in indices]))
+                except Exception as e:
+                    outputs = [e] * len(indices)
+                results.update(zip(indices, outputs))
+                requests.clear()
+                condition.notify_all()
+
+            def cost(x: np.ndarray, n: int) -> float:
+                with condition:
+                    requests[n] = x
+                    if len(requests) == num_running[0]:
+                        evaluate_requests()
+                    while n not in results:
+                        condition.wait()
+                    output = results.pop(n)
+                if isinstance(output, Exception):
+                    raise output
+                return output
+
+            def solve(n: int) -> np.ndarray:
+                try:
+                    return minimize(partial(cost, n=n), param[n])
+                finally:
+                    with condition:
+                        num_running[0] -= 1
+                        if requests and len(requests) == num_running[0]:
+                            evaluate_requests()
+
+            with ThreadPoolExecutor(max_workers=num_images) as executor:
+                return np.stack(list(executor.map(solve, range(num_images))))  # [N,P]
 
         requires_aligning = scale_invariant or shift_invariant
-        ensemble_size = depth.shape[0]
+        num_images, ensemble_size = depth.shape[:2]
 
         if requires_aligning:
             param = compute_param(depth)
             depth = align(depth, param)
 
-        depth, uncertainty = ensemble(depth, return_uncertainty=output_uncertainty)
+        depth, uncertainty = ensemble(depth, return_uncertainty=output_uncertainty)  # [N,1,H,W], [N,1,H,W]
 
-        depth_max = depth.max()
+        depth_max = depth.amax(dim=(1, 2, 3), keepdim=True)
         if scale_invariant and shift_invariant:
-            depth_min = depth.min()
+            depth_min = depth.amin(dim=(1, 2, 3), keepdim=True)
         elif scale_invariant:
             depth_min = 0
         else:
@@ -810,4 +1008,4 @@ class MarigoldDepthPipeline(DiffusionPipeline):
         if output_uncertainty:
             uncertainty /= depth_range
 
-        return depth, uncertainty  # [1,1,H,W], [1,1,H,W]
+        return depth, uncertainty  # [N,1,H,W], [N,1,H,W]
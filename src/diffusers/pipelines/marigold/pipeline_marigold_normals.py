@@ -185,6 +185,8 @@ class MarigoldNormalsPipeline(DiffusionPipeline):
         generator: Optional[Union[torch.Generator, List[torch.Generator]]],
         output_type: str,
         output_uncertainty: bool,
+        tile_size: Optional[int] = None,
+        tile_overlap: float = 0.25,
     ) -> int:
         if num_inference_steps is None:
             raise ValueError("`num_inference_steps` is not specified and could not be resolved from the model config.")
@@ -235,6 +237,16 @@ class MarigoldNormalsPipeline(DiffusionPipeline):
             if "reduction" in ensembling_kwargs and ensembling_kwargs["reduction"] not in ("closest", "mean"):
                 raise ValueError("`ensembling_kwargs['reduction']` can be either `'closest'` or `'mean'`.")
 
+        if tile_size is not None:
+            if tile_size <= 0 or tile_size % self.vae_scale_factor != 0:
+                raise ValueError(f"`tile_size` must be a positive multiple of {self.vae_scale_factor}.")
+            if not 0 <= tile_overlap < 1:
+                raise ValueError("`tile_overlap` must be in the range [0, 1).")
+            if latents is not None:
+                raise ValueError("`latents` cannot be used together with `tile_size`.")
+            if isinstance(generator, list):
+                raise ValueError("A list of generators cannot be used together with `tile_size`.")
+
         # image checks
         num_images = 0
         W, H = None, None
@@ -327,6 +339,8 @@ class MarigoldNormalsPipeline(DiffusionPipeline):
         resample_method_output: str = "bilinear",
         batch_size: int = 1,
         ensembling_kwargs: Optional[Dict[str, Any]] = None,
+        tile_size: Optional[int] = None,
+        tile_overlap: float = 0.25,
         latents: Optional[Union[torch.Tensor, List[torch.Tensor]]] = None,
         generator: Optional[Union[torch.Generator, List[torch.Generator]]] = None,
         output_type: str = "np",
@@ -370,6 +384,16 @@ class MarigoldNormalsPipeline(DiffusionPipeline):
                 Extra dictionary with arguments for precise ensembling control. The following options are available:
                 - reduction (`str`, *optional*, defaults to `"closest"`): Defines the ensembling function applied in
                   every pixel location, can be either `"closest"` or `"mean"`.
+            tile_size (`int`, *optional*, defaults to `None`):
+                Enables the tiled high-resolution mode. The input image is processed at its native resolution in
+                overlapping tiles of size `tile_size` (a multiple of the VAE scale factor, e.g. the
+                `processing_resolution`) instead of being resized to `processing_resolution`. The tiles are batched
+                together with the ensemble members and their predictions are blended into a native resolution
+                prediction. `latents` and lists of generators are not supported in this mode, and the output's `latent`
+                field contains the latents of the tiles.
+            tile_overlap (`float`, *optional*, defaults to `0.25`):
+                Overlap of neighboring tiles, as a fraction of `tile_size`. Larger values blend the seams more smoothly
+                at the cost of more tiles.
             latents (`torch.Tensor`, *optional*, defaults to `None`):
                 Latent noise tensors to replace the random initialization. These can be taken from the previous
                 function call's output.
@@ -421,6 +445,8 @@ class MarigoldNormalsPipeline(DiffusionPipeline):
             generator,
             output_type,
             output_uncertainty,
+            tile_size,
+            tile_overlap,
         )
 
         # 2. Prepare empty text conditioning.
@@ -444,10 +470,22 @@ class MarigoldNormalsPipeline(DiffusionPipeline):
         # of `processing_resolution` resolves to the optimal value from the model config. It is a recommended mode of
         # operation and leads to the most reasonable results. Using the native image resolution or any other processing
         # resolution can lead to loss of either fine details or global context in the output predictions.
+        #
+        # In the tiled mode, the input images are processed at their native resolution `(H, W)`, padded to
+        # `(PPH, PPW)`, in `T` overlapping tiles of size `(TH, TW)`, which go through the next steps in place of the
+        # images.
         image, padding, original_resolution = self.image_processor.preprocess(
-            image, processing_resolution, resample_method_input, device, dtype
+            image, processing_resolution if tile_size is None else 0, resample_method_input, device, dtype
         )  # [N,3,PPH,PPW]
 
+        if tile_size is not None:
+            padded_size = image.shape[2:]
+            coords, tile_shape, overlap = self.image_processor.get_tile_coords(
+                *padded_size, tile_size, tile_overlap, self.vae_scale_factor
+            )
+            num_tiles = len(coords)
+            image = self.image_processor.split_tiles(image, coords, tile_shape)  # [N*T,3,TH,TW]
+
         # 4. Encode input image into latent space. At this step, each of the `N` input images is represented with `E`
         # ensemble members. Each ensemble member is an independent diffused prediction, just initialized independently.
         # Latents of each such predictions across all input images and all ensemble members are represented in the
@@ -459,65 +497,30 @@ class MarigoldNormalsPipeline(DiffusionPipeline):
         # noise. This behavior can be achieved by setting the `output_latent` argument to `True`. The latent space
         # dimensions are `(h, w)`. Encoding into latent space happens in batches of size `batch_size`.
         # Model invocation: self.vae.encoder.
-        image_latent, pred_latent = self.prepare_latents(
-            image, latents, generator, ensemble_size, batch_size
-        )  # [N*E,4,h,w], [N*E,4,h,w]
-
-        del image
-
-        batch_empty_text_embedding = self.empty_text_embedding.to(device=device, dtype=dtype).repeat(
-            batch_size, 1, 1
-        )  # [B,1024,2]
-
+        #
         # 5. Process the denoising loop. All `N * E` latents are processed sequentially in batches of size `batch_size`.
         # The unet model takes concatenated latent spaces of the input image and the predicted modality as an input, and
         # outputs noise for the predicted modality's latent space. The number of denoising diffusion steps is defined by
         # `num_inference_steps`. It is either set directly, or resolves to the optimal value specific to the loaded
         # model.
         # Model invocation: self.unet.
-        pred_latents = []
-
-        for i in self.progress_bar(
-            range(0, num_images * ensemble_size, batch_size), leave=True, desc="Marigold predictions..."
-        ):
-            batch_image_latent = image_latent[i : i + batch_size]  # [B,4,h,w]
-            batch_pred_latent = pred_latent[i : i + batch_size]  # [B,4,h,w]
-            effective_batch_size = batch_image_latent.shape[0]
-            text = batch_empty_text_embedding[:effective_batch_size]  # [B,2,1024]
-
-            self.scheduler.set_timesteps(num_inference_steps, device=device)
-            for t in self.progress_bar(self.scheduler.timesteps, leave=False, desc="Diffusion steps..."):
-                batch_latent = torch.cat([batch_image_latent, batch_pred_latent], dim=1)  # [B,8,h,w]
-                noise = self.unet(batch_latent, t, encoder_hidden_states=text, return_dict=False)[0]  # [B,4,h,w]
-                batch_pred_latent = self.scheduler.step(
-                    noise, t, batch_pred_latent, generator=generator
-                ).prev_sample  # [B,4,h,w]
-
-            pred_latents.append(batch_pred_latent)
-
-        pred_latent = torch.cat(pred_latents, dim=0)  # [N*E,4,h,w]
-
-        del (
-            pred_latents,
-            image_latent,
-            batch_empty_text_embedding,
-            batch_image_latent,
-            batch_pred_latent,
-            text,
-            batch_latent,
-            noise,
-        )
-
+        #
         # 6. Decode predictions from latent into pixel space. The resulting `N * E` predictions have shape `(PPH, PPW)`,
         # which requires slight postprocessing. Decoding into pixel space happens in batches of size `batch_size`.
         # Model invocation: self.vae.decoder.
-        prediction = torch.cat(
-            [
-                self.decode_prediction(pred_latent[i : i + batch_size])
-                for i in range(0, pred_latent.shape[0], batch_size)
-            ],
-            dim=0,
-        )  # [N*E,3,PPH,PPW]
+        prediction, pred_latent = self.predict(
+            image, latents, generator, ensemble_size, batch_size, num_inference_steps
+        )  # [N*E,3,PPH,PPW], [N*E,4,h,w]
+
+        del image
+
+        # 6.1. In the tiled mode, the predictions of the tiles are blended into predictions of the padded native
+        # resolution and renormalized to unit length.
+        if tile_size is not None:
+            prediction = prediction.reshape(num_images, num_tiles, ensemble_size, *prediction.shape[1:])
+            prediction = prediction.transpose(0, 1).flatten(1, 2)  # [T,N*E,3,TH,TW]
+            prediction = self.image_processor.merge_tiles(prediction, coords, padded_size, overlap)  # [N*E,3,PPH,PPW]
+            prediction = self.normalize_normals(prediction)  # [N*E,3,PPH,PPW]
 
         if not output_latent:
             pred_latent = None
@@ -577,6 +580,61 @@ class MarigoldNormalsPipeline(DiffusionPipeline):
             latent=pred_latent,
         )
 
+    # Copied from diffusers.pipelines.marigold.pipeline_marigold_depth.MarigoldDepthPipeline.predict
+    def predict(
+        self,
+        image: torch.Tensor,
+        latents: Optional[torch.Tensor],
+        generator: Optional[Union[torch.Generator, List[torch.Generator]]],
+        ensemble_size: int,
+        batch_size: int,
+        num_inference_steps: int,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        device = self._execution_device
+        dtype = self.dtype
+
+        image_latent, pred_latent = self.prepare_latents(
+            image, latents, generator, ensemble_size, batch_size
+        )  # [N*E,4,h,w], [N*E,4,h,w]
+
+        batch_empty_text_embedding = self.empty_text_embedding.to(device=device, dtype=dtype).repeat(
+            batch_size, 1, 1
+        )  # [B,1024,2]
+
+        pred_latents = []
+
+        for i in self.progress_bar(
+            range(0, image_latent.shape[0], batch_size), leave=True, desc="Marigold predictions..."
+        ):
+            batch_image_latent = image_latent[i : i + batch_size]  # [B,4,h,w]
+            batch_pred_latent = pred_latent[i : i + batch_size]  # [B,4,h,w]
+            effective_batch_size = batch_image_latent.shape[0]
+            text = batch_empty_text_embedding[:effective_batch_size]  # [B,2,1024]
+
+            self.scheduler.set_timesteps(num_inference_steps, device=device)
+            for t in self.progress_bar(self.scheduler.timesteps, leave=False, desc="Diffusion steps..."):
+                batch_latent = torch.cat([batch_image_latent, batch_pred_latent], dim=1)  # [B,8,h,w]
+                noise = self.unet(batch_latent, t, encoder_hidden_states=text, return_dict=False)[0]  # [B,4,h,w]
+                batch_pred_latent = self.scheduler.step(
+                    noise, t, batch_pred_latent, generator=generator
+                ).prev_sample  # [B,4,h,w]
+
+            pred_latents.append(batch_pred_latent)
+
+        pred_latent = torch.cat(pred_latents, dim=0)  # [N*E,4,h,w]
+
+        del image_latent, batch_empty_text_embedding
+
+        prediction = torch.cat(
+            [
+                self.decode_prediction(pred_latent[i : i + batch_size])
+                for i in range(0, pred_latent.shape[0], batch_size)
+            ],
+            dim=0,
+        )  # [N*E,C,PPH,PPW]
+
+        return prediction, pred_latent
+
     # Copied from diffusers.pipelines.marigold.pipeline_marigold_depth.MarigoldDepthPipeline.prepare_latents
     def prepare_latents(
         self,
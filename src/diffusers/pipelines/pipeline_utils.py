@@ -1631,6 +1631,112 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
         for module in modules:
             fn_recursive_set_mem_eff(module)
 
+    def enable_token_merging(self, ratio: float = 0.5, max_downsample: int = 1, **kwargs):
+        r"""
+        Enable [Token Merging](https://arxiv.org/abs/2303.17604) (ToMe) in the denoiser of the pipeline. Similar image
+        tokens are merged before the attention of the transformer blocks and unmerged afterwards, which speeds up
+        inference at high resolutions at a small cost in quality. Only the components whose transformer blocks support
+        token merging (for example the UNet of Stable Diffusion and SDXL, PixArt and DiT transformers) are affected.
+
+        Args:
+            ratio (`float`, defaults to `0.5`):
+                The ratio of tokens to merge. Higher values are faster but degrade the quality more.
+            max_downsample (`int`, defaults to `1`):
+                Only apply token merging to the blocks whose token grid is at most `max_downsample` times smaller than
+                the latent. `1` only applies it to the highest resolution blocks.
+            kwargs (`dict`, *optional*):
+                Other arguments of [`~ModelMixin.enable_token_merging`].
+
+        Examples:
+
+        ```py
+        >>> import torch
+        >>> from diffusers import StableDiffusionXLPipeline
+
+        >>> pipe = StableDiffusionXLPipeline.from_pretrained(
+        ...     "stabilityai/stable-diffusion-xl-base-1.0", torch_dtype=torch.float16
+        ... ).to("cuda")
+        >>> pipe.enable_token_merging(ratio=0.5)
+        >>> image = pipe("a photo of an astronaut riding a horse on mars").images[0]
+        ```
+        """
+        modules = self._get_token_merging_modules()
+        if len(modules) == 0:
+            raise ValueError(f"{self.__class__.__name__} doesn't have any component supporting token merging.")
+
+        for module in modules:
+            module.enable_token_merging(ratio=ratio, max_downsample=max_downsample, **kwargs)
+
+    def disable_token_merging(self):
+        r"""
+        Disable token merging if [`~DiffusionPipeline.enable_token_merging`] was previously called.
+        """
+        for module in self._get_token_merging_modules():
+            module.disable_token_merging()
+
+    def _get_token_merging_modules(self) -> List[torch.nn.Module]:
+        module_names, _ = self._get_signature_keys(self)
+        modules = [getattr(self, n, None) for n in module_names]
+        return [
+            m
+            for m in modules
+            if isinstance(m, ModelMixin) and any(hasattr(module, "set_token_merging") for module in m.modules())
+        ]
+
+    def enable_context_parallel(self, group: Optional["torch.distributed.ProcessGroup"] = None, mode: str = "ring"):
+        r"""
+        Enable context (sequence) parallelism in the denoiser of the pipeline. The text and image/video tokens of the
+        transformer are split across the ranks of a `torch.distributed` process group, which reduces the latency of
+        high resolution images and long videos. Supported by [`FluxTransformer2DModel`],
+        [`SD3Transformer2DModel`] and [`CogVideoXTransformer3DModel`].
+
+        Every rank runs the whole pipeline with the same inputs, so the random generator has to be seeded identically
+        on all the ranks. All the ranks return the same output.
+
+        Args:
+            group (`torch.distributed.ProcessGroup`, *optional*):
+                The process group to split the sequences over. Defaults to the default process group.
+            mode (`str`, defaults to `"ring"`):
+                `"ring"` for ring attention or `"ulysses"` for all-to-all (Ulysses) attention, which requires the number
+                of attention heads to be divisible by the world size.
+
+        Examples:
+
+        ```py
+        >>> # torchrun --nproc_per_node=2 run_flux.py
+        >>> import torch
+        >>> import torch.distributed as dist
+        >>> from diffusers import FluxPipeline
+
+        >>> dist.init_process_group("nccl")
+        >>> torch.cuda.set_device(dist.get_rank())
+        >>> pipe = FluxPipeline.from_pretrained("black-forest-labs/FLUX.1-dev", torch_dtype=torch.bfloat16).to("cuda")
+        >>> pipe.enable_context_parallel()
+        >>> generator = torch.Generator("cuda").manual_seed(0)
+        >>> image = pipe("a photo of a cat", height=2048, width=2048, generator=generator).images[0]
+        >>> if dist.get_rank() == 0:
+        ...     image.save("cat.png")
+        ```
+        """
+        modules = self._get_context_parallel_modules()
+        if len(modules) == 0:
+            raise ValueError(f"{self.__class__.__name__} doesn't have any component supporting context parallelism.")
+
+        for module in modules:
+            module.enable_context_parallel(group=group, mode=mode)
+
+    def disable_context_parallel(self):
+        r"""
+        Disable context parallelism if [`~DiffusionPipeline.enable_context_parallel`] was previously called.
+        """
+        for module in self._get_context_parallel_modules():
+            module.disable_context_parallel()
+
+    def _get_context_parallel_modules(self) -> List[torch.nn.Module]:
+        module_names, _ = self._get_signature_keys(self)
+        modules = [getattr(self, n, None) for n in module_names]
+        return [m for m in modules if isinstance(m, ModelMixin) and m._supports_context_parallel]
+
     def enable_attention_slicing(self, slice_size: Optional[Union[str, int]] = "auto"):
         r"""
         Enable sliced attention computation. When this option is enabled, the attention module splits the input tensor
@@ -1929,3 +2035,123 @@ class StableDiffusionMixin:
             else:
                 self.vae.unfuse_qkv_projections()
                 self.fusing_vae = False
+
+
+class _CFGParallel:
+    # splits the batch of the inputs of a denoiser across the ranks of a process group and gathers the outputs
+
+    def __init__(self, group: Optional["torch.distributed.ProcessGroup"] = None):
+        import torch.distributed as dist
+
+        if not dist.is_available() or not dist.is_initialized():
+            raise RuntimeError("CFG parallelism requires an initialized `torch.distributed` process group.")
+
+        self.group = group
+        self.world_size = dist.get_world_size(group)
+        self.rank = dist.get_rank(group)
+        self.batch_size = None
+
+    def split(self, obj: Any) -> Any:
+        if isinstance(obj, torch.Tensor):
+            return obj.chunk(self.world_size)[self.rank] if obj.ndim > 0 and obj.shape[0] == self.batch_size else obj
+        if isinstance(obj, (list, tuple)):
+            return type(obj)(self.split(o) for o in obj)
+        if isinstance(obj, dict):
+            return {k: self.split(v) for k, v in obj.items()}
+        return obj
+
+    def gather(self, obj: Any) -> Any:
+        import torch.distributed as dist
+
+        if isinstance(obj, torch.Tensor):
+            if obj.ndim == 0 or obj.shape[0] != self.batch_size // self.world_size:
+                return obj
+            chunks = [torch.empty_like(obj) for _ in range(self.world_size)]
+            dist.all_gather(chunks, obj.contiguous(), group=self.group)
+            return torch.cat(chunks)
+        if isinstance(obj, BaseOutput):
+            return obj.__class__(**{k: self.gather(v) for k, v in obj.items()})
+        if isinstance(obj, (list, tuple)):
+            return type(obj)(self.gather(o) for o in obj)
+        return obj
+
+    def pre_forward_hook(self, module, args, kwargs):
+        sample = args[0] if len(args) > 0 else kwargs.get("sample", kwargs.get("hidden_states"))
+        self.batch_size = sample.shape[0] if isinstance(sample, torch.Tensor) else None
+        # batches that can't be split evenly (e.g. without guidance) are computed on every rank
+        if self.batch_size is None or self.batch_size % self.world_size != 0:
+            self.batch_size = None
+            return args, kwargs
+        return self.split(args), self.split(kwargs)
+
+    def forward_hook(self, module, args, kwargs, output):
+        if self.batch_size is None:
+            return output
+        output = self.gather(output)
+        self.batch_size = None
+        return output
+
+
+class CFGParallelMixin:
+    r"""
+    Mixin for pipelines that concatenate the unconditional and conditional inputs of classifier-free guidance into one
+    batch for their denoiser (`unet` or `transformer`). With [`~CFGParallelMixin.enable_cfg_parallel`], the batch is
+    split across the ranks of a `torch.distributed` process group, so that with two processes one computes the
+    unconditional branch and the other the conditional branch, and the outputs are all-gathered before the scheduler
+    step.
+    """
+
+    def enable_cfg_parallel(self, group: Optional["torch.distributed.ProcessGroup"] = None):
+        r"""
+        Enable classifier-free guidance parallelism. The batch of every denoiser forward is split across the ranks of
+        `group` and the outputs of all the ranks are gathered, which halves the latency of a guided generation with two
+        GPUs. Batches that can't be split evenly are computed on all the ranks.
+
+        Every rank runs the whole pipeline with the same inputs, so the random generator has to be seeded identically
+        on all the ranks. All the ranks return the same output.
+
+        Args:
+            group (`torch.distributed.ProcessGroup`, *optional*):
+                The process group to split the batch over, usually of two processes. Defaults to the default process
+                group.
+
+        Examples:
+
+        ```py
+        >>> # torchrun --nproc_per_node=2 run_sdxl.py
+        >>> import torch
+        >>> import torch.distributed as dist
+        >>> from diffusers import StableDiffusionXLPipeline
+
+        >>> dist.init_process_group("nccl")
+        >>> torch.cuda.set_device(dist.get_rank())
+        >>> pipe = StableDiffusionXLPipeline.from_pretrained(
+        ...     "stabilityai/stable-diffusion-xl-base-1.0", torch_dtype=torch.float16
+        ... ).to("cuda")
+        >>> pipe.enable_cfg_parallel()
+        >>> generator = torch.Generator("cuda").manual_seed(0)
+        >>> image = pipe("an astronaut riding a horse", generator=generator).images[0]
+        ```
+        """
+        self.disable_cfg_parallel()
+
+        denoiser = getattr(self, "unet", None)
+        if denoiser is None:
+            denoiser = getattr(self, "transformer", None)
+        if denoiser is None:
+            raise ValueError(f"{self.__class__.__name__} doesn't have a `unet` or `transformer` to parallelize.")
+
+        cfg_parallel = _CFGParallel(group=group)
+        self._cfg_parallel_hooks = [
+            denoiser.register_forward_pre_hook(cfg_parallel.pre_forward_hook, with_kwargs=True),
+            denoiser.register_forward_hook(cfg_parallel.forward_hook, with_kwargs=True),
+        ]
+
+    def disable_cfg_parallel(self):
+        r"""
+        Disable classifier-free guidance parallelism if [`~CFGParallelMixin.enable_cfg_parallel`] was previously
+        called.
+        """
+        for hook in getattr(self, "_cfg_parallel_hooks", []):
+            hook.remove()
+        self._cfg_parallel_hooks = []
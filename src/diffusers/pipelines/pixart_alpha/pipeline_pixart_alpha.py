@@ -33,7 +33,7 @@ from ...utils import (
     replace_example_docstring,
 )
 from ...utils.torch_utils import randn_tensor
-from ..pipeline_utils import DiffusionPipeline, ImagePipelineOutput
+from ..pipeline_utils import CFGParallelMixin, DiffusionPipeline, ImagePipelineOutput
 
 
 logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
@@ -229,7 +229,7 @@ def retrieve_timesteps(
     return timesteps, num_inference_steps
 
 
-class PixArtAlphaPipeline(DiffusionPipeline):
+class PixArtAlphaPipeline(DiffusionPipeline, CFGParallelMixin):
     r"""
     Pipeline for text-to-image generation using PixArt-Alpha.
 
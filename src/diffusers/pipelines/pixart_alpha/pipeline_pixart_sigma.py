@@ -33,7 +33,7 @@ from ...utils import (
     replace_example_docstring,
 )
 from ...utils.torch_utils import randn_tensor
-from ..pipeline_utils import DiffusionPipeline, ImagePipelineOutput
+from ..pipeline_utils import CFGParallelMixin, DiffusionPipeline, ImagePipelineOutput
 from .pipeline_pixart_alpha import (
     ASPECT_RATIO_256_BIN,
     ASPECT_RATIO_512_BIN,
@@ -173,7 +173,7 @@ def retrieve_timesteps(
     return timesteps, num_inference_steps
 
 
-class PixArtSigmaPipeline(DiffusionPipeline):
+class PixArtSigmaPipeline(DiffusionPipeline, CFGParallelMixin):
     r"""
     Pipeline for text-to-image generation using PixArt-Sigma.
     """
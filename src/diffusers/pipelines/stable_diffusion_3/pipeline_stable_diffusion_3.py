@@ -37,7 +37,7 @@ from ...utils import (
     unscale_lora_layers,
 )
 from ...utils.torch_utils import randn_tensor
-from ..pipeline_utils import DiffusionPipeline
+from ..pipeline_utils import CFGParallelMixin, DiffusionPipeline
 from .pipeline_output import StableDiffusion3PipelineOutput
 
 
@@ -128,7 +128,7 @@ def retrieve_timesteps(
     return timesteps, num_inference_steps
 
 
-class StableDiffusion3Pipeline(DiffusionPipeline, SD3LoraLoaderMixin, FromSingleFileMixin):
+class StableDiffusion3Pipeline(DiffusionPipeline, SD3LoraLoaderMixin, FromSingleFileMixin, CFGParallelMixin):
     r"""
     Args:
         transformer ([`SD3Transformer2DModel`]):
@@ -51,7 +51,7 @@ from ...utils import (
     unscale_lora_layers,
 )
 from ...utils.torch_utils import randn_tensor
-from ..pipeline_utils import DiffusionPipeline, StableDiffusionMixin
+from ..pipeline_utils import CFGParallelMixin, DiffusionPipeline, StableDiffusionMixin
 from .pipeline_output import StableDiffusionXLPipelineOutput
 
 
@@ -175,6 +175,7 @@ def retrieve_timesteps(
 class StableDiffusionXLPipeline(
     DiffusionPipeline,
     StableDiffusionMixin,
+    CFGParallelMixin,
     FromSingleFileMixin,
     StableDiffusionXLLoraLoaderMixin,
     TextualInversionLoaderMixin,
@@ -762,6 +763,52 @@ class StableDiffusionXLPipeline(
             self.vae.decoder.conv_in.to(dtype)
             self.vae.decoder.mid_block.to(dtype)
 
+    def enable_patch_parallel(
+        self, group: Optional["torch.distributed.ProcessGroup"] = None, num_warmup_steps: int = 1
+    ):
+        r"""
+        Enables displaced patch parallelism ([DistriFusion](https://arxiv.org/abs/2402.19481)) in the UNet. The latent
+        is split into one horizontal patch per rank of a `torch.distributed` process group and every rank denoises its
+        own patch, exchanging the activations of the previous step with the other ranks asynchronously. The latents
+        are gathered after every UNet forward, so the scheduler, the VAE and the returned images are the same on all
+        the ranks. This reduces the latency of a single high resolution image with the number of GPUs.
+
+        Every rank runs the whole pipeline with the same inputs, so the random generator has to be seeded identically
+        on all the ranks. The latent height (`height // 8`) has to be divisible by the number of processes times 8.
+
+        Args:
+            group (`torch.distributed.ProcessGroup`, *optional*):
+                The process group to split the latent over. Defaults to the default process group.
+            num_warmup_steps (`int`, defaults to `1`):
+                The number of denoising steps during which the activations are exchanged synchronously. More warmup
+                steps are slower but closer to the output of a single GPU.
+
+        Examples:
+
+        ```py
+        >>> # torchrun --nproc_per_node=2 run_sdxl.py
+        >>> import torch
+        >>> import torch.distributed as dist
+        >>> from diffusers import StableDiffusionXLPipeline
+
+        >>> dist.init_process_group("nccl")
+        >>> torch.cuda.set_device(dist.get_rank())
+        >>> pipe = StableDiffusionXLPipeline.from_pretrained(
+        ...     "stabilityai/stable-diffusion-xl-base-1.0", torch_dtype=torch.float16
+        ... ).to("cuda")
+        >>> pipe.enable_patch_parallel(num_warmup_steps=4)
+        >>> generator = torch.Generator("cuda").manual_seed(0)
+        >>> image = pipe("an astronaut riding a horse", height=2048, width=2048, generator=generator).images[0]
+        ```
+        """
+        self.unet.enable_patch_parallel(group=group, num_warmup_steps=num_warmup_steps)
+
+    def disable_patch_parallel(self):
+        r"""
+        Disables patch parallelism if [`~StableDiffusionXLPipeline.enable_patch_parallel`] was previously called.
+        """
+        self.unet.disable_patch_parallel()
+
     # Copied from diffusers.pipelines.latent_consistency_models.pipeline_latent_consistency_text2img.LatentConsistencyModelPipeline.get_guidance_scale_embedding
     def get_guidance_scale_embedding(
         self, w: torch.Tensor, embedding_dim: int = 512, dtype: torch.dtype = torch.float32
@@ -1193,6 +1240,10 @@ class StableDiffusionXLPipeline(
                 guidance_scale_tensor, embedding_dim=self.unet.config.time_cond_proj_dim
             ).to(device=device, dtype=latents.dtype)
 
+        # the activations of the previous generation can't be reused by patch parallelism
+        if getattr(self.unet, "_patch_parallel", None) is not None:
+            self.unet._patch_parallel.reset()
+
         self._num_timesteps = len(timesteps)
         with self.progress_bar(total=num_inference_steps) as progress_bar:
             for i, t in enumerate(timesteps):
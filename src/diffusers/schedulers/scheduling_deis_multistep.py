@@ -26,10 +26,6 @@ from ..utils import deprecate, is_scipy_available
 from .scheduling_utils import KarrasDiffusionSchedulers, SchedulerMixin, SchedulerOutput
 
 
-if is_scipy_available():
-    import scipy.stats
-
-
 # Copied from diffusers.schedulers.scheduling_ddpm.betas_for_alpha_bar
 def betas_for_alpha_bar(
     num_diffusion_timesteps,
@@ -417,6 +413,8 @@ class DEISMultistepScheduler(SchedulerMixin, ConfigMixin):
     ) -> torch.Tensor:
         """From "Beta Sampling is All You Need" [arXiv:2407.12173] (Lee et. al, 2024)"""
 
+        import scipy.stats
+
         # Hack to make sure that other schedulers which copy this function don't break
         # TODO: Add this logic to the other schedulers
         if hasattr(self.config, "sigma_min"):
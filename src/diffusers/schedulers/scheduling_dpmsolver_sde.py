@@ -25,10 +25,6 @@ from ..utils import BaseOutput, is_scipy_available
 from .scheduling_utils import KarrasDiffusionSchedulers, SchedulerMixin
 
 
-if is_scipy_available():
-    import scipy.stats
-
-
 @dataclass
 # Copied from diffusers.schedulers.scheduling_ddpm.DDPMSchedulerOutput with DDPM->DPMSolverSDE
 class DPMSolverSDESchedulerOutput(BaseOutput):
@@ -493,6 +489,8 @@ class DPMSolverSDEScheduler(SchedulerMixin, ConfigMixin):
     ) -> torch.Tensor:
         """From "Beta Sampling is All You Need" [arXiv:2407.12173] (Lee et. al, 2024)"""
 
+        import scipy.stats
+
         # Hack to make sure that other schedulers which copy this function don't break
         # TODO: Add this logic to the other schedulers
         if hasattr(self.config, "sigma_min"):
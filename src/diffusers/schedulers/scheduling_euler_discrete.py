@@ -25,9 +25,6 @@ from ..utils.torch_utils import randn_tensor
 from .scheduling_utils import KarrasDiffusionSchedulers, SchedulerMixin
 
 
-if is_scipy_available():
-    import scipy.stats
-
 logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
 
 
@@ -525,6 +522,8 @@ class EulerDiscreteScheduler(SchedulerMixin, ConfigMixin):
     ) -> torch.Tensor:
         """From "Beta Sampling is All You Need" [arXiv:2407.12173] (Lee et. al, 2024)"""
 
+        import scipy.stats
+
         # Hack to make sure that other schedulers which copy this function don't break
         # TODO: Add this logic to the other schedulers
         if hasattr(self.config, "sigma_min"):
@@ -64,6 +64,7 @@ from .import_utils import (
     is_bitsandbytes_available,
     is_bitsandbytes_version,
     is_bs4_available,
+    is_flash_attn_available,
     is_flax_available,
     is_ftfy_available,
     is_google_colab,
@@ -103,10 +104,13 @@ from .peft_utils import (
     delete_adapter_layers,
     get_adapter_name,
     get_peft_kwargs,
+    merge_lora_layer_with_delta,
     recurse_remove_peft_layers,
     scale_lora_layers,
     set_adapter_layers,
+    set_batch_adapter_layers,
     set_weights_and_activate_adapters,
+    unmerge_lora_layer,
     unscale_lora_layers,
 )
 from .pil_utils import PIL_INTERPOLATION, make_image_grid, numpy_to_pil, pt_to_pil
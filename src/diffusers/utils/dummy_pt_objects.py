@@ -795,6 +795,21 @@ class BlipDiffusionPipeline(metaclass=DummyObject):
         requires_backends(cls, ["torch"])
 
 
+class CFGParallelMixin(metaclass=DummyObject):
+    _backends = ["torch"]
+
+    def __init__(self, *args, **kwargs):
+        requires_backends(self, ["torch"])
+
+    @classmethod
+    def from_config(cls, *args, **kwargs):
+        requires_backends(cls, ["torch"])
+
+    @classmethod
+    def from_pretrained(cls, *args, **kwargs):
+        requires_backends(cls, ["torch"])
+
+
 class CLIPImageProjection(metaclass=DummyObject):
     _backends = ["torch"]
 
@@ -1,15 +1,18 @@
 import io
+import os
+import queue
 import random
-import struct
 import tempfile
-from contextlib import contextmanager
-from typing import List, Union
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Iterable, Iterator, List, Optional, Union
 
 import numpy as np
 import PIL.Image
 import PIL.ImageOps
 
-from .import_utils import BACKENDS_MAPPING, is_imageio_available, is_opencv_available
+from .import_utils import BACKENDS_MAPPING, is_imageio_available, is_opencv_available, is_torch_available
 from .logging import get_logger
 
 
@@ -25,10 +28,40 @@ def buffered_writer(raw_f):
     f.flush()
 
 
-def export_to_gif(image: List[PIL.Image.Image], output_gif_path: str = None, fps: int = 10) -> str:
+def export_to_gif(
+    image: List[PIL.Image.Image], output_gif_path: str = None, fps: int = 10, num_workers: Optional[int] = None
+) -> str:
+    r"""
+    Writes a list of PIL images to an animated GIF.
+
+    Args:
+        image (`List[PIL.Image.Image]`):
+            The frames of the GIF.
+        output_gif_path (`str`, *optional*):
+            The path to write the GIF to. If `None`, a temporary file is used.
+        fps (`int`, *optional*, defaults to 10):
+            The frame rate of the GIF.
+        num_workers (`int`, *optional*):
+            The number of threads to quantize the RGB frames to their GIF palettes with. Defaults to the number of
+            CPUs.
+
+    Returns:
+        `str`: The path of the GIF.
+    """
     if output_gif_path is None:
         output_gif_path = tempfile.NamedTemporaryFile(suffix=".gif").name
 
+    def quantize(frame):
+        # same conversion as PIL's GIF writer, which would quantize the frames one at a time
+        if frame.mode == "RGB":
+            frame = frame.convert("P", palette=PIL.Image.Palette.ADAPTIVE)
+        return frame
+
+    num_workers = num_workers or os.cpu_count() or 1
+    if num_workers > 1 and len(image) > 1:
+        with ThreadPoolExecutor(max_workers=min(num_workers, len(image))) as executor:
+            image = list(executor.map(quantize, image))
+
     image[0].save(
         output_gif_path,
         save_all=True,
@@ -67,27 +100,20 @@ def export_to_ply(mesh, output_ply_path: str = None):
             f.write(b"property list uchar int vertex_index\n")
         f.write(b"end_header\n")
 
+        # the vertices and faces are written as packed little-endian records, the same as `struct.pack`
         if rgb is not None:
-            rgb = (rgb * 255.499).round().astype(int)
-            vertices = [
-                (*coord, *rgb)
-                for coord, rgb in zip(
-                    coords.tolist(),
-                    rgb.tolist(),
-                )
-            ]
-            format = struct.Struct("<3f3B")
-            for item in vertices:
-                f.write(format.pack(*item))
+            vertices = np.empty(len(coords), dtype=[("xyz", "<f4", 3), ("rgb", "u1", 3)])
+            vertices["rgb"] = (rgb * 255.499).round().clip(0, 255)
         else:
-            format = struct.Struct("<3f")
-            for vertex in coords.tolist():
-                f.write(format.pack(*vertex))
+            vertices = np.empty(len(coords), dtype=[("xyz", "<f4", 3)])
+        vertices["xyz"] = coords
+        f.write(vertices.tobytes())
 
         if faces is not None:
-            format = struct.Struct("<B3I")
-            for tri in faces.tolist():
-                f.write(format.pack(len(tri), *tri))
+            tris = np.empty(len(faces), dtype=[("count", "u1"), ("indices", "<u4", 3)])
+            tris["count"] = 3
+            tris["indices"] = faces
+            f.write(tris.tobytes())
 
     return output_ply_path
 
@@ -100,20 +126,100 @@ def export_to_obj(mesh, output_obj_path: str = None):
     faces = mesh.faces.cpu().numpy()
 
     vertex_colors = np.stack([mesh.vertex_channels[x].detach().cpu().numpy() for x in "RGB"], axis=1)
-    vertices = [
-        "{} {} {} {} {} {}".format(*coord, *color) for coord, color in zip(verts.tolist(), vertex_colors.tolist())
-    ]
+    vertices = np.concatenate([verts, vertex_colors], axis=1).astype(np.float64)
 
-    faces = ["f {} {} {}".format(str(tri[0] + 1), str(tri[1] + 1), str(tri[2] + 1)) for tri in faces.tolist()]
-
-    combined_data = ["v " + vertex for vertex in vertices] + faces
+    # format all the lines with a single `%` call instead of one `str.format` per vertex and face
+    vertex_lines = ("v" + " %r" * 6 + "\n") * len(vertices) % tuple(vertices.ravel().tolist())
+    face_lines = "\n".join(["f %d %d %d"] * len(faces)) % tuple((faces + 1).ravel().tolist())
 
     with open(output_obj_path, "w") as f:
-        f.writelines("\n".join(combined_data))
+        f.write(vertex_lines + face_lines)
+
+    return output_obj_path
+
+
+def _iter_uint8_frames(
+    video_frames: Union[List[np.ndarray], List[PIL.Image.Image], Iterable],
+) -> Iterator[np.ndarray]:
+    r"""
+    Yields the frames of a video as uint8 arrays of shape `(height, width, num_channels)`. Every item of `video_frames`
+    is a frame or a chunk of frames (a list of PIL images, or a 4D array or tensor).
+    """
+    for frames in video_frames:
+        if isinstance(frames, PIL.Image.Image) or (hasattr(frames, "ndim") and frames.ndim < 4):
+            frames = [frames]
+
+        for frame in frames:
+            if isinstance(frame, PIL.Image.Image):
+                frame = np.array(frame)
+            elif not isinstance(frame, np.ndarray):
+                # torch tensors, in the layout of the numpy frames
+                frame = frame.cpu().numpy()
+            if frame.dtype != np.uint8:
+                frame = (frame * 255).astype(np.uint8)
+            yield frame
+
+
+def _iter_in_background(iterable: Iterable, max_prefetch: int = 2) -> Iterator:
+    r"""
+    Consumes `iterable` on a background thread, at most `max_prefetch` items ahead of the caller. Exceptions raised by
+    `iterable` are raised to the caller. The background thread runs with the grad and inference modes of the caller,
+    which are thread-local in torch, so that e.g. a decoder consumed under `torch.no_grad()` doesn't build a graph.
+    """
+    items = queue.Queue(maxsize=max_prefetch)
+    stopped = threading.Event()
+    done = object()
+
+    torch_modes = None
+    if is_torch_available():
+        import torch
+
+        torch_modes = (torch.is_inference_mode_enabled(), torch.is_grad_enabled())
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        with ExitStack() as stack:
+            if torch_modes is not None:
+                inference_mode, grad_enabled = torch_modes
+                stack.enter_context(torch.inference_mode(inference_mode))
+                stack.enter_context(torch.set_grad_enabled(grad_enabled))
+            try:
+                for item in iterable:
+                    if not put((item, None)):
+                        return
+            except BaseException as e:
+                put((None, e))
+            else:
+                put((done, None))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        # unblock the background thread if the caller stops early
+        stopped.set()
+        thread.join()
 
 
 def _legacy_export_to_video(
-    video_frames: Union[List[np.ndarray], List[PIL.Image.Image]], output_video_path: str = None, fps: int = 10
+    video_frames: Union[List[np.ndarray], List[PIL.Image.Image], Iterable],
+    output_video_path: str = None,
+    fps: int = 10,
 ):
     if is_opencv_available():
         import cv2
@@ -122,25 +228,57 @@ def _legacy_export_to_video(
     if output_video_path is None:
         output_video_path = tempfile.NamedTemporaryFile(suffix=".mp4").name
 
-    if isinstance(video_frames[0], np.ndarray):
-        video_frames = [(frame * 255).astype(np.uint8) for frame in video_frames]
-
-    elif isinstance(video_frames[0], PIL.Image.Image):
-        video_frames = [np.array(frame) for frame in video_frames]
-
     fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    h, w, c = video_frames[0].shape
-    video_writer = cv2.VideoWriter(output_video_path, fourcc, fps=fps, frameSize=(w, h))
-    for i in range(len(video_frames)):
-        img = cv2.cvtColor(video_frames[i], cv2.COLOR_RGB2BGR)
+    video_writer = None
+    for frame in _iter_in_background(_iter_uint8_frames(video_frames)):
+        if video_writer is None:
+            h, w, c = frame.shape
+            video_writer = cv2.VideoWriter(output_video_path, fourcc, fps=fps, frameSize=(w, h))
+        img = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
         video_writer.write(img)
+    if video_writer is not None:
+        video_writer.release()
 
     return output_video_path
 
 
 def export_to_video(
-    video_frames: Union[List[np.ndarray], List[PIL.Image.Image]], output_video_path: str = None, fps: int = 10
+    video_frames: Union[List[np.ndarray], List[PIL.Image.Image], Iterable],
+    output_video_path: str = None,
+    fps: int = 10,
+    quality: Optional[float] = 5.0,
+    bitrate: Optional[int] = None,
+    codec: Optional[str] = None,
+    macro_block_size: Optional[int] = 16,
 ) -> str:
+    r"""
+    Writes the frames of a video to an mp4 file.
+
+    The frames are converted and written one chunk at a time on a background thread, so `video_frames` can be a
+    generator (e.g. over [`~VideoProcessor.postprocess_video_iter`]) and the whole video never has to be in memory.
+
+    Args:
+        video_frames (`List[np.ndarray]`, `List[PIL.Image.Image]` or `Iterable`):
+            The frames of the video. Every item is a frame or a chunk of frames: PIL images, NumPy arrays or PyTorch
+            tensors of shape `(height, width, num_channels)`, with uint8 values or float values in [0, 1].
+        output_video_path (`str`, *optional*):
+            The path to write the video to. If `None`, a temporary file is used.
+        fps (`int`, *optional*, defaults to 10):
+            The frame rate of the video.
+        quality (`float`, *optional*, defaults to 5.0):
+            The quality of the video, from 0 to 10, passed to the ffmpeg writer of imageio. Ignored if `bitrate` is
+            set.
+        bitrate (`int`, *optional*):
+            The bitrate of the video, passed to the ffmpeg writer of imageio.
+        codec (`str`, *optional*):
+            The ffmpeg codec of the video. Defaults to the codec of imageio (`libx264`).
+        macro_block_size (`int`, *optional*, defaults to 16):
+            The frames are resized so that their height and width are a multiple of `macro_block_size`, which most
+            codecs require.
+
+    Returns:
+        `str`: The path of the video.
+    """
     # TODO: Dhruv. Remove by Diffusers release 0.33.0
     # Added to prevent breaking existing code
     if not is_imageio_available():
@@ -171,14 +309,12 @@ def export_to_video(
     if output_video_path is None:
         output_video_path = tempfile.NamedTemporaryFile(suffix=".mp4").name
 
-    if isinstance(video_frames[0], np.ndarray):
-        video_frames = [(frame * 255).astype(np.uint8) for frame in video_frames]
-
-    elif isinstance(video_frames[0], PIL.Image.Image):
-        video_frames = [np.array(frame) for frame in video_frames]
+    writer_kwargs = {"quality": quality, "bitrate": bitrate, "macro_block_size": macro_block_size}
+    if codec is not None:
+        writer_kwargs["codec"] = codec
 
-    with imageio.get_writer(output_video_path, fps=fps) as writer:
-        for frame in video_frames:
+    with imageio.get_writer(output_video_path, fps=fps, **writer_kwargs) as writer:
+        for frame in _iter_in_background(_iter_uint8_frames(video_frames)):
             writer.append_data(frame)
 
     return output_video_path
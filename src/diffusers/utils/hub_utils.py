@@ -55,10 +55,10 @@ from .constants import (
 )
 from .import_utils import (
     ENV_VARS_TRUE_VALUES,
-    _flax_version,
-    _jax_version,
-    _onnxruntime_version,
-    _torch_version,
+    _get_flax_version,
+    _get_jax_version,
+    _get_onnxruntime_version,
+    _get_torch_version,
     is_flax_available,
     is_onnx_available,
     is_torch_available,
@@ -80,12 +80,12 @@ def http_user_agent(user_agent: Union[Dict, str, None] = None) -> str:
     if HF_HUB_DISABLE_TELEMETRY or HF_HUB_OFFLINE:
         return ua + "; telemetry/off"
     if is_torch_available():
-        ua += f"; torch/{_torch_version}"
+        ua += f"; torch/{_get_torch_version()}"
     if is_flax_available():
-        ua += f"; jax/{_jax_version}"
-        ua += f"; flax/{_flax_version}"
+        ua += f"; jax/{_get_jax_version()}"
+        ua += f"; flax/{_get_flax_version()}"
     if is_onnx_available():
-        ua += f"; onnxruntime/{_onnxruntime_version}"
+        ua += f"; onnxruntime/{_get_onnxruntime_version()}"
     # CI will set this value to True
     if os.environ.get("DIFFUSERS_IS_CI", "").upper() in ENV_VARS_TRUE_VALUES:
         ua += "; is_ci/true"
@@ -20,12 +20,12 @@ import operator as op
 import os
 import sys
 from collections import OrderedDict
+from functools import lru_cache
 from itertools import chain
 from types import ModuleType
-from typing import Any, Union
+from typing import Any, Optional, Tuple, Union
 
 from huggingface_hub.utils import is_jinja_available  # noqa: F401
-from packaging import version
 from packaging.version import Version, parse
 
 from . import logging
@@ -52,400 +52,203 @@ DIFFUSERS_SLOW_IMPORT = DIFFUSERS_SLOW_IMPORT in ENV_VARS_TRUE_VALUES
 
 STR_OPERATION_TO_FUNC = {">": op.gt, ">=": op.ge, "==": op.eq, "!=": op.ne, "<=": op.le, "<": op.lt}
 
-_torch_version = "N/A"
-if USE_TORCH in ENV_VARS_TRUE_AND_AUTO_VALUES and USE_TF not in ENV_VARS_TRUE_VALUES:
-    _torch_available = importlib.util.find_spec("torch") is not None
-    if _torch_available:
-        try:
-            _torch_version = importlib_metadata.version("torch")
-            logger.info(f"PyTorch version {_torch_version} available.")
-        except importlib_metadata.PackageNotFoundError:
-            _torch_available = False
-else:
-    logger.info("Disabling PyTorch because USE_TORCH is set")
-    _torch_available = False
-
-_torch_xla_available = importlib.util.find_spec("torch_xla") is not None
-if _torch_xla_available:
-    try:
-        _torch_xla_version = importlib_metadata.version("torch_xla")
-        logger.info(f"PyTorch XLA version {_torch_xla_version} available.")
-    except ImportError:
-        _torch_xla_available = False
-
-# check whether torch_npu is available
-_torch_npu_available = importlib.util.find_spec("torch_npu") is not None
-if _torch_npu_available:
-    try:
-        _torch_npu_version = importlib_metadata.version("torch_npu")
-        logger.info(f"torch_npu version {_torch_npu_version} available.")
-    except ImportError:
-        _torch_npu_available = False
-
-_jax_version = "N/A"
-_flax_version = "N/A"
-if USE_JAX in ENV_VARS_TRUE_AND_AUTO_VALUES:
-    _flax_available = importlib.util.find_spec("jax") is not None and importlib.util.find_spec("flax") is not None
-    if _flax_available:
-        try:
-            _jax_version = importlib_metadata.version("jax")
-            _flax_version = importlib_metadata.version("flax")
-            logger.info(f"JAX version {_jax_version}, Flax version {_flax_version} available.")
-        except importlib_metadata.PackageNotFoundError:
-            _flax_available = False
-else:
-    _flax_available = False
 
-if USE_SAFETENSORS in ENV_VARS_TRUE_AND_AUTO_VALUES:
-    _safetensors_available = importlib.util.find_spec("safetensors") is not None
-    if _safetensors_available:
-        try:
-            _safetensors_version = importlib_metadata.version("safetensors")
-            logger.info(f"Safetensors version {_safetensors_version} available.")
-        except importlib_metadata.PackageNotFoundError:
-            _safetensors_available = False
-else:
-    logger.info("Disabling Safetensors because USE_TF is set")
-    _safetensors_available = False
-
-_transformers_available = importlib.util.find_spec("transformers") is not None
-try:
-    _transformers_version = importlib_metadata.version("transformers")
-    logger.debug(f"Successfully imported transformers version {_transformers_version}")
-except importlib_metadata.PackageNotFoundError:
-    _transformers_available = False
-
-
-_inflect_available = importlib.util.find_spec("inflect") is not None
-try:
-    _inflect_version = importlib_metadata.version("inflect")
-    logger.debug(f"Successfully imported inflect version {_inflect_version}")
-except importlib_metadata.PackageNotFoundError:
-    _inflect_available = False
-
-
-_unidecode_available = importlib.util.find_spec("unidecode") is not None
-try:
-    _unidecode_version = importlib_metadata.version("unidecode")
-    logger.debug(f"Successfully imported unidecode version {_unidecode_version}")
-except importlib_metadata.PackageNotFoundError:
-    _unidecode_available = False
-
-_onnxruntime_version = "N/A"
-_onnx_available = importlib.util.find_spec("onnxruntime") is not None
-if _onnx_available:
-    candidates = (
-        "onnxruntime",
-        "onnxruntime-gpu",
-        "ort_nightly_gpu",
-        "onnxruntime-directml",
-        "onnxruntime-openvino",
-        "ort_nightly_directml",
-        "onnxruntime-rocm",
-        "onnxruntime-training",
-    )
-    _onnxruntime_version = None
-    # For the metadata, we have to look for both onnxruntime and onnxruntime-gpu
-    for pkg in candidates:
-        try:
-            _onnxruntime_version = importlib_metadata.version(pkg)
-            break
-        except importlib_metadata.PackageNotFoundError:
-            pass
-    _onnx_available = _onnxruntime_version is not None
-    if _onnx_available:
-        logger.debug(f"Successfully imported onnxruntime version {_onnxruntime_version}")
-
-# (sayakpaul): importlib.util.find_spec("opencv-python") returns None even when it's installed.
-# _opencv_available = importlib.util.find_spec("opencv-python") is not None
-try:
-    candidates = (
-        "opencv-python",
-        "opencv-contrib-python",
-        "opencv-python-headless",
-        "opencv-contrib-python-headless",
-    )
-    _opencv_version = None
-    for pkg in candidates:
+# Availability checks are evaluated lazily, on the first call to the corresponding `is_xxx_available()`. Each check
+# costs a `find_spec` (a scan of `sys.path`) plus a metadata lookup, and most of them are never needed to import a
+# single pipeline, so doing all of them eagerly made up a noticeable part of `import diffusers`.
+@lru_cache(maxsize=None)
+def _is_package_available(pkg_name: str, distribution_names: Optional[Tuple[str, ...]] = None) -> Tuple[bool, str]:
+    """
+    Returns whether `pkg_name` can be imported together with its installed version (`"N/A"` when it is not
+    available). `distribution_names` lists the distributions to look the version up for, in order, when they differ
+    from the import name.
+    """
+    if importlib.util.find_spec(pkg_name) is None:
+        return False, "N/A"
+
+    for distribution_name in distribution_names or (pkg_name,):
         try:
-            _opencv_version = importlib_metadata.version(pkg)
-            break
+            pkg_version = importlib_metadata.version(distribution_name)
         except importlib_metadata.PackageNotFoundError:
-            pass
-    _opencv_available = _opencv_version is not None
-    if _opencv_available:
-        logger.debug(f"Successfully imported cv2 version {_opencv_version}")
-except importlib_metadata.PackageNotFoundError:
-    _opencv_available = False
-
-_scipy_available = importlib.util.find_spec("scipy") is not None
-try:
-    _scipy_version = importlib_metadata.version("scipy")
-    logger.debug(f"Successfully imported scipy version {_scipy_version}")
-except importlib_metadata.PackageNotFoundError:
-    _scipy_available = False
-
-_librosa_available = importlib.util.find_spec("librosa") is not None
-try:
-    _librosa_version = importlib_metadata.version("librosa")
-    logger.debug(f"Successfully imported librosa version {_librosa_version}")
-except importlib_metadata.PackageNotFoundError:
-    _librosa_available = False
-
-_accelerate_available = importlib.util.find_spec("accelerate") is not None
-try:
-    _accelerate_version = importlib_metadata.version("accelerate")
-    logger.debug(f"Successfully imported accelerate version {_accelerate_version}")
-except importlib_metadata.PackageNotFoundError:
-    _accelerate_available = False
-
-_xformers_available = importlib.util.find_spec("xformers") is not None
-try:
-    _xformers_version = importlib_metadata.version("xformers")
-    if _torch_available:
-        _torch_version = importlib_metadata.version("torch")
-        if version.Version(_torch_version) < version.Version("1.12"):
-            raise ValueError("xformers is installed in your environment and requires PyTorch >= 1.12")
-
-    logger.debug(f"Successfully imported xformers version {_xformers_version}")
-except importlib_metadata.PackageNotFoundError:
-    _xformers_available = False
-
-_k_diffusion_available = importlib.util.find_spec("k_diffusion") is not None
-try:
-    _k_diffusion_version = importlib_metadata.version("k_diffusion")
-    logger.debug(f"Successfully imported k-diffusion version {_k_diffusion_version}")
-except importlib_metadata.PackageNotFoundError:
-    _k_diffusion_available = False
-
-_note_seq_available = importlib.util.find_spec("note_seq") is not None
-try:
-    _note_seq_version = importlib_metadata.version("note_seq")
-    logger.debug(f"Successfully imported note-seq version {_note_seq_version}")
-except importlib_metadata.PackageNotFoundError:
-    _note_seq_available = False
-
-_wandb_available = importlib.util.find_spec("wandb") is not None
-try:
-    _wandb_version = importlib_metadata.version("wandb")
-    logger.debug(f"Successfully imported wandb version {_wandb_version }")
-except importlib_metadata.PackageNotFoundError:
-    _wandb_available = False
-
-
-_tensorboard_available = importlib.util.find_spec("tensorboard")
-try:
-    _tensorboard_version = importlib_metadata.version("tensorboard")
-    logger.debug(f"Successfully imported tensorboard version {_tensorboard_version}")
-except importlib_metadata.PackageNotFoundError:
-    _tensorboard_available = False
-
-
-_compel_available = importlib.util.find_spec("compel")
-try:
-    _compel_version = importlib_metadata.version("compel")
-    logger.debug(f"Successfully imported compel version {_compel_version}")
-except importlib_metadata.PackageNotFoundError:
-    _compel_available = False
-
-
-_ftfy_available = importlib.util.find_spec("ftfy") is not None
-try:
-    _ftfy_version = importlib_metadata.version("ftfy")
-    logger.debug(f"Successfully imported ftfy version {_ftfy_version}")
-except importlib_metadata.PackageNotFoundError:
-    _ftfy_available = False
-
-
-_bs4_available = importlib.util.find_spec("bs4") is not None
-try:
-    # importlib metadata under different name
-    _bs4_version = importlib_metadata.version("beautifulsoup4")
-    logger.debug(f"Successfully imported ftfy version {_bs4_version}")
-except importlib_metadata.PackageNotFoundError:
-    _bs4_available = False
-
-_torchsde_available = importlib.util.find_spec("torchsde") is not None
-try:
-    _torchsde_version = importlib_metadata.version("torchsde")
-    logger.debug(f"Successfully imported torchsde version {_torchsde_version}")
-except importlib_metadata.PackageNotFoundError:
-    _torchsde_available = False
-
-_invisible_watermark_available = importlib.util.find_spec("imwatermark") is not None
-try:
-    _invisible_watermark_version = importlib_metadata.version("invisible-watermark")
-    logger.debug(f"Successfully imported invisible-watermark version {_invisible_watermark_version}")
-except importlib_metadata.PackageNotFoundError:
-    _invisible_watermark_available = False
-
-
-_peft_available = importlib.util.find_spec("peft") is not None
-try:
-    _peft_version = importlib_metadata.version("peft")
-    logger.debug(f"Successfully imported peft version {_peft_version}")
-except importlib_metadata.PackageNotFoundError:
-    _peft_available = False
-
-_torchvision_available = importlib.util.find_spec("torchvision") is not None
-try:
-    _torchvision_version = importlib_metadata.version("torchvision")
-    logger.debug(f"Successfully imported torchvision version {_torchvision_version}")
-except importlib_metadata.PackageNotFoundError:
-    _torchvision_available = False
-
-_sentencepiece_available = importlib.util.find_spec("sentencepiece") is not None
-try:
-    _sentencepiece_version = importlib_metadata.version("sentencepiece")
-    logger.info(f"Successfully imported sentencepiece version {_sentencepiece_version}")
-except importlib_metadata.PackageNotFoundError:
-    _sentencepiece_available = False
-
-_matplotlib_available = importlib.util.find_spec("matplotlib") is not None
-try:
-    _matplotlib_version = importlib_metadata.version("matplotlib")
-    logger.debug(f"Successfully imported matplotlib version {_matplotlib_version}")
-except importlib_metadata.PackageNotFoundError:
-    _matplotlib_available = False
-
-_timm_available = importlib.util.find_spec("timm") is not None
-if _timm_available:
-    try:
-        _timm_version = importlib_metadata.version("timm")
-        logger.info(f"Timm version {_timm_version} available.")
-    except importlib_metadata.PackageNotFoundError:
-        _timm_available = False
+            continue
+        logger.debug(f"Successfully imported {pkg_name} version {pkg_version}")
+        return True, pkg_version
+    return False, "N/A"
+
+
+_ONNXRUNTIME_DISTRIBUTIONS = (
+    "onnxruntime",
+    "onnxruntime-gpu",
+    "ort_nightly_gpu",
+    "onnxruntime-directml",
+    "onnxruntime-openvino",
+    "ort_nightly_directml",
+    "onnxruntime-rocm",
+    "onnxruntime-training",
+)
+# (sayakpaul): importlib.util.find_spec("opencv-python") returns None even when it's installed, so we look for the
+# `cv2` module and resolve its version from one of the distributions that provide it.
+_OPENCV_DISTRIBUTIONS = (
+    "opencv-python",
+    "opencv-contrib-python",
+    "opencv-python-headless",
+    "opencv-contrib-python-headless",
+)
 
+_is_google_colab = "google.colab" in sys.modules or any(k.startswith("COLAB_") for k in os.environ)
 
-def is_timm_available():
-    return _timm_available
 
+def _get_torch_version():
+    if USE_TORCH not in ENV_VARS_TRUE_AND_AUTO_VALUES or USE_TF in ENV_VARS_TRUE_VALUES:
+        return "N/A"
+    return _is_package_available("torch")[1]
 
-_bitsandbytes_available = importlib.util.find_spec("bitsandbytes") is not None
-try:
-    _bitsandbytes_version = importlib_metadata.version("bitsandbytes")
-    logger.debug(f"Successfully imported bitsandbytes version {_bitsandbytes_version}")
-except importlib_metadata.PackageNotFoundError:
-    _bitsandbytes_available = False
 
-_is_google_colab = "google.colab" in sys.modules or any(k.startswith("COLAB_") for k in os.environ)
+def _get_jax_version():
+    if USE_JAX not in ENV_VARS_TRUE_AND_AUTO_VALUES:
+        return "N/A"
+    return _is_package_available("jax")[1]
+
+
+def _get_flax_version():
+    if _get_jax_version() == "N/A":
+        return "N/A"
+    return _is_package_available("flax")[1]
+
+
+def _get_onnxruntime_version():
+    return _is_package_available("onnxruntime", _ONNXRUNTIME_DISTRIBUTIONS)[1]
 
-_imageio_available = importlib.util.find_spec("imageio") is not None
-if _imageio_available:
-    try:
-        _imageio_version = importlib_metadata.version("imageio")
-        logger.debug(f"Successfully imported imageio version {_imageio_version}")
 
-    except importlib_metadata.PackageNotFoundError:
-        _imageio_available = False
+_LEGACY_VERSION_GETTERS = {
+    "_torch_version": _get_torch_version,
+    "_jax_version": _get_jax_version,
+    "_flax_version": _get_flax_version,
+    "_onnxruntime_version": _get_onnxruntime_version,
+}
+
+
+def __getattr__(name: str) -> Any:
+    # Backwards compatibility for the `_xxx_available` / `_xxx_version` module attributes that used to be computed
+    # eagerly at import time.
+    if name in _LEGACY_VERSION_GETTERS:
+        return _LEGACY_VERSION_GETTERS[name]()
+    if name.startswith("_") and name.endswith("_available") and f"is{name}" in globals():
+        return globals()[f"is{name}"]()
+    raise AttributeError(f"module {__name__} has no attribute {name}")
 
 
 def is_torch_available():
-    return _torch_available
+    return _get_torch_version() != "N/A"
 
 
 def is_torch_xla_available():
-    return _torch_xla_available
+    return _is_package_available("torch_xla")[0]
 
 
 def is_torch_npu_available():
-    return _torch_npu_available
+    return _is_package_available("torch_npu")[0]
 
 
 def is_flax_available():
-    return _flax_available
+    return _get_flax_version() != "N/A"
 
 
 def is_transformers_available():
-    return _transformers_available
+    return _is_package_available("transformers")[0]
 
 
 def is_inflect_available():
-    return _inflect_available
+    return _is_package_available("inflect")[0]
 
 
 def is_unidecode_available():
-    return _unidecode_available
+    return _is_package_available("unidecode")[0]
 
 
 def is_onnx_available():
-    return _onnx_available
+    return _get_onnxruntime_version() != "N/A"
 
 
 def is_opencv_available():
-    return _opencv_available
+    return _is_package_available("cv2", _OPENCV_DISTRIBUTIONS)[0]
 
 
 def is_scipy_available():
-    return _scipy_available
+    return _is_package_available("scipy")[0]
 
 
 def is_librosa_available():
-    return _librosa_available
+    return _is_package_available("librosa")[0]
 
 
 def is_xformers_available():
-    return _xformers_available
+    xformers_available, _ = _is_package_available("xformers")
+    if xformers_available and is_torch_available() and is_torch_version("<", "1.12"):
+        raise ValueError("xformers is installed in your environment and requires PyTorch >= 1.12")
+    return xformers_available
 
 
 def is_accelerate_available():
-    return _accelerate_available
+    return _is_package_available("accelerate")[0]
 
 
 def is_k_diffusion_available():
-    return _k_diffusion_available
+    return _is_package_available("k_diffusion")[0]
 
 
 def is_note_seq_available():
-    return _note_seq_available
+    return _is_package_available("note_seq")[0]
 
 
 def is_wandb_available():
-    return _wandb_available
+    return _is_package_available("wandb")[0]
 
 
 def is_tensorboard_available():
-    return _tensorboard_available
+    return _is_package_available("tensorboard")[0]
 
 
 def is_compel_available():
-    return _compel_available
+    return _is_package_available("compel")[0]
 
 
 def is_ftfy_available():
-    return _ftfy_available
+    return _is_package_available("ftfy")[0]
 
 
 def is_bs4_available():
-    return _bs4_available
+    return _is_package_available("bs4", ("beautifulsoup4",))[0]
 
 
 def is_torchsde_available():
-    return _torchsde_available
+    return _is_package_available("torchsde")[0]
 
 
 def is_invisible_watermark_available():
-    return _invisible_watermark_available
+    return _is_package_available("imwatermark", ("invisible-watermark",))[0]
 
 
 def is_peft_available():
-    return _peft_available
+    return _is_package_available("peft")[0]
 
 
 def is_torchvision_available():
-    return _torchvision_available
+    return _is_package_available("torchvision")[0]
 
 
 def is_matplotlib_available():
-    return _matplotlib_available
+    return _is_package_available("matplotlib")[0]
 
 
 def is_safetensors_available():
-    return _safetensors_available
+    if USE_SAFETENSORS not in ENV_VARS_TRUE_AND_AUTO_VALUES:
+        return False
+    return _is_package_available("safetensors")[0]
 
 
 def is_bitsandbytes_available():
-    return _bitsandbytes_available
+    return _is_package_available("bitsandbytes")[0]
 
 
 def is_google_colab():
@@ -453,11 +256,19 @@ def is_google_colab():
 
 
 def is_sentencepiece_available():
-    return _sentencepiece_available
+    return _is_package_available("sentencepiece")[0]
 
 
 def is_imageio_available():
-    return _imageio_available
+    return _is_package_available("imageio")[0]
+
+
+def is_timm_available():
+    return _is_package_available("timm")[0]
+
+
+def is_flash_attn_available():
+    return _is_package_available("flash_attn", ("flash-attn",))[0]
 
 
 # docstyle-ignore
@@ -697,7 +508,7 @@ def is_torch_version(operation: str, version: str):
         version (`str`):
             A string version of PyTorch
     """
-    return compare_versions(parse(_torch_version), operation, version)
+    return compare_versions(parse(_get_torch_version()), operation, version)
 
 
 def is_transformers_version(operation: str, version: str):
@@ -710,9 +521,10 @@ def is_transformers_version(operation: str, version: str):
         version (`str`):
             A version string
     """
-    if not _transformers_available:
+    transformers_available, transformers_version = _is_package_available("transformers")
+    if not transformers_available:
         return False
-    return compare_versions(parse(_transformers_version), operation, version)
+    return compare_versions(parse(transformers_version), operation, version)
 
 
 def is_accelerate_version(operation: str, version: str):
@@ -725,9 +537,10 @@ def is_accelerate_version(operation: str, version: str):
         version (`str`):
             A version string
     """
-    if not _accelerate_available:
+    accelerate_available, accelerate_version = _is_package_available("accelerate")
+    if not accelerate_available:
         return False
-    return compare_versions(parse(_accelerate_version), operation, version)
+    return compare_versions(parse(accelerate_version), operation, version)
 
 
 def is_peft_version(operation: str, version: str):
@@ -740,9 +553,10 @@ def is_peft_version(operation: str, version: str):
         version (`str`):
             A version string
     """
-    if not _peft_version:
+    peft_available, peft_version = _is_package_available("peft")
+    if not peft_available:
         return False
-    return compare_versions(parse(_peft_version), operation, version)
+    return compare_versions(parse(peft_version), operation, version)
 
 
 def is_bitsandbytes_version(operation: str, version: str):
@@ -754,9 +568,10 @@ def is_bitsandbytes_version(operation: str, version: str):
         version (`str`):
             A version string
     """
-    if not _bitsandbytes_version:
+    bitsandbytes_available, bitsandbytes_version = _is_package_available("bitsandbytes")
+    if not bitsandbytes_available:
         return False
-    return compare_versions(parse(_bitsandbytes_version), operation, version)
+    return compare_versions(parse(bitsandbytes_version), operation, version)
 
 
 def is_k_diffusion_version(operation: str, version: str):
@@ -769,9 +584,10 @@ def is_k_diffusion_version(operation: str, version: str):
         version (`str`):
             A version string
     """
-    if not _k_diffusion_available:
+    k_diffusion_available, k_diffusion_version = _is_package_available("k_diffusion")
+    if not k_diffusion_available:
         return False
-    return compare_versions(parse(_k_diffusion_version), operation, version)
+    return compare_versions(parse(k_diffusion_version), operation, version)
 
 
 def get_objects_from_module(module):
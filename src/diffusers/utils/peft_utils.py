@@ -17,21 +17,19 @@ PEFT utilities: Utilities related to peft library
 
 import collections
 import importlib
-from typing import Optional
+from typing import List, Optional
 
 from packaging import version
 
-from .import_utils import is_peft_available, is_torch_available
-
-
-if is_torch_available():
-    import torch
+from .import_utils import is_peft_available
 
 
 def recurse_remove_peft_layers(model):
     r"""
     Recursively replace all instances of `LoraLayer` with corresponding new layers in `model`.
     """
+    # `torch` is imported here rather than at module level so that `import diffusers` does not pay for it.
+    import torch
     from peft.tuners.tuners_utils import BaseTunerLayer
 
     has_base_layer_pattern = False
@@ -100,6 +98,22 @@ def recurse_remove_peft_layers(model):
     return model
 
 
+def _restore_lora_scaling_tensors(module):
+    # The scalings of hot-swappable LoRA layers (see `PeftAdapterMixin.enable_lora_hotswap`) are kept in persistent
+    # tensors so that a compiled model doesn't recompile when they change. PEFT's `set_scale` and `unscale_layer`
+    # assign Python floats instead, which are copied back into the persistent tensors here.
+    scaling_tensors = getattr(module, "_diffusers_lora_hotswap_scaling", None)
+    if not scaling_tensors:
+        return
+
+    for adapter_name, scaling_tensor in scaling_tensors.items():
+        scaling = module.scaling.get(adapter_name)
+        if scaling is None or scaling is scaling_tensor:
+            continue
+        scaling_tensor.fill_(scaling)
+        module.scaling[adapter_name] = scaling_tensor
+
+
 def scale_lora_layers(model, weight):
     """
     Adjust the weightage given to the LoRA layers of the model.
@@ -145,6 +159,7 @@ def unscale_lora_layers(model, weight: Optional[float] = None):
                 for adapter_name in module.active_adapters:
                     # if weight == 0 unscale should re-set the scale to the original value.
                     module.set_scale(adapter_name, 1.0)
+            _restore_lora_scaling_tensors(module)
 
 
 def get_peft_kwargs(rank_dict, network_alpha_dict, peft_state_dict, is_unet=True):
@@ -216,6 +231,7 @@ def set_adapter_layers(model, enabled=True):
 def delete_adapter_layers(model, adapter_name):
     from peft.tuners.tuners_utils import BaseTunerLayer
 
+    _clear_batch_lora_weights(model)
     for module in model.modules():
         if isinstance(module, BaseTunerLayer):
             if hasattr(module, "delete_adapter"):
@@ -264,6 +280,7 @@ def set_weights_and_activate_adapters(model, adapter_names, weights):
                 else:
                     module.active_adapter = adapter_name
                 module.set_scale(adapter_name, get_module_weight(weight, module_name))
+                _restore_lora_scaling_tensors(module)
 
     # set multiple active adapters
     for module in model.modules():
@@ -275,6 +292,250 @@ def set_weights_and_activate_adapters(model, adapter_names, weights):
                 module.active_adapter = adapter_names
 
 
+def _clear_batch_lora_weights(model):
+    # Drops the stacked LoRA weights cached by `_BatchedLoraHook`. Called whenever the LoRA weights of `model` are
+    # replaced, deleted or updated in place.
+    for module in model.modules():
+        if hasattr(module, "_diffusers_batch_lora_weights"):
+            del module._diffusers_batch_lora_weights
+
+
+class _BatchedLoraHook:
+    r"""
+    Forward hook that adds a different LoRA delta to each row of the batch of a PEFT LoRA layer.
+
+    The `lora_A`/`lora_B` weights of the requested adapters are stacked (zero-padded to the largest rank) and gathered
+    per row with the adapter index of that row, so that all rows are handled by a single batched matmul, as done in
+    Punica and S-LoRA. Rows without an adapter gather an all-zero slot. The stacked weights are cached on every layer
+    (see `_clear_batch_lora_weights`); the scalings are read on every call, so rescaling the adapters takes effect
+    immediately.
+    """
+
+    def __init__(self, adapter_names):
+        self.adapter_names = adapter_names
+        self._indices = {}
+
+    def slots(self, module):
+        # slot 0 is reserved for rows without an adapter (or with an adapter that does not target this layer)
+        return [None] + sorted({name for name in self.adapter_names if name is not None and name in module.lora_A})
+
+    def indices(self, module, batch_size, device):
+        slots = self.slots(module)
+        key = (tuple(slots), batch_size, device)
+        if key not in self._indices:
+            import torch
+
+            num_rows = len(self.adapter_names)
+            if batch_size % num_rows != 0:
+                raise ValueError(
+                    f"The batch size of the LoRA layer input ({batch_size}) is not a multiple of the number of per-sample"
+                    f" adapters ({num_rows})."
+                )
+            indices = [slots.index(name) if name in slots else 0 for name in self.adapter_names]
+            # inputs that were concatenated along the batch dimension (e.g. for classifier-free guidance) reuse the
+            # per-sample adapters of each chunk
+            self._indices[key] = torch.tensor(indices, device=device).repeat(batch_size // num_rows)
+        return self._indices[key]
+
+    def stacked_weights(self, module, dtype, device):
+        import torch
+
+        slots = self.slots(module)
+        weight_A = [module.lora_A[name].weight for name in slots[1:]]
+        weight_B = [module.lora_B[name].weight for name in slots[1:]]
+        scaling = torch.tensor([0.0] + [float(module.scaling[name]) for name in slots[1:]], dtype=dtype, device=device)
+
+        # The stacked weights can't be cached when gradients have to flow back to the LoRA weights. Loading an
+        # adapter under a requested name replaces its weights, which changes the key.
+        cacheable = not (torch.is_grad_enabled() and any(weight.requires_grad for weight in weight_A + weight_B))
+        key = (tuple(slots), tuple(id(weight) for weight in weight_A + weight_B), dtype, device)
+        cache = getattr(module, "_diffusers_batch_lora_weights", None)
+        if cacheable and cache is not None and cache[0] == key:
+            return cache[1], cache[2], scaling
+
+        rank = max(weight.shape[0] for weight in weight_A)
+        stacked_A = weight_A[0].new_zeros(
+            (len(slots), rank) + tuple(weight_A[0].shape[1:]), dtype=dtype, device=device
+        )
+        stacked_B = weight_B[0].new_zeros(
+            (len(slots), weight_B[0].shape[0], rank) + tuple(weight_B[0].shape[2:]), dtype=dtype, device=device
+        )
+        for i, (A, B) in enumerate(zip(weight_A, weight_B), start=1):
+            stacked_A[i, : A.shape[0]] = A
+            stacked_B[i, :, : B.shape[1]] = B
+        if cacheable:
+            module._diffusers_batch_lora_weights = (key, stacked_A, stacked_B)
+        return stacked_A, stacked_B, scaling
+
+    def __call__(self, module, args, output):
+        import torch
+        import torch.nn.functional as F
+
+        if len(self.slots(module)) == 1:
+            return output
+
+        x = args[0]
+        batch_size = x.shape[0]
+        stacked_A, stacked_B, scaling = self.stacked_weights(module, x.dtype, x.device)
+        indices = self.indices(module, batch_size, x.device)
+        weight_A, weight_B, scaling = stacked_A[indices], stacked_B[indices], scaling[indices]
+
+        if isinstance(module.base_layer, torch.nn.Conv2d):
+            lora_A = module.lora_A[self.slots(module)[1]]
+            hidden_states = F.conv2d(
+                x.reshape(1, -1, *x.shape[2:]),
+                weight_A.flatten(0, 1),
+                stride=lora_A.stride,
+                padding=lora_A.padding,
+                dilation=lora_A.dilation,
+                groups=batch_size,
+            )
+            delta = F.conv2d(hidden_states, weight_B.flatten(0, 1), groups=batch_size)
+            delta = delta.reshape(batch_size, -1, *delta.shape[2:]) * scaling.view(-1, 1, 1, 1)
+        else:
+            hidden_states = torch.bmm(x.reshape(batch_size, -1, x.shape[-1]), weight_A.transpose(1, 2))
+            delta = torch.bmm(hidden_states, weight_B.transpose(1, 2)) * scaling.view(-1, 1, 1)
+            delta = delta.reshape(*x.shape[:-1], delta.shape[-1])
+
+        return output + delta.to(output.dtype)
+
+
+def set_batch_adapter_layers(model, adapter_names: Optional[List[Optional[str]]]):
+    """
+    Applies a different LoRA adapter to each sample of the batch passed to `model`.
+
+    While set, the LoRA layers of `model` ignore the active adapters and instead add, to every row of their input, the
+    delta of the adapter at the same position in `adapter_names`. Inputs whose batch size is a multiple of
+    `len(adapter_names)`, such as the concatenated unconditional and conditional inputs of classifier-free guidance,
+    repeat `adapter_names` for each chunk.
+
+    Args:
+        model (`torch.nn.Module`):
+            The model with the PEFT LoRA layers.
+        adapter_names (`List[Optional[str]]`, *optional*):
+            The name of the adapter to use for each sample of the batch. `None` entries use the base model. Passing
+            `None` instead of a list restores the regular behavior of the LoRA layers.
+    """
+    import torch
+    from peft.tuners.tuners_utils import BaseTunerLayer
+
+    _clear_batch_lora_weights(model)
+    for module in model.modules():
+        handle = getattr(module, "_diffusers_batch_lora_hook", None)
+        if handle is not None:
+            handle.remove()
+            module._disable_adapters = module._diffusers_batch_lora_disable_adapters
+            del module._diffusers_batch_lora_hook
+            del module._diffusers_batch_lora_disable_adapters
+
+    if adapter_names is None:
+        return
+
+    hook = _BatchedLoraHook(list(adapter_names))
+    requested = {name for name in adapter_names if name is not None}
+    for module in model.modules():
+        if not isinstance(module, BaseTunerLayer) or not requested.intersection(getattr(module, "lora_A", {})):
+            continue
+
+        if getattr(module, "merged", False):
+            raise ValueError("Per-sample adapters cannot be used with fused LoRA layers. Please unfuse them first.")
+        if any(getattr(module, "use_dora", {}).get(name, False) for name in requested):
+            raise ValueError("Per-sample adapters are not supported for DoRA adapters.")
+        if not isinstance(module.base_layer, (torch.nn.Linear, torch.nn.Conv2d)):
+            raise ValueError(
+                f"Per-sample adapters are only supported for LoRA `Linear` and `Conv2d` layers, but the adapters"
+                f" target a `{type(module.base_layer).__name__}` layer."
+            )
+
+        # The regular LoRA path of PEFT is skipped by flagging the adapters of the layer as disabled. This is done
+        # without `enable_adapters` so that the `requires_grad` flags of the LoRA weights are left untouched.
+        module._diffusers_batch_lora_disable_adapters = module._disable_adapters
+        module._disable_adapters = True
+        module._diffusers_batch_lora_hook = module.register_forward_hook(hook)
+
+
+def merge_lora_layer_with_delta(module, adapter_names=None, safe_merge=False, delta_device=None):
+    """
+    Fuses the LoRA adapters of a PEFT LoRA layer into its base weight and keeps the change that was applied to the
+    base weight, so that [`unmerge_lora_layer`] can restore the original weight with a subtraction instead of
+    recomputing `lora_B @ lora_A * scaling`.
+
+    The kept delta is the difference between the fused and the original weight computed in `float32`, which makes
+    unfusing exact even for half-precision weights. Adapters using DoRA or a LoRA bias are fused with PEFT's `merge`.
+
+    Args:
+        module (`BaseTunerLayer`):
+            The LoRA layer to fuse.
+        adapter_names (`List[str]`, *optional*):
+            The adapters to fuse. Defaults to the active adapters of the layer.
+        safe_merge (`bool`, defaults to `False`):
+            Whether to check the fused weight for NaN or infinite values before fusing it.
+        delta_device (`str` or `torch.device`, *optional*):
+            The device to keep the deltas on, e.g. `"cpu"` to save accelerator memory. Defaults to the device of the
+            base weight.
+    """
+    import torch
+
+    if adapter_names is None:
+        adapter_names = module.active_adapters
+
+    weight = module.get_base_layer().weight
+    if not hasattr(module, "_diffusers_fused_lora_deltas"):
+        module._diffusers_fused_lora_deltas = {}
+
+    for adapter_name in adapter_names:
+        if adapter_name not in module.lora_A or adapter_name in module.merged_adapters:
+            continue
+
+        if module.use_dora.get(adapter_name, False) or getattr(module, "lora_bias", {}).get(adapter_name, False):
+            module.merge(safe_merge=safe_merge, adapter_names=[adapter_name])
+            continue
+
+        with torch.no_grad():
+            original_weight = weight.data.float()
+            fused_weight = (original_weight + module.get_delta_weight(adapter_name).float()).to(weight.dtype)
+            if safe_merge and not torch.isfinite(fused_weight).all():
+                raise ValueError(f"NaNs detected in the merged weights. The adapter {adapter_name} seems to be broken")
+            delta = fused_weight.float() - original_weight
+            weight.data.copy_(fused_weight)
+
+        module._diffusers_fused_lora_deltas[adapter_name] = delta.to(delta_device or weight.device)
+        module.merged_adapters.append(adapter_name)
+
+
+def unmerge_lora_layer(module):
+    """
+    Unfuses all the fused adapters of a PEFT LoRA layer. Adapters fused with [`merge_lora_layer_with_delta`] are
+    unfused by subtracting their kept delta, the other ones with PEFT's `unmerge`.
+
+    Args:
+        module (`BaseTunerLayer`):
+            The LoRA layer to unfuse.
+    """
+    import torch
+
+    deltas = getattr(module, "_diffusers_fused_lora_deltas", None)
+    if not deltas:
+        module.unmerge()
+        return
+
+    weight = module.get_base_layer().weight
+    # adapters are unfused in the reverse order in which they were fused
+    while len(module.merged_adapters) > 0:
+        adapter_name = module.merged_adapters[-1]
+        delta = deltas.pop(adapter_name, None)
+        if delta is None:
+            remaining_adapters = module.merged_adapters[:-1]
+            module.merged_adapters = [adapter_name]
+            module.unmerge()
+            module.merged_adapters = remaining_adapters
+            continue
+
+        with torch.no_grad():
+            weight.data.copy_((weight.data.float() - delta.to(weight.device)).to(weight.dtype))
+        module.merged_adapters.pop()
+
+
 def check_peft_version(min_version: str) -> None:
     r"""
     Checks if the version of PEFT is compatible.
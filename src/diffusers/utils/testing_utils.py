@@ -889,6 +889,47 @@ def run_test_in_subprocess(test_case, target_func, inputs=None, timeout=None):
         test_case.fail(f'{results["error"]}')
 
 
+def _run_distributed_worker(rank, world_size, port, target_func, args):
+    import torch.distributed as dist
+
+    os.environ["MASTER_ADDR"] = "127.0.0.1"
+    os.environ["MASTER_PORT"] = str(port)
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+    try:
+        target_func(rank, world_size, *args)
+    finally:
+        dist.destroy_process_group()
+
+
+def run_distributed_test(target_func, world_size=2, args=()):
+    """
+    Runs `target_func(rank, world_size, *args)` in `world_size` forked processes with an initialized `gloo` process
+    group, so distributed features can be tested on CPU. Exceptions raised in any process fail the test.
+
+    Args:
+        target_func (`Callable`):
+            The function implementing the testing logic. It has to be defined at the module level.
+        world_size (`int`, *optional*, defaults to `2`):
+            The number of processes.
+        args (`tuple`, *optional*):
+            Extra arguments passed to `target_func`.
+    """
+    import socket
+
+    import torch.multiprocessing as mp
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    mp.start_processes(
+        _run_distributed_worker,
+        args=(world_size, port, target_func, args),
+        nprocs=world_size,
+        start_method="fork",
+    )
+
+
 class CaptureLogger:
     """
     Args:
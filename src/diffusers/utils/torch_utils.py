@@ -15,6 +15,9 @@
 PyTorch utilities: Utilities related to PyTorch
 """
 
+import importlib.abc
+import importlib.util
+import sys
 from typing import List, Optional, Tuple, Union
 
 from . import logging
@@ -27,13 +30,58 @@ if is_torch_available():
 
 logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
 
-try:
-    from torch._dynamo import allow_in_graph as maybe_allow_in_graph
-except (ImportError, ModuleNotFoundError):
+# Importing `torch._dynamo` takes about a second, which is more than the rest of `import torch`'s dependents in
+# diffusers combined. Classes decorated with `maybe_allow_in_graph` are therefore only registered with dynamo once
+# something else (usually `torch.compile`) has imported it.
+_pending_allow_in_graph = []
 
-    def maybe_allow_in_graph(cls):
+
+def _register_pending_allow_in_graph():
+    from torch._dynamo import allow_in_graph
+
+    while _pending_allow_in_graph:
+        allow_in_graph(_pending_allow_in_graph.pop())
+
+
+class _DynamoImportHook(importlib.abc.MetaPathFinder):
+    """Runs the pending `allow_in_graph` registrations right after `torch._dynamo` has been imported."""
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname != "torch._dynamo":
+            return None
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(fullname)
+        if spec is None or spec.loader is None:
+            return spec
+
+        exec_module = spec.loader.exec_module
+
+        def exec_module_and_register(module):
+            exec_module(module)
+            _register_pending_allow_in_graph()
+
+        spec.loader.exec_module = exec_module_and_register
+        return spec
+
+
+def maybe_allow_in_graph(cls):
+    """
+    Registers `cls` with `torch._dynamo.allow_in_graph`. If `torch._dynamo` has not been imported yet, registration is
+    deferred until it is, so that decorating a class doesn't force the (slow) dynamo import.
+    """
+    if not is_torch_available() or is_torch_version("<", "2.0.0"):
         return cls
 
+    if "torch._dynamo" in sys.modules:
+        from torch._dynamo import allow_in_graph
+
+        return allow_in_graph(cls)
+
+    if not _pending_allow_in_graph and not any(isinstance(finder, _DynamoImportHook) for finder in sys.meta_path):
+        sys.meta_path.insert(0, _DynamoImportHook())
+    _pending_allow_in_graph.append(cls)
+    return cls
+
 
 def randn_tensor(
     shape: Union[Tuple, List],
@@ -85,7 +133,9 @@ def randn_tensor(
 
 def is_compiled_module(module) -> bool:
     """Check whether the module was compiled with torch.compile()"""
-    if is_torch_version("<", "2.0.0") or not hasattr(torch, "_dynamo"):
+    # A module can only have been compiled if dynamo was imported, and checking `hasattr(torch, "_dynamo")` would
+    # import it.
+    if is_torch_version("<", "2.0.0") or "torch._dynamo" not in sys.modules:
         return False
     return isinstance(module, torch._dynamo.eval_frame.OptimizedModule)
 
@@ -13,7 +13,7 @@
 # limitations under the License.
 
 import warnings
-from typing import List, Optional, Union
+from typing import Iterable, Iterator, List, Optional, Union
 
 import numpy as np
 import PIL
@@ -25,7 +25,14 @@ from .image_processor import VaeImageProcessor, is_valid_image, is_valid_image_i
 class VideoProcessor(VaeImageProcessor):
     r"""Simple video processor."""
 
-    def preprocess_video(self, video, height: Optional[int] = None, width: Optional[int] = None) -> torch.Tensor:
+    def preprocess_video(
+        self,
+        video,
+        height: Optional[int] = None,
+        width: Optional[int] = None,
+        device: Optional[Union[str, torch.device]] = None,
+        num_workers: Optional[int] = None,
+    ) -> torch.Tensor:
         r"""
         Preprocesses input video(s).
 
@@ -49,6 +56,11 @@ class VideoProcessor(VaeImageProcessor):
             width (`int`, *optional*`, defaults to `None`):
                 The width in preprocessed frames of the video. If `None`, will use get_default_height_width()` to get
                 the default width.
+            device (`str` or `torch.device`, *optional*, defaults to `None`):
+                The device to preprocess the frames on, see [`~VaeImageProcessor.preprocess`].
+            num_workers (`int`, *optional*, defaults to `None`):
+                The number of threads to resize and convert the PIL frames of each video with, see
+                [`~VaeImageProcessor.preprocess`].
         """
         if isinstance(video, list) and isinstance(video[0], np.ndarray) and video[0].ndim == 5:
             warnings.warn(
@@ -79,7 +91,13 @@ class VideoProcessor(VaeImageProcessor):
                 "Input is in incorrect format. Currently, we only support numpy.ndarray, torch.Tensor, PIL.Image.Image"
             )
 
-        video = torch.stack([self.preprocess(img, height=height, width=width) for img in video], dim=0)
+        video = torch.stack(
+            [
+                self.preprocess(img, height=height, width=width, device=device, num_workers=num_workers)
+                for img in video
+            ],
+            dim=0,
+        )
 
         # move the number of channels before the number of frames.
         video = video.permute(0, 2, 1, 3, 4)
@@ -105,9 +123,28 @@ class VideoProcessor(VaeImageProcessor):
 
         if output_type == "np":
             outputs = np.stack(outputs)
-        elif output_type == "pt":
+        elif output_type in ["pt", "uint8"]:
             outputs = torch.stack(outputs)
         elif not output_type == "pil":
-            raise ValueError(f"{output_type} does not exist. Please choose one of ['np', 'pt', 'pil']")
+            raise ValueError(f"{output_type} does not exist. Please choose one of ['np', 'pt', 'uint8', 'pil']")
 
         return outputs
+
+    def postprocess_video_iter(
+        self, video_chunks: Iterable[torch.Tensor], output_type: str = "np"
+    ) -> Iterator[Union[np.ndarray, torch.Tensor, List[PIL.Image.Image]]]:
+        r"""
+        Converts chunks of a video tensor to chunks of frames for export, as soon as they're available.
+
+        Args:
+            video_chunks (`Iterable[torch.Tensor]`):
+                The chunks of the video, of shape `(batch_size, num_channels, num_frames, height, width)`, e.g. from
+                [`~AutoencoderKLCogVideoX.decode_frames_iter`].
+            output_type (`str`, defaults to `"np"`): Output type of the postprocessed chunks.
+
+        Returns:
+            `Iterator`:
+                An iterator over the postprocessed chunks, in the format of [`~VideoProcessor.postprocess_video`].
+        """
+        for video in video_chunks:
+            yield self.postprocess_video(video, output_type=output_type)
@@ -1008,6 +1008,81 @@ class PeftLoraLoaderMixinTests:
                 "Fused lora should not change the output",
             )
 
+    def test_simple_inference_with_text_denoiser_lora_unfused_with_kept_delta(self):
+        """
+        Tests that fusing with `keep_fused_delta=True` gives the same results as regular fusing and that unfusing
+        restores the original weights exactly.
+        """
+        for scheduler_cls in self.scheduler_classes:
+            components, text_lora_config, denoiser_lora_config = self.get_dummy_components(scheduler_cls)
+            pipe = self.pipeline_class(**components)
+            pipe = pipe.to(torch_device)
+            pipe.set_progress_bar_config(disable=None)
+            _, _, inputs = self.get_dummy_inputs(with_generator=False)
+
+            if "text_encoder" in self.pipeline_class._lora_loadable_modules:
+                pipe.text_encoder.add_adapter(text_lora_config)
+                self.assertTrue(
+                    check_if_lora_correctly_set(pipe.text_encoder), "Lora not correctly set in text encoder"
+                )
+
+            denoiser = pipe.transformer if self.unet_kwargs is None else pipe.unet
+            denoiser.add_adapter(denoiser_lora_config)
+            self.assertTrue(check_if_lora_correctly_set(denoiser), "Lora not correctly set in denoiser.")
+
+            original_state_dict = {k: v.clone() for k, v in denoiser.state_dict().items() if "lora" not in k}
+            output_lora = pipe(**inputs, generator=torch.manual_seed(0))[0]
+
+            pipe.fuse_lora(
+                components=self.pipeline_class._lora_loadable_modules, keep_fused_delta=True, fused_delta_device="cpu"
+            )
+            output_fused_lora = pipe(**inputs, generator=torch.manual_seed(0))[0]
+            self.assertTrue(
+                np.allclose(output_lora, output_fused_lora, atol=1e-3, rtol=1e-3),
+                "Fused lora should not change the output",
+            )
+
+            pipe.unfuse_lora(components=self.pipeline_class._lora_loadable_modules)
+            unfused_state_dict = denoiser.state_dict()
+            for name, param in original_state_dict.items():
+                self.assertTrue(torch.equal(param, unfused_state_dict[name]), f"{name} was not restored exactly.")
+
+    def test_lora_state_dict_cache(self):
+        """
+        Tests that loading the same LoRA file with the state dict cache enabled reuses the converted state dict.
+        """
+        for scheduler_cls in self.scheduler_classes:
+            components, _, denoiser_lora_config = self.get_dummy_components(scheduler_cls)
+            pipe = self.pipeline_class(**components)
+            pipe = pipe.to(torch_device)
+            pipe.set_progress_bar_config(disable=None)
+            _, _, inputs = self.get_dummy_inputs(with_generator=False)
+
+            denoiser = pipe.transformer if self.unet_kwargs is None else pipe.unet
+            denoiser.add_adapter(denoiser_lora_config)
+            images_lora = pipe(**inputs, generator=torch.manual_seed(0))[0]
+
+            with tempfile.TemporaryDirectory() as tmpdirname:
+                modules_to_save = self._get_modules_to_save(pipe, has_denoiser=True)
+                lora_state_dicts = self._get_lora_state_dicts(modules_to_save)
+                self.pipeline_class.save_lora_weights(save_directory=tmpdirname, **lora_state_dicts)
+                pipe.unload_lora_weights()
+
+                pipe.enable_lora_state_dict_cache(max_size=2)
+                pipe.load_lora_weights(tmpdirname, weight_name="pytorch_lora_weights.safetensors", adapter_name="a")
+                pipe.load_lora_weights(tmpdirname, weight_name="pytorch_lora_weights.safetensors", adapter_name="b")
+                self.assertEqual(len(pipe._lora_state_dict_cache), 1)
+
+            pipe.set_adapters("b")
+            images_lora_from_cache = pipe(**inputs, generator=torch.manual_seed(0))[0]
+            self.assertTrue(
+                np.allclose(images_lora, images_lora_from_cache, atol=1e-3, rtol=1e-3),
+                "Loading from the state dict cache should give same results.",
+            )
+
+            pipe.disable_lora_state_dict_cache()
+            self.assertIsNone(pipe._lora_state_dict_cache)
+
     def test_simple_inference_with_text_denoiser_multi_adapter(self):
         """
         Tests a simple inference with lora attached to text encoder and unet, attaches
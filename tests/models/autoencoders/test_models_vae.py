@@ -24,6 +24,7 @@ from parameterized import parameterized
 from diffusers import (
     AsymmetricAutoencoderKL,
     AutoencoderKL,
+    AutoencoderKLCogVideoX,
     AutoencoderKLTemporalDecoder,
     AutoencoderOobleck,
     AutoencoderTiny,
@@ -69,6 +70,18 @@ def get_autoencoder_kl_config(block_out_channels=None, norm_num_groups=None):
     return init_dict
 
 
+def assemble_tiles(tiles):
+    tiles = list(tiles)
+    height = max(y + tile.shape[2] for tile, y, _ in tiles)
+    width = max(x + tile.shape[3] for tile, _, x in tiles)
+    output = torch.full(tiles[0][0].shape[:2] + (height, width), float("nan"), device=tiles[0][0].device)
+    for tile, y, x in tiles:
+        # the tiles don't overlap
+        assert output[:, :, y : y + tile.shape[2], x : x + tile.shape[3]].isnan().all()
+        output[:, :, y : y + tile.shape[2], x : x + tile.shape[3]] = tile
+    return output
+
+
 def get_asym_autoencoder_kl_config(block_out_channels=None, norm_num_groups=None):
     block_out_channels = block_out_channels or [2, 4]
     norm_num_groups = norm_num_groups or 2
@@ -217,6 +230,76 @@ class AutoencoderKLTests(ModelTesterMixin, UNetTesterMixin, unittest.TestCase):
         for name, param in named_params.items():
             self.assertTrue(torch_all_close(param.grad.data, named_params_2[name].grad.data, atol=5e-5))
 
+    def test_tiled_batched(self):
+        init_dict = get_autoencoder_kl_config()
+        init_dict["sample_size"] = 16
+        model = self.model_class(**init_dict).to(torch_device).eval()
+        model.enable_tiling()
+
+        # sizes that aren't multiples of the tiles give smaller tiles at the borders
+        image = floats_tensor((2, 3, 44, 30)).to(torch_device)
+        latents = floats_tensor((2, 4, 19, 27)).to(torch_device)
+
+        with torch.no_grad():
+            encoded = model._tiled_encode(image)
+            decoded = model.tiled_decode(latents).sample
+            model.tile_batch_size = 4
+            encoded_batched = model._tiled_encode(image)
+            decoded_batched = model.tiled_decode(latents).sample
+
+        self.assertEqual(encoded.shape, (2, 8, 22, 15))
+        self.assertEqual(decoded.shape, (2, 3, 38, 54))
+        self.assertTrue(torch_all_close(encoded, encoded_batched, atol=1e-5))
+        self.assertTrue(torch_all_close(decoded, decoded_batched, atol=1e-5))
+
+    def test_decode_tiles_iter(self):
+        init_dict = get_autoencoder_kl_config()
+        init_dict["sample_size"] = 16
+        model = self.model_class(**init_dict).to(torch_device).eval()
+        latents = floats_tensor((2, 4, 19, 27)).to(torch_device)
+
+        with torch.no_grad():
+            decoded = model.tiled_decode(latents).sample
+            decoded_tiles = assemble_tiles(model.decode_tiles_iter(latents))
+
+        self.assertEqual(decoded_tiles.shape, decoded.shape)
+        self.assertTrue(torch_all_close(decoded_tiles, decoded, atol=1e-6))
+
+    def test_encode_cache(self):
+        model = self.model_class(**get_autoencoder_kl_config()).to(torch_device).eval()
+        model.enable_encode_cache(max_size=2)
+        encoder_calls = []
+        model.encoder.register_forward_pre_hook(lambda module, args: encoder_calls.append(args[0].shape[0]))
+        images = [floats_tensor((1, 3, 32, 32)).to(torch_device) for _ in range(3)]
+
+        with torch.no_grad():
+            posterior = model.encode(images[0]).latent_dist
+            cached_posterior = model.encode(images[0].clone()).latent_dist
+            self.assertEqual(len(encoder_calls), 1)
+            self.assertTrue(torch_all_close(cached_posterior.mean, posterior.mean))
+
+            # the latents are sampled with the generator of every request
+            sample = cached_posterior.sample(generator=torch.manual_seed(0))
+            self.assertTrue(torch_all_close(posterior.sample(generator=torch.manual_seed(0)), sample))
+            self.assertFalse(torch.allclose(cached_posterior.sample(generator=torch.manual_seed(1)), sample))
+
+            # the least recently used images are evicted
+            model.encode(images[1])
+            model.encode(images[2])
+            self.assertEqual(len(model.encode_cache), 2)
+            model.encode(images[0])
+            self.assertEqual(len(encoder_calls), 4)
+
+            # updating the weights invalidates the cache
+            model.load_state_dict(model.state_dict())
+            model.encode(images[0])
+            self.assertEqual(len(encoder_calls), 5)
+
+        model.disable_encode_cache()
+        with torch.no_grad():
+            model.encode(images[0])
+        self.assertEqual(len(encoder_calls), 6)
+
     def test_from_pretrained_hub(self):
         model, loading_info = AutoencoderKL.from_pretrained("fusing/autoencoder-kl-dummy", output_loading_info=True)
         self.assertIsNotNone(model)
@@ -335,6 +418,28 @@ class AsymmetricAutoencoderKLTests(ModelTesterMixin, UNetTesterMixin, unittest.T
     def test_forward_with_norm_groups(self):
         pass
 
+    def test_decode_tiles_iter(self):
+        init_dict = get_asym_autoencoder_kl_config()
+        init_dict["sample_size"] = 16
+        model = self.model_class(**init_dict).to(torch_device).eval()
+
+        # a single tile is decoded like the whole latents
+        latents = floats_tensor((2, 4, 6, 6)).to(torch_device)
+        image = floats_tensor((2, 3, 12, 12)).to(torch_device)
+        mask = torch.ones((2, 1, 12, 12)).to(torch_device)
+        with torch.no_grad():
+            decoded = model.decode(latents, image=image, mask=mask).sample
+            tiles = list(model.decode_tiles_iter(latents, image=image, mask=mask))
+        self.assertEqual(len(tiles), 1)
+        self.assertTrue(torch_all_close(tiles[0][0], decoded, atol=1e-6))
+
+        latents = floats_tensor((2, 4, 20, 26)).to(torch_device)
+        image = floats_tensor((2, 3, 40, 52)).to(torch_device)
+        mask = torch.ones((2, 1, 40, 52)).to(torch_device)
+        with torch.no_grad():
+            decoded_tiles = assemble_tiles(model.decode_tiles_iter(latents, image=image, mask=mask))
+        self.assertEqual(decoded_tiles.shape, (2, 3, 40, 52))
+
 
 class AutoencoderTinyTests(ModelTesterMixin, unittest.TestCase):
     model_class = AutoencoderTiny
@@ -367,6 +472,19 @@ class AutoencoderTinyTests(ModelTesterMixin, unittest.TestCase):
     def test_outputs_equivalence(self):
         pass
 
+    def test_decode_tiles_iter(self):
+        model = self.model_class(**get_autoencoder_tiny_config()).to(torch_device).eval()
+        model.spatial_scale_factor = 2
+        model.tile_latent_min_size = 8
+        latents = floats_tensor((2, 4, 19, 27)).to(torch_device)
+
+        with torch.no_grad():
+            decoded = model._tiled_decode(latents)
+            decoded_tiles = assemble_tiles(model.decode_tiles_iter(latents))
+
+        self.assertEqual(decoded.shape, (2, 3, 38, 54))
+        self.assertTrue(torch_all_close(decoded_tiles, decoded, atol=1e-6))
+
 
 class ConsistencyDecoderVAETests(ModelTesterMixin, unittest.TestCase):
     model_class = ConsistencyDecoderVAE
@@ -493,6 +611,71 @@ class AutoencoderKLTemporalDecoderFastTests(ModelTesterMixin, unittest.TestCase)
 
             self.assertTrue(torch_all_close(param.grad.data, named_params_2[name].grad.data, atol=5e-5))
 
+    def test_decode_frames_iter(self):
+        init_dict, _ = self.prepare_init_args_and_inputs_for_common()
+        model = self.model_class(**init_dict).to(torch_device).eval()
+        latents = floats_tensor((6, 4, 8, 8)).to(torch_device)
+
+        with torch.no_grad():
+            decoded = model.decode(latents, num_frames=3).sample
+            decoded_frames = list(model.decode_frames_iter(latents, num_frames=3))
+            decoded_chunks = list(model.decode_frames_iter(latents, num_frames=3, decode_chunk_size=2))
+
+        self.assertEqual([frames.shape[0] for frames in decoded_frames], [3, 3])
+        self.assertTrue(torch_all_close(torch.cat(decoded_frames), decoded, atol=1e-5))
+        self.assertEqual([frames.shape[0] for frames in decoded_chunks], [2, 2, 2])
+        self.assertEqual(torch.cat(decoded_chunks).shape, decoded.shape)
+
+
+class AutoencoderKLCogVideoXTests(unittest.TestCase):
+    def get_dummy_model(self):
+        torch.manual_seed(0)
+        return AutoencoderKLCogVideoX(
+            down_block_types=("CogVideoXDownBlock3D",) * 4,
+            up_block_types=("CogVideoXUpBlock3D",) * 4,
+            block_out_channels=(8, 8, 8, 8),
+            latent_channels=4,
+            layers_per_block=1,
+            norm_num_groups=2,
+            temporal_compression_ratio=4,
+            sample_height=32,
+            sample_width=32,
+        ).to(torch_device)
+
+    def test_decode_frames_iter(self):
+        model = self.get_dummy_model().eval()
+        latents = floats_tensor((1, 4, 5, 6, 6)).to(torch_device)
+
+        for use_tiling in [False, True]:
+            model.enable_tiling() if use_tiling else model.disable_tiling()
+            with torch.no_grad():
+                decoded = model.decode(latents).sample
+                decoded_frames = list(model.decode_frames_iter(latents))
+
+            self.assertEqual(len(decoded_frames), 2)
+            self.assertTrue(torch_all_close(torch.cat(decoded_frames, dim=2), decoded, atol=1e-6))
+
+    @require_torch_gpu
+    def test_decode_frames_iter_tiled_memory(self):
+        model = self.get_dummy_model().eval()
+        model.enable_tiling()
+        latents = floats_tensor((1, 4, 13, 6, 6)).to(torch_device)
+
+        with torch.no_grad():
+            torch.cuda.reset_peak_memory_stats()
+            memory = torch.cuda.memory_allocated()
+            decoded = model.tiled_decode(latents).sample.cpu()
+            tiled_decode_memory = torch.cuda.max_memory_allocated() - memory
+
+            torch.cuda.reset_peak_memory_stats()
+            memory = torch.cuda.memory_allocated()
+            # the idle tiles keep their conv cache on the CPU, only one tile and one batch of frames are on the GPU
+            decoded_frames = [frames.cpu() for frames in model.decode_frames_iter(latents)]
+            iter_memory = torch.cuda.max_memory_allocated() - memory
+
+        self.assertTrue(torch_all_close(torch.cat(decoded_frames, dim=2), decoded, atol=1e-5))
+        self.assertLessEqual(iter_memory, tiled_decode_memory)
+
 
 class AutoencoderOobleckTests(ModelTesterMixin, UNetTesterMixin, unittest.TestCase):
     model_class = AutoencoderOobleck
@@ -5,7 +5,23 @@ import numpy as np
 import torch
 
 from diffusers import DiffusionPipeline
-from diffusers.models.attention_processor import Attention, AttnAddedKVProcessor
+from diffusers.models.attention_dispatch import (
+    _ATTENTION_BACKENDS,
+    _AUTOTUNE_CACHE,
+    attention_backend,
+    chunked_attention,
+    clear_attention_autotune_cache,
+    dispatch_attention_fn,
+    get_attention_backend,
+    register_attention_backend,
+)
+from diffusers.models.attention_processor import (
+    Attention,
+    AttnAddedKVProcessor,
+    AttnProcessor2_0,
+    FluxAttnProcessor2_0,
+    JointAttnProcessor2_0,
+)
 
 
 class AttnAddedKVProcessorTests(unittest.TestCase):
@@ -78,6 +94,112 @@ class AttnAddedKVProcessorTests(unittest.TestCase):
         self.assertTrue((only_cross_attn_out != self_and_cross_attn_out).all())
 
 
+class AttentionDispatchTests(unittest.TestCase):
+    def get_inputs(self, query_len=32, kv_len=16):
+        generator = torch.manual_seed(0)
+        query = torch.randn(2, 2, query_len, 8, generator=generator)
+        key = torch.randn(2, 2, kv_len, 8, generator=generator)
+        value = torch.randn(2, 2, kv_len, 8, generator=generator)
+        return query, key, value
+
+    def test_backends_match_native(self):
+        query, key, value = self.get_inputs()
+        attn_mask = torch.randn(2, 1, 32, 16)
+        expected = dispatch_attention_fn(query, key, value, attn_mask=attn_mask, scale=0.5)
+
+        for backend in ["sdpa_math", "auto"]:
+            output = dispatch_attention_fn(query, key, value, attn_mask=attn_mask, scale=0.5, backend=backend)
+            self.assertTrue(torch.allclose(output, expected, atol=1e-5), backend)
+
+    def test_autotune_cache(self):
+        clear_attention_autotune_cache()
+        query, key, value = self.get_inputs()
+
+        dispatch_attention_fn(query, key, value, backend="auto")
+        dispatch_attention_fn(query, key, value, backend="auto")
+        self.assertEqual(len(_AUTOTUNE_CACHE), 1)
+
+        dispatch_attention_fn(*self.get_inputs(query_len=8), backend="auto")
+        self.assertEqual(len(_AUTOTUNE_CACHE), 2)
+        clear_attention_autotune_cache()
+
+    def test_custom_backend_selection(self):
+        calls = []
+
+        @register_attention_backend("_test_backend")
+        def test_backend(query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None):
+            calls.append(query.shape)
+            return torch.zeros_like(query)
+
+        attn = Attention(query_dim=16, heads=2, dim_head=8, processor=AttnProcessor2_0())
+        hidden_states = torch.randn(1, 4, 16)
+        expected = attn(hidden_states)
+
+        with attention_backend("_test_backend"):
+            self.assertEqual(get_attention_backend(), "_test_backend")
+            attn(hidden_states)
+        self.assertIsNone(get_attention_backend())
+        self.assertEqual(len(calls), 1)
+
+        attn.set_attention_backend("_test_backend")
+        attn(hidden_states)
+        self.assertEqual(len(calls), 2)
+
+        attn.set_attention_backend(None)
+        self.assertTrue(torch.allclose(attn(hidden_states), expected))
+
+        with self.assertRaises(ValueError):
+            attn.set_attention_backend("does_not_exist")
+
+        _ATTENTION_BACKENDS.pop("_test_backend")
+
+
+class ChunkedAttentionTests(unittest.TestCase):
+    def test_chunked_attention_matches_native(self):
+        query, key, value = AttentionDispatchTests().get_inputs(query_len=37, kv_len=29)
+        for attn_mask, is_causal in [(None, False), (None, True), (torch.randn(2, 1, 37, 29), False)]:
+            expected = dispatch_attention_fn(query, key, value, attn_mask=attn_mask, is_causal=is_causal)
+            output = chunked_attention(
+                query, key, value, attn_mask=attn_mask, is_causal=is_causal, query_chunk_size=5, key_chunk_size=7
+            )
+            self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+
+    def test_chunked_backend(self):
+        torch.manual_seed(0)
+        hidden_states = torch.randn(2, 24, 16)
+        encoder_hidden_states = torch.randn(2, 6, 16)
+
+        calls = []
+
+        def chunked_attention_spy(*args, **kwargs):
+            calls.append(kwargs)
+            return chunked_attention(*args, **kwargs)
+
+        # the chunk sizes are bound to the backend when it is registered
+        register_attention_backend("chunked", chunked_attention_spy, query_chunk_size=4, key_chunk_size=5)
+        try:
+            for processor, kwargs in [
+                (AttnProcessor2_0(), {"cross_attention_dim": 16}),
+                (JointAttnProcessor2_0(), {"added_kv_proj_dim": 16, "context_pre_only": False}),
+                (FluxAttnProcessor2_0(), {"added_kv_proj_dim": 16, "context_pre_only": False, "bias": True}),
+            ]:
+                attn = Attention(query_dim=16, heads=2, dim_head=8, processor=processor, **kwargs)
+                expected = attn(hidden_states, encoder_hidden_states)
+                with attention_backend("chunked"):
+                    output = attn(hidden_states, encoder_hidden_states)
+
+                if isinstance(expected, tuple):
+                    for out, exp in zip(output, expected):
+                        self.assertTrue(torch.allclose(out, exp, atol=1e-5))
+                else:
+                    self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+        finally:
+            register_attention_backend("chunked", chunked_attention)
+
+        self.assertEqual(len(calls), 3)
+        self.assertTrue(all(call["query_chunk_size"] == 4 and call["key_chunk_size"] == 5 for call in calls))
+
+
 class DeprecatedAttentionBlockTests(unittest.TestCase):
     def test_conversion_when_using_device_map(self):
         pipe = DiffusionPipeline.from_pretrained(
@@ -0,0 +1,164 @@
+# coding=utf-8
+# Copyright 2024 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import torch
+
+from diffusers import CogVideoXTransformer3DModel, FluxTransformer2DModel, SD3Transformer2DModel, UNet2DModel
+from diffusers.models.context_parallel import ContextParallel, _attention_with_lse
+from diffusers.utils.testing_utils import require_torch_gpu, run_distributed_test
+
+
+def _check_context_parallel(rank, world_size, model, inputs, expected, mode):
+    model.enable_context_parallel(mode=mode)
+    with torch.no_grad():
+        output = model(**inputs, return_dict=False)[0]
+    max_diff = (output - expected).abs().max().item()
+    assert max_diff < 1e-4, f"rank {rank}: max diff {max_diff}"
+
+
+def _check_uneven_split(rank, world_size, mode):
+    context_parallel = ContextParallel(mode=mode)
+    torch.manual_seed(0)
+    text, image = torch.randn(3, 2, 2, 3, 8), torch.randn(3, 2, 2, 4, 8)
+    # the text and image shards both have 2 tokens on the first rank
+    context_parallel.prepare(text.shape[3], image.shape[3])
+    for sequences in ([text, image], [text], [image]):
+        query, key, value = torch.cat(sequences, dim=3)
+        expected = torch.nn.functional.scaled_dot_product_attention(query, key, value)
+        expected = expected.split([x.shape[3] for x in sequences], dim=2)
+        expected = torch.cat([context_parallel.shard(x, dim=2) for x in expected], dim=2)
+
+        query, key, value = torch.cat([context_parallel.shard(x, dim=3) for x in sequences], dim=3)
+        output = context_parallel.attention(query, key, value)
+        max_diff = (output - expected).abs().max().item()
+        assert max_diff < 1e-5, f"rank {rank}: max diff {max_diff}"
+
+
+class ContextParallelTests(unittest.TestCase):
+    world_size = 2
+
+    def check_context_parallel(self, model, inputs, mode="ring"):
+        model.eval()
+        with torch.no_grad():
+            expected = model(**inputs, return_dict=False)[0]
+
+        run_distributed_test(_check_context_parallel, self.world_size, args=(model, inputs, expected, mode))
+
+    def get_flux_model_and_inputs(self):
+        torch.manual_seed(0)
+        model = FluxTransformer2DModel(
+            patch_size=1,
+            in_channels=4,
+            num_layers=1,
+            num_single_layers=1,
+            attention_head_dim=16,
+            num_attention_heads=2,
+            joint_attention_dim=32,
+            pooled_projection_dim=32,
+            axes_dims_rope=[4, 4, 8],
+        )
+        # odd sequence lengths to split the tokens unevenly
+        inputs = {
+            "hidden_states": torch.randn(2, 15, 4),
+            "encoder_hidden_states": torch.randn(2, 7, 32),
+            "pooled_projections": torch.randn(2, 32),
+            "txt_ids": torch.randn(7, 3),
+            "img_ids": torch.randn(15, 3),
+            "timestep": torch.tensor([1.0, 1.0]),
+        }
+        return model, inputs
+
+    def test_flux_ring(self):
+        self.check_context_parallel(*self.get_flux_model_and_inputs(), mode="ring")
+
+    def test_flux_ulysses(self):
+        self.check_context_parallel(*self.get_flux_model_and_inputs(), mode="ulysses")
+
+    def test_sd3(self):
+        torch.manual_seed(0)
+        model = SD3Transformer2DModel(
+            sample_size=32,
+            patch_size=1,
+            in_channels=4,
+            num_layers=2,
+            attention_head_dim=8,
+            num_attention_heads=4,
+            caption_projection_dim=32,
+            joint_attention_dim=32,
+            pooled_projection_dim=64,
+            out_channels=4,
+            dual_attention_layers=(0,),
+        )
+        inputs = {
+            "hidden_states": torch.randn(2, 4, 5, 6),
+            "encoder_hidden_states": torch.randn(2, 9, 32),
+            "pooled_projections": torch.randn(2, 64),
+            "timestep": torch.randint(0, 1000, size=(2,)),
+        }
+        self.check_context_parallel(model, inputs, mode="ring")
+
+    def test_cogvideox(self):
+        torch.manual_seed(0)
+        model = CogVideoXTransformer3DModel(
+            num_attention_heads=2,
+            attention_head_dim=8,
+            in_channels=4,
+            out_channels=4,
+            time_embed_dim=2,
+            text_embed_dim=8,
+            num_layers=1,
+            sample_width=8,
+            sample_height=8,
+            sample_frames=8,
+            patch_size=2,
+            temporal_compression_ratio=4,
+            max_text_seq_length=8,
+            use_rotary_positional_embeddings=True,
+        )
+        image_rotary_emb = (torch.randn(2 * 4 * 4, 8), torch.randn(2 * 4 * 4, 8))
+        inputs = {
+            "hidden_states": torch.randn(2, 2, 4, 8, 8),
+            "encoder_hidden_states": torch.randn(2, 8, 8),
+            "timestep": torch.randint(0, 1000, size=(2,)),
+            "image_rotary_emb": image_rotary_emb,
+        }
+        self.check_context_parallel(model, inputs, mode="ulysses")
+
+    def test_uneven_split(self):
+        for mode in ("ring", "ulysses"):
+            run_distributed_test(_check_uneven_split, self.world_size, args=(mode,))
+
+    @require_torch_gpu
+    def test_attention_with_lse_cuda(self):
+        torch.manual_seed(0)
+        # a query length that isn't a multiple of the kernel block size
+        query, key, value = (torch.randn(2, 3, 37, 16) for _ in range(3))
+        expected_out, expected_lse = _attention_with_lse(query, key, value, 0.25)
+        for dtype, atol in ((torch.float32, 1e-4), (torch.float16, 1e-2)):
+            out, lse = _attention_with_lse(*(x.to("cuda", dtype) for x in (query, key, value)), 0.25)
+            self.assertEqual(lse.shape, expected_lse.shape)
+            self.assertTrue(torch.allclose(out.cpu(), expected_out, atol=atol))
+            self.assertTrue(torch.allclose(lse.cpu(), expected_lse, atol=atol))
+
+    def test_unsupported_model(self):
+        model = UNet2DModel(
+            block_out_channels=(32, 64),
+            down_block_types=("DownBlock2D", "AttnDownBlock2D"),
+            up_block_types=("AttnUpBlock2D", "UpBlock2D"),
+        )
+        with self.assertRaises(ValueError):
+            model.enable_context_parallel()
@@ -21,7 +21,13 @@ import torch
 from torch import nn
 
 from diffusers.models.attention import GEGLU, AdaLayerNorm, ApproximateGELU
-from diffusers.models.embeddings import get_timestep_embedding
+from diffusers.models.embeddings import (
+    FluxPosEmbed,
+    get_2d_sincos_pos_embed,
+    get_3d_sincos_pos_embed,
+    get_cached_pos_embed,
+    get_timestep_embedding,
+)
 from diffusers.models.resnet import Downsample2D, ResnetBlock2D, Upsample2D
 from diffusers.models.transformers.transformer_2d import Transformer2DModel
 from diffusers.utils.testing_utils import (
@@ -107,6 +113,38 @@ class EmbeddingsTests(unittest.TestCase):
             1e-3,
         )
 
+    def test_sincos_pos_embed_torch_matches_numpy(self):
+        embed_np = get_2d_sincos_pos_embed(64, (6, 10), base_size=8, interpolation_scale=2.0)
+        embed_pt = get_2d_sincos_pos_embed(64, (6, 10), base_size=8, interpolation_scale=2.0, output_type="pt")
+        assert isinstance(embed_pt, torch.Tensor)
+        assert np.allclose(embed_pt.numpy(), embed_np, atol=1e-6)
+
+        embed_np = get_3d_sincos_pos_embed(64, (10, 6), 4, 1.5, 2.0)
+        embed_pt = get_3d_sincos_pos_embed(64, (10, 6), 4, 1.5, 2.0, output_type="pt")
+        assert np.allclose(embed_pt.numpy(), embed_np, atol=1e-6)
+
+    def test_cached_pos_embed(self):
+        embed = get_cached_pos_embed(get_2d_sincos_pos_embed, 32, (4, 4), output_type="pt")
+        assert get_cached_pos_embed(get_2d_sincos_pos_embed, 32, (4, 4), output_type="pt") is embed
+        assert get_cached_pos_embed(get_2d_sincos_pos_embed, 32, (4, 8), output_type="pt") is not embed
+
+    def test_flux_pos_embed_cached(self):
+        pos_embed = FluxPosEmbed(theta=10000, axes_dim=[4, 6, 6])
+        txt_ids = torch.zeros(3, 3)
+        img_ids = torch.rand(8, 3)
+
+        freqs = pos_embed.forward_cached(txt_ids, img_ids)
+        assert pos_embed.forward_cached(txt_ids, img_ids) is freqs
+        for cached, expected in zip(freqs, pos_embed(torch.cat([txt_ids, img_ids]))):
+            assert torch.equal(cached, expected)
+
+        # in-place modifications invalidate the cache
+        img_ids.add_(1.0)
+        for cached, expected in zip(
+            pos_embed.forward_cached(txt_ids, img_ids), pos_embed(torch.cat([txt_ids, img_ids]))
+        ):
+            assert torch.equal(cached, expected)
+
 
 class Upsample2DBlockTests(unittest.TestCase):
     def test_upsample_default(self):
@@ -0,0 +1,183 @@
+# coding=utf-8
+# Copyright 2024 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import tempfile
+import unittest
+
+import torch
+
+from diffusers import (
+    AuraFlowTransformer2DModel,
+    CogVideoXTransformer3DModel,
+    FluxTransformer2DModel,
+    SD3Transformer2DModel,
+    UNet2DModel,
+)
+from diffusers.utils.testing_utils import run_distributed_test
+
+
+def _check_tensor_parallel(rank, world_size, model, inputs, expected):
+    num_parameters = sum(p.numel() for p in model.parameters())
+    model.enable_tensor_parallel()
+    assert sum(p.numel() for p in model.parameters()) < num_parameters
+
+    with torch.no_grad():
+        output = model(**inputs, return_dict=False)[0]
+    max_diff = (output - expected).abs().max().item()
+    assert max_diff < 1e-4, f"rank {rank}: max diff {max_diff}"
+
+
+def _check_tensor_parallel_from_pretrained(rank, world_size, model_class, path, inputs, expected):
+    model = model_class.from_pretrained(path, tensor_parallel=True)
+    attn = model.transformer_blocks[0].attn
+    inner_dim = model.config.num_attention_heads * model.config.attention_head_dim
+    assert attn.to_q.weight.shape[0] == inner_dim // world_size
+    assert attn.heads == model.config.num_attention_heads // world_size
+
+    with torch.no_grad():
+        output = model(**inputs, return_dict=False)[0]
+    max_diff = (output - expected).abs().max().item()
+    assert max_diff < 1e-4, f"rank {rank}: max diff {max_diff}"
+
+
+class TensorParallelTests(unittest.TestCase):
+    world_size = 2
+
+    def check_tensor_parallel(self, model, inputs):
+        model.eval()
+        with torch.no_grad():
+            expected = model(**inputs, return_dict=False)[0]
+
+        run_distributed_test(_check_tensor_parallel, self.world_size, args=(model, inputs, expected))
+
+    def get_flux_model_and_inputs(self):
+        torch.manual_seed(0)
+        model = FluxTransformer2DModel(
+            patch_size=1,
+            in_channels=4,
+            num_layers=1,
+            num_single_layers=1,
+            attention_head_dim=16,
+            num_attention_heads=2,
+            joint_attention_dim=32,
+            pooled_projection_dim=32,
+            axes_dims_rope=[4, 4, 8],
+        )
+        inputs = {
+            "hidden_states": torch.randn(2, 16, 4),
+            "encoder_hidden_states": torch.randn(2, 7, 32),
+            "pooled_projections": torch.randn(2, 32),
+            "txt_ids": torch.randn(7, 3),
+            "img_ids": torch.randn(16, 3),
+            "timestep": torch.tensor([1.0, 1.0]),
+        }
+        return model, inputs
+
+    def test_flux(self):
+        self.check_tensor_parallel(*self.get_flux_model_and_inputs())
+
+    def test_sd3(self):
+        torch.manual_seed(0)
+        model = SD3Transformer2DModel(
+            sample_size=32,
+            patch_size=1,
+            in_channels=4,
+            num_layers=2,
+            attention_head_dim=8,
+            num_attention_heads=4,
+            caption_projection_dim=32,
+            joint_attention_dim=32,
+            pooled_projection_dim=64,
+            out_channels=4,
+            qk_norm="rms_norm",
+            dual_attention_layers=(0,),
+        )
+        inputs = {
+            "hidden_states": torch.randn(2, 4, 4, 4),
+            "encoder_hidden_states": torch.randn(2, 9, 32),
+            "pooled_projections": torch.randn(2, 64),
+            "timestep": torch.randint(0, 1000, size=(2,)),
+        }
+        self.check_tensor_parallel(model, inputs)
+
+    def test_auraflow(self):
+        torch.manual_seed(0)
+        model = AuraFlowTransformer2DModel(
+            sample_size=8,
+            patch_size=2,
+            in_channels=4,
+            num_mmdit_layers=1,
+            num_single_dit_layers=1,
+            attention_head_dim=8,
+            num_attention_heads=4,
+            caption_projection_dim=32,
+            joint_attention_dim=32,
+            out_channels=4,
+            pos_embed_max_size=16,
+        )
+        inputs = {
+            "hidden_states": torch.randn(2, 4, 8, 8),
+            "encoder_hidden_states": torch.randn(2, 6, 32),
+            "timestep": torch.randint(0, 1000, size=(2,)),
+        }
+        self.check_tensor_parallel(model, inputs)
+
+    def test_cogvideox(self):
+        torch.manual_seed(0)
+        model = CogVideoXTransformer3DModel(
+            num_attention_heads=2,
+            attention_head_dim=8,
+            in_channels=4,
+            out_channels=4,
+            time_embed_dim=2,
+            text_embed_dim=8,
+            num_layers=1,
+            sample_width=8,
+            sample_height=8,
+            sample_frames=8,
+            patch_size=2,
+            temporal_compression_ratio=4,
+            max_text_seq_length=8,
+        )
+        inputs = {
+            "hidden_states": torch.randn(2, 2, 4, 8, 8),
+            "encoder_hidden_states": torch.randn(2, 8, 8),
+            "timestep": torch.randint(0, 1000, size=(2,)),
+        }
+        self.check_tensor_parallel(model, inputs)
+
+    def test_from_pretrained(self):
+        model, inputs = self.get_flux_model_and_inputs()
+        model.eval()
+        with torch.no_grad():
+            expected = model(**inputs, return_dict=False)[0]
+
+        for max_shard_size in ["10GB", "20KB"]:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                model.save_pretrained(tmpdir, max_shard_size=max_shard_size)
+                run_distributed_test(
+                    _check_tensor_parallel_from_pretrained,
+                    self.world_size,
+                    args=(FluxTransformer2DModel, tmpdir, inputs, expected),
+                )
+
+    def test_unsupported_model(self):
+        model = UNet2DModel(
+            block_out_channels=(32, 64),
+            down_block_types=("DownBlock2D", "AttnDownBlock2D"),
+            up_block_types=("AttnUpBlock2D", "UpBlock2D"),
+        )
+        with self.assertRaises(ValueError):
+            model.enable_tensor_parallel()
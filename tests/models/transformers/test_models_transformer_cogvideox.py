@@ -18,6 +18,7 @@ import unittest
 import torch
 
 from diffusers import CogVideoXTransformer3DModel
+from diffusers.models.attention_processor import CogVideoXSparseAttnProcessor2_0
 from diffusers.utils.testing_utils import (
     enable_full_determinism,
     torch_device,
@@ -81,3 +82,22 @@ class CogVideoXTransformerTests(ModelTesterMixin, unittest.TestCase):
         }
         inputs_dict = self.dummy_input
         return init_dict, inputs_dict
+
+    def test_sparse_attention(self):
+        init_dict, inputs_dict = self.prepare_init_args_and_inputs_for_common()
+        model = self.model_class(**init_dict).to(torch_device).eval()
+        inputs_dict["hidden_states"] = torch.randn((2, 3, 4, 8, 8)).to(torch_device)
+
+        with torch.no_grad():
+            output = model(**inputs_dict).sample
+
+            # windows covering the whole video are equivalent to full attention
+            model.set_attn_processor(CogVideoXSparseAttnProcessor2_0(window_size=(3, 4, 4)))
+            output_full_window = model(**inputs_dict).sample
+
+            model.set_attn_processor(CogVideoXSparseAttnProcessor2_0(window_size=(2, 3, 2), temporal_stride=2))
+            output_sparse = model(**inputs_dict).sample
+
+        self.assertTrue(torch.allclose(output, output_full_window, atol=1e-5))
+        self.assertEqual(output_sparse.shape, output.shape)
+        self.assertFalse(torch.allclose(output, output_sparse, atol=1e-5))
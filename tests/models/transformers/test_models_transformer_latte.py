@@ -18,6 +18,7 @@ import unittest
 import torch
 
 from diffusers import LatteTransformer3DModel
+from diffusers.models.attention_processor import Attention
 from diffusers.utils.testing_utils import (
     enable_full_determinism,
     torch_device,
@@ -86,3 +87,22 @@ class LatteTransformerTests(ModelTesterMixin, unittest.TestCase):
         super().test_output(
             expected_output_shape=(self.dummy_input[self.main_input_name].shape[0],) + self.output_shape
         )
+
+    def test_fuse_qkv_projections(self):
+        init_dict, inputs_dict = self.prepare_init_args_and_inputs_for_common()
+        model = self.model_class(**init_dict).to(torch_device).eval()
+
+        with torch.no_grad():
+            output = model(**inputs_dict)[0]
+
+            model.fuse_qkv_projections()
+            attention_modules = [module for module in model.modules() if isinstance(module, Attention)]
+            self.assertTrue(all(module.fused_projections for module in attention_modules))
+            fused_output = model(**inputs_dict)[0]
+
+            model.unfuse_qkv_projections()
+            self.assertFalse(any(hasattr(module, "to_qkv") for module in attention_modules))
+            unfused_output = model(**inputs_dict)[0]
+
+        self.assertTrue(torch.allclose(output, fused_output, atol=1e-5))
+        self.assertTrue(torch.allclose(output, unfused_output, atol=1e-5))
@@ -45,6 +45,7 @@ from diffusers.utils.testing_utils import (
     require_torch_accelerator_with_fp16,
     require_torch_accelerator_with_training,
     require_torch_gpu,
+    run_distributed_test,
     skip_mps,
     slow,
     torch_all_close,
@@ -57,6 +58,7 @@ from ..test_modeling_common import ModelTesterMixin, UNetTesterMixin
 if is_peft_available():
     from peft import LoraConfig
     from peft.tuners.tuners_utils import BaseTunerLayer
+    from peft.utils import get_peft_model_state_dict
 
 
 logger = logging.get_logger(__name__)
@@ -300,6 +302,22 @@ def create_ip_adapter_faceid_state_dict(model):
     return ip_state_dict
 
 
+def check_patch_parallel(rank, world_size, model, inputs_dict, expected_outputs):
+    model.enable_patch_parallel(num_warmup_steps=2)
+    with torch.no_grad():
+        outputs = [model(**{**inputs_dict, "sample": inputs_dict["sample"] + 0.01 * i}).sample for i in range(3)]
+
+    # the warmup steps are exact, the next ones use the activations of the other patches from the previous step
+    assert torch.allclose(outputs[0], expected_outputs[0], atol=1e-5)
+    assert torch.allclose(outputs[1], expected_outputs[1], atol=1e-5)
+    assert torch.allclose(outputs[2], expected_outputs[2], atol=5e-2)
+
+    model.disable_patch_parallel()
+    with torch.no_grad():
+        output = model(**inputs_dict).sample
+    assert torch.allclose(output, expected_outputs[0], atol=1e-5)
+
+
 def create_custom_diffusion_layers(model, mock_weights: bool = True):
     train_kv = True
     train_q_out = True
@@ -406,6 +424,46 @@ class UNet2DConditionModelTests(ModelTesterMixin, UNetTesterMixin, unittest.Test
             == "XFormersAttnProcessor"
         ), "xformers is not enabled"
 
+    def test_token_merging(self):
+        init_dict, inputs_dict = self.prepare_init_args_and_inputs_for_common()
+        model = self.model_class(**init_dict)
+        model.to(torch_device)
+        model.eval()
+
+        with torch.no_grad():
+            output = model(**inputs_dict).sample
+
+            model.enable_token_merging(ratio=0.0)
+            output_no_merging = model(**inputs_dict).sample
+
+            model.enable_token_merging(ratio=0.5, merge_crossattn=True, merge_mlp=True)
+            token_merging = model.down_blocks[0].attentions[0].transformer_blocks[0]._token_merging
+            output_merged = model(**inputs_dict).sample
+            self.assertEqual(token_merging.latent_size, (16, 16))
+            # all the blocks share the same settings
+            self.assertIs(model.up_blocks[1].attentions[0].transformer_blocks[0]._token_merging, token_merging)
+
+            model.disable_token_merging()
+            output_disabled = model(**inputs_dict).sample
+
+        self.assertTrue(torch.allclose(output, output_no_merging, atol=1e-5))
+        self.assertEqual(output_merged.shape, output.shape)
+        self.assertFalse(torch.allclose(output, output_merged, atol=1e-5))
+        self.assertTrue(torch.allclose(output, output_disabled, atol=1e-5))
+        self.assertIsNone(model.down_blocks[0].attentions[0].transformer_blocks[0]._token_merging)
+
+    def test_patch_parallel(self):
+        init_dict, inputs_dict = self.prepare_init_args_and_inputs_for_common()
+        model = self.model_class(**init_dict)
+        model.eval()
+
+        with torch.no_grad():
+            expected_outputs = [
+                model(**{**inputs_dict, "sample": inputs_dict["sample"] + 0.01 * i}).sample for i in range(3)
+            ]
+
+        run_distributed_test(check_patch_parallel, world_size=2, args=(model, inputs_dict, expected_outputs))
+
     @require_torch_accelerator_with_training
     def test_gradient_checkpointing(self):
         # enable deterministic behavior for gradient checkpointing
@@ -1200,6 +1258,180 @@ class UNet2DConditionModelTests(ModelTesterMixin, UNetTesterMixin, unittest.Test
             lora_sample_1, lora_sample_2, atol=1e-4, rtol=1e-4
         ), "Loading from a saved checkpoint should produce identical results."
 
+    @require_peft_backend
+    def test_lora_hotswap(self):
+        init_dict, inputs_dict = self.prepare_init_args_and_inputs_for_common()
+
+        def get_lora_state_dict(rank, target_modules, seed):
+            torch.manual_seed(seed)
+            model = self.model_class(**init_dict)
+            lora_config = LoraConfig(r=rank, lora_alpha=rank, target_modules=target_modules, init_lora_weights=False)
+            model.add_adapter(lora_config)
+            return get_peft_model_state_dict(model)
+
+        state_dict_1 = get_lora_state_dict(4, ["to_q", "to_k", "to_v", "to_out.0"], seed=1)
+        state_dict_2 = get_lora_state_dict(8, ["to_q", "to_v"], seed=2)
+
+        torch.manual_seed(0)
+        model = self.model_class(**init_dict).to(torch_device)
+        base_state_dict = copy.deepcopy(model.state_dict())
+        model.load_attn_procs(state_dict_2, adapter_name="reference")
+        with torch.no_grad():
+            expected_sample = model(**inputs_dict).sample
+
+        model = self.model_class(**init_dict).to(torch_device)
+        model.load_state_dict(base_state_dict)
+        model.enable_lora_hotswap(target_rank=8)
+        model.load_attn_procs(state_dict_1, adapter_name="default_0")
+        with torch.no_grad():
+            lora_sample_1 = model(**inputs_dict).sample
+
+        lora_params = {name: param.data_ptr() for name, param in model.named_parameters() if "lora_" in name}
+        model.load_attn_procs(state_dict_2, adapter_name="default_0", hotswap=True)
+        with torch.no_grad():
+            lora_sample_2 = model(**inputs_dict).sample
+
+        assert lora_params == {
+            name: param.data_ptr() for name, param in model.named_parameters() if "lora_" in name
+        }, "Hot-swapping should update the LoRA weights in place."
+        assert not torch.allclose(lora_sample_1, lora_sample_2, atol=1e-4, rtol=1e-4)
+        assert torch.allclose(
+            expected_sample, lora_sample_2, atol=1e-4, rtol=1e-4
+        ), "Hot-swapping a LoRA should produce the same results as loading it."
+
+        # the rank of a hot-swapped LoRA cannot exceed the pre-allocated rank
+        with self.assertRaises(ValueError):
+            model.load_attn_procs(get_lora_state_dict(16, ["to_q"], seed=3), adapter_name="default_0", hotswap=True)
+
+    @require_peft_backend
+    def test_lora_hotswap_no_recompile(self):
+        from torch._dynamo.testing import CompileCounter
+
+        init_dict, inputs_dict = self.prepare_init_args_and_inputs_for_common()
+
+        def get_lora_state_dict(rank, seed):
+            torch.manual_seed(seed)
+            model = self.model_class(**init_dict)
+            lora_config = LoraConfig(r=rank, lora_alpha=rank, target_modules=["to_q", "to_v"], init_lora_weights=False)
+            model.add_adapter(lora_config)
+            return get_peft_model_state_dict(model)
+
+        torch.manual_seed(0)
+        model = self.model_class(**init_dict).to(torch_device)
+        model.enable_lora_hotswap(target_rank=8)
+        model.load_attn_procs(get_lora_state_dict(4, seed=1), adapter_name="default_0")
+
+        torch._dynamo.reset()
+        counter = CompileCounter()
+        compiled_model = torch.compile(model, backend=counter)
+        with torch.no_grad():
+            lora_sample_1 = compiled_model(**inputs_dict).sample
+        frame_count = counter.frame_count
+
+        # neither changing the scale of the adapter nor hot-swapping a new one should recompile the model
+        with torch._dynamo.config.patch(error_on_recompile=True), torch.no_grad():
+            model.set_adapters(["default_0"], [0.5])
+            lora_sample_2 = compiled_model(**inputs_dict).sample
+            model.load_attn_procs(get_lora_state_dict(8, seed=2), adapter_name="default_0", hotswap=True)
+            lora_sample_3 = compiled_model(**inputs_dict).sample
+            model.set_adapters(["default_0"], [0.5])
+            lora_sample_4 = compiled_model(**inputs_dict).sample
+        torch._dynamo.reset()
+
+        with torch.no_grad():
+            expected_sample = model(**inputs_dict).sample
+
+        assert counter.frame_count == frame_count, "Hot-swapping a LoRA should not recompile the model."
+        assert not torch.allclose(lora_sample_1, lora_sample_2, atol=1e-4, rtol=1e-4)
+        assert not torch.allclose(lora_sample_2, lora_sample_3, atol=1e-4, rtol=1e-4)
+        assert not torch.allclose(lora_sample_3, lora_sample_4, atol=1e-4, rtol=1e-4)
+        assert torch.allclose(expected_sample, lora_sample_4, atol=1e-4, rtol=1e-4)
+
+    @require_peft_backend
+    def test_lora_batch_adapters(self):
+        init_dict, inputs_dict = self.prepare_init_args_and_inputs_for_common()
+        model = self.model_class(**init_dict)
+        model.to(torch_device)
+
+        model.add_adapter(get_unet_lora_config(), adapter_name="adapter-1")
+        lora_config = LoraConfig(r=8, lora_alpha=4, target_modules=["to_q", "to_v", "conv1"], init_lora_weights=False)
+        model.add_adapter(lora_config, adapter_name="adapter-2")
+
+        adapter_names = ["adapter-2", None, "adapter-1", "adapter-2"]
+        batch_size = inputs_dict["sample"].shape[0]
+        expected_samples = []
+        with torch.no_grad():
+            for i, adapter_name in enumerate(adapter_names):
+                row_inputs = {k: v[i : i + 1] if len(v) == batch_size else v for k, v in inputs_dict.items()}
+                if adapter_name is None:
+                    model.disable_lora()
+                else:
+                    model.enable_lora()
+                    model.set_adapters(adapter_name)
+                expected_samples.append(model(**row_inputs).sample)
+        model.enable_lora()
+        expected_sample = torch.cat(expected_samples)
+
+        model.set_batch_adapters(adapter_names)
+        with torch.no_grad():
+            batch_sample = model(**inputs_dict).sample
+            # inputs duplicated along the batch dimension repeat the per-sample adapters
+            doubled_inputs = {k: torch.cat([v, v]) if len(v) == batch_size else v for k, v in inputs_dict.items()}
+            doubled_sample = model(**doubled_inputs).sample
+
+        assert torch.allclose(
+            expected_sample, batch_sample, atol=1e-4, rtol=1e-4
+        ), "Per-sample adapters should match running each adapter separately."
+        assert torch.allclose(torch.cat([batch_sample, batch_sample]), doubled_sample, atol=1e-4, rtol=1e-4)
+
+        model.set_batch_adapters(None)
+        model.set_adapters("adapter-1")
+        with torch.no_grad():
+            sample = model(**inputs_dict).sample
+        assert torch.allclose(sample[2:3], expected_sample[2:3], atol=1e-4, rtol=1e-4)
+
+    @require_peft_backend
+    def test_lora_batch_adapters_cache(self):
+        init_dict, inputs_dict = self.prepare_init_args_and_inputs_for_common()
+        model = self.model_class(**init_dict)
+        model.to(torch_device)
+
+        model.add_adapter(get_unet_lora_config(), adapter_name="adapter-1")
+        lora_config = LoraConfig(r=8, lora_alpha=4, target_modules=["to_q", "to_v"], init_lora_weights=False)
+        model.add_adapter(lora_config, adapter_name="adapter-2")
+
+        def get_cached_weights():
+            return [
+                module._diffusers_batch_lora_weights[1].data_ptr()
+                for module in model.modules()
+                if hasattr(module, "_diffusers_batch_lora_weights")
+            ]
+
+        model.set_batch_adapters(["adapter-1", "adapter-2"])
+        with torch.no_grad():
+            sample_1 = model(**inputs_dict).sample
+            cached_weights = get_cached_weights()
+            sample_2 = model(**inputs_dict).sample
+
+        assert len(cached_weights) > 0
+        assert cached_weights == get_cached_weights(), "The stacked LoRA weights should be reused across calls."
+        assert torch.allclose(sample_1, sample_2, atol=1e-6, rtol=1e-6)
+
+        # the scalings aren't cached, rescaling the adapters is picked up by the next call
+        model.set_adapters(["adapter-1", "adapter-2"], [0.5, 0.5])
+        with torch.no_grad():
+            sample_3 = model(**inputs_dict).sample
+        model.set_batch_adapters(["adapter-1", "adapter-2"])
+        assert get_cached_weights() == []
+        with torch.no_grad():
+            sample_4 = model(**inputs_dict).sample
+
+        assert not torch.allclose(sample_1, sample_3, atol=1e-4, rtol=1e-4)
+        assert torch.allclose(sample_3, sample_4, atol=1e-6, rtol=1e-6)
+
+        model.delete_adapters("adapter-2")
+        assert get_cached_weights() == []
+
 
 @slow
 class UNet2DConditionModelIntegrationTests(unittest.TestCase):
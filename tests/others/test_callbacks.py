@@ -0,0 +1,100 @@
+# coding=utf-8
+# Copyright 2024 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import queue
+import types
+import unittest
+
+import numpy as np
+import torch
+
+from diffusers import AutoencoderTiny, FluxPipeline
+from diffusers.callbacks import LatentPreviewCallback
+
+
+class LatentPreviewCallbackTests(unittest.TestCase):
+    latent_rgb_factors = [[0.3, 0.2, 0.2], [0.2, 0.3, 0.2], [0.2, 0.2, 0.3], [-0.2, -0.2, -0.2]]
+
+    def get_dummy_pipeline(self, num_timesteps=4):
+        return types.SimpleNamespace(
+            num_timesteps=num_timesteps, vae_scale_factor=16, _unpack_latents=FluxPipeline._unpack_latents
+        )
+
+    def run_callback(self, callback, latents, num_timesteps=4):
+        pipeline = self.get_dummy_pipeline(num_timesteps)
+        for step_index in range(num_timesteps):
+            callback_kwargs = {"latents": latents}
+            self.assertIs(callback(pipeline, step_index, 1000 - step_index, callback_kwargs), callback_kwargs)
+
+    def test_linear_preview(self):
+        previews = []
+        callback = LatentPreviewCallback(previews.append, latent_rgb_factors=self.latent_rgb_factors, preview_steps=2)
+        self.run_callback(callback, torch.randn(2, 4, 8, 6))
+
+        # every `preview_steps` steps and at the last step
+        self.assertEqual([preview.step_index for preview in previews], [0, 2, 3])
+        self.assertEqual(len(previews[0].images), 2)
+        self.assertEqual(previews[0].images[0].size, (6, 8))
+
+    def test_packed_latents(self):
+        sink = queue.Queue()
+        pipeline = self.get_dummy_pipeline()
+        for height, width, callback_kwargs in [(8, 8, {}), (8, 6, {"height": 64, "width": 48})]:
+            callback = LatentPreviewCallback(
+                sink, latent_rgb_factors=self.latent_rgb_factors, output_type="pt", **callback_kwargs
+            )
+            latents = torch.randn(1, 4, height, width)
+            packed_latents = FluxPipeline._pack_latents(latents, 1, 4, height, width)
+            callback(pipeline, 0, 1000, {"latents": packed_latents})
+
+            expected = callback.decode_latents(pipeline, latents) / 2 + 0.5
+            self.assertTrue(torch.allclose(sink.get_nowait().images, expected, atol=1e-6))
+
+    def test_video_latents(self):
+        previews = []
+        callback = LatentPreviewCallback(previews.append, latent_rgb_factors=self.latent_rgb_factors, output_type="np")
+        self.run_callback(callback, torch.randn(2, 3, 4, 8, 6), num_timesteps=1)
+        callback = LatentPreviewCallback(previews.append, latent_rgb_factors=self.latent_rgb_factors, output_type="pt")
+        self.run_callback(callback, torch.randn(2, 4, 3, 8, 6), num_timesteps=1)
+
+        self.assertEqual(previews[0].images.shape, (2, 3, 8, 6, 3))
+        self.assertEqual(previews[1].images.shape, (2, 3, 3, 8, 6))
+
+    def test_tiny_autoencoder_preview(self):
+        torch.manual_seed(0)
+        vae = AutoencoderTiny(
+            encoder_block_out_channels=[32, 32],
+            decoder_block_out_channels=[32, 32],
+            num_encoder_blocks=[1, 1],
+            num_decoder_blocks=[1, 1],
+        ).eval()
+        latents = torch.randn(1, 4, 8, 6)
+
+        previews = []
+        callback = LatentPreviewCallback(previews.append, vae=vae, output_type="np")
+        self.run_callback(callback, latents, num_timesteps=1)
+
+        with torch.no_grad():
+            expected = vae.decode(latents).sample
+        expected = (expected.clamp(-1, 1) / 2 + 0.5).permute(0, 2, 3, 1).numpy()
+        self.assertTrue(np.allclose(previews[0].images, expected, atol=1e-6))
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            LatentPreviewCallback(print)
+        with self.assertRaises(ValueError):
+            LatentPreviewCallback(print, latent_rgb_factors=self.latent_rgb_factors, preview_steps=0)
+        with self.assertRaises(ValueError):
+            LatentPreviewCallback(print, latent_rgb_factors=self.latent_rgb_factors, output_type="latent")
@@ -13,6 +13,8 @@
 # limitations under the License.
 
 import inspect
+import subprocess
+import sys
 import unittest
 from importlib import import_module
 
@@ -48,3 +50,16 @@ class DependencyTester(unittest.TestCase):
             if hasattr(diffusers.pipelines, cls_name):
                 pipeline_folder_module = ".".join(str(cls_module.__module__).split(".")[:3])
                 _ = import_module(pipeline_folder_module, str(cls_name))
+
+    def test_import_is_lazy(self):
+        # Run in a fresh interpreter: other tests have already imported the heavy dependencies in this one.
+        code = (
+            "import sys; import diffusers; "
+            "heavy = [name for name in ('torch', 'transformers', 'peft', 'scipy.stats') if name in sys.modules]; "
+            "assert not heavy, heavy; "
+            "from diffusers import UNet2DConditionModel; "
+            "assert 'torch._dynamo' not in sys.modules; "
+            "assert 'diffusers.models.unets.unet_motion_model' not in sys.modules"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
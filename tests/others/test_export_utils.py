@@ -0,0 +1,151 @@
+# coding=utf-8
+# Copyright 2024 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+import PIL.Image
+import torch
+
+from diffusers import AutoencoderKLCogVideoX
+from diffusers.utils import export_to_gif, export_to_obj, export_to_ply, export_to_video
+from diffusers.utils.import_utils import is_imageio_available
+from diffusers.video_processor import VideoProcessor
+
+
+@unittest.skipUnless(is_imageio_available(), "test requires imageio")
+class ExportToVideoTests(unittest.TestCase):
+    def get_frames(self, num_frames=6, height=32, width=48):
+        rng = np.random.default_rng(0)
+        return [rng.random((height, width, 3), dtype=np.float32) for _ in range(num_frames)]
+
+    def read_video(self, path):
+        import imageio
+
+        with imageio.get_reader(path) as reader:
+            return np.stack(list(reader.iter_data()))
+
+    def test_export_to_video_streaming(self):
+        frames = self.get_frames()
+        uint8_frames = [(frame * 255).astype(np.uint8) for frame in frames]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            expected = self.read_video(export_to_video(frames, os.path.join(tmpdir, "list.mp4")))
+            assert expected.shape == (6, 32, 48, 3)
+
+            # chunks of frames in every supported format, from a generator
+            def chunks():
+                yield torch.from_numpy(np.stack(uint8_frames[:2]))
+                yield [PIL.Image.fromarray(frame) for frame in uint8_frames[2:4]]
+                yield np.stack(frames[4:5])
+                yield torch.from_numpy(uint8_frames[5])
+
+            output = self.read_video(export_to_video(chunks(), os.path.join(tmpdir, "stream.mp4")))
+            assert np.array_equal(output, expected)
+
+    def test_export_to_video_generator_error(self):
+        frames = self.get_frames()
+
+        def frames_with_error():
+            yield from frames[:2]
+            raise RuntimeError("decoding failed")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with self.assertRaisesRegex(RuntimeError, "decoding failed"):
+                export_to_video(frames_with_error(), os.path.join(tmpdir, "error.mp4"))
+
+    def test_export_to_video_no_grad(self):
+        torch.manual_seed(0)
+        vae = AutoencoderKLCogVideoX(
+            down_block_types=("CogVideoXDownBlock3D",) * 4,
+            up_block_types=("CogVideoXUpBlock3D",) * 4,
+            block_out_channels=(8, 8, 8, 8),
+            latent_channels=4,
+            layers_per_block=1,
+            norm_num_groups=2,
+            temporal_compression_ratio=4,
+            sample_height=32,
+            sample_width=32,
+        )
+        video_processor = VideoProcessor(vae_scale_factor=8)
+        latents = torch.randn(1, 4, 5, 4, 4)
+
+        # the frames are decoded on the background thread of `export_to_video`, which has to inherit `no_grad`
+        with tempfile.TemporaryDirectory() as tmpdir, torch.no_grad():
+            chunks = video_processor.postprocess_video_iter(vae.decode_frames_iter(latents), output_type="np")
+            output = self.read_video(
+                export_to_video((frames[0] for frames in chunks), os.path.join(tmpdir, "vae.mp4"))
+            )
+
+        assert output.shape == (17, 32, 32, 3)
+
+
+class ExportMeshTests(unittest.TestCase):
+    def get_dummy_mesh(self, num_verts=10, num_faces=6):
+        generator = torch.Generator().manual_seed(0)
+        return SimpleNamespace(
+            verts=torch.randn(num_verts, 3, generator=generator),
+            faces=torch.randint(0, num_verts, (num_faces, 3), generator=generator),
+            vertex_channels={channel: torch.rand(num_verts, generator=generator) for channel in "RGB"},
+        )
+
+    def test_export_to_ply(self):
+        mesh = self.get_dummy_mesh()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(export_to_ply(mesh, os.path.join(tmpdir, "mesh.ply")), "rb") as f:
+                data = f.read()
+
+        header, body = data.split(b"end_header\n")
+        assert b"element vertex 10\n" in header and b"element face 6\n" in header
+
+        vertices = np.frombuffer(body[: 10 * 15], dtype=[("xyz", "<f4", 3), ("rgb", "u1", 3)])
+        faces = np.frombuffer(body[10 * 15 :], dtype=[("count", "u1"), ("indices", "<u4", 3)])
+        assert np.array_equal(vertices["xyz"], mesh.verts.numpy())
+        for i, channel in enumerate("RGB"):
+            expected = (mesh.vertex_channels[channel].numpy() * 255.499).round()
+            assert np.array_equal(vertices["rgb"][:, i], expected)
+        assert (faces["count"] == 3).all()
+        assert np.array_equal(faces["indices"], mesh.faces.numpy())
+
+    def test_export_to_obj(self):
+        mesh = self.get_dummy_mesh()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(export_to_obj(mesh, os.path.join(tmpdir, "mesh.obj"))) as f:
+                lines = f.read().split("\n")
+
+        vertices = np.array([[float(x) for x in line.split()[1:]] for line in lines if line.startswith("v ")])
+        faces = np.array([[int(x) for x in line.split()[1:]] for line in lines if line.startswith("f ")])
+        colors = np.stack([mesh.vertex_channels[channel].numpy() for channel in "RGB"], axis=1)
+        assert np.array_equal(vertices.astype(np.float32), np.concatenate([mesh.verts.numpy(), colors], axis=1))
+        assert np.array_equal(faces, mesh.faces.numpy() + 1)
+
+
+class ExportToGifTests(unittest.TestCase):
+    def test_export_to_gif_parallel(self):
+        rng = np.random.default_rng(0)
+        frames = [PIL.Image.fromarray(rng.integers(0, 255, (32, 32, 3), dtype=np.uint8)) for _ in range(4)]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(export_to_gif(frames, os.path.join(tmpdir, "serial.gif"), num_workers=1), "rb") as f:
+                expected = f.read()
+            with open(export_to_gif(frames, os.path.join(tmpdir, "parallel.gif"), num_workers=4), "rb") as f:
+                output = f.read()
+
+        assert output == expected
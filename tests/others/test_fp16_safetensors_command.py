@@ -0,0 +1,85 @@
+# coding=utf-8
+# Copyright 2024 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import tempfile
+import unittest
+
+import torch
+
+from diffusers import DDPMPipeline, DDPMScheduler, UNet2DModel
+from diffusers.commands.fp16_safetensors import FP16SafetensorsCommand
+
+
+class FP16SafetensorsCommandTests(unittest.TestCase):
+    def get_dummy_pipeline(self):
+        torch.manual_seed(0)
+        unet = UNet2DModel(
+            block_out_channels=(32, 64),
+            layers_per_block=1,
+            sample_size=32,
+            in_channels=3,
+            out_channels=3,
+            down_block_types=("DownBlock2D", "AttnDownBlock2D"),
+            up_block_types=("AttnUpBlock2D", "UpBlock2D"),
+        )
+        return DDPMPipeline(unet=unet, scheduler=DDPMScheduler())
+
+    def test_local_conversion_is_resharded(self):
+        pipe = self.get_dummy_pipeline()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source_dir = os.path.join(tmpdir, "source")
+            output_dir = os.path.join(tmpdir, "output")
+            pipe.save_pretrained(source_dir)
+            pipe.unet.save_pretrained(os.path.join(source_dir, "unet"), max_shard_size="200KB")
+
+            command = FP16SafetensorsCommand(
+                source_dir, "fp16", True, output_dir=output_dir, max_shard_size="300KB", num_workers=2
+            )
+            command.convert()
+
+            unet_files = os.listdir(os.path.join(output_dir, "unet"))
+            shards = [f for f in unet_files if f.startswith("diffusion_pytorch_model.fp16-")]
+            self.assertTrue(len(shards) > 1)
+            self.assertIn("diffusion_pytorch_model.safetensors.index.fp16.json", unet_files)
+            self.assertIn("model_index.json", os.listdir(output_dir))
+
+            with open(os.path.join(output_dir, "unet", "diffusion_pytorch_model.safetensors.index.fp16.json")) as f:
+                index = json.load(f)
+            self.assertEqual(set(index["weight_map"].keys()), set(pipe.unet.state_dict().keys()))
+            self.assertEqual(set(index["weight_map"].values()), set(shards))
+
+            converted = DDPMPipeline.from_pretrained(output_dir, variant="fp16", torch_dtype=torch.float16)
+
+        self.assertEqual(converted.unet.dtype, torch.float16)
+        converted_state_dict = converted.unet.state_dict()
+        for name, param in pipe.unet.state_dict().items():
+            self.assertTrue(torch.equal(param.half(), converted_state_dict[name]), name)
+
+    def test_in_place_bf16_conversion(self):
+        pipe = self.get_dummy_pipeline()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pipe.save_pretrained(tmpdir)
+            FP16SafetensorsCommand(tmpdir, "bf16", False, num_workers=1).convert()
+
+            self.assertIn("diffusion_pytorch_model.bf16.safetensors", os.listdir(os.path.join(tmpdir, "unet")))
+            converted = UNet2DModel.from_pretrained(
+                tmpdir, subfolder="unet", variant="bf16", torch_dtype=torch.bfloat16
+            )
+
+        self.assertEqual(converted.dtype, torch.bfloat16)
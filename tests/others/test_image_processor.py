@@ -20,6 +20,7 @@ import PIL.Image
 import torch
 
 from diffusers.image_processor import VaeImageProcessor
+from diffusers.utils.testing_utils import torch_device
 
 
 class ImageProcessorTest(unittest.TestCase):
@@ -97,6 +98,22 @@ class ImageProcessorTest(unittest.TestCase):
                     np.abs(in_np - out_np).max() < 1e-6
                 ), f"decoded output does not match input for output_type {output_type}"
 
+    def test_vae_image_processor_uint8(self):
+        image_processor = VaeImageProcessor(do_resize=False, do_normalize=True)
+
+        image = torch.randn((4, 3, 8, 8))
+        do_denormalize = [True, False, True, False]
+        for dtype in [torch.float32, torch.float16]:
+            out = image_processor.postprocess(image.to(dtype), output_type="uint8", do_denormalize=do_denormalize)
+            out_pil = image_processor.postprocess(image.to(dtype), output_type="pil", do_denormalize=do_denormalize)
+            out_np = image_processor.postprocess(image.to(dtype), output_type="np", do_denormalize=do_denormalize)
+
+            self.assertEqual(out.dtype, torch.uint8)
+            self.assertEqual(out.shape, (4, 8, 8, 3))
+            self.assertTrue(np.array_equal(out.numpy(), self.to_np(out_pil)))
+            expected = (out_np.clip(0, 1) * 255).round().astype(np.uint8)
+            self.assertTrue(np.array_equal(out.numpy(), expected))
+
     def test_preprocess_input_3d(self):
         image_processor = VaeImageProcessor(do_resize=False, do_normalize=False)
 
@@ -308,3 +325,24 @@ class ImageProcessorTest(unittest.TestCase):
         assert (
             out_np.shape == exp_np_shape
         ), f"resized image output shape '{out_np.shape}' didn't match expected shape '{exp_np_shape}'."
+
+    def test_vae_image_processor_preprocess_parallel(self):
+        image_processor = VaeImageProcessor(do_resize=True, vae_scale_factor=8, do_convert_rgb=True)
+
+        # smooth images, so that the PIL and torch filters agree up to the lanczos ringing
+        y, x = np.meshgrid(np.linspace(0, 1, 60), np.linspace(0, 1, 90), indexing="ij")
+        images = []
+        for phase in range(4):
+            channels = [np.sin(2 * np.pi * (x + y + phase / 4 + c / 3)) * 0.5 + 0.5 for c in range(3)]
+            images.append(PIL.Image.fromarray((np.stack(channels, axis=-1) * 255).round().astype(np.uint8)))
+
+        expected = image_processor.preprocess(images, height=32, width=48)
+
+        out = image_processor.preprocess(images, height=32, width=48, num_workers=4)
+        assert torch.equal(out, expected)
+
+        out = image_processor.preprocess(images, height=32, width=48, device=torch_device, num_workers=2)
+        assert out.device.type == torch.device(torch_device).type
+        assert out.shape == expected.shape
+        max_diff = (out.cpu() - expected).abs().max().item()
+        assert max_diff < 0.05, f"tensor resize doesn't match the PIL resize, max diff {max_diff}"
@@ -167,3 +167,18 @@ class VideoProcessorTest(unittest.TestCase):
                 (self.to_np(input) * 255.0).round().astype("uint8") if output_type == "pil" else self.to_np(input)
             )
             assert np.abs(input_np - out_np).max() < 1e-6, f"Decoded output does not match input for {output_type=}"
+
+    def test_video_processor_iter(self):
+        video_processor = VideoProcessor(do_resize=False, do_normalize=True)
+
+        video = video_processor.preprocess_video(self.get_dummy_sample(input_type="5d_pt"))
+        for output_type in ["pt", "np", "pil"]:
+            out = video_processor.postprocess_video(video, output_type=output_type)
+            out_chunks = list(video_processor.postprocess_video_iter(video.split(2, dim=2), output_type=output_type))
+            if output_type == "pil":
+                out_chunks = [sum(frames, []) for frames in zip(*out_chunks)]
+            else:
+                out_chunks = (
+                    torch.cat(out_chunks, dim=1) if output_type == "pt" else np.concatenate(out_chunks, axis=1)
+                )
+            assert np.abs(self.to_np(out) - self.to_np(out_chunks)).max() < 1e-6
@@ -31,6 +31,7 @@ from diffusers import (
     MarigoldDepthPipeline,
     UNet2DConditionModel,
 )
+from diffusers.pipelines.marigold import MarigoldImageProcessor
 from diffusers.utils.testing_utils import (
     enable_full_determinism,
     floats_tensor,
@@ -286,6 +287,75 @@ class MarigoldDepthPipelineFastTests(PipelineTesterMixin, unittest.TestCase):
             )
             self.assertIn("processing_resolution", str(e))
 
+    def test_marigold_depth_dummy_tiled(self):
+        components = self.get_dummy_components()
+        pipe = self.pipeline_class(**components)
+        pipe.to("cpu")
+        pipe.set_progress_bar_config(disable=None)
+
+        pipe_inputs = self.get_dummy_inputs("cpu")
+        pipe_inputs.update(
+            processing_resolution=16,
+            tile_size=16,
+            tile_overlap=0.5,
+            ensemble_size=2,
+            batch_size=4,
+            output_uncertainty=True,
+            output_latent=True,
+        )
+        output = pipe(**pipe_inputs)
+
+        self.assertEqual(output.prediction.shape, (1, 32, 32, 1), "Unexpected output resolution")
+        self.assertEqual(output.uncertainty.shape, (1, 32, 32, 1), "Unexpected uncertainty resolution")
+        self.assertTrue(output.prediction.min() >= 0 and output.prediction.max() <= 1)
+        # 3x3 tiles of 16x16 with a stride of 8, times 2 ensemble members
+        self.assertEqual(output.latent.shape[0], 9 * 2)
+        self.assertEqual(output.latent.shape[2:], (16 // pipe.vae_scale_factor, 16 // pipe.vae_scale_factor))
+
+    def test_marigold_depth_dummy_tiled_latents(self):
+        with self.assertRaises(ValueError) as e:
+            self._test_marigold_depth(
+                tile_size=16,
+                latents=torch.randn(1, 4, 8, 8),
+                expected_slice=np.array([0.0]),
+            )
+            self.assertIn("tile_size", str(e))
+
+    def test_marigold_depth_tiles_roundtrip(self):
+        image = torch.rand(2, 1, 40, 56)
+        coords, tile_size, overlap = MarigoldImageProcessor.get_tile_coords(40, 56, 24, 0.3, 8)
+        self.assertEqual(coords[-1], (40 - tile_size[0], 56 - tile_size[1]))
+
+        tiles = MarigoldImageProcessor.split_tiles(image, coords, tile_size)
+        tiles = tiles.reshape(2, len(coords), *tiles.shape[1:]).transpose(0, 1)
+        merged = MarigoldImageProcessor.merge_tiles(tiles, coords, (40, 56), overlap)
+        self.assertTrue(torch.allclose(merged, image, atol=1e-6))
+
+    def test_marigold_depth_align_depth_tiles(self):
+        tiles = torch.rand(3, 1, 8, 8)
+        reference = tiles * torch.tensor([0.5, 0.8, 0.2]).view(3, 1, 1, 1) + torch.tensor([0.1, 0.0, 0.4]).view(
+            3, 1, 1, 1
+        )
+        aligned = MarigoldDepthPipeline.align_depth_tiles(tiles, reference)
+        self.assertTrue(torch.allclose(aligned, reference, atol=1e-5))
+
+        aligned = MarigoldDepthPipeline.align_depth_tiles(tiles, reference, False, False)
+        self.assertTrue(torch.equal(aligned, tiles))
+
+    def test_marigold_depth_ensemble_depth_batched(self):
+        depth = torch.rand(3, 4, 1, 16, 16, generator=torch.Generator().manual_seed(0))
+        for kwargs in ({}, {"reduction": "mean", "regularizer_strength": 0.1}):
+            prediction, uncertainty = MarigoldDepthPipeline.ensemble_depth(depth, output_uncertainty=True, **kwargs)
+            self.assertEqual(prediction.shape, (3, 1, 16, 16))
+            self.assertEqual(uncertainty.shape, (3, 1, 16, 16))
+
+            for i in range(depth.shape[0]):
+                expected, expected_uncertainty = MarigoldDepthPipeline.ensemble_depth(
+                    depth[i], output_uncertainty=True, **kwargs
+                )
+                self.assertTrue(torch.allclose(prediction[i : i + 1], expected, atol=1e-6))
+                self.assertTrue(torch.allclose(uncertainty[i : i + 1], expected_uncertainty, atol=1e-6))
+
 
 @slow
 @require_torch_gpu
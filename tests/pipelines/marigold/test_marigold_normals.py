@@ -283,6 +283,37 @@ class MarigoldNormalsPipelineFastTests(PipelineTesterMixin, unittest.TestCase):
             )
             self.assertIn("processing_resolution", str(e))
 
+    def test_marigold_normals_dummy_tiled(self):
+        components = self.get_dummy_components()
+        pipe = self.pipeline_class(**components)
+        pipe.to("cpu")
+        pipe.set_progress_bar_config(disable=None)
+
+        pipe_inputs = self.get_dummy_inputs("cpu")
+        pipe_inputs.update(
+            processing_resolution=16,
+            tile_size=16,
+            tile_overlap=0.5,
+            ensemble_size=2,
+            batch_size=4,
+            output_latent=True,
+        )
+        output = pipe(**pipe_inputs)
+
+        self.assertEqual(output.prediction.shape, (1, 32, 32, 3), "Unexpected output resolution")
+        norm = np.linalg.norm(output.prediction, axis=-1)
+        self.assertTrue(np.allclose(norm, 1.0, atol=1e-3))
+        # 3x3 tiles of 16x16 with a stride of 8, times 2 ensemble members
+        self.assertEqual(output.latent.shape[0], 9 * 2)
+
+    def test_marigold_normals_dummy_tiled_invalid_tile_size(self):
+        with self.assertRaises(ValueError) as e:
+            self._test_marigold_normals(
+                tile_size=15,
+                expected_slice=np.array([0.0]),
+            )
+            self.assertIn("tile_size", str(e))
+
 
 @slow
 @require_torch_gpu
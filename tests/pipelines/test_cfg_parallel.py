@@ -0,0 +1,99 @@
+# coding=utf-8
+# Copyright 2024 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import torch
+
+from diffusers import CFGParallelMixin, DDIMScheduler, DiffusionPipeline, UNet2DConditionModel
+from diffusers.utils.testing_utils import run_distributed_test
+
+
+class GuidedPipeline(DiffusionPipeline, CFGParallelMixin):
+    def __init__(self, unet, scheduler):
+        super().__init__()
+        self.register_modules(unet=unet, scheduler=scheduler)
+
+    @torch.no_grad()
+    def __call__(self, latents, prompt_embeds, guidance_scale=5.0, num_inference_steps=3):
+        self.scheduler.set_timesteps(num_inference_steps)
+        for t in self.scheduler.timesteps:
+            latent_model_input = torch.cat([latents] * 2) if guidance_scale > 1 else latents
+            noise_pred = self.unet(latent_model_input, t, encoder_hidden_states=prompt_embeds).sample
+            if guidance_scale > 1:
+                noise_pred_uncond, noise_pred_text = noise_pred.chunk(2)
+                noise_pred = noise_pred_uncond + guidance_scale * (noise_pred_text - noise_pred_uncond)
+            latents = self.scheduler.step(noise_pred, t, latents).prev_sample
+        return latents
+
+
+def _check_cfg_parallel(rank, world_size, pipe, inputs, expected):
+    pipe.enable_cfg_parallel()
+
+    # the batch of the denoiser has to be split across the ranks
+    batch_sizes = []
+    hook = pipe.unet.register_forward_pre_hook(lambda module, args: batch_sizes.append(args[0].shape[0]))
+    output = pipe(**inputs)
+    hook.remove()
+    assert batch_sizes == [1] * len(batch_sizes), f"rank {rank}: batch sizes {batch_sizes}"
+
+    max_diff = (output - expected).abs().max().item()
+    assert max_diff < 1e-4, f"rank {rank}: max diff {max_diff}"
+
+    # unguided batches of 1 can't be split and are computed on every rank
+    unguided_inputs = {**inputs, "prompt_embeds": inputs["prompt_embeds"][1:], "guidance_scale": 1.0}
+    pipe.disable_cfg_parallel()
+    unguided_expected = pipe(**unguided_inputs)
+    pipe.enable_cfg_parallel()
+    assert torch.allclose(pipe(**unguided_inputs), unguided_expected, atol=1e-6)
+
+    pipe.disable_cfg_parallel()
+    assert len(pipe.unet._forward_pre_hooks) == 0
+    assert torch.allclose(pipe(**inputs), expected, atol=1e-6)
+
+
+class CFGParallelTests(unittest.TestCase):
+    def get_dummy_pipeline(self):
+        torch.manual_seed(0)
+        unet = UNet2DConditionModel(
+            block_out_channels=(4, 8),
+            layers_per_block=1,
+            sample_size=8,
+            in_channels=4,
+            out_channels=4,
+            down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+            up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+            cross_attention_dim=8,
+            norm_num_groups=2,
+        )
+        pipe = GuidedPipeline(unet=unet.eval(), scheduler=DDIMScheduler())
+        pipe.set_progress_bar_config(disable=None)
+        return pipe
+
+    def test_cfg_parallel(self):
+        pipe = self.get_dummy_pipeline()
+        generator = torch.Generator().manual_seed(0)
+        inputs = {
+            "latents": torch.randn(1, 4, 8, 8, generator=generator),
+            "prompt_embeds": torch.randn(2, 3, 8, generator=generator),
+        }
+        expected = pipe(**inputs)
+
+        run_distributed_test(_check_cfg_parallel, world_size=2, args=(pipe, inputs, expected))
+
+    def test_cfg_parallel_requires_process_group(self):
+        pipe = self.get_dummy_pipeline()
+        with self.assertRaises(RuntimeError):
+            pipe.enable_cfg_parallel()